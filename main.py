@@ -1,8 +1,9 @@
 from pathlib import Path
-from umbtest.benchmarks import Tester
+from umbtest.benchmarks import Tester, configure_tester
 from umbtest.tools import PrismCLI, StormCLI, UmbPython, check_tools, configure_umbtools
 
 configure_umbtools()
+configure_tester()
 prism_cli = PrismCLI()
 storm_cli = StormCLI()
 umb_py = UmbPython()
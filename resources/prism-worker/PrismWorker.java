@@ -0,0 +1,104 @@
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.security.Permission;
+
+import prism.PrismCL;
+
+/**
+ * Long-lived PRISM process for umbtest (see PrismWorkerCLI in umbtest/tools.py).
+ *
+ * Reads one invocation per line from stdin, with the command line arguments separated by tabs,
+ * runs it with PrismCL inside this JVM, and answers with a line "EXIT <code>" on stdout.
+ * Calls to System.exit by PRISM are trapped and reported as exit code.
+ * Trapping them needs a security manager, which Java 24 removed (JEP 486). Without it, System.exit terminates the worker,
+ * and umbtest reports the exit code of the process and starts a new worker. PrismWorkerCLI does not use the worker with such a Java.
+ * Uncaught exceptions are appended to the file given with -mainlog, as stderr is not read by umbtest.
+ */
+public class PrismWorker
+{
+	private static class ExitTrappedException extends SecurityException
+	{
+		final int status;
+
+		ExitTrappedException(int status)
+		{
+			this.status = status;
+		}
+	}
+
+	@SuppressWarnings("removal")
+	private static void trapExits()
+	{
+		try {
+			System.setSecurityManager(new SecurityManager()
+			{
+				@Override
+				public void checkExit(int status)
+				{
+					throw new ExitTrappedException(status);
+				}
+
+				@Override
+				public void checkPermission(Permission perm)
+				{
+				}
+
+				@Override
+				public void checkPermission(Permission perm, Object context)
+				{
+				}
+			});
+		} catch (UnsupportedOperationException | SecurityException e) {
+			System.err.println("PrismWorker: cannot trap System.exit: " + e);
+		}
+	}
+
+	private static void logUncaught(String[] invocation, Throwable t)
+	{
+		String mainlog = null;
+		for (int i = 0; i + 1 < invocation.length; i++) {
+			if (invocation[i].equals("-mainlog")) {
+				mainlog = invocation[i + 1];
+			}
+		}
+		if (mainlog == null) {
+			t.printStackTrace();
+			return;
+		}
+		try (PrintStream log = new PrintStream(new FileOutputStream(mainlog, true), true)) {
+			log.println();
+			log.println("Error: Unhandled exception in PrismWorker:");
+			t.printStackTrace(log);
+		} catch (IOException e) {
+			t.printStackTrace();
+		}
+	}
+
+	public static void main(String[] args) throws IOException
+	{
+		PrintStream protocol = new PrintStream(new FileOutputStream(FileDescriptor.out), true);
+		// Anything PRISM prints to stdout goes to stderr, such that stdout only carries the protocol.
+		System.setOut(System.err);
+		trapExits();
+		BufferedReader in = new BufferedReader(new InputStreamReader(System.in));
+		String line;
+		while ((line = in.readLine()) != null) {
+			String[] invocation = line.isEmpty() ? new String[0] : line.split("\t", -1);
+			int code = 0;
+			try {
+				new PrismCL().go(invocation);
+			} catch (ExitTrappedException e) {
+				code = e.status;
+			} catch (Throwable t) {
+				logUncaught(invocation, t);
+				code = 1;
+			}
+			protocol.println("EXIT " + code);
+		}
+		Runtime.getRuntime().halt(0);
+	}
+}
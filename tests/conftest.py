@@ -0,0 +1,276 @@
+import pathlib
+import threading
+import time
+
+import pytest
+
+from umbtest.benchmarks import MatrixRunner, Tester, UmbBenchmark, configure_tester, prism_files_manifest, select_benchmarks, shard_benchmarks
+from umbtest.schedule import DurationHistory, estimates, longest_first, predict_makespan
+from umbtest.tools import ReportedResults, UmbTool
+
+pytest_plugins = ["umbtest.pytest_perf"]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("umbtest", "benchmark selection")
+    group.addoption("--shard", default=None, help="Only run shard i of n, given as i/n with i from 0 to n-1.")
+    group.addoption("--benchmark-min-states", type=int, default=None, help="Only benchmarks with at least this many states.")
+    group.addoption("--benchmark-max-states", type=int, default=None, help="Only benchmarks with at most this many states.")
+    group.addoption("--benchmark-type", action="append", default=None, help="Only benchmarks of this model type, e.g., mdp.")
+    group.addoption("--benchmark-tag", action="append", default=None, help="Only benchmarks with this tag.")
+    group.addoption(
+        "--history",
+        default=None,
+        help="Durations of previous runs, used to run the longest tests first. Defaults to the test history of the runner in tools.toml.",
+    )
+    group.addoption(
+        "--predict-makespan",
+        type=int,
+        default=None,
+        metavar="WORKERS",
+        help="Report the expected duration of the selected tests on this many workers.",
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Before the perf plugin reads its baseline and the benchmarks are selected.
+    configure_tester()
+
+
+_makespan_key = pytest.StashKey[tuple]()
+# The duration of setup, call, and teardown of every test in this session.
+_durations = dict()
+
+
+def _history(config) -> DurationHistory | None:
+    location = config.getoption("--history")
+    if location is not None:
+        return DurationHistory(location)
+    return MatrixRunner.default_test_history
+
+
+def _shard(config):
+    value = config.getoption("--shard")
+    if value is None:
+        return None
+    index, count = value.split("/")
+    return int(index), int(count)
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Deselects the tests on benchmarks that do not match the selection options, and runs the longest tests first if there is a history.
+    """
+    _select(config, items)
+    history = _history(config)
+    if history is None:
+        return
+    keys = [item.nodeid for item in items]
+    items[:] = longest_first(items, keys, history)
+    workers = config.getoption("--predict-makespan")
+    if workers is not None:
+        config.stash[_makespan_key] = (workers, predict_makespan(estimates(keys, history), workers))
+
+
+def pytest_runtest_logreport(report):
+    _durations[report.nodeid] = _durations.get(report.nodeid, 0.0) + report.duration
+
+
+def pytest_sessionfinish(session):
+    # The measurements of the session are written to the manifest once.
+    prism_files_manifest.save()
+    history = _history(session.config)
+    if history is None or not _durations:
+        return
+    for nodeid, duration in _durations.items():
+        history.add(nodeid, duration)
+    history.save()
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if _makespan_key in config.stash:
+        workers, makespan = config.stash[_makespan_key]
+        terminalreporter.write_line(f"Predicted duration on {workers} workers: {makespan:.0f}s")
+    cache = Tester.artifact_cache_default
+    if cache is not None and cache.hits + cache.misses > 0:
+        stats = cache.stats()
+        terminalreporter.write_line(
+            f"Artifact cache {cache.location}: {stats['hits']} hits, {stats['misses']} misses, {stats['stores']} stores, {stats['evictions']} evictions"
+        )
+
+
+def _select(config, items):
+    """
+    Deselects the tests on benchmarks that do not match the selection options.
+    Sharding is by benchmark, such that all tests on one benchmark run on the same shard.
+    Tests without a benchmark run on shard 0.
+    """
+    shard = _shard(config)
+    criteria = {
+        "min_states": config.getoption("--benchmark-min-states"),
+        "max_states": config.getoption("--benchmark-max-states"),
+        "model_types": config.getoption("--benchmark-type"),
+        "tags": config.getoption("--benchmark-tag"),
+    }
+    if shard is None and all(c is None for c in criteria.values()):
+        return
+    selected, deselected = [], []
+    for item in items:
+        callspec = getattr(item, "callspec", None)
+        benchmark = callspec.params.get("benchmark") if callspec is not None else None
+        if isinstance(benchmark, UmbBenchmark):
+            keep = bool(select_benchmarks([benchmark], **criteria))
+            keep = keep and (shard is None or bool(shard_benchmarks([benchmark], *shard)))
+        else:
+            keep = shard is None or shard[0] == 0
+        (selected if keep else deselected).append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+class FakeTool(UmbTool):
+    """
+    A stand-in for the tools of a chain, which succeeds without running a process.
+    Every step waits for the given seconds, writes the payload to the output file (if any) and the log to the log file.
+    The wall times are reported in turn. The tool counts its calls and the steps that run at the same time, and remembers the directories
+    of the log files. Tests that need other behaviour subclass it and override _run.
+    """
+
+    name = "FakeTool"
+
+    def __init__(self, identifier=None, payload=b"umb", log="done\n", times=(None,), seconds=0.0, model_info=None, version="1", extra_args=[]):
+        """
+        :param identifier: The identifier of the tool, which is its name if none.
+        :param version: Part of the fingerprint, such that a new version invalidates the results of the older one.
+        """
+        self._identifier = identifier
+        self.payload = payload
+        self.log = log
+        self.times = list(times)
+        self.seconds = seconds
+        self.model_info = model_info
+        self.version = version
+        self._extra_args = extra_args
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self.directories = set()
+
+    @property
+    def identifier(self):
+        return self.name if self._identifier is None else self._identifier
+
+    def fingerprint(self):
+        return "fake-" + self.version
+
+    def __getstate__(self):
+        # Tools are pickled for the workers of a work queue, which cannot share the lock.
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def _run(self, input_file, output_file, log_file):
+        with self.lock:
+            wall_time = self.times[self.calls % len(self.times)]
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.directories.add(pathlib.Path(log_file).parent)
+        try:
+            time.sleep(self.seconds)
+            if output_file is not None:
+                pathlib.Path(output_file).write_bytes(self.payload)
+            with open(log_file, "w") as f:
+                f.write(self.log)
+        finally:
+            with self.lock:
+                self.running -= 1
+        result = ReportedResults()
+        result.exit_code = 0
+        result.logfile = log_file
+        result.wall_time = wall_time
+        result.model_info = None if self.model_info is None else dict(self.model_info)
+        return result
+
+    def prism_file_to_umb(self, prism_file, output_file, log_file):
+        return self._run(prism_file, output_file, log_file)
+
+    def umb_to_umb(self, input_file, output_file, log_file):
+        return self._run(input_file, output_file, log_file)
+
+    def check_umb(self, umb_file, log_file, properties=[]):
+        return self._run(umb_file, None, log_file)
+
+
+def fake_jobs(tool, n, directory=None):
+    """
+    Jobs for a MatrixRunner or QueueRunner, in which the tool loads and checks a benchmark of its own.
+
+    :param directory: Where the models are written, e.g., for workers that read them. If none, the models do not exist, which the stand-in tools do not notice.
+    """
+    jobs = []
+    for i in range(n):
+        if directory is None:
+            path = pathlib.Path(f"stand-in/model{i}.nm")
+        else:
+            path = directory / f"model{i}.nm"
+            path.write_text(f"dtmc // {i}")
+        tester = Tester()
+        tester.set_chain(loader=tool, checker=tool)
+        jobs.append((tester, UmbBenchmark(path)))
+    return jobs
+
+
+def small_dtmc():
+    """
+    A DTMC with three states in a cycle, where every state has a self-loop, with a state reward.
+    """
+    # umbi is imported here, such that collecting the tests does not need it.
+    from umbi.binary import SizedType
+    from umbi.datatypes import NumericPrimitiveType
+    from umbi.umb import ExplicitUmb
+    from umbi.umb.index import AnnotationDescription
+
+    umb = ExplicitUmb()
+    ts = umb.index.transition_system
+    ts.time = "discrete"
+    ts.num_players = 0
+    ts.num_states = 3
+    ts.num_initial_states = 1
+    ts.num_choices = 3
+    ts.num_branches = 6
+    ts.branch_probability_type = SizedType.for_type(NumericPrimitiveType.DOUBLE)
+    umb.state_is_initial = [True, False, False]
+    umb.state_to_choices = [0, 1, 2, 3]
+    umb.choice_to_branches = [0, 2, 4, 6]
+    umb.branch_to_target = [1, 0, 2, 1, 0, 2]
+    umb.branch_to_probability = [0.5] * 6
+    umb.index.annotations = {
+        "rewards": {
+            "r": AnnotationDescription(
+                applies_to=["states"],
+                type=SizedType.for_type(NumericPrimitiveType.DOUBLE),
+            )
+        }
+    }
+    umb.annotations = {"rewards": {"r": {"states": [1.0, 2.0, 3.0]}}}
+    return umb
+
+
+@pytest.fixture
+def umb_file(tmp_path):
+    """
+    The small DTMC, written to a UMB file.
+    """
+    import umbi
+
+    path = tmp_path / "small.umb"
+    umbi.umb.write(small_dtmc(), path)
+    return path
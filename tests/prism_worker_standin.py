@@ -0,0 +1,23 @@
+"""
+A stand-in for resources/prism-worker/PrismWorker.java, speaking the same protocol.
+It writes a PRISM-like main log and, if asked to export, a file containing the process id of the worker.
+The special arguments -hang and -crash simulate a stuck invocation and a worker that terminates.
+"""
+
+import os
+import sys
+import time
+
+for line in sys.stdin:
+    args = line.rstrip("\n").split("\t")
+    if "-crash" in args:
+        sys.exit(3)
+    if "-hang" in args:
+        time.sleep(60)
+    if "-mainlog" in args:
+        with open(args[args.index("-mainlog") + 1], "w") as log:
+            log.write("Type:        DTMC\nStates:      13 (1 initial)\nTransitions: 20\n")
+    if "-exportmodel" in args:
+        with open(args[args.index("-exportmodel") + 1], "w") as out:
+            out.write(str(os.getpid()))
+    print("EXIT 0", flush=True)
@@ -0,0 +1,107 @@
+import asyncio
+import pathlib
+import threading
+import time
+
+import pytest
+
+from conftest import FakeTool, fake_jobs
+from umbtest.benchmarks import MatrixRunner, Tester
+from umbtest.tools import run_process_async, run_sync
+
+"""
+The asynchronous API is tested with a stand-in tool that runs a (sleeping) subprocess on the event loop.
+"""
+
+
+class _SleepingTool(FakeTool):
+    """
+    Runs a sleeping process before every step, which the tool awaits rather than blocking a thread.
+    """
+
+    name = "SleepingTool"
+
+    def __init__(self, seconds=0.2):
+        super().__init__()
+        self.process_seconds = seconds
+
+    async def _run_async(self, input_file, output_file, log_file):
+        # The shell starts a child, which must be killed as well on cancellation.
+        script = f"sleep {self.process_seconds} & echo $! > {log_file}.child; wait"
+        outcome = await run_process_async(["sh", "-c", script])
+        result = self._run(input_file, output_file, log_file)
+        result.set_outcome(outcome)
+        return result
+
+    async def prism_file_to_umb_async(self, prism_file, output_file, log_file):
+        return await self._run_async(prism_file, output_file, log_file)
+
+    async def check_umb_async(self, umb_file, log_file, properties=[]):
+        return await self._run_async(umb_file, None, log_file)
+
+    async def check_process_async(self):
+        return True
+
+    def prism_file_to_umb(self, prism_file, output_file, log_file):
+        return run_sync(self.prism_file_to_umb_async(prism_file, output_file, log_file))
+
+    def check_umb(self, umb_file, log_file, properties=[]):
+        return run_sync(self.check_umb_async(umb_file, log_file, properties))
+
+    def check_process(self):
+        return run_sync(self.check_process_async())
+
+
+def test_tool_methods(tmp_path):
+    tool = _SleepingTool(seconds=0)
+    result = asyncio.run(tool.prism_file_to_umb_async(pathlib.Path("model.nm"), tmp_path / "out.umb", tmp_path / "out.log"))
+    assert result.exit_code == 0
+    assert (tmp_path / "out.umb").exists()
+    assert asyncio.run(tool.check_process_async())
+    assert tool.check_umb(tmp_path / "out.umb", tmp_path / "check.log").exit_code == 0
+
+
+def test_fan_out_overlaps():
+    tool = _SleepingTool(seconds=0.3)
+    threads = []
+
+    async def run():
+        runner = asyncio.ensure_future(MatrixRunner(max_workers=8).run_async(fake_jobs(tool, 8)))
+        await asyncio.sleep(0.15)
+        threads.append(threading.active_count())
+        return await runner
+
+    start = time.monotonic()
+    results = asyncio.run(run())
+    # Every job takes two steps of 0.3s, sequentially this would take 4.8s.
+    assert time.monotonic() - start < 3
+    # The processes are driven by the event loop, rather than by a thread each.
+    assert threads[0] < 4
+    assert [r["checker"].exit_code for r in results] == [0] * 8
+
+
+def test_cancellation_kills_process_tree(tmp_path):
+    tool = _SleepingTool(seconds=30)
+    tester = Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=tool, checker=tool)
+
+    async def cancel_soon():
+        task = asyncio.ensure_future(tester.check_prism_file_async(pathlib.Path("model.nm"), []))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.monotonic()
+    asyncio.run(cancel_soon())
+    assert time.monotonic() - start < 10
+    children = list(tmp_path.glob("*.child"))
+    # The checker did not start after the loader was cancelled.
+    assert len(children) == 1
+    pid = int(children[0].read_text())
+    # The grandchild is killed (and reaped by init), so it no longer exists or is a zombie.
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            assert f.read().split(")")[-1].split()[0] == "Z"
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,90 @@
+
+from conftest import FakeTool
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.cache import ArtifactCache, CachedTool
+
+
+def _counting_tool(**kwargs):
+    return FakeTool(log="States: \t3\n", times=[0.5], model_info={"states": 3}, **kwargs)
+
+
+def _model(tmp_path, content="dtmc"):
+    path = tmp_path / "model.nm"
+    path.write_text(content)
+    return path
+
+
+def test_reuse(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache")
+    tool = _counting_tool()
+    cached = CachedTool(tool, cache)
+    model = _model(tmp_path)
+    first = cached.prism_file_to_umb(model, tmp_path / "a.umb", tmp_path / "a.log")
+    second = cached.prism_file_to_umb(model, tmp_path / "b.umb", tmp_path / "b.log")
+    assert tool.calls == 1
+    assert (tmp_path / "b.umb").read_bytes() == b"umb"
+    assert (tmp_path / "b.log").read_text() == "States: \t3\n"
+    assert second.logfile == tmp_path / "b.log"
+    assert second.model_info == first.model_info
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    # The reused results were not measured.
+    assert second.cached and not first.cached
+    assert first.wall_time is not None and second.wall_time is None
+    # Writing the output in place does not change the entry.
+    with open(tmp_path / "b.umb", "r+b") as f:
+        f.write(b"xyz")
+    cached.prism_file_to_umb(model, tmp_path / "c.umb", tmp_path / "c.log")
+    assert (tmp_path / "c.umb").read_bytes() == b"umb"
+
+
+def test_key_changes(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache")
+    model = _model(tmp_path)
+    key = cache.key("prism_file_to_umb", _counting_tool(), model)
+    assert key != cache.key("umb_to_umb", _counting_tool(), model)
+    assert key != cache.key("prism_file_to_umb", _counting_tool(extra_args=["-exact"]), model)
+    model.write_text("mdp")
+    assert key != cache.key("prism_file_to_umb", _counting_tool(), model)
+
+
+def test_eviction(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache", max_bytes=3000)
+    tool = _counting_tool(payload=b"x" * 1000)
+    cached = CachedTool(tool, cache)
+    for i in range(5):
+        model = _model(tmp_path, f"dtmc {i}")
+        cached.prism_file_to_umb(model, tmp_path / "out.umb", tmp_path / "out.log")
+    assert cache.size() <= 3000
+    assert cache.stats()["evictions"] > 0
+    # The most recent entry is still there.
+    cached.prism_file_to_umb(model, tmp_path / "out.umb", tmp_path / "out.log")
+    assert tool.calls == 5
+
+
+def test_store_without_rescan(tmp_path, monkeypatch):
+    cache = ArtifactCache(tmp_path / "cache", max_bytes=10000)
+    cached = CachedTool(_counting_tool(payload=b"x" * 1000), cache)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+    for i in range(12):
+        cached.prism_file_to_umb(_model(tmp_path, f"dtmc {i}"), tmp_path / "out.umb", tmp_path / "out.log")
+        if i == 4:
+            # The cache is scanned once to count its size, and then only when it exceeds the budget.
+            assert len(scans) == 1
+    assert 1 < len(scans) <= 1 + cache.stats()["evictions"]
+    assert cache._size == cache.size() <= 10000
+
+
+def test_tester(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache")
+    tool = _counting_tool()
+    benchmark = UmbBenchmark(_model(tmp_path))
+    for _ in range(3):
+        tester = Tester(tmpdir=str(tmp_path), artifact_cache=cache)
+        tester.set_chain(loader=tool, transformer=tool, checker=tool)
+        results = tester.check_benchmark(benchmark)
+        assert results["checker"].exit_code == 0
+    # Loader and transformer once, checker every time.
+    assert tool.calls == 2 + 3
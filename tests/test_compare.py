@@ -0,0 +1,201 @@
+import copy
+from fractions import Fraction
+
+import numpy as np
+import umbi
+from umbi.binary import SizedType
+from umbi.datatypes import Interval, PrimitiveType
+from umbi.umb.index import AnnotationDescription
+
+from conftest import small_dtmc
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.compare import UmbArrays, _hash_values, _sort_within_rows, compare_umb_files
+from umbtest.tools import ReportedResults, UmbPython, UmbTool
+
+
+def _mdp():
+    """
+    A small MDP with labels, where the choices and branches of state 0 are in an arbitrary order.
+    """
+    umb = small_dtmc()
+    ts = umb.index.transition_system
+    ts.num_states = 4
+    ts.num_choices = 5
+    ts.num_branches = 8
+    umb.state_is_initial = [True, False, False, False]
+    umb.state_to_choices = [0, 2, 3, 4, 5]
+    umb.choice_to_branches = [0, 2, 3, 5, 7, 8]
+    umb.branch_to_target = [2, 1, 3, 1, 2, 0, 3, 3]
+    umb.branch_to_probability = [0.25, 0.75, 1.0, 0.5, 0.5, 0.1, 0.9, 1.0]
+    umb.index.annotations["aps"] = {
+        "goal": AnnotationDescription(applies_to=["states"], type=SizedType.for_type(PrimitiveType.BOOL))
+    }
+    umb.annotations = {
+        "rewards": {"r": {"states": [1.0, 2.0, 3.0, 4.0]}},
+        "aps": {"goal": {"states": [False, False, False, True]}},
+    }
+    return umb
+
+
+def _renumbered(umb, new_id):
+    """
+    The same model, where state s is renamed to new_id[s] and the choices of every state are reversed.
+    """
+    result = copy.deepcopy(umb)
+    n = umb.index.transition_system.num_states
+    old_id = [new_id.index(s) for s in range(n)]
+    choices = [c for s in old_id for c in reversed(range(umb.state_to_choices[s], umb.state_to_choices[s + 1]))]
+    result.state_to_choices = [0]
+    for s in old_id:
+        result.state_to_choices.append(result.state_to_choices[-1] + umb.state_to_choices[s + 1] - umb.state_to_choices[s])
+    result.choice_to_branches = [0]
+    result.branch_to_target = []
+    result.branch_to_probability = []
+    for c in choices:
+        for b in range(umb.choice_to_branches[c], umb.choice_to_branches[c + 1]):
+            result.branch_to_target.append(new_id[umb.branch_to_target[b]])
+            result.branch_to_probability.append(umb.branch_to_probability[b])
+        result.choice_to_branches.append(len(result.branch_to_target))
+    result.state_is_initial = [umb.state_is_initial[s] for s in old_id]
+    for group in umb.annotations:
+        for name in umb.annotations[group]:
+            values = umb.annotations[group][name]["states"]
+            result.annotations[group][name]["states"] = [values[s] for s in old_id]
+    return result
+
+
+def _write(tmp_path, name, umb):
+    path = tmp_path / name
+    umbi.umb.write(umb, path)
+    return path
+
+
+def test_equal(tmp_path):
+    path = _write(tmp_path, "a.umb", _mdp())
+    assert compare_umb_files(path, path) == []
+    arrays = UmbArrays.read(path)
+    assert arrays.num_states == 4
+    assert list(arrays.annotations[("aps", "goal", "states")]) == [False, False, False, True]
+
+
+def test_branch_order(tmp_path):
+    umb = _mdp()
+    left = _write(tmp_path, "a.umb", umb)
+    umb.branch_to_target[0:2] = [1, 2]
+    umb.branch_to_probability[0:2] = [0.75, 0.25]
+    right = _write(tmp_path, "b.umb", umb)
+    assert compare_umb_files(left, right) == []
+
+
+def test_differences(tmp_path):
+    umb = _mdp()
+    left = _write(tmp_path, "a.umb", umb)
+    umb.branch_to_probability[3] = 0.5 + 1e-12
+    umb.branch_to_probability[4] = 0.5 - 1e-12
+    umb.annotations["rewards"]["r"]["states"][2] = 5.0
+    right = _write(tmp_path, "b.umb", umb)
+    differences = compare_umb_files(left, right)
+    assert len(differences) == 2
+    assert differences[0].startswith("branch-to-probability: 2 entries differ")
+    assert differences[1].startswith("annotation rewards/r/states: 1 entries differ, first at 2")
+    assert compare_umb_files(left, right, tolerance=1e-9) == [differences[1]]
+
+
+def test_count_mismatch(tmp_path):
+    left = _write(tmp_path, "a.umb", _mdp())
+    right = _write(tmp_path, "b.umb", small_dtmc())
+    assert compare_umb_files(left, right)[0] == "number of states: 4 vs 3"
+
+
+def test_canonicalize(tmp_path):
+    umb = _mdp()
+    left = _write(tmp_path, "a.umb", umb)
+    right = _write(tmp_path, "b.umb", _renumbered(umb, [2, 0, 3, 1]))
+    assert compare_umb_files(left, right) != []
+    assert compare_umb_files(left, right, canonicalize=True) == []
+    # A different label is still found after canonicalization.
+    other = _renumbered(umb, [2, 0, 3, 1])
+    other.annotations["aps"]["goal"]["states"] = [True, False, False, False]
+    right = _write(tmp_path, "c.umb", other)
+    assert compare_umb_files(left, right, canonicalize=True) != []
+
+
+def test_canonical_large():
+    # A random DTMC, given directly as arrays.
+    rng = np.random.default_rng(0)
+    n = 100000
+    arrays = UmbArrays(
+        None,
+        np.arange(n) == 0,
+        np.arange(n + 1, dtype=np.int64),
+        np.arange(0, 2 * n + 1, 2, dtype=np.int64),
+        rng.integers(0, n, 2 * n),
+        rng.random(2 * n),
+        dict(),
+        {("rewards", "r", "states"): rng.random(n)},
+    )
+    canonical, ambiguous = arrays.canonical()
+    assert ambiguous == 0
+    permutation = rng.permutation(n)
+    new_id = np.empty(n, dtype=np.int64)
+    new_id[permutation] = np.arange(n)
+    renumbered = UmbArrays(
+        None,
+        arrays.initial[permutation],
+        arrays.state_to_choices,
+        arrays.choice_to_branches,
+        new_id[arrays.branch_to_target.reshape(n, 2)[permutation].reshape(-1)],
+        arrays.branch_to_probability.reshape(n, 2)[permutation].reshape(-1),
+        dict(),
+        {("rewards", "r", "states"): arrays.annotations[("rewards", "r", "states")][permutation]},
+    )
+    other, _ = renumbered.canonical()
+    assert np.array_equal(canonical.branch_to_target, other.branch_to_target)
+    assert np.array_equal(canonical.branch_to_probability, other.branch_to_probability)
+
+
+def test_sort_large_keys():
+    offsets = np.array([0, 3, 5], dtype=np.int64)
+    keys = np.array([2**40, 1, 2**33, 2**32 + 1, 2**32], dtype=np.int64)
+    order = _sort_within_rows(offsets, keys)
+    assert order.tolist() == [1, 2, 0, 4, 3]
+
+
+def test_hash_intervals():
+    values = np.array([Interval(0.25, 0.5), Interval(Fraction(1, 4), Fraction(1, 2)), Interval(0.25, 0.75)], dtype=object)
+    hashes = _hash_values(values, None)
+    assert hashes[0] == hashes[1]
+    assert hashes[0] != hashes[2]
+
+
+class _UmbLoader(UmbTool):
+    """
+    Loads every benchmark as the given model, and accepts every model.
+    """
+
+    name = "UmbLoader"
+
+    def __init__(self, umb):
+        self.umb = umb
+
+    def prism_file_to_umb(self, prism_file, output_file, log_file):
+        umbi.umb.write(self.umb, output_file)
+        result = ReportedResults()
+        result.exit_code = 0
+        return result
+
+    def check_umb(self, umb_file, log_file, properties=[]):
+        result = ReportedResults()
+        result.exit_code = 0
+        return result
+
+
+def test_tester(tmp_path):
+    benchmark = UmbBenchmark(tmp_path / "model.nm")
+    loader = _UmbLoader(_mdp())
+    tester = Tester(tmpdir=str(tmp_path), compare=True)
+    tester.set_chain(loader=loader, transformer=UmbPython("stream"), checker=loader)
+    assert tester.check_benchmark(benchmark)["differences"] == []
+    tester = Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=loader, transformer=UmbPython("stream"), checker=loader)
+    assert tester.check_benchmark(benchmark)["differences"] is None
@@ -0,0 +1,75 @@
+
+import umbi
+
+from conftest import small_dtmc
+from umbtest.benchmarks import UmbBenchmark
+from umbtest.formats import FormatCostReport, FormatCostSuite, supported_codecs
+from umbtest.tools import ReportedResults, UmbTool, record_file_sizes
+
+
+class _Producer(UmbTool):
+    name = "Producer"
+
+    def prism_file_to_umb(self, prism_file, output_file, log_file):
+        umbi.umb.write(small_dtmc(), output_file)
+        result = ReportedResults()
+        result.exit_code = 0
+        return record_file_sizes(result, prism_file, output_file)
+
+
+def _record(**values):
+    record = {"benchmark": "b", "producer": "p", "mode": "umb", "codec": "gz", "read_time": 1.0, "write_time": 1.0, "size": 100}
+    record.update(values)
+    return record
+
+
+def test_suite(tmp_path):
+    benchmark = UmbBenchmark(tmp_path / "model.nm")
+    benchmark.location.write_text("dtmc")
+    report = FormatCostSuite([_Producer()], tmpdir=tmp_path).run([benchmark])
+    assert len(report.records) == 2 * len(supported_codecs())
+    for record in report.records:
+        assert record["states"] == 3
+        assert record["transitions"] == 6
+        assert record["size"] > 0
+        assert record["read_memory"] > 0
+    uncompressed = [r for r in report.records if r["codec"] == "none"]
+    assert all(r["compression_ratio"] <= 1 for r in uncompressed)
+    assert [r for r in report.records if r["codec"] == "gz"][0]["compression_ratio"] > 1
+
+
+def test_json_round_trip(tmp_path):
+    report = FormatCostReport("1.0")
+    report.add(_record())
+    report.write_json(tmp_path / "formats.json")
+    restored = FormatCostReport.read_json(tmp_path / "formats.json")
+    assert restored.version == "1.0"
+    assert restored.records == report.records
+
+
+def test_regressions():
+    baseline = FormatCostReport("1.0")
+    baseline.add(_record())
+    baseline.add(_record(codec="xz", read_time=0.01))
+    current = FormatCostReport("1.1")
+    current.add(_record(read_time=1.1, size=200))
+    # Too short to be compared.
+    current.add(_record(codec="xz", read_time=0.03))
+    # Not in the baseline.
+    current.add(_record(codec="bz2", read_time=10.0))
+    regressions = current.regressions(baseline)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("b/p/umb/gz: size grew from 100")
+
+
+def test_max_states(tmp_path):
+    benchmark = UmbBenchmark(tmp_path / "model.nm")
+    benchmark.location.write_text("dtmc")
+    assert FormatCostSuite([_Producer()], tmpdir=tmp_path, codecs=supported_codecs()[:1], max_states=2).run([benchmark]).records == []
+    assert len(FormatCostSuite([_Producer()], tmpdir=tmp_path, codecs=supported_codecs()[:1], max_states=3).run([benchmark]).records) == 2
+
+
+def test_summary_without_ratio():
+    report = FormatCostReport("1.0")
+    report.add(_record(size=0, compression_ratio=None))
+    assert "ratio      -" in report.summary()
@@ -0,0 +1,144 @@
+import json
+import random
+
+import pytest
+
+import umbtest.fuzz
+from umbtest.fuzz import Fuzzer, UmbArchive, UmbiReader, mutate, signature, triage
+from umbtest.synthetic import SyntheticModel
+from umbtest.tools import ReportedResults, UmbTool, read_umb_index
+
+
+class _PickyTool(UmbTool):
+    """
+    A checker that crashes on every archive with a readable index and a member that is not expected, and rejects all other invalid archives.
+    """
+
+    name = "PickyTool"
+    limits = UmbTool.default_limits
+
+    def __init__(self, expected_members):
+        self._expected_members = set(expected_members)
+
+    def check_umb(self, umb_file, log_file, properties=[]):
+        result = ReportedResults()
+        try:
+            read_umb_index(umb_file)
+            members = set(UmbArchive.read(umb_file).names())
+        except Exception:
+            result.exit_code = 1
+            result.errors = ("cannot read the archive",)
+            return result
+        if not members <= self._expected_members:
+            result.exit_code = -11
+            result.signal = 11
+        else:
+            result.exit_code = 0
+        return result
+
+
+@pytest.fixture
+def seeds(tmp_path):
+    paths = []
+    for model_type, values in [("dtmc", "double"), ("mdp", "exact"), ("ma", "double"), ("mdp", "interval")]:
+        path = tmp_path / f"{model_type}-{values}.umb"
+        SyntheticModel(model_type, states=20, branching=2, rewards=1, labels=1, values=values, seed=1).write(path, compression=None)
+        paths.append(path)
+    return paths
+
+
+def test_mutators(seeds):
+    archive = UmbArchive.read(seeds[1])
+    assert archive.names()[0] == "index.json"
+    assert UmbArchive(archive.copy().members).to_bytes() == archive.to_bytes()
+    for name, mutator in umbtest.fuzz.mutators.items():
+        mutant = archive.copy()
+        assert mutator(random.Random(name), mutant) is not None
+        assert mutant.to_bytes() != archive.to_bytes()
+    # The original is never changed.
+    assert archive.to_bytes() == UmbArchive.read(seeds[1]).to_bytes()
+    first, steps = mutate(random.Random(7), archive)
+    second, _ = mutate(random.Random(7), archive)
+    assert first.to_bytes() == second.to_bytes()
+    assert len(steps) >= 1
+
+
+def test_mutators_on_mutants(seeds):
+    # Mutants of mutants, with broken indices, are mutated without errors.
+    corpus = [UmbArchive.read(seed) for seed in seeds]
+    for i in range(2000):
+        rng = random.Random(i)
+        mutant, _ = mutate(rng, rng.choice(corpus))
+        mutant.to_bytes()
+        if i % 4 == 0:
+            corpus.append(mutant)
+    # Indices without fields are not mutated.
+    for index in [b"{}", b"[]", b"1"]:
+        archive = UmbArchive.read(seeds[0])
+        archive.set("index.json", index)
+        assert umbtest.fuzz._mutate_index(random.Random(0), archive) is None
+
+
+def test_triage():
+    result = ReportedResults()
+    result.exit_code = 0
+    assert triage(result) == ("accepted", "")
+    result.exit_code = 1
+    result.errors = ("ERROR (parsing): unexpected end of file",)
+    assert triage(result) == ("rejected", "ERROR (parsing): unexpected end of file")
+    result.log_tail = ("ERROR (storm-cli.cpp:42): An unexpected exception occurred and caused Storm to terminate.",)
+    assert triage(result)[0] == "crash"
+    result = ReportedResults()
+    result.exit_code = 2
+    assert triage(result) == ("crash", "exit code 2")
+    result.exit_code = -11
+    result.signal = 11
+    assert triage(result) == ("crash", "signal 11")
+    result.timeout = True
+    assert triage(result) == ("hang", "timeout")
+    assert signature("/tmp/x/12.umb: offset 0x1f at 123", "/tmp/x/12.umb") == "<file>: offset 0x? at N"
+
+
+def test_umbi_reader(tmp_path, seeds):
+    reader = UmbiReader("umb", workers=0)
+    result = reader.check_umb(seeds[0], tmp_path / "valid.log")
+    assert triage(result) == ("accepted", "")
+    assert result.model_info["states"] == 20 and result.model_info["transitions"] >= 20
+    (tmp_path / "garbage.umb").write_bytes(b"no archive")
+    result = reader.check_umb(tmp_path / "garbage.umb", tmp_path / "garbage.log")
+    assert triage(result)[0] == "rejected"
+    archive = UmbArchive.read(seeds[0])
+    archive.set("branch-to-target.bin", archive.get("branch-to-target.bin")[:-1])
+    (tmp_path / "short.umb").write_bytes(archive.to_bytes())
+    result = UmbiReader("stream", workers=0).check_umb(tmp_path / "short.umb", tmp_path / "short.log")
+    assert triage(result)[0] == "rejected"
+    assert "branch-to-target.bin" in result.errors[0]
+
+
+def test_fuzzer(tmp_path, seeds):
+    reader = UmbiReader("index", workers=1)
+    picky = _PickyTool(name for seed in seeds for name in UmbArchive.read(seed).names())
+    fuzzer = Fuzzer([reader, picky], tmp_path / "findings", workers=2, seed=3)
+    for seed in seeds:
+        fuzzer.add_seed(seed)
+    try:
+        report = fuzzer.run(mutants=150)
+    finally:
+        reader.close()
+    assert report.mutants + report.duplicates == 150
+    assert report.executions == 2 * report.mutants
+    assert report.executions_per_second > 0
+    counts = report.counts["PickyTool"]
+    assert counts["crash"] > 0 and counts["accepted"] > 0 and counts["rejected"] > 0
+    assert sum(report.counts["umbilib-reader(index)"].values()) == report.mutants
+    # All crashes of the picky tool have the same signature, and the smallest reproducer is kept.
+    crashes = [finding for finding in report.findings if finding["tool"] == "PickyTool"]
+    assert len(crashes) == 1
+    assert crashes[0]["count"] == counts["crash"]
+    reproducer = tmp_path / "findings" / crashes[0]["reproducer"]
+    assert reproducer.stat().st_size == crashes[0]["size"]
+    assert picky.check_umb(reproducer, tmp_path / "repro.log").signal == 11
+    assert 0 < report.corpus - len(seeds) == len(list((tmp_path / "findings" / "corpus").iterdir()))
+    with open(tmp_path / "findings" / "report.json") as f:
+        assert json.load(f)["executions"] == report.executions
+    assert "exec/s" in report.summary()
@@ -0,0 +1,127 @@
+import errno
+import pathlib
+
+import pytest
+
+from conftest import FakeTool
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.reporting import RunReport
+from umbtest.tools import ReportedResults, record_file_sizes
+
+
+class _CopyingTool(FakeTool):
+    """
+    Writes a fixed payload as UMB file and remembers which files it was given.
+    """
+
+    name = "CopyingTool"
+
+    def __init__(self, payload):
+        super().__init__(payload=payload)
+        self.inputs = []
+
+    def _run(self, input_file, output_file, log_file):
+        self.inputs.append((pathlib.Path(input_file).parent, pathlib.Path(input_file).read_bytes()))
+        return record_file_sizes(super()._run(input_file, output_file, log_file), input_file, output_file)
+
+
+@pytest.fixture
+def ram_dir(tmp_path, monkeypatch):
+    ram_dir = tmp_path / "ram"
+    ram_dir.mkdir()
+    monkeypatch.setattr(Tester, "ramdir_default", str(ram_dir))
+    monkeypatch.setattr(Tester, "handoff_max_bytes_default", 1000)
+    return ram_dir
+
+
+def _run(tmp_path, payload, handoff):
+    benchmark = UmbBenchmark(tmp_path / "model.nm")
+    benchmark.location.write_text("dtmc")
+    tool = _CopyingTool(payload)
+    tester = Tester(tmpdir=str(tmp_path), handoff=handoff)
+    tester.set_chain(loader=tool, transformer=tool, checker=tool)
+    return tool, tester.check_benchmark(benchmark)
+
+
+def test_ram(tmp_path, ram_dir):
+    tool, results = _run(tmp_path, b"x" * 100, "ram")
+    assert results["loader"].handoff == "ram"
+    assert results["transformer"].handoff == "ram"
+    # Transformer and checker read from the RAM-backed directory.
+    assert tool.inputs[1] == (ram_dir, b"x" * 100)
+    assert tool.inputs[2] == (ram_dir, b"x" * 100)
+    report = RunReport()
+    tester = Tester()
+    tester.set_chain(loader=tool, transformer=tool, checker=tool)
+    report.add(tester, UmbBenchmark(tmp_path / "model.nm"), results)
+    assert report.bytes_off_disk() == 200
+
+
+def test_spill(tmp_path, ram_dir):
+    tool, results = _run(tmp_path, b"x" * 2000, "ram")
+    assert results["loader"].handoff == "spilled"
+    assert tool.inputs[1] == (tmp_path, b"x" * 2000)
+    assert tool.inputs[2] == (tmp_path, b"x" * 2000)
+    assert list(ram_dir.iterdir()) == []
+
+
+def test_disk(tmp_path, ram_dir):
+    tool, results = _run(tmp_path, b"x" * 100, "disk")
+    assert results["loader"].handoff == "disk"
+    assert tool.inputs[2] == (tmp_path, b"x" * 100)
+
+
+def test_no_room(tmp_path, ram_dir, monkeypatch):
+    monkeypatch.setattr(Tester, "handoff_max_bytes_default", 1 << 60)
+    _, results = _run(tmp_path, b"x" * 100, "ram")
+    assert results["loader"].handoff == "disk"
+
+
+class _FullRamTool(_CopyingTool):
+    """
+    Fails to write its output into the RAM-backed directory, as if it was full.
+    """
+
+    def __init__(self, payload, ram_dir, raises):
+        super().__init__(payload)
+        self.ram_dir = ram_dir
+        self.raises = raises
+
+    def umb_to_umb(self, input_file, output_file, log_file):
+        if pathlib.Path(output_file).parent != self.ram_dir:
+            return super().umb_to_umb(input_file, output_file, log_file)
+        if self.raises:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        result = ReportedResults()
+        result.exit_code = 1
+        result.errors = (f"ERROR: cannot write {output_file}: No space left on device",)
+        return result
+
+
+@pytest.mark.parametrize("raises", [True, False])
+def test_ram_full(tmp_path, ram_dir, raises):
+    benchmark = UmbBenchmark(tmp_path / "model.nm")
+    benchmark.location.write_text("dtmc")
+    loader = _CopyingTool(b"x" * 100)
+    transformer = _FullRamTool(b"y" * 100, ram_dir, raises)
+    tester = Tester(tmpdir=str(tmp_path), handoff="ram")
+    tester.set_chain(loader=loader, transformer=transformer, checker=loader)
+    results = tester.check_benchmark(benchmark)
+    assert results["loader"].handoff == "ram"
+    assert results["transformer"].exit_code == 0
+    assert results["transformer"].handoff == "spilled"
+    assert loader.inputs[-1] == (tmp_path, b"y" * 100)
+
+
+def test_ram_reservations(tmp_path, ram_dir, monkeypatch):
+    monkeypatch.setattr(Tester, "_ram_free_bytes", lambda self: 1500)
+    tester = Tester(tmpdir=str(tmp_path), handoff="ram")
+    _, first = tester._handoff_umbfile()
+    # There is only room for one intermediate of maximal size at a time.
+    _, second = tester._handoff_umbfile()
+    assert (first, second) == ("ram", "disk")
+    tester._release_handoff(first)
+    _, third = tester._handoff_umbfile()
+    assert third == "ram"
+    tester._release_handoff(third)
+    assert Tester._ram_reserved == 0
@@ -0,0 +1,110 @@
+import pathlib
+
+from conftest import FakeTool
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.journal import ResultsJournal, results_from_dict, results_to_dict
+from umbtest.tools import ReportedResults
+
+
+def _counting_tool(**kwargs):
+    return FakeTool(times=[0.25], model_info={"states": 3}, **kwargs)
+
+
+def _benchmark(tmp_path, content="dtmc"):
+    path = tmp_path / "model.nm"
+    path.write_text(content)
+    return UmbBenchmark(path)
+
+
+def _tester(tmp_path, journal, loader, checker):
+    tester = Tester(tmpdir=str(tmp_path), journal=journal)
+    tester.set_chain(loader=loader, checker=checker)
+    return tester
+
+
+def test_serialization():
+    result = ReportedResults()
+    result.exit_code = 1
+    result.errors = ("unsupported",)
+    result.logfile = pathlib.Path("/tmp/x.log")
+    result.model_info = {"states": 3}
+    content = results_to_dict({"loader": result, "transformer": None, "checker": None, "differences": ["states differ"]})
+    restored = results_from_dict(content)
+    assert restored["loader"].exit_code == 1
+    assert restored["loader"].errors == ("unsupported",)
+    assert restored["loader"].logfile == pathlib.Path("/tmp/x.log")
+    assert restored["loader"].model_info == {"states": 3}
+    assert restored["transformer"] is None
+    assert restored["differences"] == ["states differ"]
+
+
+def test_unchanged_chain_is_reused(tmp_path):
+    journal = ResultsJournal(tmp_path / "journal.jsonl")
+    benchmark = _benchmark(tmp_path)
+    loader, checker = _counting_tool(), _counting_tool()
+    first = _tester(tmp_path, journal, loader, checker).check_benchmark(benchmark)
+    assert loader.calls == 1 and checker.calls == 1
+    # A fresh journal on the same file, as in the next run.
+    journal = ResultsJournal(tmp_path / "journal.jsonl")
+    second = _tester(tmp_path, journal, loader, checker).check_benchmark(benchmark)
+    assert loader.calls == 1 and checker.calls == 1
+    assert journal.reused == 1
+    assert second["checker"].exit_code == first["checker"].exit_code == 0
+    assert second["loader"].model_info == {"states": 3}
+
+
+def test_changes_invalidate(tmp_path):
+    journal = ResultsJournal(tmp_path / "journal.jsonl")
+    benchmark = _benchmark(tmp_path)
+    loader = _counting_tool()
+    _tester(tmp_path, journal, loader, _counting_tool()).check_benchmark(benchmark)
+    # Another tool binary.
+    _tester(tmp_path, journal, loader, _counting_tool(version="2")).check_benchmark(benchmark)
+    # Other extra arguments.
+    _tester(tmp_path, journal, loader, _counting_tool(extra_args=["--exact"])).check_benchmark(benchmark)
+    # Another benchmark content.
+    _tester(tmp_path, journal, loader, _counting_tool()).check_benchmark(_benchmark(tmp_path, "mdp"))
+    assert loader.calls == 4
+    assert journal.reused == 0
+    assert journal.recorded == 4
+
+
+class _TimeoutTool(FakeTool):
+    def check_umb(self, umb_file, log_file, properties=[]):
+        result = super().check_umb(umb_file, log_file, properties)
+        result.exit_code = None
+        result.timeout = True
+        return result
+
+
+def test_timeouts_run_again(tmp_path):
+    benchmark = _benchmark(tmp_path)
+    loader, checker = _counting_tool(), _TimeoutTool()
+    _tester(tmp_path, ResultsJournal(tmp_path / "journal.jsonl"), loader, checker).check_benchmark(benchmark)
+    journal = ResultsJournal(tmp_path / "journal.jsonl")
+    results = _tester(tmp_path, journal, loader, checker).check_benchmark(benchmark)
+    assert checker.calls == 2 and journal.reused == 0
+    assert results["checker"].timeout
+    # Unless they are reused on request.
+    journal = ResultsJournal(tmp_path / "journal.jsonl", reuse_timeouts=True)
+    results = _tester(tmp_path, journal, loader, checker).check_benchmark(benchmark)
+    assert checker.calls == 2 and journal.reused == 1
+    assert results["checker"].timeout
+
+
+def test_truncated_line_is_skipped(tmp_path):
+    location = tmp_path / "journal.jsonl"
+    journal = ResultsJournal(location)
+    benchmark = _benchmark(tmp_path)
+    loader = _counting_tool()
+    _tester(tmp_path, journal, loader, _counting_tool()).check_benchmark(benchmark)
+    # An interrupted run leaves half a line behind.
+    with open(location, "a") as f:
+        f.write('{"version": 1, "key": "abc", "res')
+    journal = ResultsJournal(location)
+    _tester(tmp_path, journal, loader, _counting_tool(version="2")).check_benchmark(benchmark)
+    assert loader.calls == 2
+    journal = ResultsJournal(location)
+    assert len(journal.entries()) == 2
+    _tester(tmp_path, journal, loader, _counting_tool(version="2")).check_benchmark(benchmark)
+    assert loader.calls == 2
@@ -0,0 +1,64 @@
+import sys
+
+from umbtest.tools import Limits, run_process
+
+
+def test_no_limits():
+    outcome = run_process([sys.executable, "-c", "print('hello')"])
+    assert outcome.returncode == 0
+    assert outcome.stdout == "hello\n"
+    assert not outcome.timeout
+    assert not outcome.memout
+    assert outcome.signal is None
+    assert outcome.wall_time is not None
+
+
+def test_timeout_kills_process_group():
+    # The shell starts a child that would outlive the shell if only the shell was killed.
+    outcome = run_process(["sh", "-c", "sleep 30 & sleep 30"], Limits(time=0.5))
+    assert outcome.timeout
+    assert not outcome.memout
+    assert outcome.signal == 9
+    assert outcome.wall_time < 10
+
+
+def test_memout():
+    program = "import time\nx = bytearray(400 * 1024 * 1024)\nx[::4096] = b'1' * len(x[::4096])\ntime.sleep(30)"
+    outcome = run_process([sys.executable, "-c", program], Limits(memory=100 * 1024 * 1024))
+    assert outcome.memout
+    assert not outcome.timeout
+    assert outcome.returncode != 0
+    # The kernel stops the allocation, instead of the process being killed some time after it exceeded the limit.
+    assert outcome.wall_time < 10
+
+
+def test_memout_without_rlimit():
+    # As for the JVM, which fails at startup under RLIMIT_DATA.
+    program = "import resource, time\nassert resource.getrlimit(resource.RLIMIT_DATA)[0] == resource.RLIM_INFINITY\nx = bytearray(400 * 1024 * 1024)\nx[::4096] = b'1' * len(x[::4096])\ntime.sleep(30)"
+    outcome = run_process([sys.executable, "-c", program], Limits(memory=100 * 1024 * 1024), rlimit=False)
+    assert outcome.memout
+    assert outcome.signal == 9
+    assert outcome.wall_time < 10
+
+
+def test_memout_of_process_group():
+    # Every process stays below the limit, but together they exceed it.
+    child = "import time\nx = bytearray(70 * 1024 * 1024)\nx[::4096] = b'1' * len(x[::4096])\ntime.sleep(30)"
+    outcome = run_process(["sh", "-c", f'{sys.executable} -c "{child}" & {sys.executable} -c "{child}"'], Limits(memory=100 * 1024 * 1024))
+    assert outcome.memout
+    assert not outcome.timeout
+    assert outcome.wall_time < 10
+
+
+def test_merged():
+    limits = Limits(time=10, memory=100).merged(Limits(time=5))
+    assert limits.time == 5
+    assert limits.memory == 100
+
+
+def test_resource_usage():
+    program = "x = bytearray(200 * 1024 * 1024)\nx[::4096] = b'1' * len(x[::4096])\nsum(range(10**7))"
+    outcome = run_process([sys.executable, "-c", program])
+    assert outcome.returncode == 0
+    assert outcome.user_time > 0
+    assert outcome.peak_memory > 200 * 1024 * 1024
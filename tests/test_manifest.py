@@ -0,0 +1,124 @@
+import json
+import os
+
+import pytest
+
+from umbtest.benchmarks import UmbBenchmark, select_benchmarks, shard_benchmarks
+from umbtest.manifest import BenchmarkManifest, describe_prism_file, shard
+
+_dtmc = "dtmc\n\nconst int N = 4;\nconst double p;\n\nmodule m\n  s : [0..N] init 0;\n  [] s<N -> p : (s'=s+1) + 1-p : (s'=s);\nendmodule\n"
+_mdp = "// an mdp\nmdp\n\nmodule m\n  s : [0..1] init 0;\n  [a] s=0 -> (s'=1);\n  [b] s=0 -> (s'=0);\nendmodule\n"
+
+
+@pytest.fixture
+def benchmark_dir(tmp_path):
+    directory = tmp_path / "benchmarks"
+    directory.mkdir()
+    (directory / "walk_small.nm").write_text(_dtmc)
+    (directory / "choice.nm").write_text(_mdp)
+    (directory / "notes.txt").write_text("not a benchmark")
+    return directory
+
+
+def test_describe_prism_file():
+    description = describe_prism_file(_dtmc)
+    assert description["model_type"] == "dtmc"
+    assert description["constants"] == {"N": "4", "p": None}
+    assert describe_prism_file("nondeterministic\nmodule m endmodule")["model_type"] == "mdp"
+    assert describe_prism_file(_mdp)["model_type"] == "mdp"
+
+
+def test_entries(benchmark_dir):
+    manifest = BenchmarkManifest(benchmark_dir)
+    entries = manifest.entries()
+    assert sorted(entries) == ["choice.nm", "walk_small.nm"]
+    assert entries["walk_small.nm"]["tags"] == ["walk"]
+    assert entries["choice.nm"]["model_type"] == "mdp"
+    assert manifest.location.exists()
+
+
+def test_refresh_is_incremental(benchmark_dir):
+    BenchmarkManifest(benchmark_dir).entries()
+    manifest = BenchmarkManifest(benchmark_dir)
+    manifest.entries()
+    assert manifest.refresh() == 0
+    # Touching a file does not change its content, so it is hashed but not described again.
+    os.utime(benchmark_dir / "choice.nm", ns=(0, 0))
+    assert manifest.refresh() == 0
+    (benchmark_dir / "choice.nm").write_text(_mdp + "\n")
+    assert manifest.refresh() == 1
+
+
+def test_measurements_reset_on_change(benchmark_dir):
+    manifest = BenchmarkManifest(benchmark_dir)
+    path = benchmark_dir / "walk_small.nm"
+    manifest.tag(path, "slow")
+    manifest.record(path, {"states": 5, "transitions": 9}, {"storm:prism_file_to_umb": 0.5})
+    manifest.save()
+    entry = BenchmarkManifest(benchmark_dir).entry(path)
+    assert entry["states"] == 5
+    assert entry["durations"] == {"storm:prism_file_to_umb": 0.5}
+    path.write_text(_dtmc.replace("N = 4", "N = 8"))
+    manifest.refresh()
+    entry = manifest.entry(path)
+    assert entry["states"] is None
+    assert entry["durations"] == {}
+    assert entry["constants"]["N"] == "8"
+    assert entry["tags"] == ["slow", "walk"]
+
+
+def test_select(benchmark_dir):
+    manifest = BenchmarkManifest(benchmark_dir)
+    manifest.record(benchmark_dir / "walk_small.nm", {"states": 5}, {})
+    assert manifest.select(model_types=["mdp"]) == [benchmark_dir / "choice.nm"]
+    assert manifest.select(max_states=3, include_unmeasured=False) == []
+    assert manifest.select(max_states=3) == [benchmark_dir / "choice.nm"]
+    assert manifest.select(min_states=5, tags=["walk"]) == [benchmark_dir / "walk_small.nm"]
+
+    benchmarks = [UmbBenchmark(p, manifest=manifest) for p in manifest.files()]
+    assert [b.location for b in select_benchmarks(benchmarks, model_types=["dtmc"])] == [benchmark_dir / "walk_small.nm"]
+    assert select_benchmarks([UmbBenchmark(benchmark_dir / "choice.nm")], model_types=["mdp"]) == []
+
+
+def test_save_merges(benchmark_dir):
+    first = BenchmarkManifest(benchmark_dir)
+    second = BenchmarkManifest(benchmark_dir)
+    first.entries()
+    second.entries()
+    first.record(benchmark_dir / "walk_small.nm", {"states": 5}, {})
+    second.record(benchmark_dir / "choice.nm", {"states": 2}, {})
+    first.save()
+    second.save()
+    with open(first.location) as f:
+        entries = json.load(f)["entries"]
+    assert entries["walk_small.nm"]["states"] == 5
+    assert entries["choice.nm"]["states"] == 2
+
+
+def test_records_are_batched(benchmark_dir):
+    manifest = BenchmarkManifest(benchmark_dir)
+    manifest.entries()
+    saved = manifest.location.stat().st_mtime_ns
+    for i in range(20):
+        manifest.record(benchmark_dir / "walk_small.nm", {"states": i}, {"storm:prism_file_to_umb": 0.1})
+    assert manifest.location.stat().st_mtime_ns == saved
+    assert BenchmarkManifest(benchmark_dir).entry(benchmark_dir / "walk_small.nm")["states"] is None
+    manifest.save()
+    assert BenchmarkManifest(benchmark_dir).entry(benchmark_dir / "walk_small.nm")["states"] == 19
+
+
+def test_shard():
+    items = [f"benchmark-{i}" for i in range(100)]
+    shards = [shard(items, i, 4) for i in range(4)]
+    assert sorted(sum(shards, [])) == sorted(items)
+    assert all(shards)
+    # The assignment of an item does not depend on the other items.
+    assert shard(items[:10], 1, 4) == [item for item in shards[1] if item in items[:10]]
+    with pytest.raises(RuntimeError):
+        shard(items, 4, 4)
+
+
+def test_shard_benchmarks(benchmark_dir):
+    benchmarks = [UmbBenchmark(p) for p in sorted(benchmark_dir.glob("*.nm"))]
+    shards = [shard_benchmarks(benchmarks, i, 2) for i in range(2)]
+    assert sorted(str(b.id) for s in shards for b in s) == sorted(str(b.id) for b in benchmarks)
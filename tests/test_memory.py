@@ -0,0 +1,112 @@
+import threading
+import time
+import tracemalloc
+
+import pytest
+import umbi
+
+from conftest import FakeTool
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.manifest import BenchmarkManifest
+from umbtest.tools import Limits, UmbPython, trace_peak_memory
+
+
+def test_isolated(tmp_path, umb_file):
+    result = UmbPython("umb", isolate=True).umb_to_umb(umb_file, tmp_path / "out.umb", log_file=tmp_path / "out.log")
+    assert result.exit_code == 0
+    assert result.model_info == {"states": 3, "transitions": 6}
+    assert umbi.umb.read(tmp_path / "out.umb", strict=True) == umbi.umb.read(umb_file, strict=True)
+    # The resident set size of the child includes the interpreter.
+    assert result.peak_memory > result.allocated_memory > 0
+    assert len(result.allocation_sites) > 0
+    site, size, count = result.allocation_sites[0]
+    assert ":" in site and size > 0 and count > 0
+    assert not list(tmp_path.glob("*.result.json"))
+
+
+def test_isolated_memout(tmp_path, umb_file):
+    tool = UmbPython("umb", isolate=True, limits=Limits(memory=1024 * 1024))
+    result = tool.umb_to_umb(umb_file, tmp_path / "out.umb", log_file=tmp_path / "out.log")
+    assert result.memout
+    assert result.exit_code != 0
+
+
+def test_concurrent_tracing():
+    peaks = dict()
+
+    def allocate(size):
+        with trace_peak_memory() as traced:
+            data = bytearray(size)
+            time.sleep(0.2)
+            del data
+        peaks[size] = traced["peak"]
+
+    threads = [threading.Thread(target=allocate, args=(size * 1024 * 1024,)) for size in [5, 10, 20]]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # The traced blocks run at the same time, and the first block that is left does not end the tracing of the others.
+    assert time.monotonic() - start < 0.5
+    for size, peak in peaks.items():
+        assert size <= peak < 36 * 1024 * 1024
+    assert not tracemalloc.is_tracing()
+
+
+def test_isolated_error(tmp_path):
+    broken = tmp_path / "broken.umb"
+    broken.write_bytes(b"not a umb file")
+    result = UmbPython("umb", isolate=True).umb_to_umb(broken, tmp_path / "out.umb", log_file=tmp_path / "out.log")
+    assert result.exit_code == 1
+    assert not result.memout
+    assert len(result.errors) == 1
+
+
+class _AllocatingTool(FakeTool):
+    name = "AllocatingTool"
+    track_memory = True
+
+    def __init__(self):
+        super().__init__(times=[0.1], model_info={"states": 3, "transitions": 6})
+        self.allocated = 600
+
+    def _run(self, input_file, output_file, log_file):
+        result = super()._run(input_file, output_file, log_file)
+        result.allocated_memory = self.allocated
+        return result
+
+
+@pytest.mark.parametrize("allocated, regressions", [(600, 0), (480, 0), (899, 0), (1200, 1)])
+def test_budget(tmp_path, allocated, regressions):
+    directory = tmp_path / "benchmarks"
+    directory.mkdir()
+    (directory / "model.nm").write_text("dtmc\n")
+    manifest = BenchmarkManifest(directory)
+    benchmark = UmbBenchmark(directory / "model.nm", manifest=manifest)
+    transformer = _AllocatingTool()
+    tester = Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=_AllocatingTool(), transformer=transformer, checker=_AllocatingTool())
+    results = tester.check_benchmark(benchmark)
+    assert results["memory_regressions"] == []
+    assert manifest.memory_budget(benchmark.location, "AllocatingTool:umb_to_umb") == 100
+    transformer.allocated = allocated
+    results = tester.check_benchmark(benchmark)
+    assert len(results["memory_regressions"]) == regressions
+    # The budget only ever decreases.
+    assert manifest.memory_budget(benchmark.location, "AllocatingTool:umb_to_umb") == min(100, allocated / 6)
+
+
+def test_umb_benchmark_with_manifest(tmp_path):
+    # UMB benchmarks are checked without a loader.
+    directory = tmp_path / "benchmarks"
+    directory.mkdir()
+    (directory / "model.umb").write_text("umb")
+    manifest = BenchmarkManifest(directory, patterns=["*.umb"])
+    benchmark = UmbBenchmark(directory / "model.umb", is_prism_file=False, manifest=manifest)
+    tester = Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=None, transformer=_AllocatingTool(), checker=_AllocatingTool())
+    results = tester.check_benchmark(benchmark)
+    assert results["loader"] is None
+    assert results["checker"].exit_code == 0
+    assert manifest.entry(benchmark.location)["durations"] == {"AllocatingTool:umb_to_umb": 0.1, "AllocatingTool:check_umb": 0.1}
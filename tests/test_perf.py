@@ -0,0 +1,115 @@
+import pathlib
+import textwrap
+
+import pytest
+
+from conftest import FakeTool
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.journal import ResultsJournal
+from umbtest.perf import PerfBaseline, mad, mann_whitney_greater, measure, median_interval
+from umbtest.tools import ReportedResults
+
+pytest_plugins = ["pytester"]
+
+
+def test_statistics():
+    samples = [1.0, 1.1, 0.9, 1.0, 5.0, 1.05, 0.95]
+    assert mad(samples) == pytest.approx(0.05)
+    low, high = median_interval(samples)
+    assert low == 0.9 and high == 5.0
+    low, high = median_interval([float(i) for i in range(20)])
+    assert 4.0 <= low < 9.5 < high <= 15.0
+
+
+def test_mann_whitney():
+    old = [1.0, 1.01, 0.99, 1.02, 0.98, 1.0]
+    assert mann_whitney_greater([3.0, 3.1, 2.9, 3.05, 2.95, 3.0], old) < 0.01
+    assert mann_whitney_greater([1.0, 0.99, 1.01, 1.0, 1.02, 0.98], old) > 0.3
+    assert mann_whitney_greater([0.3, 0.31, 0.29, 0.3, 0.32, 0.28], old) > 0.99
+
+
+def test_baseline_detects_slowdown(tmp_path):
+    baseline = PerfBaseline(tmp_path / "perf.json")
+    key = PerfBaseline.key("Storm", "loader", "dice")
+    baseline.add(key, "Storm", "build-1", [1.0, 1.01, 0.99, 1.02, 0.98, 1.0])
+    baseline.save()
+    baseline = PerfBaseline(tmp_path / "perf.json")
+    assert baseline.compare(key, "Storm", "build-1", [1.0, 0.99, 1.01, 1.0, 1.02, 0.98]) is None
+    # Slower, but less than the minimal slowdown.
+    assert baseline.compare(key, "Storm", "build-2", [1.05, 1.04, 1.06, 1.05, 1.07, 1.03]) is None
+    slowdown = baseline.compare(key, "Storm", "build-2", [3.0, 3.1, 2.9, 3.05, 2.95, 3.0])
+    assert slowdown is not None
+    assert 2.9 < slowdown.factor < 3.1
+    assert "Storm | loader | dice" in str(slowdown) and "build-1 -> build-2" in str(slowdown)
+    # The most recently saved samples are the reference.
+    baseline.add(key, "Storm", "build-2", [3.0, 3.1, 2.9, 3.05, 2.95, 3.0])
+    assert baseline.compare(key, "Storm", "build-2", [3.0, 3.1, 2.9, 3.05, 2.95, 3.0]) is None
+
+
+def test_measure_bypasses_journal(tmp_path):
+    path = tmp_path / "model.nm"
+    path.write_text("dtmc")
+    benchmark = UmbBenchmark(path)
+    loader, checker = FakeTool(times=[0.5, 0.6]), FakeTool(times=[0.1])
+    tester = Tester(tmpdir=str(tmp_path), journal=ResultsJournal(tmp_path / "journal.jsonl"))
+    tester.set_chain(loader=loader, checker=checker)
+    tester.check_benchmark(benchmark)
+    measurements = measure(tester, benchmark, 4)
+    assert loader.calls == 5
+    assert measurements["loader"] == ("FakeTool", "fake-1", [0.6, 0.5, 0.6, 0.5])
+    assert measurements["checker"][2] == [0.1] * 4
+    assert "transformer" not in measurements
+
+
+def test_measure_only_successful_chains(tmp_path):
+    path = tmp_path / "model.nm"
+    path.write_text("dtmc")
+    benchmark = UmbBenchmark(path)
+    loader, checker = FakeTool(times=[0.5]), FakeTool(times=[0.1])
+    tester = Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=loader, checker=checker)
+    failed = ReportedResults()
+    failed.exit_code = 1
+    failed.anticipated_error = True
+    assert measure(tester, benchmark, 3, {"loader": failed, "transformer": None, "checker": None}) == dict()
+    unsupported = ReportedResults()
+    unsupported.not_supported = True
+    assert measure(tester, benchmark, 3, {"loader": unsupported, "transformer": None, "checker": None}) == dict()
+    assert loader.calls == 0 and checker.calls == 0
+
+
+_plugin_test = """
+import os
+
+from umbtest import benchmarks
+from conftest import FakeTool
+
+
+def test_chain(tmp_path, perf_check):
+    path = tmp_path / "model.nm"
+    path.write_text("dtmc")
+    base = float(os.environ["PERF_TIME"])
+    tester = benchmarks.Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=FakeTool(times=[base, base + 0.01, base - 0.01]), checker=FakeTool(times=[0.1, 0.11, 0.09]))
+    results = perf_check(tester, benchmarks.UmbBenchmark(path))
+    assert results["loader"].exit_code == 0
+"""
+
+
+def test_plugin(pytester, monkeypatch):
+    # The generated test reuses the stand-in tool of the tests.
+    pytester.syspathinsert(pathlib.Path(__file__).parent)
+    pytester.makepyfile(test_chain=textwrap.dedent(_plugin_test))
+    baseline = pytester.path / "perf.json"
+    options = ["-p", "umbtest.pytest_perf", "--perf-repeat", "6", "--perf-baseline", str(baseline)]
+
+    monkeypatch.setenv("PERF_TIME", "1.0")
+    pytester.runpytest_inprocess(*options, "--perf-save").assert_outcomes(passed=1)
+    assert baseline.exists()
+    pytester.runpytest_inprocess(*options).assert_outcomes(passed=1)
+
+    monkeypatch.setenv("PERF_TIME", "3.0")
+    result = pytester.runpytest_inprocess(*options)
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(["*FakeTool -> FakeTool | loader | *model.nm: FakeTool 1.000s -> 3.000s*"])
+    pytester.runpytest_inprocess(*options, "--perf-mode", "warn").assert_outcomes(passed=1, warnings=1)
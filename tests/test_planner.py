@@ -0,0 +1,129 @@
+from conftest import FakeTool
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.journal import ResultsJournal
+from umbtest.planner import ChainPath, ChainPlan
+
+
+class _RecordingTool(FakeTool):
+    """
+    Writes its own identifier after the content of the input file, such that the output records the chain that produced it.
+    """
+
+    name = "RecordingTool"
+
+    def __init__(self, identifier, fail=False):
+        super().__init__(identifier, times=[0.1])
+        self.fail = fail
+        self.seen = []
+
+    def _recorded(self, content, output_file, log_file):
+        result = self._run(None, None, log_file)
+        result.exit_code = 1 if self.fail else 0
+        result.anticipated_error = self.fail
+        if output_file is not None and not self.fail:
+            with open(output_file, "w") as f:
+                f.write(content + self.identifier)
+        return result
+
+    def prism_file_to_umb(self, prism_file, output_file, log_file):
+        return self._recorded("", output_file, log_file)
+
+    def umb_to_umb(self, input_file, output_file, log_file):
+        with open(input_file) as f:
+            return self._recorded(f.read() + ">", output_file, log_file)
+
+    def check_umb(self, umb_file, log_file, properties=[]):
+        with open(umb_file) as f:
+            self.seen.append(f.read())
+        return self._recorded("", None, log_file)
+
+
+def _benchmark(tmp_path):
+    path = tmp_path / "model.nm"
+    path.write_text("dtmc")
+    return UmbBenchmark(path)
+
+
+def test_artifacts_are_shared(tmp_path):
+    loaders = [_RecordingTool("A"), _RecordingTool("B")]
+    transformers = [None, _RecordingTool("T"), _RecordingTool("U")]
+    checkers = [_RecordingTool("X"), _RecordingTool("Y"), _RecordingTool("Z")]
+    plan = ChainPlan(loaders, checkers, transformers, tester=Tester(tmpdir=str(tmp_path)))
+    results = plan.check_benchmark(_benchmark(tmp_path))
+    assert len(results) == 18
+    assert [loader.calls for loader in loaders] == [1, 1]
+    assert [transformer.calls for transformer in transformers[1:]] == [2, 2]
+    assert plan.stats() == {"paths": 18, "loads": 2, "transforms": 4, "checks": 18}
+    # Every checker read the output of every chain.
+    assert sorted(checkers[0].seen) == ["A", "A>T", "A>U", "B", "B>T", "B>U"]
+    path = ChainPath(loaders[1], transformers[1], checkers[2])
+    assert path.id == "l=B_t=T_c=Z"
+    assert results[path]["loader"].exit_code == 0
+    assert results[path]["transformer"].exit_code == 0
+    assert results[path]["checker"].exit_code == 0
+    assert results[ChainPath(loaders[0], None, checkers[0])]["transformer"] is None
+
+
+def test_umb_benchmarks_skip_the_loaders(tmp_path):
+    loaders = [_RecordingTool("A"), _RecordingTool("B")]
+    transformers = [None, _RecordingTool("T")]
+    checkers = [_RecordingTool("X"), _RecordingTool("Y")]
+    plan = ChainPlan(loaders, checkers, transformers, tester=Tester(tmpdir=str(tmp_path)))
+    path = tmp_path / "model.umb"
+    path.write_text("M")
+    results = plan.check_benchmark(UmbBenchmark(path, is_prism_file=False))
+    assert len(results) == 8
+    assert [loader.calls for loader in loaders] == [0, 0]
+    assert plan.stats() == {"paths": 8, "loads": 0, "transforms": 1, "checks": 4}
+    assert sorted(checkers[0].seen) == ["M", "M>T"]
+    assert path.read_text() == "M"
+    result = results[ChainPath(loaders[1], transformers[1], checkers[1])]
+    assert result["loader"] is None
+    assert result["checker"].exit_code == 0
+
+
+def test_failures_stop_their_subtree(tmp_path):
+    loaders = [_RecordingTool("A", fail=True), _RecordingTool("B")]
+    transformers = [_RecordingTool("T", fail=True), _RecordingTool("U")]
+    checker = _RecordingTool("X")
+    plan = ChainPlan(loaders, [checker], transformers, tester=Tester(tmpdir=str(tmp_path)))
+    results = plan.check_benchmark(_benchmark(tmp_path))
+    assert results[ChainPath(loaders[0], transformers[1], checker)]["loader"].anticipated_error
+    assert results[ChainPath(loaders[0], transformers[1], checker)]["transformer"] is None
+    assert results[ChainPath(loaders[1], transformers[0], checker)]["transformer"].anticipated_error
+    assert results[ChainPath(loaders[1], transformers[0], checker)]["checker"] is None
+    assert checker.seen == ["B>U"]
+
+
+def test_journal_skips_recorded_chains(tmp_path):
+    journal = ResultsJournal(tmp_path / "journal.jsonl")
+    benchmark = _benchmark(tmp_path)
+    loaders = [_RecordingTool("A"), _RecordingTool("B")]
+    checkers = [_RecordingTool("X")]
+    ChainPlan(loaders[:1], checkers, tester=Tester(tmpdir=str(tmp_path), journal=journal)).check_benchmark(benchmark)
+    assert journal.recorded == 1
+    plan = ChainPlan(loaders, checkers, tester=Tester(tmpdir=str(tmp_path), journal=journal))
+    results = plan.check_benchmark(benchmark)
+    # Only the chain with the new loader runs.
+    assert [loader.calls for loader in loaders] == [1, 1]
+    assert journal.reused == 1 and journal.recorded == 2
+    assert all(result["checker"].exit_code == 0 for result in results.values())
+    # The same chain via a single tester reuses the verdict of the plan.
+    tester = Tester(tmpdir=str(tmp_path), journal=journal)
+    tester.set_chain(loader=loaders[1], checker=checkers[0])
+    tester.check_benchmark(benchmark)
+    assert loaders[1].calls == 1
+
+
+def test_check_benchmarks(tmp_path):
+    benchmarks = []
+    for name in ["a", "b", "c"]:
+        path = tmp_path / f"{name}.nm"
+        path.write_text("dtmc")
+        benchmarks.append(UmbBenchmark(path))
+    loader, checker = _RecordingTool("A"), _RecordingTool("X")
+    plan = ChainPlan([loader], [checker], [None, _RecordingTool("T")], tester=Tester(tmpdir=str(tmp_path)))
+    results = plan.check_benchmarks(benchmarks, max_workers=2)
+    assert len(results) == 3
+    assert plan.stats() == {"paths": 2, "loads": 3, "transforms": 3, "checks": 6}
+    assert not [entry for entry in tmp_path.iterdir() if entry.name.startswith("job-")]
@@ -0,0 +1,82 @@
+import pathlib
+
+import pytest
+
+from umbtest.tools import ReportedResults, parse_log_lines_prism, parse_logfile_prism
+
+"""
+The corpus consists of PRISM main logs as written with -mainlog.
+For every log, we list what the parser should extract.
+"""
+_logs_path = pathlib.Path(__file__).parent / "../resources/prism-logs/"
+
+expected = {
+    "dtmc_export.log": dict(
+        not_supported=False,
+        errors=(),
+        model_info={
+            "model-type": "DTMC",
+            "states": 13,
+            "initial-states": 1,
+            "transitions": 20,
+            "model-building-time": 0.043,
+            "model-export-time": 0.021,
+        },
+    ),
+    "mdp_import_check.log": dict(
+        not_supported=False,
+        errors=(),
+        model_info={
+            "model-type": "MDP",
+            "states": 1296,
+            "initial-states": 1,
+            "transitions": 5832,
+            "choices": 3240,
+            "model-import-time": 0.118,
+            "model-checking-time": 0.041,
+        },
+    ),
+    "error_missing_file.log": dict(
+        not_supported=False,
+        errors=(
+            'Error: Could not import model: File "/tmp/does-not-exist.umb" not found.',
+        ),
+        model_info={},
+    ),
+    "unsupported_tsg.log": dict(
+        not_supported=True,
+        errors=("Error: Unsupported model type TSG in UMB file.",),
+        model_info={},
+    ),
+    "truncated_build.log": dict(
+        not_supported=False,
+        errors=(),
+        model_info={"model-type": "MDP"},
+    ),
+}
+
+
+def test_corpus_complete():
+    assert sorted(p.name for p in _logs_path.glob("*.log")) == sorted(expected)
+
+
+@pytest.mark.parametrize("logname", sorted(expected))
+def test_parse_logfile_prism(logname):
+    result = ReportedResults()
+    with open(_logs_path / logname, "r") as log:
+        parse_logfile_prism(log.read(), result)
+    assert result.not_supported == expected[logname]["not_supported"]
+    assert result.errors == expected[logname]["errors"]
+    assert result.model_info == expected[logname]["model_info"]
+
+
+@pytest.mark.parametrize("logname", sorted(expected))
+def test_parse_log_lines_prism(logname):
+    result = ReportedResults()
+    with open(_logs_path / logname, "r") as log:
+        parse_log_lines_prism(log, result)
+    assert result.errors == expected[logname]["errors"]
+    assert result.model_info == expected[logname]["model_info"]
+    with open(_logs_path / logname, "r") as log:
+        lines = log.read().splitlines()
+    assert list(result.log_tail) == lines[-len(result.log_tail):]
@@ -0,0 +1,74 @@
+import pathlib
+import pickle
+import sys
+
+import umbtest.tools
+from umbtest.tools import Limits, PrismWorkerCLI, run_sync
+
+_standin = [sys.executable, str(pathlib.Path(__file__).parent / "prism_worker_standin.py")]
+
+
+def test_reuse(tmp_path):
+    prism = PrismWorkerCLI(location=tmp_path, workers=1, worker_command=_standin)
+    model = tmp_path / "model.nm"
+    model.write_text("dtmc")
+    try:
+        first = prism.prism_file_to_umb(model, tmp_path / "a.umb", tmp_path / "a.log")
+        second = prism.umb_to_umb(tmp_path / "a.umb", tmp_path / "b.umb", tmp_path / "b.log")
+        assert first.exit_code == 0
+        assert second.exit_code == 0
+        assert first.model_info["states"] == 13
+        assert second.model_info["transitions"] == 20
+        assert second.input_size == (tmp_path / "a.umb").stat().st_size
+        # Both invocations were handled by the same worker process.
+        assert (tmp_path / "a.umb").read_text() == (tmp_path / "b.umb").read_text()
+        assert prism.check_process()
+    finally:
+        prism.close()
+
+
+def test_crash_and_timeout(tmp_path):
+    prism = PrismWorkerCLI(location=tmp_path, workers=1, worker_command=_standin)
+    try:
+        crashed = prism.check_umb(tmp_path / "a.umb", tmp_path / "a.log", properties=None)
+        assert crashed.exit_code == 0
+        result = run_sync(prism._call_prism_async(tmp_path / "b.log", ["-crash"]))
+        assert result.exit_code == 3
+        slow = prism.with_limits(Limits(time=0.5))
+        result = run_sync(slow._call_prism_async(tmp_path / "c.log", ["-hang"]))
+        assert result.timeout
+        assert result.signal == 9
+        # A fresh worker takes over.
+        assert prism.check_process()
+        assert prism._pool.started == 3
+    finally:
+        prism.close()
+
+
+def test_pickle(tmp_path):
+    prism = PrismWorkerCLI(location=tmp_path, workers=1, worker_command=_standin)
+    assert prism.check_process()
+    restored = pickle.loads(pickle.dumps(prism.with_limits(Limits(time=5))))
+    try:
+        assert restored.limits.time == 5 and restored._worker_command == _standin
+        assert restored._pool is not prism._pool and restored._pool.started == 0
+        assert restored.check_process()
+        # Copies share the pool of the original.
+        assert prism.with_limits(Limits(time=5))._pool is prism._pool
+    finally:
+        prism.close()
+        restored.close()
+
+
+def test_java_without_security_manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(umbtest.tools, "java_feature_version", lambda: 24)
+    umbtest.tools._java_has_security_manager.cache_clear()
+    try:
+        assert not PrismWorkerCLI(location=tmp_path, workers=1)._uses_workers()
+        # Explicit worker commands are always used.
+        assert PrismWorkerCLI(location=tmp_path, workers=1, worker_command=_standin)._uses_workers()
+        monkeypatch.setattr(umbtest.tools, "java_feature_version", lambda: 21)
+        umbtest.tools._java_has_security_manager.cache_clear()
+        assert PrismWorkerCLI(location=tmp_path, workers=1)._uses_workers()
+    finally:
+        umbtest.tools._java_has_security_manager.cache_clear()
@@ -0,0 +1,119 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import umbtest.tools
+from umbtest.tools import PrismCLI, StormCLI, ToolProbes, UmbTool, check_tools
+
+
+class _ProbedTool(UmbTool):
+    name = "ProbedTool"
+
+    def __init__(self, version="1", works=True):
+        self.version = version
+        self.works = works
+        self.probes = 0
+
+    def fingerprint(self):
+        return "probed-" + self.version
+
+    def check_process(self):
+        self.probes += 1
+        return self.works
+
+
+def test_probe_is_reused(tmp_path):
+    tool = _ProbedTool()
+    check_tools(tool, probes=ToolProbes(tmp_path / "probes.json"))
+    check_tools(tool, probes=ToolProbes(tmp_path / "probes.json"))
+    assert tool.probes == 1
+
+
+def test_changed_tool_is_probed(tmp_path):
+    probes = ToolProbes(tmp_path / "probes.json")
+    check_tools(_ProbedTool(), probes=probes)
+    tool = _ProbedTool(version="2")
+    check_tools(tool, probes=probes)
+    assert tool.probes == 1
+
+
+def _install(directory, classes):
+    (directory / "prism" / "bin").mkdir(parents=True)
+    (directory / "prism" / "bin" / "prism").write_text("#!/bin/sh")
+    (directory / "prism" / "classes" / "prism").mkdir(parents=True)
+    for name, content in classes.items():
+        (directory / "prism" / "classes" / "prism" / name).write_text(content)
+
+
+def test_fingerprint_of_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(ToolProbes, "default_location", tmp_path / "probes.json")
+    _install(tmp_path / "a", {"Prism.class": "1", "PrismCL.class": "2"})
+    fingerprint = PrismCLI(tmp_path / "a").fingerprint()
+    # A rebuild with the same content keeps the fingerprint.
+    _install(tmp_path / "b", {"PrismCL.class": "2", "Prism.class": "1"})
+    os.utime(tmp_path / "b" / "prism" / "bin" / "prism", (0, 0))
+    assert PrismCLI(tmp_path / "b").fingerprint() == fingerprint
+    # Rewriting a class changes it, even if the directories keep their modification times.
+    classes = tmp_path / "a" / "prism" / "classes" / "prism"
+    stat = classes.stat()
+    (classes / "Prism.class").write_text("33")
+    os.utime(classes, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert PrismCLI(tmp_path / "a").fingerprint() != fingerprint
+    # Storm takes its libraries into account.
+    (tmp_path / "storm" / "bin").mkdir(parents=True)
+    (tmp_path / "storm" / "lib").mkdir()
+    (tmp_path / "storm" / "bin" / "storm").write_text("storm")
+    (tmp_path / "storm" / "lib" / "libstorm.so").write_text("1")
+    storm = StormCLI(tmp_path / "storm" / "bin" / "storm")
+    fingerprint = storm.fingerprint()
+    (tmp_path / "storm" / "lib" / "libstorm.so").write_text("22")
+    assert storm.fingerprint() != fingerprint
+    # Other libraries next to it are not.
+    fingerprint = storm.fingerprint()
+    (tmp_path / "storm" / "lib" / "libz.so").write_text("z")
+    assert storm.fingerprint() == fingerprint
+
+
+def test_digests_are_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(ToolProbes, "default_location", tmp_path / "probes.json")
+    binary = tmp_path / "storm"
+    binary.write_text("1")
+    fingerprint = StormCLI(binary).fingerprint()
+    assert (tmp_path / "probes-digests.json").exists()
+    # A new process does not hash the unchanged file again.
+    stat = binary.stat()
+    binary.write_text("2")
+    os.utime(binary, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    monkeypatch.setattr(umbtest.tools, "_file_digests", None)
+    assert StormCLI(binary).fingerprint() == fingerprint
+    binary.write_text("33")
+    assert StormCLI(binary).fingerprint() != fingerprint
+
+
+def test_failed_probe_is_not_stored(tmp_path):
+    probes = ToolProbes(tmp_path / "probes.json")
+    tool = _ProbedTool(works=False)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            check_tools(tool, probes=probes)
+    assert tool.probes == 2
+
+
+def test_umbi_is_imported_lazily():
+    code = "import sys, umbtest.benchmarks, umbtest.tools; assert 'umbi' not in sys.modules and 'numpy' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_asyncio_is_imported_lazily():
+    code = "import sys, umbtest.benchmarks, umbtest.tools; assert 'asyncio' not in sys.modules and 'concurrent.futures' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_tester_is_configured_lazily():
+    code = (
+        "import sys, umbtest.benchmarks; assert not umbtest.benchmarks._configured; "
+        "assert not any(m in sys.modules for m in ('umbtest.cache', 'umbtest.journal', 'umbtest.warehouse', 'umbtest.perf', 'umbtest.schedule'))"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,151 @@
+import contextlib
+import io
+from fractions import Fraction
+
+import numpy as np
+import pytest
+import umbi
+
+from umbtest.benchmarks import Tester
+from umbtest.reduce import FailureSignature, Reducer, drop_extras, reachable, restrict, _extras
+from umbtest.synthetic import SyntheticModel
+from umbtest.tools import ReportedResults, UmbTool
+
+
+class _LabelledSuccessorTool(UmbTool):
+    """
+    A checker that fails on every model in which a state labelled with l0 has another labelled successor.
+    """
+
+    name = "LabelledSuccessorTool"
+    limits = UmbTool.default_limits
+
+    def check_umb(self, umb_file, log_file, properties=[]):
+        umb = umbi.umb.read(umb_file, strict=True)
+        labels = ((umb.annotations or dict()).get("aps") or dict()).get("l0", dict()).get("states")
+        failing = False
+        if labels is not None:
+            for state, labelled in enumerate(labels):
+                for choice in range(umb.state_to_choices[state], umb.state_to_choices[state + 1]):
+                    for branch in range(umb.choice_to_branches[choice], umb.choice_to_branches[choice + 1]):
+                        target = umb.branch_to_target[branch]
+                        failing |= labelled and labels[target] and target != state
+        result = ReportedResults()
+        result.logfile = log_file
+        result.exit_code = 1 if failing else 0
+        result.errors = (f"ERROR: labelled state {len(labels)} has a labelled successor",) if failing else ()
+        with open(log_file, "w") as f:
+            f.write("\n".join(result.errors) + "\n")
+        return result
+
+
+def _check_valid(tmp_path, umb, values):
+    umbi.umb.write(umb, tmp_path / "restricted.umb")
+    umb = umbi.umb.read(tmp_path / "restricted.umb", strict=True)
+    ts = umb.index.transition_system
+    assert ts.num_initial_states == sum(umb.state_is_initial) > 0
+    assert all(0 <= target < ts.num_states for target in umb.branch_to_target)
+    assert len(umb.state_to_choices) == ts.num_states + 1 and len(umb.choice_to_branches) == ts.num_choices + 1
+    assert np.all(np.diff(umb.state_to_choices) >= 1) and np.all(np.diff(umb.choice_to_branches) >= 1)
+    for choice in range(ts.num_choices):
+        probabilities = umb.branch_to_probability[umb.choice_to_branches[choice] : umb.choice_to_branches[choice + 1]]
+        targets = umb.branch_to_target[umb.choice_to_branches[choice] : umb.choice_to_branches[choice + 1]]
+        assert len(set(targets)) == len(targets)
+        if values == "double":
+            assert sum(probabilities) == pytest.approx(1.0)
+        elif values == "exact":
+            assert sum(probabilities) == 1
+        else:
+            assert sum(p.left for p in probabilities) <= 1 <= sum(p.right for p in probabilities)
+    for annotation_map in (umb.annotations or dict()).values():
+        for applies_to_values in annotation_map.values():
+            for applies_to, annotation_values in applies_to_values.items():
+                assert len(annotation_values) == {"states": ts.num_states, "choices": ts.num_choices, "branches": ts.num_branches}[applies_to]
+
+
+@pytest.mark.parametrize("model_type,values", [("dtmc", "exact"), ("ctmc", "double"), ("mdp", "interval"), ("ma", "double")])
+def test_restrict(tmp_path, model_type, values):
+    model = SyntheticModel(model_type, states=200, branching=3, rewards=1, labels=1, values=values, seed=6)
+    model.write(tmp_path / "model.umb")
+    umb = umbi.umb.read(tmp_path / "model.umb")
+    ts = umb.index.transition_system
+    rng = np.random.default_rng(6)
+    keep_states = rng.random(ts.num_states) < 0.5
+    keep_states[0] = True
+    restricted = restrict(umb, keep_states, rng.random(ts.num_choices) < 0.5, rng.random(ts.num_branches) < 0.5)
+    assert restricted.index.transition_system.num_states == keep_states.sum()
+    _check_valid(tmp_path, restricted, values)
+    # The original is not changed.
+    assert umb.index.transition_system.num_states == 200
+    if values == "exact":
+        assert all(isinstance(p, Fraction) for p in restricted.branch_to_probability)
+    # Without any initial state, there is no model.
+    assert restrict(umb, ~np.asarray(umb.state_is_initial), keep_states, keep_states) is None
+    dropped = drop_extras(umb, _extras(umb))
+    assert dropped.annotations is None and _extras(dropped) == []
+    _check_valid(tmp_path, dropped, values)
+
+
+def test_reachable(tmp_path):
+    SyntheticModel("mdp", states=50, seed=1).write(tmp_path / "model.umb")
+    umb = umbi.umb.read(tmp_path / "model.umb")
+    # Every state reaches its successor in the synthetic models.
+    assert reachable(umb).all()
+    keep = np.ones(50, dtype=bool)
+    keep[10:20] = False
+    assert reachable(restrict(umb, keep, np.ones(umb.index.transition_system.num_choices, dtype=bool), np.ones(umb.index.transition_system.num_branches, dtype=bool))).sum() <= 40
+
+
+def test_signature():
+    failing = ReportedResults()
+    failing.exit_code = 1
+    failing.errors = ("ERROR: state 1234 has no choices (file /tmp/a.umb)",)
+    signature = FailureSignature.of({"transformer": None, "checker": failing})
+    assert signature.stage == "checker"
+    other = ReportedResults()
+    other.exit_code = 1
+    other.errors = ("ERROR: state 7 has no choices (file /tmp/a.umb)",)
+    assert signature.matches({"checker": other})
+    other.errors = ("ERROR: state 7 has too many choices",)
+    assert not signature.matches({"checker": other})
+    failing.errors = ()
+    failing.exit_code = -11
+    assert FailureSignature.of({"checker": failing}).exit_code == -11
+    failing.exit_code = 0
+    assert FailureSignature.of({"checker": failing}) is None
+
+
+@pytest.fixture
+def failing_chain(tmp_path):
+    tester = Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=None, checker=_LabelledSuccessorTool(), transformer=None)
+    SyntheticModel("mdp", states=300, branching=3, rewards=2, labels=2, seed=4).write(tmp_path / "model.umb")
+    return tester, tmp_path / "model.umb"
+
+
+def test_reducer(tmp_path, failing_chain):
+    tester, umb_file = failing_chain
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = Reducer(tester, workers=3).reduce(umb_file, tmp_path / "reduced.umb")
+        again = Reducer(tester, workers=1).reduce(umb_file, tmp_path / "reduced-sequentially.umb")
+        results = tester.check_umb_file(tmp_path / "reduced.umb", [])
+    assert report.signature.matches(results)
+    # An initial state, and two labelled states, one the successor of the other.
+    assert report.reduced["states"] <= 3
+    assert report.reduced["annotations"] == 1
+    assert report.reduced["bytes"] < report.original["bytes"]
+    assert report.original["states"] == 300
+    assert report.steps and report.steps[-1]["states"] == report.reduced["states"]
+    assert report.tests["reproduced"] >= len(report.steps) + 1
+    assert "reduced" in report.summary()
+    # The result does not depend on the number of workers.
+    assert umbi.umb.read(tmp_path / "reduced.umb").branch_to_target == umbi.umb.read(tmp_path / "reduced-sequentially.umb").branch_to_target
+    assert [step["dropped"] for step in report.steps] == [step["dropped"] for step in again.steps]
+
+
+def test_reducer_without_failure(tmp_path):
+    SyntheticModel("dtmc", states=20, labels=0, seed=1).write(tmp_path / "model.umb")
+    tester = Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=None, checker=_LabelledSuccessorTool(), transformer=None)
+    with pytest.raises(RuntimeError):
+        Reducer(tester).reduce(tmp_path / "model.umb", tmp_path / "reduced.umb")
@@ -0,0 +1,36 @@
+import csv
+import json
+
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.reporting import RunReport
+from umbtest.tools import UmbPython
+
+
+def test_umbpython_accounting(tmp_path, umb_file):
+    result = UmbPython("umb", trace_memory=True).umb_to_umb(umb_file, tmp_path / "out.umb", log_file=None)
+    assert result.exit_code == 0
+    assert result.model_info == {"states": 3, "transitions": 6}
+    assert result.wall_time > 0
+    assert result.peak_memory > 0
+    assert result.input_size == umb_file.stat().st_size
+    assert result.output_size == (tmp_path / "out.umb").stat().st_size
+
+
+def test_export(tmp_path, umb_file):
+    tool = UmbPython("ats", trace_memory=False)
+    result = tool.umb_to_umb(umb_file, tmp_path / "out.umb", log_file=None)
+    assert result.peak_memory is None
+    tester = Tester()
+    tester.set_chain(loader=tool, checker=tool, transformer=tool)
+    report = RunReport()
+    report.add(tester, UmbBenchmark(umb_file), {"loader": None, "transformer": result, "checker": None})
+    report.write_json(tmp_path / "report.json")
+    report.write_csv(tmp_path / "report.csv")
+    with open(tmp_path / "report.json") as f:
+        records = json.load(f)
+    assert len(records) == 1
+    assert records[0]["stage"] == "transformer"
+    assert records[0]["tool"] == "umbilib(ats)"
+    with open(tmp_path / "report.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["output_size"] == str(result.output_size)
@@ -0,0 +1,38 @@
+import pathlib
+
+from conftest import FakeTool, fake_jobs
+from umbtest.benchmarks import MatrixRunner, Tester, UmbBenchmark
+
+"""
+The runner is tested with a stand-in tool, such that no external tools are necessary.
+"""
+
+
+def test_tool_limit():
+    tool = FakeTool(seconds=0.05)
+    runner = MatrixRunner(max_workers=8, tool_limits={"FakeTool": 2})
+    results = runner.run(fake_jobs(tool, 8))
+    assert len(results) == 8
+    for result in results:
+        assert result["loader"].exit_code == 0
+        assert result["checker"].exit_code == 0
+        assert result["transformer"] is None
+    assert tool.max_running <= 2
+
+
+def test_separate_directories():
+    tool = FakeTool(seconds=0.05)
+    runner = MatrixRunner(max_workers=4)
+    runner.run(fake_jobs(tool, 4))
+    assert len(tool.directories) == 4
+
+
+def test_exceptions():
+    tool = FakeTool(seconds=0.05)
+    tester = Tester()
+    # A chain without checker raises an exception.
+    tester.set_chain(loader=tool, checker=None)
+    jobs = [(tester, UmbBenchmark(pathlib.Path("stand-in/model.nm")))] + fake_jobs(tool, 1)
+    results = MatrixRunner(max_workers=2).run(jobs, return_exceptions=True)
+    assert isinstance(results[0], RuntimeError)
+    assert results[1]["checker"].exit_code == 0
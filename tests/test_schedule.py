@@ -0,0 +1,73 @@
+import json
+import pathlib
+
+import pytest
+
+from conftest import FakeTool
+from umbtest.benchmarks import MatrixRunner, Tester, UmbBenchmark
+from umbtest.schedule import DurationHistory, estimates, job_key, longest_first, predict_makespan
+
+
+def test_estimate_is_median_of_recent(tmp_path):
+    history = DurationHistory(tmp_path / "history.json")
+    assert history.estimate("a") is None
+    for duration in [100.0, 1.0, 2.0, 3.0, 4.0, 5.0]:
+        history.add("a", duration)
+    # Only the last five durations are kept.
+    assert history.durations()["a"] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert history.estimate("a") == 3.0
+
+
+def test_save_merges(tmp_path):
+    location = tmp_path / "history.json"
+    first = DurationHistory(location)
+    second = DurationHistory(location)
+    first.add("a", 1.0)
+    second.add("b", 2.0)
+    first.save()
+    second.save()
+    assert DurationHistory(location).durations() == {"a": [1.0], "b": [2.0]}
+
+
+def test_unknown_version_is_ignored(tmp_path):
+    location = tmp_path / "history.json"
+    location.write_text(json.dumps({"version": 0, "durations": {"a": [1.0]}}))
+    assert DurationHistory(location).durations() == dict()
+
+
+def test_longest_first(tmp_path):
+    history = DurationHistory(tmp_path / "history.json")
+    history.add("a", 1.0)
+    history.add("b", 10.0)
+    history.add("c", 4.0)
+    # Unknown jobs are estimated by the median of the known ones.
+    assert estimates(["a", "b", "c", "d"], history) == [1.0, 10.0, 4.0, 4.0]
+    assert longest_first(["A", "B", "C", "D"], ["a", "b", "c", "d"], history) == ["B", "C", "D", "A"]
+
+
+def test_predict_makespan():
+    assert predict_makespan([], 4) == 0.0
+    assert predict_makespan([3.0, 3.0, 2.0, 2.0, 2.0], 1) == 12.0
+    assert predict_makespan([3.0, 3.0, 2.0, 2.0, 2.0], 2) == 7.0
+    assert predict_makespan([5.0, 1.0], 8) == 5.0
+    with pytest.raises(RuntimeError):
+        predict_makespan([1.0], 0)
+
+
+def test_runner_uses_history(tmp_path):
+    tool = FakeTool(times=[0.5])
+    history = DurationHistory(tmp_path / "history.json")
+    jobs = []
+    for name in ["short", "long"]:
+        tester = Tester()
+        tester.set_chain(loader=tool, checker=tool)
+        jobs.append((tester, UmbBenchmark(pathlib.Path(f"stand-in/{name}.nm"))))
+    history.add(job_key(*jobs[0]), 1.0)
+    history.add(job_key(*jobs[1]), 60.0)
+    runner = MatrixRunner(max_workers=1, history=history)
+    assert runner.predicted_makespan(jobs) == 61.0
+    results = runner.run(jobs)
+    # Results keep the order of the jobs, even though the long job starts first.
+    assert [r["loader"].exit_code for r in results] == [0, 0]
+    assert history.durations()[job_key(*jobs[0])] == [1.0, 1.0]
+    assert DurationHistory(history.location).durations()[job_key(*jobs[1])] == [60.0, 1.0]
@@ -0,0 +1,94 @@
+import sys
+
+from umbtest.tools import (
+    LogClassifier,
+    ReportedResults,
+    classify_storm_log,
+    parse_logfile_storm,
+    run_process,
+    _storm_log_patterns,
+)
+
+_build_log = """Storm 1.10.0
+Command line arguments: --prism model.nm --buildstateval --exportbuild model.umb
+Time for model construction: 0.052s.
+
+--------------------------------------------------------------
+Model type: \tDTMC (sparse)
+States: \t13
+Transitions: \t20
+Reward Models:  none
+State Labels: \t3 labels
+--------------------------------------------------------------
+"""
+
+_error_log = """Storm 1.10.0
+ERROR (umb.cpp:12): Could not open file.
+ERROR (storm-cli.cpp:49): Terminating.
+"""
+
+_memout_log = """Storm 1.10.0
+An unexpected exception occurred and caused Storm to terminate. The message of this exception is: std::bad_alloc
+"""
+
+_known_error_log = """Storm 1.10.0
+ERROR (ValueEncoding.h:56): Some values are given as double intervals but a model with a non-interval type is requested.
+"""
+
+
+def _parse(log, exit_code=0):
+    result = ReportedResults()
+    result.exit_code = exit_code
+    parse_logfile_storm(log, result)
+    return result
+
+
+def test_statistics():
+    result = _parse(_build_log)
+    assert result.model_info == {
+        "model-building-time": 0.052,
+        "states": 13,
+        "transitions": 20,
+    }
+    assert result.errors == ()
+    assert not result.not_supported
+    assert not result.memout
+
+
+def test_errors():
+    result = _parse(_error_log, exit_code=1)
+    assert result.errors == (
+        " (umb.cpp:12): Could not open file.",
+        " (storm-cli.cpp:49): Terminating.",
+    )
+    assert not result.anticipated_error
+
+
+def test_flags():
+    assert _parse(_memout_log, exit_code=1).memout
+    result = _parse(_known_error_log, exit_code=1)
+    assert result.anticipated_error
+    # Known errors are not reported as errors.
+    assert result.errors == ()
+
+
+def test_error_bound_and_tail():
+    classifier = LogClassifier(_storm_log_patterns, tail_length=3)
+    classifier.feed_text("".join(f"ERROR {i}\n" for i in range(100)))
+    assert len(classifier.errors) == LogClassifier.default_max_errors
+    assert list(classifier.tail) == ["ERROR 97", "ERROR 98", "ERROR 99"]
+
+
+def test_streaming(tmp_path):
+    log_file = tmp_path / "storm.log"
+    classifier = LogClassifier(_storm_log_patterns)
+    program = f"import sys\nsys.stdout.write({_build_log!r})"
+    outcome = run_process([sys.executable, "-c", program], log_file=log_file, line_handler=classifier.feed)
+    assert outcome.returncode == 0
+    assert outcome.stdout is None
+    assert log_file.read_text() == _build_log
+    result = ReportedResults()
+    result.set_outcome(outcome)
+    classify_storm_log(classifier, result)
+    assert result.model_info["states"] == 13
+    assert result.log_tail[-1] == "-" * 62
@@ -0,0 +1,56 @@
+import io
+import tarfile
+
+import pytest
+import umbi
+
+from conftest import small_dtmc
+from umbtest.tools import UmbPython, stream_umb
+
+
+def _members(path):
+    with tarfile.open(path) as tar:
+        return {m.name: tar.extractfile(m).read() for m in tar if m.isfile()}
+
+
+def test_roundtrip(tmp_path, umb_file):
+    result = UmbPython("stream").umb_to_umb(umb_file, tmp_path / "out.umb", log_file=None)
+    assert result.model_info == {"states": 3, "transitions": 6}
+    assert umbi.umb.read(tmp_path / "out.umb", strict=True) == umbi.umb.read(umb_file, strict=True)
+    before = _members(umb_file)
+    after = _members(tmp_path / "out.umb")
+    assert before.keys() == after.keys()
+    for name in before:
+        if name != "index.json":
+            assert before[name] == after[name]
+
+
+def test_bounded_memory(tmp_path):
+    umb = small_dtmc()
+    n = 100000
+    ts = umb.index.transition_system
+    ts.num_states = ts.num_choices = n
+    ts.num_branches = n
+    umb.state_is_initial = [True] + [False] * (n - 1)
+    umb.state_to_choices = list(range(n + 1))
+    umb.choice_to_branches = list(range(n + 1))
+    umb.branch_to_target = [(i + 1) % n for i in range(n)]
+    umb.branch_to_probability = [1.0] * n
+    umb.annotations = {"rewards": {"r": {"states": [1.0] * n}}}
+    umbi.umb.write(umb, tmp_path / "large.umb")
+    result = UmbPython("stream", trace_memory=True).umb_to_umb(tmp_path / "large.umb", tmp_path / "out.umb", log_file=None)
+    assert result.model_info == {"states": n, "transitions": n}
+    # The members have 4 MB in total.
+    assert result.peak_memory < 1024 * 1024
+
+
+def test_size_mismatch(tmp_path, umb_file):
+    members = _members(umb_file)
+    members["branch-to-target.bin"] = members["branch-to-target.bin"][:-8]
+    with tarfile.open(tmp_path / "broken.umb", "w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    with pytest.raises(RuntimeError, match="branch-to-target.bin"):
+        stream_umb(tmp_path / "broken.umb", tmp_path / "out.umb")
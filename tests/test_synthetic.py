@@ -0,0 +1,117 @@
+from fractions import Fraction
+
+import numpy as np
+import pytest
+import umbi
+
+import umbtest.synthetic
+from umbtest.benchmarks import Tester
+from umbtest.compare import UmbArrays
+from umbtest.synthetic import SyntheticModel
+from umbtest.tools import ReportedResults, UmbPython, UmbTool, stream_umb
+
+
+class _ReadingTool(UmbTool):
+    """
+    A checker that reads the UMB file with umbi, in strict mode.
+    """
+
+    name = "ReadingTool"
+
+    def check_umb(self, umb_file, log_file, properties=[]):
+        umb = umbi.umb.read(umb_file, strict=True)
+        with open(log_file, "w") as f:
+            f.write("done\n")
+        result = ReportedResults()
+        result.exit_code = 0
+        result.logfile = log_file
+        result.model_info = {"states": umb.index.transition_system.num_states, "transitions": umb.index.transition_system.num_branches}
+        return result
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Models with a few hundred states consist of several blocks.
+    monkeypatch.setattr(umbtest.synthetic, "_block_branches", 256)
+
+
+@pytest.mark.parametrize("model_type", ["dtmc", "ctmc", "mdp", "ma"])
+def test_structure(tmp_path, small_blocks, model_type):
+    model = SyntheticModel(model_type, states=1000, branching=3, choices=3, rewards=2, labels=2, seed=1)
+    assert model.num_blocks > 1
+    index = model.write(tmp_path / "model.umb")
+    # The sizes of all members match the index.
+    assert stream_umb(tmp_path / "model.umb", tmp_path / "copy.umb").transition_system.num_branches == index.transition_system.num_branches
+    umb = umbi.umb.read(tmp_path / "model.umb", strict=True)
+    arrays = UmbArrays.read(tmp_path / "model.umb")
+    assert arrays.num_states == 1000
+    assert list(np.flatnonzero(arrays.initial)) == [0]
+    assert np.all(np.diff(arrays.state_to_choices) >= 1)
+    branch_counts = np.diff(arrays.choice_to_branches)
+    assert np.all(branch_counts >= 1) and np.all(branch_counts <= 5)
+    sums = np.add.reduceat(arrays.branch_to_probability, arrays.choice_to_branches[:-1])
+    assert np.allclose(sums, 1.0)
+    for choice in range(arrays.num_choices):
+        targets = arrays.branch_to_target[arrays.choice_to_branches[choice] : arrays.choice_to_branches[choice + 1]]
+        assert len(set(targets)) == len(targets)
+    # The first branch of every state leads to the next state.
+    first_branches = arrays.choice_to_branches[arrays.state_to_choices[:-1]]
+    assert list(arrays.branch_to_target[first_branches]) == [(s + 1) % 1000 for s in range(1000)]
+    assert set(umb.annotations["rewards"]) == {"r0", "r1"}
+    assert set(umb.annotations["aps"]) == {"l0", "l1"}
+    assert 0 < sum(umb.annotations["aps"]["l0"]["states"]) < 1000
+    if model_type in ["mdp", "ma"]:
+        assert len(umb.annotations["rewards"]["r0"]["choices"]) == arrays.num_choices
+    if model_type == "ma":
+        markovian = arrays.state_values["markovian"]
+        assert 0 < markovian.sum() < 1000
+        assert np.all(np.diff(arrays.state_to_choices)[markovian] == 1)
+        assert np.all(arrays.state_values["exit-rate"][~markovian] == 0)
+    if model_type == "ctmc":
+        assert np.all(arrays.state_values["exit-rate"] >= 1)
+
+
+@pytest.mark.parametrize("values", ["exact", "interval", "exact-interval"])
+def test_values(tmp_path, values):
+    model = SyntheticModel("mdp", states=100, branching=3, values=values, seed=2)
+    model.write(tmp_path / "model.umb")
+    umb = umbi.umb.read(tmp_path / "model.umb", strict=True)
+    for choice in range(umb.index.transition_system.num_choices):
+        probabilities = umb.branch_to_probability[umb.choice_to_branches[choice] : umb.choice_to_branches[choice + 1]]
+        if values == "exact":
+            assert sum(probabilities) == 1
+        else:
+            assert sum(p.left for p in probabilities) <= 1 <= sum(p.right for p in probabilities)
+            assert all(p.right <= 1 for p in probabilities)
+    if values.startswith("exact"):
+        assert all(isinstance(reward, Fraction) for reward in umb.annotations["rewards"]["r0"]["states"])
+
+
+def test_deterministic(tmp_path, small_blocks):
+    SyntheticModel("ma", states=500, seed=3).write(tmp_path / "a.umb", compression=None)
+    SyntheticModel("ma", states=500, seed=3).write(tmp_path / "b.umb", compression=None)
+    SyntheticModel("ma", states=500, seed=4).write(tmp_path / "c.umb", compression=None)
+    assert (tmp_path / "a.umb").read_bytes() == (tmp_path / "b.umb").read_bytes()
+    assert (tmp_path / "a.umb").read_bytes() != (tmp_path / "c.umb").read_bytes()
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        SyntheticModel("ctmc", values="interval")
+    with pytest.raises(ValueError):
+        SyntheticModel("pomdp")
+
+
+def test_checker_only_chain(tmp_path):
+    benchmark = SyntheticModel("dtmc", states=300, seed=5).benchmark(tmp_path / "models")
+    assert not benchmark.is_prism_file
+    tester = Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=None, checker=_ReadingTool(), transformer=UmbPython("umb"))
+    results = tester.check_benchmark(benchmark)
+    assert results["loader"] is None
+    assert results["transformer"].exit_code == 0
+    assert results["checker"].model_info["states"] == 300
+    assert tester.id == "l=None_t=umbilib_c=ReadingTool"
+    # The model is written once.
+    mtime = benchmark.location.stat().st_mtime_ns
+    assert SyntheticModel("dtmc", states=300, seed=5).benchmark(tmp_path / "models").location.stat().st_mtime_ns == mtime
@@ -0,0 +1,79 @@
+import pathlib
+import types
+
+import pytest
+import umbi
+
+from conftest import small_dtmc
+from umbtest.benchmarks import UmbBenchmark, instantiate_constants, scale_families, scale_ladder
+from umbtest.throughput import ThroughputReport, ThroughputSuite
+from umbtest.tools import ReportedResults, UmbTool, record_file_sizes
+
+
+def test_instantiate_constants(tmp_path):
+    template = tmp_path / "model.nm"
+    template.write_text("dtmc\nconst int N;\nconst double p = 0.5;\nconst K = 1;\n")
+    path = instantiate_constants(template, {"N": 10, "p": 0.25, "K": 3}, tmp_path)
+    assert path.read_text() == "dtmc\nconst int N = 10;\nconst double p = 0.25;\nconst int K = 3;\n"
+    with pytest.raises(RuntimeError):
+        instantiate_constants(template, {"M": 1}, tmp_path)
+
+
+def test_ladder(tmp_path):
+    benchmarks = scale_ladder(tmp_path, max_states=10**5)
+    assert len(benchmarks) == 2 * len(scale_families)
+    assert str(benchmarks[0].id) == "grid_walk/N=32"
+    assert "const int N = 32;" in benchmarks[0].location.read_text()
+    for family in scale_families:
+        sizes = [states for _, states in family.rungs]
+        assert sizes == sorted(sizes)
+        assert sizes[0] < 10**4 and sizes[-1] >= 10**7
+
+
+def _index(states):
+    return types.SimpleNamespace(transition_system=types.SimpleNamespace(num_states=states, num_branches=2 * states))
+
+
+def _result(wall_time):
+    result = ReportedResults()
+    result.exit_code = 0
+    result.wall_time = wall_time
+    result.output_size = 10**6
+    return result
+
+
+class _Tool(UmbTool):
+    name = "Tool"
+
+    def prism_file_to_umb(self, prism_file, output_file, log_file):
+        umbi.umb.write(small_dtmc(), output_file)
+        result = _result(0.5)
+        return record_file_sizes(result, prism_file, output_file)
+
+    def check_umb(self, umb_file, log_file, properties=[]):
+        return record_file_sizes(_result(0.25), umb_file)
+
+
+def test_scaling():
+    report = ThroughputReport()
+    tool = _Tool()
+    for states in [10**3, 10**4, 10**5]:
+        benchmark = UmbBenchmark(pathlib.Path(f"ladder/{states}.nm"))
+        report.add(tool, "prism_file_to_umb", benchmark, _index(states), _result(states * 1e-6))
+        report.add(tool, "check_umb", benchmark, _index(states), _result((states * 1e-6) ** 2))
+    assert report.records[0]["states_per_second"] == pytest.approx(1e6)
+    assert report.records[0]["megabytes_per_second"] == pytest.approx(1000)
+    scaling = report.scaling()
+    assert scaling[("Tool", "prism_file_to_umb")][1] == pytest.approx(1.0)
+    assert scaling[("Tool", "check_umb")][1] == pytest.approx(2.0)
+    assert report.superlinear() == [("Tool", "check_umb")]
+
+
+def test_suite(tmp_path):
+    benchmark = UmbBenchmark(tmp_path / "model.nm")
+    benchmark.location.write_text("dtmc")
+    report = ThroughputSuite([_Tool()], tmpdir=tmp_path).run([benchmark])
+    assert [r["direction"] for r in report.records] == ["prism_file_to_umb", "check_umb"]
+    assert report.records[1]["states"] == 3
+    assert report.records[1]["transitions_per_second"] == pytest.approx(6 / 0.25)
+    report.write_csv(tmp_path / "throughput.csv")
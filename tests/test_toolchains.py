@@ -1,6 +1,7 @@
 import pytest
 import umbtest.tools
 from umbtest.benchmarks import UmbBenchmark, Tester
+from umbtest.planner import ChainPlan
 from umbtest.tools import check_tools
 
 """
@@ -15,7 +16,15 @@ prism_cli_exact = umbtest.tools.PrismCLI(extra_args = ["-exact"], custom_identif
 modest_cli = umbtest.tools.ModestCLI(custom_identifier="Modest")
 umbi_py_umb = umbtest.tools.UmbPython("umb")
 umbi_py_ats = umbtest.tools.UmbPython("ats")
-check_tools(prism_cli, storm_cli, modest_cli)
+umbi_py_stream = umbtest.tools.UmbPython("stream")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def working_tools():
+    """
+    Checks the tools once before the first test, rather than during collection.
+    """
+    check_tools(prism_cli, storm_cli, modest_cli)
 
 
 def _toolname(val: umbtest.tools.UmbTool) -> str:
@@ -46,16 +55,33 @@ def _benchmarkname(val: UmbBenchmark) -> str:
     return str(val.id)
 
 
-def load_and_read(tester, benchmark):
+def load_and_read(tester, benchmark, check):
     """
     Tests a tool chain.
 
     :param tester:
     :param benchmark:
+    :param check: The perf_check fixture, which also detects slowdowns of the chain.
     :return:
     """
     print(f"Testing {tester} on {benchmark}...")
-    results = tester.check_benchmark(benchmark)
+    check_results(check(tester, benchmark))
+
+
+def check_results(results):
+    """
+    Skips, xfails or fails the test depending on the results of a tool chain.
+
+    :param results: The results as returned by Tester.check_benchmark.
+    :return:
+    """
+    for stage in ["loader", "transformer", "checker"]:
+        if results[stage] is None:
+            continue
+        if results[stage].timeout:
+            pytest.skip(f"The {stage} timed out after {results[stage].wall_time:.1f}s.")
+        if results[stage].memout:
+            pytest.skip(f"The {stage} ran out of memory.")
     if results["loader"].anticipated_error:
         pytest.xfail("Loader failed with an anticipated error")
     if results["loader"].not_supported:
@@ -67,6 +93,8 @@ def load_and_read(tester, benchmark):
         if results["transformer"].not_supported:
             pytest.skip("Transformer does not support these files.")
         assert results["transformer"].exit_code == 0, "Transformer should not crash"
+        assert not results.get("differences"), f"Transformer changed the model: {results['differences']}"
+        assert not results.get("memory_regressions"), f"Transformer exceeded its memory budget: {results['memory_regressions']}"
     if results["checker"].anticipated_error:
         pytest.xfail("Checker failed with an anticipated error.")
     if results["checker"].not_supported:
@@ -87,34 +115,42 @@ class TestTool:
     @pytest.mark.parametrize(
         "benchmark", umbtest.benchmarks.prism_files, ids=_benchmarkname
     )
-    def test_write_read(self, tool, benchmark):
+    def test_write_read(self, tool, benchmark, perf_check):
         tester = Tester()
         tester.set_chain(loader=tool, checker=tool)
-        load_and_read(tester, benchmark)
+        load_and_read(tester, benchmark, perf_check)
 
     @pytest.mark.parametrize(
         "benchmark", umbtest.benchmarks.prism_files, ids=_benchmarkname
     )
-    def test_write_umbi_umb_read(self, tool, benchmark):
+    def test_write_umbi_umb_read(self, tool, benchmark, perf_check):
         tester = Tester()
         tester.set_chain(loader=tool, transformer=umbi_py_umb, checker=tool)
-        load_and_read(tester, benchmark)
+        load_and_read(tester, benchmark, perf_check)
 
     @pytest.mark.parametrize(
         "benchmark", umbtest.benchmarks.prism_files, ids=_benchmarkname
     )
-    def test_write_umbi_ats_read(self, tool, benchmark):
+    def test_write_umbi_ats_read(self, tool, benchmark, perf_check):
         tester = Tester()
         tester.set_chain(loader=tool, transformer=umbi_py_ats, checker=tool)
-        load_and_read(tester, benchmark)
+        load_and_read(tester, benchmark, perf_check)
 
     @pytest.mark.parametrize(
         "benchmark", umbtest.benchmarks.prism_files, ids=_benchmarkname
     )
-    def test_write_modest_read(self, tool, benchmark):
+    def test_write_umbi_stream_read(self, tool, benchmark, perf_check):
+        tester = Tester()
+        tester.set_chain(loader=tool, transformer=umbi_py_stream, checker=tool)
+        load_and_read(tester, benchmark, perf_check)
+
+    @pytest.mark.parametrize(
+        "benchmark", umbtest.benchmarks.prism_files, ids=_benchmarkname
+    )
+    def test_write_modest_read(self, tool, benchmark, perf_check):
         tester = Tester()
         tester.set_chain(loader=tool, transformer=modest_cli, checker=tool)
-        load_and_read(tester, benchmark)
+        load_and_read(tester, benchmark, perf_check)
 
 toolpairs = [(prism_cli, modest_cli)]
 @pytest.mark.parametrize("toolpair", toolpairs, ids=_toolpair, scope="class")
@@ -122,7 +158,37 @@ class TestAlignment:
     @pytest.mark.parametrize(
         "benchmark", umbtest.benchmarks.prism_files, ids=_benchmarkname
     )
-    def test_write_read(self, toolpair, benchmark):
+    def test_write_read(self, toolpair, benchmark, perf_check):
         tester = Tester()
         tester.set_chain(loader=toolpair[0], checker=toolpair[1])
-        load_and_read(tester, benchmark)
\ No newline at end of file
+        load_and_read(tester, benchmark, perf_check)
+
+
+"""
+All pairs of loaders and checkers, with and without transformation in between.
+Every loader and transformer runs only once per benchmark, and its output is read by all checkers.
+"""
+alignment_plan = ChainPlan(
+    loaders=[storm_cli, prism_cli],
+    checkers=[storm_cli, prism_cli, modest_cli],
+    transformers=[None, umbi_py_umb, modest_cli],
+)
+
+
+@pytest.fixture(scope="class")
+def alignment(benchmark):
+    """
+    The results of all chains of the alignment plan on the benchmark.
+    They are computed once for the tests on the benchmark, only if one of them is selected, and dropped after the last one.
+    """
+    return alignment_plan.check_benchmark(benchmark, return_exceptions=True)
+
+
+@pytest.mark.parametrize("benchmark", umbtest.benchmarks.prism_files, ids=_benchmarkname, scope="class")
+class TestAlignmentMatrix:
+    @pytest.mark.parametrize("path", alignment_plan.paths, ids=lambda path: path.id)
+    def test_path(self, alignment, path):
+        results = alignment[path]
+        if isinstance(results, BaseException):
+            raise results
+        check_results(results)
@@ -0,0 +1,85 @@
+import pathlib
+import pickle
+import time
+
+import pytest
+
+from conftest import FakeTool
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.tools import ReportedResults
+from umbtest.warehouse import ResultsWarehouse
+
+
+def _timed_tool(identifier, times):
+    return FakeTool(identifier, times=times, model_info={"states": 3, "transitions": 6})
+
+
+def _benchmark(tmp_path, name):
+    path = tmp_path / f"{name}.nm"
+    path.write_text("dtmc")
+    return UmbBenchmark(path)
+
+
+def test_compact_results():
+    result = ReportedResults()
+    result.exit_code = 0
+    result.errors = ("unsupported",)
+    result.logfile = pathlib.Path("/tmp/x.log")
+    with pytest.raises(AttributeError):
+        result.unknown = 1
+    content = result.to_dict()
+    assert content == {"exit_code": 0, "errors": ["unsupported"], "logfile": "/tmp/x.log"}
+    restored = ReportedResults.from_dict(content)
+    assert restored.errors == ("unsupported",) and restored.logfile == pathlib.Path("/tmp/x.log")
+    assert restored.log_tail == () and restored.wall_time is None
+    unpickled = pickle.loads(pickle.dumps(result))
+    assert unpickled.to_dict() == content and unpickled.logfile == pathlib.Path("/tmp/x.log")
+
+
+def test_results_pickled_with_dictionary():
+    # Entries of an artifact cache that were written before the fields were fixed.
+    restored = ReportedResults.__new__(ReportedResults)
+    restored.__setstate__({"exit_code": 0, "wall_time": 1.5, "removed_field": 1})
+    assert restored.exit_code == 0 and restored.wall_time == 1.5
+    assert restored.allocation_sites == ()
+
+
+def test_stage_results_are_stored(tmp_path):
+    warehouse = ResultsWarehouse(tmp_path / "results.sqlite", label="test", batch_size=4)
+    loader, checker = _timed_tool("Storm", [1.0, 3.0, 2.0]), _timed_tool("Prism", [0.5])
+    tester = Tester(tmpdir=str(tmp_path), warehouse=warehouse)
+    tester.set_chain(loader=loader, checker=checker)
+    for name in ["a", "b"]:
+        for _ in range(3):
+            tester.check_benchmark(_benchmark(tmp_path, name))
+    # Two rows are still pending, but queries see them.
+    medians = warehouse.aggregate("wall_time", "median", ("benchmark",), tool="Storm", stage="loader", days=30)
+    assert medians["value"] == [2.0, 2.0] and medians["n"] == [3, 3]
+    assert [pathlib.Path(b).name for b in medians["benchmark"]] == ["a.nm", "b.nm"]
+    rows = warehouse.results(stage="checker", fields=["tool", "wall_time", "states", "fingerprint"])
+    assert rows["tool"] == ["Prism"] * 6 and rows["states"] == [3] * 6 and rows["fingerprint"] == ["fake-1"] * 6
+    runs = warehouse.query("SELECT label, count(*) AS n FROM runs")
+    assert runs == {"label": ["test"], "n": [1]}
+    warehouse.close()
+    # Another run on the same database.
+    other = ResultsWarehouse(tmp_path / "results.sqlite")
+    assert other.aggregate("wall_time", "count", ("run", "stage"))["value"] == [6, 6]
+    assert other.results(days=0)["tool"] == []
+    with pytest.raises(ValueError):
+        other.aggregate("wall_time; DROP TABLE results", "median")
+
+
+def test_aggregation_is_fast(tmp_path):
+    warehouse = ResultsWarehouse(tmp_path / "results.sqlite", batch_size=10000)
+    tester = Tester(tmpdir=str(tmp_path))
+    tester.set_chain(loader=_timed_tool("Storm", [1.0]), checker=_timed_tool("Prism", [1.0]))
+    result = ReportedResults()
+    result.exit_code = 0
+    for i in range(20000):
+        result.wall_time = i % 7
+        warehouse.add(tester, UmbBenchmark(pathlib.Path(f"models/{i % 100}.nm")), {"loader": result, "checker": result})
+    warehouse.flush()
+    start = time.monotonic()
+    medians = warehouse.aggregate("wall_time", "median", ("benchmark",), tool="Storm", stage="loader", days=30)
+    assert time.monotonic() - start < 1.0
+    assert len(medians["benchmark"]) == 100 and sum(medians["n"]) == 20000
@@ -0,0 +1,178 @@
+import os
+import pathlib
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import FakeTool, fake_jobs
+from umbtest.tools import Limits, PrismWorkerCLI, StormCLI, UmbPython
+from umbtest.workqueue import QueueRunner, QueueWorker, WorkQueue, tool_from_dict, tool_to_dict
+
+"""
+Workers run in other processes, which unpickle the stand-in tool from this module.
+"""
+
+_repository = pathlib.Path(__file__).parent.parent
+
+
+class _MarkerTool(FakeTool):
+    """
+    Hangs if the marker file exists, after removing it, such that exactly one invocation hangs.
+    """
+
+    name = "MarkerTool"
+
+    def __init__(self, marker=None, seconds=0.0):
+        super().__init__(times=[seconds], seconds=seconds)
+        self.marker = marker
+
+    def _run(self, input_file, output_file, log_file):
+        if self.marker is not None:
+            try:
+                os.remove(self.marker)
+                time.sleep(60)
+            except FileNotFoundError:
+                pass
+        result = super()._run(input_file, output_file, log_file)
+        result.model_info = {"pid": os.getpid()}
+        return result
+
+
+def _start_workers(location, n, workers=1):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(pathlib.Path(__file__).parent), str(_repository)])
+    command = [sys.executable, "-m", "umbtest.workqueue", "worker", str(location), "--workers", str(workers), "--idle-exit", "30", "--trust-queue"]
+    return [subprocess.Popen(command, cwd=_repository, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for _ in range(n)]
+
+
+def test_tool_descriptions():
+    storm = StormCLI(extra_args=["--exact"], custom_identifier="Storm (exact)")
+    restored = tool_from_dict(tool_to_dict(storm))
+    assert type(restored) is StormCLI
+    assert restored.identifier == "Storm (exact)"
+    # The location is taken from the configuration of the worker.
+    assert restored._storm_path == StormCLI.default_path
+    assert restored.limits is StormCLI.default_limits
+    limited = tool_from_dict(tool_to_dict(storm.with_limits(Limits(time=10))))
+    assert limited.limits.time == 10
+    assert tool_from_dict(tool_to_dict(UmbPython("ats"))).identifier == "umbilib(ats)"
+    prism = tool_from_dict(tool_to_dict(PrismWorkerCLI(workers=3, worker_command=["java", "PrismWorker"])), trusted=True)
+    assert prism._workers == 3 and prism._worker_command == ["java", "PrismWorker"]
+
+
+def test_untrusted_tool_descriptions():
+    with pytest.raises(RuntimeError, match="pickled"):
+        tool_from_dict(tool_to_dict(_MarkerTool()))
+    with pytest.raises(RuntimeError, match="command"):
+        tool_from_dict(tool_to_dict(PrismWorkerCLI(worker_command=["sh", "-c", "true"])))
+    with pytest.raises(RuntimeError, match="Unknown"):
+        tool_from_dict({"class": "Popen", "args": {}, "limits": None})
+    with pytest.raises(RuntimeError, match="Invalid argument"):
+        tool_from_dict({"class": "StormCLI", "args": {"location": "/tmp"}, "limits": None})
+    assert isinstance(tool_from_dict(tool_to_dict(_MarkerTool()), trusted=True), _MarkerTool)
+
+
+def test_worker_reuses_tools(tmp_path):
+    WorkQueue.create(tmp_path / "queue")
+    worker = QueueWorker(tmp_path / "queue", trusted=True)
+    description = tool_to_dict(PrismWorkerCLI(workers=1, worker_command=["java", "PrismWorker"]))
+    tool = worker._tool(description)
+    assert worker._tool(dict(description)) is tool
+    assert worker._tool(tool_to_dict(PrismWorkerCLI(workers=2))) is not tool
+    closed = []
+    tool.close = lambda: closed.append(tool)
+    worker.close()
+    assert closed == [tool]
+    assert worker._tool(description) is not tool
+
+
+def test_worker_in_process(tmp_path):
+    runner = QueueRunner(tmp_path / "queue", poll_interval=0.05)
+    worker = QueueWorker(tmp_path / "queue", workers=2, poll_interval=0.05, trusted=True)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    try:
+        results = runner.run(fake_jobs(_MarkerTool(), 5, tmp_path), timeout=30)
+    finally:
+        runner.close()
+        thread.join()
+    assert worker.completed == 5
+    assert all(result["checker"].exit_code == 0 for result in results)
+    assert runner.queue.status() == {"jobs": 0, "leases": 0, "results": 5}
+
+
+def test_worker_processes(tmp_path):
+    runner = QueueRunner(tmp_path / "queue", poll_interval=0.05)
+    workers = _start_workers(tmp_path / "queue", 3)
+    try:
+        results = runner.run(fake_jobs(_MarkerTool(seconds=0.3), 9, tmp_path), timeout=60)
+    finally:
+        runner.close()
+        for worker in workers:
+            worker.wait(timeout=30)
+    assert all(result["loader"].exit_code == 0 for result in results)
+    pids = {result["loader"].model_info["pid"] for result in results}
+    assert len(pids) > 1
+    assert not pids & {os.getpid()}
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    marker = tmp_path / "hang"
+    marker.touch()
+    runner = QueueRunner(tmp_path / "queue", lease_timeout=1, poll_interval=0.05)
+    job_ids = runner.submit(fake_jobs(_MarkerTool(marker), 1, tmp_path))
+    crashing = _start_workers(tmp_path / "queue", 1)[0]
+    try:
+        deadline = time.monotonic() + 30
+        while marker.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # The worker hangs in the tool, and is killed.
+        crashing.send_signal(signal.SIGKILL)
+        crashing.wait()
+        assert runner.queue.status()["leases"] == 1
+        worker = QueueWorker(tmp_path / "queue", poll_interval=0.05, idle_exit=5, trusted=True)
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+        (index, results), = list(runner.results(job_ids, timeout=30))
+    finally:
+        runner.close()
+    thread.join()
+    assert worker.completed == 1
+    assert results["checker"].exit_code == 0
+
+
+def test_failing_jobs(tmp_path):
+    runner = QueueRunner(tmp_path / "queue", lease_timeout=0.2, max_attempts=2, poll_interval=0.05)
+    job_ids = runner.submit(fake_jobs(_MarkerTool(), 2, tmp_path))
+    queue = WorkQueue(tmp_path / "queue")
+    # Both jobs are claimed by a worker that never reports back.
+    assert queue.claim() is not None and queue.claim() is not None
+    time.sleep(0.3)
+    assert queue.reclaim_expired() == 2
+    assert queue.claim() is not None and queue.claim() is not None
+    time.sleep(0.3)
+    outcomes = dict(runner.results(job_ids, timeout=5))
+    assert len(outcomes) == 2
+    assert all("expired 2 times" in str(outcome) for outcome in outcomes.values())
+
+
+def test_results_of_lost_leases_are_dropped(tmp_path):
+    runner = QueueRunner(tmp_path / "queue", lease_timeout=0.2, poll_interval=0.05)
+    job_id, = runner.submit(fake_jobs(_MarkerTool(), 1, tmp_path))
+    queue = runner.queue
+    _, slow, _ = queue.claim()
+    time.sleep(0.3)
+    assert queue.reclaim_expired() == 1
+    _, fast, _ = queue.claim()
+    # The slow worker neither renews nor completes the lease of the job that runs again.
+    assert not queue.renew(job_id, slow)
+    assert not queue.complete(job_id, {"error": "slow", "worker": "slow"}, slow)
+    assert queue.result(job_id) is None
+    assert queue.renew(job_id, fast)
+    assert queue.complete(job_id, {"error": "fast", "worker": "fast"}, fast)
+    assert queue.result(job_id)["worker"] == "fast"
+    assert queue.status() == {"jobs": 0, "leases": 0, "results": 1}
@@ -1,19 +1,30 @@
+import copy
+import errno
+import multiprocessing
+import os
+import re
+import shutil
 import tempfile
+import threading
+from types import SimpleNamespace
 from typing import List
-from umbtest.tools import UmbTool, ReportedResults, PrismCLI
+from umbtest.tools import UmbTool, ReportedResults, PrismCLI, load_config, run_sync
+from umbtest.manifest import BenchmarkManifest, matches, shard
 from pathlib import Path
-from collections import deque
-import tomllib
 import pathlib
 import logging
 
 logger = logging.getLogger(__name__)
 
 class UmbBenchmark:
-    def __init__(self, location: Path, properties=None, is_prism_file=True):
+    def __init__(self, location: Path, properties=None, is_prism_file=True, manifest=None):
+        """
+        :param manifest: The BenchmarkManifest that describes this benchmark, if any.
+        """
         self.location = location
         self.properties = properties
         self.is_prism_file = is_prism_file
+        self.manifest = manifest
 
     def __str__(self):
         return str(self.__dict__)
@@ -22,9 +33,44 @@ class UmbBenchmark:
     def id(self) -> Path:
         return Path("/".join(self.location.parts[-2:]))
 
+    @property
+    def metadata(self) -> dict | None:
+        """
+        The manifest entry of this benchmark, or None if it is not part of a manifest.
+        """
+        if self.manifest is None:
+            return None
+        return self.manifest.entry(self.location)
+
 
 _prism_files_path = Path(__file__).parent / "../resources/prism-files/"
-prism_files = [UmbBenchmark(p) for p in _prism_files_path.glob("*.nm")]
+prism_files_manifest = BenchmarkManifest(_prism_files_path)
+# Only the directory is listed here; the manifest itself is loaded once metadata is needed.
+prism_files = [UmbBenchmark(p, manifest=prism_files_manifest) for p in prism_files_manifest.files()]
+
+
+def select_benchmarks(
+    benchmarks: list[UmbBenchmark], min_states=None, max_states=None, model_types=None, tags=None, include_unmeasured=True
+) -> list[UmbBenchmark]:
+    """
+    The benchmarks whose manifest entry matches the criteria, see BenchmarkManifest.select.
+    Benchmarks without manifest only match if there are no criteria.
+    """
+    criteria = [min_states, max_states, model_types, tags]
+    if all(c is None for c in criteria):
+        return list(benchmarks)
+    return [
+        b
+        for b in benchmarks
+        if b.metadata is not None and matches(b.metadata, min_states, max_states, model_types, tags, include_unmeasured)
+    ]
+
+
+def shard_benchmarks(benchmarks: list[UmbBenchmark], index: int, count: int) -> list[UmbBenchmark]:
+    """
+    The benchmarks in shard index of count, assigned by benchmark id. See manifest.shard.
+    """
+    return shard(benchmarks, index, count, key=lambda b: str(b.id))
 
 standard = [
     UmbBenchmark(
@@ -32,12 +78,152 @@ standard = [
     )
 ]
 
+class ScaledBenchmark(UmbBenchmark):
+    """
+    An instance of a parameterized model, as produced by a ScaleFamily.
+    """
+
+    def __init__(self, location: Path, family: str, constants: dict, estimated_states: int, properties=None):
+        super().__init__(location, properties)
+        self.family = family
+        self.constants = constants
+        self.estimated_states = estimated_states
+
+    @property
+    def id(self) -> Path:
+        return Path(self.family) / ",".join(f"{k}={v}" for k, v in self.constants.items())
+
+
+def instantiate_constants(template: Path, constants: dict, directory: Path) -> Path:
+    """
+    Writes a copy of a PRISM file in which the given constants are defined with the given values.
+    The constants must be declared in the file, either undefined (const int N;) or with a default value.
+    The file is only rewritten if its content changed, such that tools and caches see a stable file.
+    """
+    text = template.read_text()
+    for name, value in constants.items():
+        pattern = re.compile(rf"const\s+(?:(int|double|bool)\s+)?{re.escape(name)}\s*(?:=[^;]*)?;")
+        text, count = pattern.subn(
+            lambda m: f"const {m.group(1) or 'int'} {name} = {value};", text, count=1
+        )
+        if count != 1:
+            raise RuntimeError(f"{template} does not declare the constant {name}")
+    suffix = "-".join(f"{k}={v}" for k, v in constants.items())
+    path = Path(directory) / f"{template.stem}-{suffix}{template.suffix}"
+    if not path.exists() or path.read_text() != text:
+        path.write_text(text)
+    return path
+
+
+class ScaleFamily:
+    """
+    A parameterized model together with a ladder of values for one constant, such that the model grows with every rung.
+    """
+
+    def __init__(self, name: str, template: Path, constant: str, rungs: list[tuple[int, int]]):
+        """
+        :param name: The name of the family, used in benchmark ids.
+        :param template: The PRISM file that declares the constant.
+        :param constant: The constant that determines the size.
+        :param rungs: Pairs of a value for the constant and the (estimated) number of states for that value, in increasing order.
+        """
+        self.name = name
+        self.template = template
+        self.constant = constant
+        self.rungs = rungs
+
+    def ladder(self, directory: Path, min_states=None, max_states=None) -> list[ScaledBenchmark]:
+        """
+        Instantiates the rungs whose estimated number of states lies within the given bounds.
+
+        :param directory: The directory to which the instances are written.
+        """
+        result = []
+        for value, states in self.rungs:
+            if min_states is not None and states < min_states:
+                continue
+            if max_states is not None and states > max_states:
+                continue
+            constants = {self.constant: value}
+            location = instantiate_constants(self.template, constants, directory)
+            result.append(ScaledBenchmark(location, self.name, constants, states))
+        return result
+
+
+_scalable_files_path = Path(__file__).parent / "../resources/scalable-files/"
+scale_families = [
+    ScaleFamily(
+        "grid_walk",
+        _scalable_files_path / "grid_walk.nm",
+        "N",
+        [(32, 1024), (100, 10**4), (317, 100489), (1000, 10**6), (3163, 10004569)],
+    ),
+    ScaleFamily(
+        "grid_robot",
+        _scalable_files_path / "grid_robot.nm",
+        "N",
+        [(32, 1024), (100, 10**4), (317, 100489), (1000, 10**6), (3163, 10004569)],
+    ),
+    ScaleFamily(
+        "tandem",
+        _scalable_files_path / "tandem.sm",
+        "c",
+        [(23, 1128), (71, 10296), (224, 101025), (708, 1004653), (2237, 10015050)],
+    ),
+]
+
+
+def scale_ladder(directory: Path, min_states=None, max_states=None) -> list[ScaledBenchmark]:
+    """
+    The rungs of all scale families, see ScaleFamily.ladder.
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    result = []
+    for family in scale_families:
+        result += family.ladder(directory, min_states, max_states)
+    return result
+
+
 class Tester:
     testdir = tempfile.TemporaryDirectory()
     delete_files_default = True
+    artifact_cache_default = None
+    journal_default = None
+    warehouse_default = None
+    handoff_default = "disk"
+    ramdir_default = "/dev/shm"
+    handoff_max_bytes_default = 1024 * 1024 * 1024
+    # A RAM-backed directory with less free space after a step is considered to have run full during the step.
+    handoff_min_free_bytes = 1024 * 1024
+    compare_default = False
+    compare_tolerance_default = None
+    compare_canonicalize_default = False
+    memory_tolerance_default = 0.5
 
-    def __init__(self, id=None, delete_files=None):
-        self._tmpdir = __class__.testdir
+    def __init__(self, id=None, delete_files=None, tmpdir=None, artifact_cache=None, limits=None, handoff=None, compare=None, journal=None, warehouse=None):
+        """
+        :param artifact_cache: An ArtifactCache from which loader and transformer results are reused. If none, Tester.artifact_cache_default is used.
+        :param journal: A ResultsJournal from which the verdicts of unchanged chains on unchanged benchmarks are reused. If none, Tester.journal_default is used.
+        :param warehouse: A ResultsWarehouse in which the results of every stage are stored. If none, Tester.warehouse_default is used.
+        :param limits: Limits for every step in the chain, overriding the limits of the individual tools.
+        :param handoff: Where intermediate UMB files are handed from one step to the next, either "disk" or "ram". If none, Tester.handoff_default is used.
+        :param compare: Compare the models before and after the transformer, see compare_umb_files. The differences are reported as "differences" in the results. If none, Tester.compare_default is used.
+        """
+        _configure_once()
+        self._compare = __class__.compare_default if compare is None else compare
+        self._limits = limits
+        self._handoff = __class__.handoff_default if handoff is None else handoff
+        if self._handoff not in ["disk", "ram"]:
+            raise RuntimeError(f"Unknown handoff mode {self._handoff}")
+        self._ramdir = __class__.ramdir_default
+        self._handoff_max_bytes = __class__.handoff_max_bytes_default
+        self._tmpdir = __class__.testdir if tmpdir is None else tmpdir
+        if artifact_cache is None:
+            self._artifact_cache = __class__.artifact_cache_default
+        else:
+            self._artifact_cache = artifact_cache
+        self._journal = __class__.journal_default if journal is None else journal
+        self._warehouse = __class__.warehouse_default if warehouse is None else warehouse
         self._loader = None
         self._checker = None
         self._transformer = None
@@ -58,17 +244,124 @@ class Tester:
     def _tmplogfile(self):
         return tempfile.NamedTemporaryFile(dir=self._get_tmp_dir_name(), suffix=".log", delete=self._delete_files, delete_on_close=self._delete_files)
 
+    # The bytes reserved in RAM-backed directories for intermediates that are being written, see _handoff_umbfile.
+    _ram_reserved = 0
+    _ram_reserved_lock = threading.Lock()
+
+    def _ram_free_bytes(self) -> int | None:
+        try:
+            stats = os.statvfs(self._ramdir)
+        except OSError:
+            return None
+        return stats.f_bavail * stats.f_frsize
+
+    def _handoff_umbfile(self):
+        """
+        A temporary file for an intermediate UMB file, together with where it is located ("ram" or "disk").
+
+        Intermediates go to RAM only if there is room for one of maximal size next to the intermediates that are being written
+        at the same time, for which that much space is reserved until _release_handoff is called.
+        The tools read and write intermediates as complete files, there is no streaming via a FIFO or memfd,
+        so a tool that writes more than the maximal size can still fill the directory; that is handled in _handed_off.
+        """
+        if self._handoff == "ram":
+            free = self._ram_free_bytes()
+            with __class__._ram_reserved_lock:
+                if free is not None and free - __class__._ram_reserved >= self._handoff_max_bytes:
+                    __class__._ram_reserved += self._handoff_max_bytes
+                    return tempfile.NamedTemporaryFile(dir=self._ramdir, suffix=".umb", delete=self._delete_files, delete_on_close=self._delete_files), "ram"
+        return self._tmpumbfile(), "disk"
+
+    def _release_handoff(self, handoff):
+        if handoff == "ram":
+            with __class__._ram_reserved_lock:
+                __class__._ram_reserved -= self._handoff_max_bytes
+
+    def _ram_exhausted(self, result) -> bool:
+        """
+        Whether a step that wrote to RAM may have failed or written a truncated file, as the RAM-backed directory ran full.
+        """
+        if result is None:
+            return True
+        lines = tuple(result.errors or ()) + tuple(result.log_tail or ())
+        if any("No space left on device" in line for line in lines):
+            return True
+        free = self._ram_free_bytes()
+        return free is not None and free < __class__.handoff_min_free_bytes
+
+    async def _handed_off(self, tool, operation: str, input_file: Path, log_file: Path):
+        """
+        Runs a step that writes an intermediate UMB file, i.e., prism_file_to_umb or umb_to_umb of the tool.
+        If the step wrote to RAM and the RAM-backed directory ran full, the step runs again with a file on disk,
+        and a cached result of the step, which may be truncated, is discarded.
+
+        :return: The results of the step, the temporary file with the intermediate, and where it is located ("ram", "disk" or "spilled").
+        """
+        base_tool = self._limited(tool)
+        tool = self._cached(base_tool)
+        tmpfile, handoff = self._handoff_umbfile()
+        result = None
+        try:
+            result = await getattr(tool, operation + "_async")(input_file, Path(tmpfile.name), log_file=log_file)
+        except OSError as e:
+            if handoff != "ram" or e.errno != errno.ENOSPC:
+                raise
+        finally:
+            self._release_handoff(handoff)
+        if handoff == "ram" and self._ram_exhausted(result):
+            logger.warning(f"{self._ramdir} ran full, writing the intermediate to disk")
+            Path(tmpfile.name).unlink(missing_ok=True)
+            if tool is not base_tool:
+                tool.discard(operation, input_file)
+            tmpfile, handoff = self._tmpumbfile(), "spilled"
+            result = await getattr(tool, operation + "_async")(input_file, Path(tmpfile.name), log_file=log_file)
+        return result, tmpfile, handoff
+
+    def _spill(self, tmpfile, handoff):
+        """
+        Moves an intermediate UMB file from RAM to disk if it is larger than the threshold.
+
+        :return: The file that holds the intermediate, and where it is located ("ram", "disk" or "spilled").
+        """
+        path = Path(tmpfile.name)
+        if handoff != "ram" or not path.exists() or path.stat().st_size <= self._handoff_max_bytes:
+            return tmpfile, handoff
+        disk_file = self._tmpumbfile()
+        shutil.copyfile(path, disk_file.name)
+        path.unlink()
+        return disk_file, "spilled"
+
+    def _limited(self, tool):
+        if tool is None or self._limits is None:
+            return tool
+        return tool.with_limits(self._limits)
+
+    def _cached(self, tool):
+        if tool is None or self._artifact_cache is None:
+            return tool
+        from umbtest.cache import CachedTool
+
+        return CachedTool(tool, self._artifact_cache)
+
     def set_chain(
-        self, loader: UmbTool, checker: UmbTool, transformer: None | UmbTool = None
+        self, loader: UmbTool | None, checker: UmbTool, transformer: None | UmbTool = None
     ) -> None:
         self._loader = loader
         self._transformer = transformer
         self._checker = checker
 
+    @property
+    def chain(self) -> dict[str, UmbTool | None]:
+        return {
+            "loader": self._loader,
+            "transformer": self._transformer,
+            "checker": self._checker,
+        }
+
     @property
     def id(self):
         if self._id is None:
-            result = f"l={self._loader.name}"
+            result = f"l={self._loader.name if self._loader is not None else None}"
             if self._transformer is not None:
                 result += f"_t={self._transformer.name}"
             else:
@@ -79,96 +372,561 @@ class Tester:
             return self._id
 
     def __str__(self):
-        result = f"load with {self._loader.name}"
+        result = f"load with {self._loader.name}" if self._loader is not None else "read the UMB file"
         if self._transformer is not None:
             result += f" transform with {self._transformer.name}"
         result += f" check with {self._checker.name}"
         return result
 
     def check_benchmark(self, benchmark):
+        return run_sync(self.check_benchmark_async(benchmark))
+
+    async def check_benchmark_async(self, benchmark):
+        """
+        Like check_benchmark, but without blocking the event loop.
+        Cancelling the task kills the tool that is running, and the remaining steps are not started.
+        """
+        unsupported = self._unsupported(benchmark)
+        if unsupported is not None:
+            return unsupported
+        key = None
+        if self._journal is not None:
+            key = self._journal.key(self, benchmark, self._compare)
+            results = self._journal.lookup(key)
+            if results is not None:
+                logger.info(f"{self}: reusing the recorded verdict on {benchmark.id}")
+                return results
         if benchmark.is_prism_file:
-            return self.check_prism_file(benchmark.location, benchmark.properties)
+            results = await self.check_prism_file_async(benchmark.location, benchmark.properties)
         else:
-            raise NotImplementedError("We currently only support prism files")
+            results = await self.check_umb_file_async(benchmark.location, benchmark.properties)
+        if benchmark.manifest is not None:
+            self._record(benchmark, results)
+        if key is not None:
+            self._journal.record(key, self, benchmark, results)
+        if self._warehouse is not None:
+            self._warehouse.add(self, benchmark, results)
+        return results
+
+    def _unsupported(self, benchmark):
+        """
+        The results for a benchmark whose model type is not supported by a tool in the chain, or None if the chain supports it.
+        """
+        metadata = benchmark.metadata
+        if metadata is None:
+            return None
+        for tool in [self._loader, self._transformer, self._checker]:
+            if tool is not None and metadata["model_type"] in getattr(tool, "unsupported_model_types", []):
+                # The chain as a whole does not support the model, which is reported by the loader.
+                loader_result = ReportedResults()
+                loader_result.not_supported = True
+                return {"loader": loader_result, "transformer": None, "checker": None, "differences": None}
+        return None
+
+    def _record(self, benchmark, results):
+        """
+        Stores the size of the model and the durations of the tools in the manifest of the benchmark.
+        For tools that track their memory, the allocated memory per transition is compared with the budget of the benchmark.
+        Budgets that are exceeded by more than Tester.memory_tolerance_default are reported as "memory_regressions" in the results.
+        """
+        durations = dict()
+        memory = dict()
+        results["memory_regressions"] = []
+        # UMB benchmarks are checked without a loader.
+        loaded = results["loader"] is not None and results["loader"].exit_code == 0
+        transitions = (results["loader"].model_info or dict()).get("transitions") if loaded else None
+        for stage, operation in [("loader", "prism_file_to_umb"), ("transformer", "umb_to_umb"), ("checker", "check_umb")]:
+            tool = self.chain[stage]
+            if results.get(stage) is None or results[stage].cached or results[stage].wall_time is None:
+                continue
+            name = f"{getattr(tool, 'identifier', tool.name)}:{operation}"
+            durations[name] = results[stage].wall_time
+            allocated = results[stage].allocated_memory
+            if not getattr(tool, "track_memory", False) or allocated is None or not transitions or results[stage].exit_code != 0:
+                continue
+            memory[name] = allocated / transitions
+            budget = benchmark.manifest.memory_budget(benchmark.location, name)
+            if budget is not None and memory[name] > budget * (1 + __class__.memory_tolerance_default):
+                results["memory_regressions"].append(
+                    f"{name} allocated {memory[name]:.1f} bytes per transition, the budget is {budget:.1f}"
+                )
+        model_info = results["loader"].model_info if loaded else None
+        benchmark.manifest.record(benchmark.location, model_info, durations, memory)
 
     def check_prism_file(
         self, prism_file: Path, properties: List[str]
     ) -> dict[str, ReportedResults]:
-        result = dict()
+        return run_sync(self.check_prism_file_async(prism_file, properties))
+
+    async def check_prism_file_async(
+        self, prism_file: Path, properties: List[str]
+    ) -> dict[str, ReportedResults]:
+        """
+        Like check_prism_file, but without blocking the event loop.
+        Cancelling the task kills the tool that is running, and the remaining steps are not started.
+        """
         if self._loader is None or self._checker is None:
             raise RuntimeError("You must first set the tool chain, using set_chain()")
-        tmpfile_in = self._tmpumbfile()
-        tmpfile_in_path = Path(tmpfile_in.name)
+        result = {"loader": None, "transformer": None, "checker": None, "differences": None}
+        result["loader"], tmpfile = await self._load(self._loader, prism_file)
+        if tmpfile is None:
+            return result
+        if self._transformer:
+            result["transformer"], tmpfile, result["differences"] = await self._transform(self._transformer, tmpfile)
+            if tmpfile is None:
+                return result
+        result["checker"] = await self._check(self._checker, tmpfile, properties)
+        return result
+
+    def check_umb_file(
+        self, umb_file: Path, properties: List[str]
+    ) -> dict[str, ReportedResults]:
+        """
+        Runs the chain without its loader on an existing UMB file, e.g., one written by a SyntheticModel. The loader is reported as None.
+        The file itself is not modified, the transformer writes to a temporary file.
+        """
+        return run_sync(self.check_umb_file_async(umb_file, properties))
+
+    async def check_umb_file_async(
+        self, umb_file: Path, properties: List[str]
+    ) -> dict[str, ReportedResults]:
+        """
+        Like check_umb_file, but without blocking the event loop.
+        """
+        if self._checker is None:
+            raise RuntimeError("You must first set the tool chain, using set_chain()")
+        result = {"loader": None, "transformer": None, "checker": None, "differences": None}
+        tmpfile = SimpleNamespace(name=str(umb_file))
+        if self._transformer:
+            result["transformer"], tmpfile, result["differences"] = await self._transform(self._transformer, tmpfile)
+            if tmpfile is None:
+                return result
+        result["checker"] = await self._check(self._checker, tmpfile, properties)
+        return result
+
+    async def _load(self, loader, prism_file: Path):
+        """
+        The first step of a chain.
+
+        :return: The results of the loader, and the temporary file with the UMB file, or None if the chain stops here.
+        """
         log_file_to_umb = self._tmplogfile()
-        result["loader"] = self._loader.prism_file_to_umb(
-            prism_file, tmpfile_in_path, log_file=Path(log_file_to_umb.name)
-        )
-        result["checker"] = None
-        result["transformer"] = None
-        if result["loader"].exit_code != 0:
-            with open(result["loader"].logfile, "r") as f:
+        result, tmpfile_in, handoff = await self._handed_off(loader, "prism_file_to_umb", prism_file, Path(log_file_to_umb.name))
+        tmpfile_in_path = Path(tmpfile_in.name)
+        result.handoff = handoff
+        if result.exit_code != 0:
+            with open(result.logfile, "r") as f:
                 print(f.read())
-            if result["loader"].not_supported:
-                return result
-            if not result["loader"].anticipated_error:
+            if result.not_supported:
+                return result, None
+            if result.timeout or result.memout:
+                return result, None
+            if not result.anticipated_error:
                 raise RuntimeError(
-                    f"Unexpected exception during loading by {self._loader.name}"
+                    f"Unexpected exception during loading by {loader.name}"
                 )
             else:
-                return result
+                return result, None
         if not tmpfile_in_path.exists() or tmpfile_in_path.stat().st_size == 0:
-            d = None
-            with open(result["loader"].logfile, "r") as f:
-                d = deque(f.readlines(), maxlen=3)
-            with open(result["loader"].logfile, "r") as f:
-                print(f.read())
+            tail = result.log_tail
+            print("\n".join(tail))
             raise RuntimeError(
-                f"{self._loader.name} did not yield a UMB file (but status=0). Last log lines are {" ".join([d[i].rstrip('\n') for i in range(len(d)) if d[i]])} "
+                f"{loader.name} did not yield a UMB file (but status=0). Last log lines are {" ".join([line for line in tail[-3:] if line])} "
             )
-        if self._transformer:
-            tmpfile_out = self._tmpumbfile()
-            try:
-                result["transformer"] = self._transformer.umb_to_umb(
-                    tmpfile_in_path,
-                    Path(tmpfile_out.name),
-                    log_file=Path(self._tmplogfile().name),
-                )
-                if result["transformer"].exit_code != 0:
-                    return result
-            except Exception as e:
-                raise RuntimeError(f"{self._transformer.name} raised {type(e)}:{e}!")
-        else:
-            tmpfile_out = tmpfile_in
-        result["checker"] = self._checker.check_umb(
-            Path(tmpfile_out.name),
+        tmpfile_in, result.handoff = self._spill(tmpfile_in, handoff)
+        return result, tmpfile_in
+
+    async def _transform(self, transformer, tmpfile_in):
+        """
+        The optional middle step of a chain.
+
+        :return: The results of the transformer, the temporary file with its output or None if the chain stops here, and the differences between input and output if they are compared.
+        """
+        tmpfile_in_path = Path(tmpfile_in.name)
+        log_file = self._tmplogfile()
+        try:
+            result, tmpfile_out, handoff = await self._handed_off(transformer, "umb_to_umb", tmpfile_in_path, Path(log_file.name))
+            result.handoff = handoff
+            if result.exit_code != 0:
+                return result, None, None
+        except Exception as e:
+            raise RuntimeError(f"{transformer.name} raised {type(e)}:{e}!")
+        tmpfile_out, result.handoff = self._spill(tmpfile_out, handoff)
+        differences = None
+        if self._compare:
+            # Imported here, as the comparison needs numpy and umbi.
+            import asyncio
+            from umbtest.compare import compare_umb_files
+
+            # The comparison runs in-process, in a thread.
+            differences = await asyncio.to_thread(
+                compare_umb_files,
+                tmpfile_in_path,
+                Path(tmpfile_out.name),
+                tolerance=__class__.compare_tolerance_default,
+                canonicalize=__class__.compare_canonicalize_default,
+            )
+        return result, tmpfile_out, differences
+
+    async def _check(self, checker, tmpfile, properties: List[str]) -> ReportedResults:
+        """
+        The last step of a chain.
+        """
+        result = await self._limited(checker).check_umb_async(
+            Path(tmpfile.name),
             log_file=Path(self._tmplogfile().name),
             properties=properties,
         )
-        if result["checker"].exit_code != 0:
-            with open(result["checker"].logfile, "r") as f:
+        if result.exit_code != 0:
+            with open(result.logfile, "r") as f:
                 print(f.read())
-            if result["checker"].anticipated_error or result["checker"].not_supported:
+            if result.anticipated_error or result.not_supported:
+                return result
+            if result.timeout or result.memout:
                 return result
-            if result["checker"].errors is None:
+            if result.errors is None:
                 raise RuntimeError("Something unexpected went wrong.")
-
         return result
 
 
+class _ThrottledTool:
+    """
+    Wraps a tool such that every invocation first acquires a (shared) semaphore.
+    The semaphore is either an asyncio.Semaphore, for the jobs on one event loop, or a semaphore that is shared among threads or processes.
+    All other attributes are forwarded to the wrapped tool.
+    """
+
+    def __init__(self, tool: UmbTool, semaphore):
+        self._tool = tool
+        self._semaphore = semaphore
+
+    def __getattr__(self, item):
+        return getattr(self._tool, item)
+
+    def with_limits(self, limits):
+        return _ThrottledTool(self._tool.with_limits(limits), self._semaphore)
+
+    def prism_file_to_umb(self, *args, **kwargs):
+        with self._semaphore:
+            return self._tool.prism_file_to_umb(*args, **kwargs)
+
+    def umb_to_umb(self, *args, **kwargs):
+        with self._semaphore:
+            return self._tool.umb_to_umb(*args, **kwargs)
+
+    def check_umb(self, *args, **kwargs):
+        with self._semaphore:
+            return self._tool.check_umb(*args, **kwargs)
+
+    async def _throttled_async(self, operation, *args, **kwargs):
+        import asyncio
+
+        if isinstance(self._semaphore, asyncio.Semaphore):
+            async with self._semaphore:
+                return await getattr(self._tool, operation)(*args, **kwargs)
+        # The job runs on an event loop of its own, see run_sync, which may block until another thread or process releases the semaphore.
+        with self._semaphore:
+            return await getattr(self._tool, operation)(*args, **kwargs)
+
+    async def prism_file_to_umb_async(self, *args, **kwargs):
+        return await self._throttled_async("prism_file_to_umb_async", *args, **kwargs)
+
+    async def umb_to_umb_async(self, *args, **kwargs):
+        return await self._throttled_async("umb_to_umb_async", *args, **kwargs)
+
+    async def check_umb_async(self, *args, **kwargs):
+        return await self._throttled_async("check_umb_async", *args, **kwargs)
+
+
+def _run_matrix_job(tester: Tester, benchmark: UmbBenchmark, semaphores: dict):
+    """
+    Runs a single (tester, benchmark) job in its own temporary directory.
+    This is a module-level function such that it can be sent to a process pool.
+    """
+    return run_sync(_run_matrix_job_async(tester, benchmark, semaphores))
+
+
+async def _run_matrix_job_async(tester: Tester, benchmark: UmbBenchmark, semaphores: dict):
+    # Worker processes get the defaults of tools.toml as well.
+    _configure_once()
+    base_dir = tester._get_tmp_dir_name()
+    job_dir = tempfile.mkdtemp(dir=base_dir, prefix="job-")
+    job_tester = copy.copy(tester)
+    job_tester._tmpdir = job_dir
+
+    def throttle(tool):
+        if tool is None or tool.name not in semaphores:
+            return tool
+        return _ThrottledTool(tool, semaphores[tool.name])
+
+    job_tester.set_chain(
+        loader=throttle(tester._loader),
+        checker=throttle(tester._checker),
+        transformer=throttle(tester._transformer),
+    )
+    try:
+        return await job_tester.check_benchmark_async(benchmark)
+    finally:
+        if job_tester._delete_files:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+
+class MatrixRunner:
+    """
+    Runs a collection of (Tester, UmbBenchmark) jobs concurrently.
+
+    Every job runs in a fresh subdirectory of the tester's temporary directory, such that concurrent chains never share files.
+    The number of simultaneous invocations of a tool can be capped via its name, e.g., {"PrismCLI": 4}.
+    With a duration history, jobs are started longest first and their durations are recorded for the next run.
+    """
+
+    default_max_workers = None
+    default_tool_limits = dict()
+    default_history = None
+    # The durations of the pytest tests, keyed by node id rather than by job_key, and therefore kept in another file.
+    default_test_history = None
+
+    def __init__(self, max_workers=None, tool_limits=None, use_processes=False, history=None):
+        """
+        :param max_workers: The number of jobs that run at the same time. If none, MatrixRunner.default_max_workers is used, and if that is none, the number of cores.
+        :param tool_limits: Maps tool names to the maximal number of concurrent invocations of that tool. If none, MatrixRunner.default_tool_limits is used.
+        :param use_processes: Use a process pool instead of a thread pool. This helps for in-process tools such as UmbPython.
+        :param history: The DurationHistory used for scheduling. If none, MatrixRunner.default_history is used, and if that is none, jobs start in the given order.
+        """
+        _configure_once()
+        if max_workers is None:
+            max_workers = __class__.default_max_workers
+        self._max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self._tool_limits = dict(
+            __class__.default_tool_limits if tool_limits is None else tool_limits
+        )
+        self._use_processes = use_processes
+        self._history = __class__.default_history if history is None else history
+
+    def predicted_makespan(self, jobs: List[tuple[Tester, UmbBenchmark]]) -> float | None:
+        """
+        The expected duration of running all jobs with this runner, based on the history, or None without history.
+        """
+        if self._history is None:
+            return None
+        from umbtest.schedule import estimates, job_key, predict_makespan
+
+        durations = estimates([job_key(tester, benchmark) for tester, benchmark in jobs], self._history)
+        return predict_makespan(durations, self._max_workers)
+
+    def run(
+        self, jobs: List[tuple[Tester, UmbBenchmark]], return_exceptions=False
+    ) -> List[dict[str, ReportedResults] | BaseException]:
+        """
+        Runs all jobs and returns their results in the order of the jobs.
+
+        :param jobs: A list of (tester, benchmark) pairs.
+        :param return_exceptions: If true, an exception raised by a job is returned as its result. Otherwise, it is raised after all jobs have finished.
+        :return: For every job, the results as returned by Tester.check_benchmark.
+        """
+        # Imported here, as asyncio and concurrent.futures take long to import, see umbtest.tools.run_sync.
+        import concurrent.futures
+
+        if self._use_processes:
+            manager = multiprocessing.Manager()
+            semaphores = {
+                name: manager.BoundedSemaphore(limit)
+                for name, limit in self._tool_limits.items()
+            }
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._max_workers
+            )
+        else:
+            manager = None
+            semaphores = {
+                name: threading.BoundedSemaphore(limit)
+                for name, limit in self._tool_limits.items()
+            }
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._max_workers
+            )
+        order = list(range(len(jobs)))
+        if self._history is not None:
+            from umbtest.schedule import job_key, longest_first
+
+            keys = [job_key(tester, benchmark) for tester, benchmark in jobs]
+            order = longest_first(order, keys, self._history)
+        try:
+            with executor:
+                futures = [None] * len(jobs)
+                for i in order:
+                    tester, benchmark = jobs[i]
+                    # The temporary directory object itself cannot be sent to another process.
+                    tester = copy.copy(tester)
+                    tester._tmpdir = tester._get_tmp_dir_name()
+                    futures[i] = executor.submit(_run_matrix_job, tester, benchmark, semaphores)
+                concurrent.futures.wait(futures)
+        finally:
+            if manager is not None:
+                manager.shutdown()
+
+        outcomes = [future.exception() or future.result() for future in futures]
+        return self._collect(jobs, outcomes, return_exceptions)
+
+    async def run_async(
+        self, jobs: List[tuple[Tester, UmbBenchmark]], return_exceptions=False
+    ) -> List[dict[str, ReportedResults] | BaseException]:
+        """
+        Like run, but without blocking the event loop. The jobs run on the event loop, also if the runner uses processes.
+        Cancelling the task kills the running tools, and jobs that did not start yet are not started.
+        """
+        import asyncio
+
+        semaphores = {
+            name: asyncio.Semaphore(limit)
+            for name, limit in self._tool_limits.items()
+        }
+        slots = asyncio.Semaphore(self._max_workers if self._max_workers is not None else os.cpu_count())
+
+        async def run_job(tester, benchmark):
+            async with slots:
+                tester = copy.copy(tester)
+                tester._tmpdir = tester._get_tmp_dir_name()
+                return await _run_matrix_job_async(tester, benchmark, semaphores)
+
+        order = list(range(len(jobs)))
+        if self._history is not None:
+            from umbtest.schedule import job_key, longest_first
+
+            keys = [job_key(tester, benchmark) for tester, benchmark in jobs]
+            order = longest_first(order, keys, self._history)
+        tasks = [None] * len(jobs)
+        # Waiting tasks acquire the slots in the order in which they were created.
+        for i in order:
+            tasks[i] = asyncio.ensure_future(run_job(*jobs[i]))
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        return self._collect(jobs, outcomes, return_exceptions)
+
+    def _collect(self, jobs, outcomes, return_exceptions):
+        """
+        The results of all jobs, given the result or exception of every job.
+        """
+        results = []
+        for (tester, benchmark), outcome in zip(jobs, outcomes):
+            if isinstance(outcome, BaseException) and not return_exceptions:
+                raise RuntimeError(
+                    f"Job {tester.id} on {benchmark.id} failed"
+                ) from outcome
+            results.append(outcome)
+        if self._history is not None:
+            self._record(jobs, results)
+        return results
+
+    def _record(self, jobs, results):
+        """
+        Adds the duration of every finished job to the history, as the sum of the wall times of its stages.
+        Waiting for a throttled tool is not included.
+        """
+        from umbtest.schedule import job_key
+
+        for (tester, benchmark), result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                continue
+            # Stages reused from the cache took no time in this run, and are not charged to the job.
+            times = [r.wall_time for r in result.values() if isinstance(r, ReportedResults) and not r.cached and r.wall_time is not None]
+            if times:
+                self._history.add(job_key(tester, benchmark), sum(times))
+        self._history.save()
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _configure_once():
+    """
+    Configures the defaults from tools.toml, unless that happened already, see configure_tester.
+    """
+    with _configure_lock:
+        if not _configured:
+            configure_tester()
+
+
 def configure_tester():
-    path = str(pathlib.Path(__file__).parent.parent / "tools.toml")
-    with open(path, "rb") as config_file:
-        paths = tomllib.load(config_file)
-        if "byproducts" in paths:
-            if "tmpfolder" in paths["byproducts"]:
-                Tester.testdir = paths["byproducts"]["tmpfolder"]
-                logger.warning(
-                    f"Temporary files are now stored at {Tester.testdir}"
-                )
-            if "cleanup" in paths["byproducts"]:
-                Tester.delete_files_default = paths["byproducts"]["cleanup"]
-                logger.warning(
-                    f"Temporary files cleanup is set to {Tester.delete_files_default}"
-                )
+    """
+    Sets the defaults of Tester and MatrixRunner, and the manifest and perf baseline locations, from tools.toml.
+    Entry points call this explicitly, before benchmarks are selected. Otherwise, it runs when the first Tester or MatrixRunner is created.
+    The optional subsystems (cache, journal, warehouse, perf, schedule) are only imported if they are configured.
+    """
+    global _configured
+    _configured = True
+    paths = load_config()
+    if "byproducts" in paths:
+        if "tmpfolder" in paths["byproducts"]:
+            Tester.testdir = paths["byproducts"]["tmpfolder"]
+            logger.warning(
+                f"Temporary files are now stored at {Tester.testdir}"
+            )
+        if "cleanup" in paths["byproducts"]:
+            Tester.delete_files_default = paths["byproducts"]["cleanup"]
+            logger.warning(
+                f"Temporary files cleanup is set to {Tester.delete_files_default}"
+            )
+        if "handoff" in paths["byproducts"]:
+            Tester.handoff_default = paths["byproducts"]["handoff"]
+            logger.warning(
+                f"Intermediate UMB files are handed over via {Tester.handoff_default}"
+            )
+        if "ramfolder" in paths["byproducts"]:
+            Tester.ramdir_default = paths["byproducts"]["ramfolder"]
+        if "ram_max_megabytes" in paths["byproducts"]:
+            Tester.handoff_max_bytes_default = paths["byproducts"]["ram_max_megabytes"] * 1024 * 1024
+    if "benchmarks" in paths and "manifest" in paths["benchmarks"]:
+        prism_files_manifest.location = pathlib.Path(paths["benchmarks"]["manifest"])
+    if "compare" in paths:
+        if "enabled" in paths["compare"]:
+            Tester.compare_default = paths["compare"]["enabled"]
+        if "tolerance" in paths["compare"]:
+            Tester.compare_tolerance_default = paths["compare"]["tolerance"]
+        if "canonicalize" in paths["compare"]:
+            Tester.compare_canonicalize_default = paths["compare"]["canonicalize"]
+    if "memory" in paths and "tolerance" in paths["memory"]:
+        Tester.memory_tolerance_default = paths["memory"]["tolerance"]
+    if "runner" in paths:
+        if "workers" in paths["runner"]:
+            MatrixRunner.default_max_workers = paths["runner"]["workers"]
+        if "limits" in paths["runner"]:
+            MatrixRunner.default_tool_limits = dict(paths["runner"]["limits"])
+        if "history" in paths["runner"]:
+            from umbtest.schedule import DurationHistory
+
+            MatrixRunner.default_history = DurationHistory(pathlib.Path(paths["runner"]["history"]))
+        if "test_history" in paths["runner"]:
+            from umbtest.schedule import DurationHistory
 
-configure_tester()
+            MatrixRunner.default_test_history = DurationHistory(pathlib.Path(paths["runner"]["test_history"]))
+    if "perf" in paths and "baseline" in paths["perf"]:
+        from umbtest.perf import PerfBaseline
+
+        PerfBaseline.default_location = pathlib.Path(paths["perf"]["baseline"])
+    if "journal" in paths and "location" in paths["journal"]:
+        from umbtest.journal import ResultsJournal
+
+        Tester.journal_default = ResultsJournal(pathlib.Path(paths["journal"]["location"]), reuse_timeouts=paths["journal"].get("reuse_timeouts", False))
+        logger.warning(
+            f"Verdicts of unchanged tool chains are now reused from {paths['journal']['location']}"
+        )
+    if "warehouse" in paths and "location" in paths["warehouse"]:
+        from umbtest.warehouse import ResultsWarehouse
+
+        Tester.warehouse_default = ResultsWarehouse(pathlib.Path(paths["warehouse"]["location"]), label=paths["warehouse"].get("label"))
+        logger.warning(
+            f"Results are now stored in {paths['warehouse']['location']}"
+        )
+    if "cache" in paths and "location" in paths["cache"]:
+        from umbtest.cache import ArtifactCache
+
+        max_bytes = None
+        if "max_megabytes" in paths["cache"]:
+            max_bytes = paths["cache"]["max_megabytes"] * 1024 * 1024
+        Tester.artifact_cache_default = ArtifactCache(
+            pathlib.Path(paths["cache"]["location"]), max_bytes=max_bytes
+        )
+        logger.warning(
+            f"UMB artifacts are now cached at {paths['cache']['location']}"
+        )
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import shutil
+import tempfile
+import threading
+import logging
+
+from umbtest.tools import UmbTool, ReportedResults
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path: pathlib.Path) -> str:
+    """
+    The sha256 hex digest of the content of a file.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _entry_size(entry: pathlib.Path) -> int:
+    return sum(f.stat().st_size for f in entry.iterdir())
+
+
+class ArtifactCache:
+    """
+    A persistent, content-addressed store for UMB files produced by tools, together with their ReportedResults.
+
+    Entries are keyed on the hash of the input file, the operation, the tool identifier, its extra arguments and the tool fingerprint.
+    Every entry is a directory with the UMB file, the log file, and the pickled results.
+    The UMB file is copied rather than linked on lookup, such that a tool that writes its output in place cannot change the entry.
+    Results of a lookup are marked as cached and carry no resource usage, since nothing was measured.
+    The total size is counted once and then tracked. Whenever it exceeds the budget, the cache is rescanned,
+    which also accounts for entries stored by other processes, and the least recently used entries are removed.
+    """
+
+    _umb_name = "artifact.umb"
+    _log_name = "artifact.log"
+    _results_name = "results.pickle"
+
+    def __init__(self, location: pathlib.Path, max_bytes: int | None = None):
+        """
+        :param location: The directory in which the cache is stored. It is created if necessary.
+        :param max_bytes: The size budget of the cache. If none, the cache is unbounded.
+        """
+        self._location = pathlib.Path(location)
+        self._location.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        # The total size of the entries, or None until the first store that needs it.
+        self._size = None
+
+    @property
+    def location(self) -> pathlib.Path:
+        return self._location
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+    def __str__(self):
+        return f"ArtifactCache[{self._location},{self.stats()}]"
+
+    def key(self, operation: str, tool: UmbTool, input_file: pathlib.Path) -> str:
+        description = [
+            operation,
+            file_hash(input_file),
+            tool.identifier,
+            list(getattr(tool, "_extra_args", [])),
+            tool.fingerprint(),
+        ]
+        return hashlib.sha256(json.dumps(description).encode()).hexdigest()
+
+    def _entry(self, key: str) -> pathlib.Path:
+        return self._location / key
+
+    def lookup(
+        self, key: str, output_file: pathlib.Path, log_file: pathlib.Path | None
+    ) -> ReportedResults | None:
+        """
+        Restores the output and log file for the given key.
+
+        :return: The stored results, or None if there is no entry for the key.
+        """
+        entry = self._entry(key)
+        try:
+            with open(entry / __class__._results_name, "rb") as f:
+                result = pickle.load(f)
+            shutil.copyfile(entry / __class__._umb_name, output_file)
+            if log_file is not None:
+                shutil.copyfile(entry / __class__._log_name, log_file)
+            # The modification time of the results file determines the LRU order.
+            os.utime(entry / __class__._results_name)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self.misses += 1
+            return None
+        result.logfile = log_file
+        result.cached = True
+        result.forget_resources()
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def store(
+        self, key: str, output_file: pathlib.Path, result: ReportedResults
+    ) -> None:
+        """
+        Stores the output file and results of a successful invocation.
+        Concurrent stores of the same key are safe: the first one wins.
+        """
+        if result.exit_code != 0 or not output_file.exists() or output_file.stat().st_size == 0:
+            return
+        staging = pathlib.Path(tempfile.mkdtemp(dir=self._location, prefix=".staging-"))
+        try:
+            shutil.copyfile(output_file, staging / __class__._umb_name)
+            if result.logfile is not None and pathlib.Path(result.logfile).exists():
+                shutil.copyfile(result.logfile, staging / __class__._log_name)
+            else:
+                (staging / __class__._log_name).touch()
+            with open(staging / __class__._results_name, "wb") as f:
+                pickle.dump(result, f)
+            size = _entry_size(staging)
+            os.rename(staging, self._entry(key))
+        except OSError:
+            # Another process stored the same entry in the meantime.
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        with self._lock:
+            self.stores += 1
+            if self._max_bytes is None:
+                return
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += size
+            over_budget = self._size > self._max_bytes
+        if over_budget:
+            self.evict()
+
+    def size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        result = []
+        for entry in self._location.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                last_used = (entry / __class__._results_name).stat().st_mtime
+                size = _entry_size(entry)
+            except OSError:
+                continue
+            result.append((last_used, entry, size))
+        return result
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the cache fits into its budget.
+        """
+        if self._max_bytes is None:
+            return
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, entry, size in entries:
+            if total <= self._max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            with self._lock:
+                self.evictions += 1
+        with self._lock:
+            self._size = total
+
+    def discard(self, key: str) -> None:
+        try:
+            size = _entry_size(self._entry(key))
+        except OSError:
+            return
+        shutil.rmtree(self._entry(key), ignore_errors=True)
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def clear(self) -> None:
+        for entry in self._location.iterdir():
+            shutil.rmtree(entry, ignore_errors=True)
+        with self._lock:
+            self._size = 0
+
+
+class CachedTool:
+    """
+    Wraps a tool such that prism_file_to_umb and umb_to_umb are served from an ArtifactCache whenever possible.
+    All other attributes are forwarded to the wrapped tool.
+    """
+
+    def __init__(self, tool: UmbTool, cache: ArtifactCache):
+        self._tool = tool
+        self._cache = cache
+
+    def __getattr__(self, item):
+        return getattr(self._tool, item)
+
+    def with_limits(self, limits):
+        return CachedTool(self._tool.with_limits(limits), self._cache)
+
+    def _lookup(self, operation, input_file, output_file, log_file):
+        key = self._cache.key(operation, self._tool, input_file)
+        result = self._cache.lookup(key, output_file, log_file)
+        if result is not None:
+            logger.info(f"{self._tool.identifier}: reusing cached {operation} for {input_file}")
+        return key, result
+
+    def _cached(self, operation, input_file, output_file, log_file):
+        key, result = self._lookup(operation, input_file, output_file, log_file)
+        if result is not None:
+            return result
+        result = getattr(self._tool, operation)(input_file, output_file, log_file=log_file)
+        self._cache.store(key, output_file, result)
+        return result
+
+    async def _cached_async(self, operation, input_file, output_file, log_file):
+        import asyncio
+
+        # Hashing and copying files would block the event loop.
+        key, result = await asyncio.to_thread(self._lookup, operation, input_file, output_file, log_file)
+        if result is not None:
+            return result
+        result = await getattr(self._tool, operation + "_async")(input_file, output_file, log_file=log_file)
+        await asyncio.to_thread(self._cache.store, key, output_file, result)
+        return result
+
+    def discard(self, operation, input_file):
+        """
+        Removes the cached result of an operation on the input file, if any.
+        """
+        self._cache.discard(self._cache.key(operation, self._tool, input_file))
+
+    def prism_file_to_umb(
+        self,
+        prism_file: pathlib.Path,
+        output_file: pathlib.Path,
+        log_file: pathlib.Path,
+    ):
+        return self._cached("prism_file_to_umb", prism_file, output_file, log_file)
+
+    def umb_to_umb(
+        self,
+        input_file: pathlib.Path,
+        output_file: pathlib.Path,
+        log_file: pathlib.Path,
+    ):
+        return self._cached("umb_to_umb", input_file, output_file, log_file)
+
+    async def prism_file_to_umb_async(
+        self,
+        prism_file: pathlib.Path,
+        output_file: pathlib.Path,
+        log_file: pathlib.Path,
+    ):
+        return await self._cached_async("prism_file_to_umb", prism_file, output_file, log_file)
+
+    async def umb_to_umb_async(
+        self,
+        input_file: pathlib.Path,
+        output_file: pathlib.Path,
+        log_file: pathlib.Path,
+    ):
+        return await self._cached_async("umb_to_umb", input_file, output_file, log_file)
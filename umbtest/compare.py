@@ -0,0 +1,395 @@
+import pathlib
+
+import numpy as np
+import umbi
+from umbi.datatypes import Interval, NumericPrimitiveType, PrimitiveType
+
+
+def _csr_ranges(offsets: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gathers the given rows of a CSR structure.
+
+    :return: The new offsets, and for every entry of the gathered rows the index of the entry in the original structure.
+    """
+    counts = offsets[rows + 1] - offsets[rows]
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(counts, out=new_offsets[1:])
+    entries = np.repeat(offsets[rows] - new_offsets[:-1], counts) + np.arange(new_offsets[-1], dtype=np.int64)
+    return new_offsets, entries
+
+
+def _row_ids(offsets: np.ndarray) -> np.ndarray:
+    """
+    For every entry of a CSR structure, the row it belongs to.
+    """
+    return np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+
+
+def _segment_sums(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Wrapping sums of uint64 values per row of a CSR structure. Empty rows have sum zero.
+    """
+    sums = np.zeros(len(values) + 1, dtype=np.uint64)
+    np.cumsum(values, out=sums[1:])
+    return sums[offsets[1:]] - sums[offsets[:-1]]
+
+
+def _sort_within_rows(offsets: np.ndarray, keys: np.ndarray, tie_breaker: np.ndarray | None = None) -> np.ndarray:
+    """
+    The permutation that sorts the entries of every row of a CSR structure by the given keys.
+    If rows and keys are below 2**32, they are packed into a single uint64, such that one sort suffices,
+    and sorted input is detected without sorting. Otherwise, np.lexsort is used.
+    Only if keys occur multiple times within a row, the tie breaker is used.
+    """
+    rows = _row_ids(offsets)
+    if len(offsets) > 2**32 or (len(keys) > 0 and int(keys.max()) >= 2**32):
+        return np.lexsort((keys, rows) if tie_breaker is None else (tie_breaker, keys, rows))
+    packed = (rows.astype(np.uint64) << np.uint64(32)) | keys.astype(np.uint64)
+    if np.all(packed[1:] >= packed[:-1]):
+        order = np.arange(len(packed), dtype=np.int64)
+    else:
+        order = np.argsort(packed, kind="stable")
+    if tie_breaker is not None:
+        packed = packed[order]
+        equal = packed[1:] == packed[:-1]
+        if np.any(equal):
+            # Only the tied entries are sorted again, they keep their positions as a group.
+            tied = np.zeros(len(order), dtype=bool)
+            tied[1:] |= equal
+            tied[:-1] |= equal
+            positions = np.flatnonzero(tied)
+            entries = order[positions]
+            order[positions] = entries[np.lexsort((tie_breaker[entries], packed[positions]))]
+    return order
+
+
+def _num_distinct(values: np.ndarray) -> int:
+    values = np.sort(values)
+    return int(np.count_nonzero(values[1:] != values[:-1])) + min(len(values), 1)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """
+    The splitmix64 finalizer, applied element-wise with wrapping uint64 arithmetic.
+    """
+    with np.errstate(over="ignore"):
+        z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def _is_numeric(values: np.ndarray) -> bool:
+    return values.dtype.kind in "fiu" or (values.dtype == object and len(values) > 0 and not isinstance(values[0], str))
+
+
+def _hash_values(values: np.ndarray, tolerance: float | None) -> np.ndarray:
+    """
+    Hashes the entries of a value array, such that values that are equal (up to rounding to the tolerance) get the same hash.
+    """
+    if values.dtype == object:
+        if len(values) > 0 and isinstance(values[0], Interval):
+            # Intervals are hashed via their endpoints.
+            lefts = np.array([v.left for v in values], dtype=object)
+            rights = np.array([v.right for v in values], dtype=object)
+            return _mix(_hash_values(lefts, tolerance) ^ _mix(_hash_values(rights, tolerance)))
+        if _is_numeric(values):
+            values = values.astype(np.float64)
+        else:
+            # Strings are hashed via their rank among all values.
+            _, values = np.unique(values, return_inverse=True)
+    if values.dtype.kind == "f":
+        values = values.astype(np.float64)
+        if tolerance:
+            values = np.round(values / tolerance)
+        # Normalize negative zero.
+        values = values + 0.0
+        return _mix(values.view(np.uint64))
+    return _mix(values.astype(np.int64).view(np.uint64))
+
+
+class UmbArrays:
+    """
+    The structure of a UMB file as NumPy arrays.
+
+    Choices and branches are stored in CSR form, as in the file: the choices of state s are
+    state_to_choices[s] until state_to_choices[s+1], and likewise for the branches of a choice.
+    Annotations (rewards, labels, ...) are stored as a dictionary from (group, name, applies-to) to an array.
+    """
+
+    def __init__(self, index, initial, state_to_choices, choice_to_branches, branch_to_target, branch_to_probability, state_values, annotations):
+        self.index = index
+        self.initial = initial
+        self.state_to_choices = state_to_choices
+        self.choice_to_branches = choice_to_branches
+        self.branch_to_target = branch_to_target
+        self.branch_to_probability = branch_to_probability
+        self.state_values = state_values
+        self.annotations = annotations
+
+    @property
+    def num_states(self) -> int:
+        return len(self.initial)
+
+    @property
+    def num_choices(self) -> int:
+        return len(self.choice_to_branches) - 1
+
+    @property
+    def num_branches(self) -> int:
+        return len(self.branch_to_target)
+
+    @classmethod
+    def read(cls, path: pathlib.Path):
+        """
+        Reads a UMB file. Fixed-size numeric data is mapped to NumPy arrays without decoding individual values.
+        """
+        tar = umbi.tar.TarCoder(path)
+        index = umbi.umb.index.UmbIndex.from_json(tar.read_json("index.json"))
+        ts = index.transition_system
+
+        def vector(name, sized_type, optional=False):
+            data = tar.read_file(name, optional=optional)
+            if data is None:
+                return None
+            dtype = _numpy_type(sized_type)
+            if dtype is not None:
+                return np.frombuffer(data, dtype=dtype)
+            return np.array(umbi.binary.bytes_to_vector(data, sized_type), dtype=object)
+
+        def bitvector(name, num_entries):
+            data = np.frombuffer(tar.read_file(name), dtype=np.uint8)
+            return np.unpackbits(data, bitorder="little")[:num_entries].astype(bool)
+
+        uint64 = umbi.binary.UINT64
+        if ts.num_initial_states == 0:
+            initial = np.zeros(ts.num_states, dtype=bool)
+        else:
+            initial = bitvector("state-is-initial.bin", ts.num_states)
+        state_to_choices = vector("state-to-choices.bin", uint64, optional=True)
+        if state_to_choices is None:
+            state_to_choices = np.arange(ts.num_states + 1, dtype=np.uint64)
+        choice_to_branches = vector("choice-to-branches.bin", uint64, optional=True)
+        if choice_to_branches is None:
+            choice_to_branches = np.arange(ts.num_choices + 1, dtype=np.uint64)
+        branch_to_target = vector("branch-to-target.bin", uint64)
+        branch_to_probability = None
+        if ts.branch_probability_type is not None:
+            branch_to_probability = vector("branch-to-probability.bin", ts.branch_probability_type)
+        state_values = dict()
+        if ts.exit_rate_type is not None:
+            state_values["exit-rate"] = vector("state-to-exit-rate.bin", ts.exit_rate_type, optional=True)
+        if ts.time == "urgent-stochastic" and tar.has_file("state-is-markovian.bin"):
+            state_values["markovian"] = bitvector("state-is-markovian.bin", ts.num_states)
+        num_entries = {
+            "states": ts.num_states,
+            "choices": ts.num_choices,
+            "branches": ts.num_branches,
+        }
+        annotations = dict()
+        for group, annotation_map in (index.annotations or {}).items():
+            for name, annotation in annotation_map.items():
+                for applies_to in annotation.applies_to:
+                    path = f"annotations/{group}/{name}/{applies_to}"
+                    if annotation.type.type == PrimitiveType.STRING:
+                        values = np.array(
+                            tar.read_strings(f"{path}/strings.bin", filename_csr=f"{path}/string-mapping.bin"),
+                            dtype=object,
+                        )
+                    elif annotation.type.type == PrimitiveType.BOOL:
+                        values = bitvector(f"{path}/values.bin", num_entries[applies_to])
+                    else:
+                        values = vector(f"{path}/values.bin", annotation.type)
+                    annotations[(group, name, applies_to)] = values
+        return cls(
+            index,
+            initial,
+            state_to_choices.astype(np.int64),
+            choice_to_branches.astype(np.int64),
+            branch_to_target.astype(np.int64),
+            branch_to_probability,
+            {k: v for k, v in state_values.items() if v is not None},
+            annotations,
+        )
+
+    def _state_colors(self, tolerance: float | None, max_rounds: int) -> np.ndarray:
+        """
+        Colors the states by iterated hashing of their own data and the colors of their successors (color refinement).
+        The colors do not depend on the numbering of states, choices or branches.
+        """
+        colors = _mix(self.initial.astype(np.uint64))
+        for (_, _, applies_to), values in sorted(self.annotations.items(), key=lambda item: item[0]):
+            if applies_to == "states":
+                colors = _mix(colors ^ _hash_values(values, tolerance))
+        for _, values in sorted(self.state_values.items()):
+            colors = _mix(colors ^ _hash_values(values, tolerance))
+        branch_data = np.zeros(self.num_branches, dtype=np.uint64)
+        if self.branch_to_probability is not None:
+            branch_data = _hash_values(self.branch_to_probability, tolerance)
+        num_colors = _num_distinct(colors)
+        for _ in range(max_rounds):
+            branch_hashes = _mix(colors[self.branch_to_target] ^ _mix(branch_data))
+            choice_hashes = _mix(_segment_sums(branch_hashes, self.choice_to_branches))
+            colors = _mix(colors ^ _segment_sums(choice_hashes, self.state_to_choices))
+            new_num_colors = _num_distinct(colors)
+            if new_num_colors == num_colors:
+                break
+            num_colors = new_num_colors
+        return colors
+
+    def canonical(self, tolerance: float | None = None, max_rounds: int = 64):
+        """
+        Renumbers the states by their color, see _state_colors, and orders the choices of every state
+        and the branches of every choice by their content.
+        If all colors are distinct, the result is the same for all numberings of the same model.
+
+        :return: The renumbered model, and the number of states that share their color with another state.
+        """
+        colors = self._state_colors(tolerance, max_rounds)
+        order = np.argsort(colors, kind="stable")
+        sorted_colors = colors[order]
+        shared = np.zeros(self.num_states, dtype=bool)
+        equal = sorted_colors[1:] == sorted_colors[:-1]
+        shared[1:] |= equal
+        shared[:-1] |= equal
+        ambiguous = int(np.count_nonzero(shared))
+        new_id = np.empty(self.num_states, dtype=np.int64)
+        new_id[order] = np.arange(self.num_states, dtype=np.int64)
+
+        state_to_choices, choices = _csr_ranges(self.state_to_choices, order)
+        # Order the choices of every state by a hash of their branches.
+        targets = new_id[self.branch_to_target]
+        branch_hashes = _mix(colors[self.branch_to_target])
+        if self.branch_to_probability is not None:
+            branch_hashes = _mix(branch_hashes ^ _hash_values(self.branch_to_probability, tolerance))
+        choice_hashes = _segment_sums(branch_hashes, self.choice_to_branches)
+        choice_hashes = choice_hashes[choices]
+        choices = choices[_sort_within_rows(state_to_choices, choice_hashes >> np.uint64(32), choice_hashes)]
+
+        choice_to_branches, branches = _csr_ranges(self.choice_to_branches, choices)
+        result = UmbArrays(
+            self.index,
+            self.initial[order],
+            state_to_choices,
+            choice_to_branches,
+            targets[branches],
+            None if self.branch_to_probability is None else self.branch_to_probability[branches],
+            {k: v[order] for k, v in self.state_values.items()},
+            dict(),
+        )
+        branches = branches[result._branch_order()]
+        result.branch_to_target = targets[branches]
+        if self.branch_to_probability is not None:
+            result.branch_to_probability = self.branch_to_probability[branches]
+        permutations = {"states": order, "choices": choices, "branches": branches}
+        result.annotations = {k: v[permutations[k[2]]] for k, v in self.annotations.items()}
+        return result, ambiguous
+
+    def _branch_order(self) -> np.ndarray:
+        """
+        The permutation of branches that sorts the branches of every choice by target and probability.
+        """
+        tie_breaker = None
+        if self.branch_to_probability is not None and self.branch_to_probability.dtype != object:
+            tie_breaker = self.branch_to_probability
+        return _sort_within_rows(self.choice_to_branches, self.branch_to_target, tie_breaker)
+
+    def sorted_branches(self):
+        """
+        The same model, where the branches of every choice are sorted by target and probability.
+        """
+        order = self._branch_order()
+        annotations = {k: v[order] if k[2] == "branches" else v for k, v in self.annotations.items()}
+        return UmbArrays(
+            self.index,
+            self.initial,
+            self.state_to_choices,
+            self.choice_to_branches,
+            self.branch_to_target[order],
+            None if self.branch_to_probability is None else self.branch_to_probability[order],
+            self.state_values,
+            annotations,
+        )
+
+
+def _numpy_type(sized_type) -> np.dtype | None:
+    """
+    The NumPy type that matches the binary layout of a UMB type, or None if there is none.
+    """
+    if sized_type.type == NumericPrimitiveType.DOUBLE and sized_type.size_bits == 64:
+        return np.dtype("<f8")
+    if sized_type.type in [NumericPrimitiveType.INT, NumericPrimitiveType.UINT] and sized_type.size_bits in [8, 16, 32, 64]:
+        kind = "i" if sized_type.type == NumericPrimitiveType.INT else "u"
+        return np.dtype(f"<{kind}{sized_type.size_bits // 8}")
+    return None
+
+
+def _compare_values(what: str, left: np.ndarray, right: np.ndarray, tolerance: float | None) -> list[str]:
+    if len(left) != len(right):
+        return [f"{what}: {len(left)} vs {len(right)} entries"]
+    if tolerance is not None and _is_numeric(left) and _is_numeric(right):
+        with np.errstate(invalid="ignore"):
+            deviation = np.abs(left.astype(np.float64) - right.astype(np.float64))
+        # Entries that are both infinite (or both NaN) do not deviate.
+        deviation[left.astype(np.float64) == right.astype(np.float64)] = 0
+        mismatches = np.flatnonzero(~(deviation <= tolerance))
+    else:
+        mismatches = np.flatnonzero(left != right)
+    if len(mismatches) == 0:
+        return []
+    first = mismatches[0]
+    return [f"{what}: {len(mismatches)} entries differ, first at {first}: {left[first]} vs {right[first]}"]
+
+
+def compare_umb_arrays(left: UmbArrays, right: UmbArrays, tolerance: float | None = None, canonicalize: bool = False) -> list[str]:
+    """
+    Compares the structure of two models: initial states, choices, branches, probabilities and annotations.
+    The order of branches within a choice is irrelevant.
+
+    :param tolerance: The absolute tolerance for numeric values. If none, values must be equal.
+    :param canonicalize: Renumber states (and reorder choices) canonically first, such that models that only differ in their numbering are equal.
+    :return: A description of every difference. Empty if the models are equal.
+    """
+    counts = [
+        ("states", left.num_states, right.num_states),
+        ("choices", left.num_choices, right.num_choices),
+        ("branches", left.num_branches, right.num_branches),
+    ]
+    differences = [f"number of {what}: {a} vs {b}" for what, a, b in counts if a != b]
+    if differences:
+        return differences
+    if canonicalize:
+        left, left_ambiguous = left.canonical(tolerance)
+        right, right_ambiguous = right.canonical(tolerance)
+        if left_ambiguous != right_ambiguous:
+            differences.append(f"canonical form: {left_ambiguous} vs {right_ambiguous} states with shared colors")
+    else:
+        left = left.sorted_branches()
+        right = right.sorted_branches()
+    differences += _compare_values("initial states", left.initial, right.initial, None)
+    differences += _compare_values("state-to-choices", left.state_to_choices, right.state_to_choices, None)
+    differences += _compare_values("choice-to-branches", left.choice_to_branches, right.choice_to_branches, None)
+    differences += _compare_values("branch-to-target", left.branch_to_target, right.branch_to_target, None)
+    if (left.branch_to_probability is None) != (right.branch_to_probability is None):
+        differences.append("branch probabilities are only given in one model")
+    elif left.branch_to_probability is not None:
+        differences += _compare_values("branch-to-probability", left.branch_to_probability, right.branch_to_probability, tolerance)
+    for key in sorted(left.state_values.keys() | right.state_values.keys()):
+        if key not in left.state_values or key not in right.state_values:
+            differences.append(f"{key} is only given in one model")
+            continue
+        differences += _compare_values(key, left.state_values[key], right.state_values[key], tolerance)
+    for key in sorted(left.annotations.keys() | right.annotations.keys()):
+        what = "annotation " + "/".join(key)
+        if key not in left.annotations or key not in right.annotations:
+            differences.append(f"{what} is only given in one model")
+            continue
+        differences += _compare_values(what, left.annotations[key], right.annotations[key], tolerance)
+    return differences
+
+
+def compare_umb_files(left: pathlib.Path, right: pathlib.Path, tolerance: float | None = None, canonicalize: bool = False) -> list[str]:
+    """
+    Compares the structure of the models in two UMB files, see compare_umb_arrays.
+    """
+    return compare_umb_arrays(UmbArrays.read(left), UmbArrays.read(right), tolerance, canonicalize)
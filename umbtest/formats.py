@@ -0,0 +1,290 @@
+import argparse
+import importlib.metadata
+import inspect
+import json
+import logging
+import pathlib
+import tarfile
+import tempfile
+import time
+
+import umbi
+from umbi.ats.ats_to_umb import explicit_ats_to_explicit_umb
+from umbi.umb.umb_to_tar import UmbEncoder
+
+from umbtest.benchmarks import UmbBenchmark
+from umbtest.tools import Limits, UmbTool, read_umb_index, trace_peak_memory
+
+logger = logging.getLogger(__name__)
+
+modes = ["umb", "ats"]
+# None stands for an uncompressed tar archive.
+codecs = [None, "gz", "bz2", "xz"]
+metrics = ["read_time", "write_time", "read_memory", "write_memory", "size"]
+
+
+def umbi_version() -> str:
+    try:
+        return importlib.metadata.version("umbi")
+    except importlib.metadata.PackageNotFoundError:
+        return umbi.__version__
+
+
+def supported_codecs() -> list[str | None]:
+    """
+    The codecs that the installed umbi can write. Older versions of umbi do not have a choice and always use gz.
+    """
+    if "compression" in inspect.signature(UmbEncoder.write).parameters:
+        return list(codecs)
+    return ["gz"]
+
+
+def _codec_name(codec: str | None) -> str:
+    return "none" if codec is None else codec
+
+
+def _read(mode: str, path: pathlib.Path):
+    if mode == "umb":
+        return umbi.umb.read(path, strict=True)
+    return umbi.ats.read(path, strict=True)
+
+
+def _write(mode: str, model, path: pathlib.Path, codec: str | None):
+    # umbi.ats.write and umbi.umb.write always compress with gz, so the encoder is used directly.
+    umb = model if mode == "umb" else explicit_ats_to_explicit_umb(model)
+    encoder = UmbEncoder()
+    encoder.encode(umb)
+    if codec == "gz":
+        # The default, which is also the only choice in older versions of umbi.
+        encoder.write(path)
+    else:
+        encoder.write(path, compression=codec)
+
+
+def _uncompressed_size(path: pathlib.Path) -> int:
+    """
+    The total size of the members of a UMB file.
+    """
+    with tarfile.open(path, mode="r:*") as tar:
+        return sum(member.size for member in tar.getmembers() if member.isfile())
+
+
+def _measure(function, trace_memory: bool):
+    """
+    Runs the function once for the time and, if requested, once more for the peak memory allocated, as tracing slows down the function.
+
+    :return: The result of the function, the wall time, and the peak memory in bytes or None.
+    """
+    start = time.monotonic()
+    result = function()
+    wall_time = time.monotonic() - start
+    if not trace_memory:
+        return result, wall_time, None
+    with trace_peak_memory() as traced:
+        function()
+    return result, wall_time, traced["peak"]
+
+
+class FormatCostReport:
+    """
+    Read and write cost of every UMB mode and codec of umbi, on the UMB files of every producing tool on every benchmark.
+    Records are identified by benchmark, producer, mode and codec, such that reports from different umbi versions can be compared.
+    """
+
+    columns = [
+        "benchmark",
+        "producer",
+        "mode",
+        "codec",
+        "states",
+        "transitions",
+        "read_time",
+        "write_time",
+        "read_memory",
+        "write_memory",
+        "size",
+        "uncompressed_size",
+        "compression_ratio",
+    ]
+
+    def __init__(self, version: str | None = None):
+        """
+        :param version: The version of umbi that was measured. If none, the installed version.
+        """
+        self.version = umbi_version() if version is None else version
+        self.records = []
+
+    @staticmethod
+    def key(record: dict) -> tuple[str, str, str, str]:
+        return record["benchmark"], record["producer"], record["mode"], record["codec"]
+
+    def add(self, record: dict):
+        self.records.append({column: record.get(column) for column in __class__.columns})
+
+    def regressions(self, baseline, tolerance=0.25, min_time=0.05) -> list[str]:
+        """
+        The metrics that became worse than in the baseline by more than the tolerance, e.g., 0.25 for 25%.
+        Times below min_time seconds are too noisy and are not compared.
+        Records that are not in both reports are ignored.
+        """
+        previous = {__class__.key(record): record for record in baseline.records}
+        result = []
+        for record in self.records:
+            old = previous.get(__class__.key(record))
+            if old is None:
+                continue
+            for metric in metrics:
+                if record[metric] is None or old[metric] is None or old[metric] == 0:
+                    continue
+                if metric.endswith("_time") and max(record[metric], old[metric]) < min_time:
+                    continue
+                if record[metric] > old[metric] * (1 + tolerance):
+                    result.append(
+                        f"{'/'.join(__class__.key(record))}: {metric} grew from {old[metric]:.4g} (umbi {baseline.version}) to {record[metric]:.4g} (umbi {self.version})"
+                    )
+        return result
+
+    def summary(self) -> str:
+        lines = []
+        for record in self.records:
+            ratio = "     -" if record["compression_ratio"] is None else f"{record['compression_ratio']:6.2f}"
+            lines.append(
+                f"{record['benchmark']:30} {record['producer']:20} {record['mode']:4} {record['codec']:5}"
+                f" read {record['read_time']:8.3f}s write {record['write_time']:8.3f}s"
+                f" size {record['size'] / 1e6:9.3f}MB ratio {ratio}"
+            )
+        return "\n".join(lines)
+
+    def write_json(self, path: pathlib.Path):
+        with open(path, "w") as f:
+            json.dump({"umbi": self.version, "records": self.records}, f, indent=2)
+
+    @staticmethod
+    def read_json(path: pathlib.Path):
+        with open(path, "r") as f:
+            content = json.load(f)
+        report = FormatCostReport(content["umbi"])
+        for record in content["records"]:
+            report.add(record)
+        return report
+
+
+class FormatCostSuite:
+    """
+    Measures what the UMB modes and codecs of umbi cost.
+
+    Every producing tool writes the benchmark to UMB. For every mode, the file is read once through umbi,
+    and then written and read back with every codec. The read time is that of the file written with the codec.
+    """
+
+    def __init__(
+        self, producers: list[UmbTool], tmpdir=None, limits: Limits | None = None, trace_memory=True, codecs=None, max_states=None
+    ):
+        """
+        :param producers: The tools that write UMB files.
+        :param tmpdir: The directory for the UMB files. If none, a temporary directory is used.
+        :param limits: Limits for every invocation of a producer, overriding the limits of the tools.
+        :param trace_memory: Measure the peak memory allocated by umbi, in a second run of every read and write.
+        :param codecs: The codecs to measure. If none, all codecs that the installed umbi supports.
+        :param max_states: Skip the models with more states, as found in the index of the produced file.
+            This also bounds benchmarks that the manifest has not measured yet.
+        """
+        self._producers = [tool if limits is None else tool.with_limits(limits) for tool in producers]
+        self._tmpdir = tmpdir
+        self._trace_memory = trace_memory
+        self._codecs = supported_codecs() if codecs is None else codecs
+        self._max_states = max_states
+
+    def run(self, benchmarks: list[UmbBenchmark], report: FormatCostReport | None = None) -> FormatCostReport:
+        report = FormatCostReport() if report is None else report
+        with tempfile.TemporaryDirectory(dir=self._tmpdir) as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            for benchmark in benchmarks:
+                for producer in self._producers:
+                    self._run_producer(benchmark, producer, tmpdir, report)
+        return report
+
+    def _run_producer(self, benchmark: UmbBenchmark, producer: UmbTool, tmpdir: pathlib.Path, report: FormatCostReport):
+        produced = tmpdir / "produced.umb"
+        result = producer.prism_file_to_umb(benchmark.location, produced, log_file=tmpdir / "produced.log")
+        if result.exit_code != 0 or not produced.exists() or produced.stat().st_size == 0:
+            logger.warning(f"{producer.name} could not export {benchmark.id}")
+            return
+        if self._max_states is not None:
+            states = read_umb_index(produced).transition_system.num_states
+            if states > self._max_states:
+                logger.info(f"Skipping {benchmark.id} from {producer.name} with {states} states")
+                produced.unlink()
+                return
+        for mode in modes:
+            try:
+                model = _read(mode, produced)
+            except Exception as e:
+                logger.warning(f"umbi cannot read {benchmark.id} from {producer.name} in {mode} mode: {e}")
+                continue
+            for codec in self._codecs:
+                self._run_codec(benchmark, producer, mode, model, codec, tmpdir, report)
+        for path in tmpdir.iterdir():
+            path.unlink()
+
+    def _run_codec(self, benchmark, producer, mode, model, codec, tmpdir, report):
+        path = tmpdir / f"{mode}-{_codec_name(codec)}.umb"
+        _, write_time, write_memory = _measure(lambda: _write(mode, model, path, codec), self._trace_memory)
+        reread, read_time, read_memory = _measure(lambda: _read(mode, path), self._trace_memory)
+        index = reread.index if mode == "umb" else None
+        size = path.stat().st_size
+        uncompressed_size = _uncompressed_size(path)
+        report.add(
+            {
+                "benchmark": str(benchmark.id),
+                "producer": getattr(producer, "identifier", producer.name),
+                "mode": mode,
+                "codec": _codec_name(codec),
+                "states": index.transition_system.num_states if index is not None else reread.num_states,
+                "transitions": index.transition_system.num_branches if index is not None else reread.num_branches,
+                "read_time": read_time,
+                "write_time": write_time,
+                "read_memory": read_memory,
+                "write_memory": write_memory,
+                "size": size,
+                "uncompressed_size": uncompressed_size,
+                "compression_ratio": uncompressed_size / size if size else None,
+            }
+        )
+        path.unlink()
+
+
+def main():
+    from umbtest.benchmarks import configure_tester, prism_files, select_benchmarks
+    from umbtest.tools import PrismCLI, StormCLI, check_tools, configure_umbtools
+
+    parser = argparse.ArgumentParser(description="Measures the cost of the UMB modes and codecs of umbi.")
+    parser.add_argument("--max-states", type=int, default=10**5)
+    parser.add_argument("--time-limit", type=float, default=None, help="in seconds, per export")
+    parser.add_argument("--no-memory", action="store_true", help="Do not measure the peak memory, which halves the run time.")
+    parser.add_argument("--json", type=pathlib.Path, default=None)
+    parser.add_argument("--baseline", type=pathlib.Path, default=None, help="A report of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    configure_umbtools()
+    configure_tester()
+    producers = [PrismCLI(), StormCLI()]
+    check_tools(*producers)
+    # Benchmarks that the manifest has not measured yet are bounded by the suite once they are exported.
+    benchmarks = select_benchmarks(prism_files, max_states=args.max_states)
+    suite = FormatCostSuite(producers, limits=Limits(time=args.time_limit), trace_memory=not args.no_memory, max_states=args.max_states)
+    report = suite.run(benchmarks)
+    if args.json is not None:
+        report.write_json(args.json)
+    print(report.summary())
+    if args.baseline is not None:
+        regressions = report.regressions(FormatCostReport.read_json(args.baseline), tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"WARN: {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,958 @@
+import argparse
+import concurrent.futures
+import hashlib
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import pathlib
+import random
+import re
+import shutil
+import struct
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import traceback
+
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.tools import (
+    LogClassifier,
+    Limits,
+    PrismWorkerPool,
+    ProcessOutcome,
+    ReportedResults,
+    UmbTool,
+    read_umb_index,
+    record_file_sizes,
+    stream_umb,
+)
+
+logger = logging.getLogger(__name__)
+
+outcomes = ["crash", "hang", "accepted", "rejected"]
+
+# Lines of a log that indicate that the tool did not reject the input in a controlled way, but failed on it.
+_crash_markers = [
+    "Unhandled exception",  # umbi readers (see _read_logged) and .NET, i.e., Modest
+    "An unexpected exception occurred",  # Storm, for exceptions that are not Storm exceptions
+    "Exception in thread",  # Java, i.e., PRISM
+    "java.lang.",
+    "Segmentation fault",
+    "core dumped",
+]
+
+_interesting_integers = [0, 1, -1, 2**31 - 1, 2**32, 2**63 - 1, 2**64 - 1, 2**64, 10**30]
+_interesting_json = _interesting_integers + [0.5, "", "?", None, True, [], {}]
+_interesting_doubles = [math.nan, math.inf, -math.inf, -0.5, 1.5, 0.0, -0.0, 1e308, 5e-324]
+_interesting_bytes = [0x00, 0x01, 0x7F, 0x80, 0xFF]
+
+
+class UmbArchive:
+    """
+    The members of a UMB file in archive order, which the mutators change in place.
+    Members with content None are directories.
+    """
+
+    def __init__(self, members: list[list], compression=None):
+        self.members = members
+        self.compression = compression
+        # If set, the archive is cut off after this fraction of its bytes.
+        self.truncate = None
+
+    @classmethod
+    def read(cls, path: pathlib.Path):
+        members = []
+        with tarfile.open(path, mode="r:*") as tar:
+            for member in tar:
+                if member.isfile():
+                    members.append([member.name, tar.extractfile(member).read()])
+                elif member.isdir():
+                    members.append([member.name, None])
+        return cls(members)
+
+    def copy(self):
+        result = UmbArchive([list(member) for member in self.members], self.compression)
+        result.truncate = self.truncate
+        return result
+
+    def names(self) -> list[str]:
+        return [name for name, data in self.members if data is not None]
+
+    def get(self, name: str) -> bytes | None:
+        for member_name, data in self.members:
+            if member_name == name and data is not None:
+                return data
+        return None
+
+    def set(self, name: str, data: bytes):
+        for member in self.members:
+            if member[0] == name and member[1] is not None:
+                member[1] = data
+                return
+
+    def index(self) -> dict | None:
+        try:
+            index = json.loads(self.get("index.json") or b"")
+        except ValueError:
+            return None
+        return index if isinstance(index, dict) else None
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz" if self.compression == "gz" else "w") as tar:
+            for name, data in self.members:
+                info = tarfile.TarInfo(name=name)
+                if data is None:
+                    info.type = tarfile.DIRTYPE
+                    tar.addfile(info)
+                else:
+                    info.size = len(data)
+                    tar.addfile(info, io.BytesIO(data))
+        data = buffer.getvalue()
+        if self.truncate is not None:
+            data = data[: int(len(data) * self.truncate)]
+        return data
+
+
+def _json_paths(value, path=()):
+    yield path
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _json_paths(child, path + (key,))
+    elif isinstance(value, list):
+        for i, child in enumerate(value):
+            yield from _json_paths(child, path + (i,))
+
+
+def _json_parent(value, path):
+    for key in path[:-1]:
+        value = value[key]
+    return value
+
+
+def _mutate_index(rng: random.Random, archive: UmbArchive) -> str | None:
+    """
+    Changes, removes or adds a field of the index.
+    """
+    index = archive.index()
+    paths = [] if index is None else [path for path in _json_paths(index) if path]
+    if not paths:
+        return None
+    path = rng.choice(paths)
+    parent = _json_parent(index, path)
+    old = parent[path[-1]]
+    name = "/".join(str(key) for key in path)
+    operation = rng.choice(["set", "set", "nudge", "delete", "add", "cut"])
+    if operation == "nudge" and isinstance(old, int) and not isinstance(old, bool):
+        parent[path[-1]] = old + rng.choice([-1, 1])
+        description = f"{name} = {parent[path[-1]]}"
+    elif operation == "delete":
+        del parent[path[-1]]
+        description = f"removed {name}"
+    elif operation == "add" and isinstance(old, dict):
+        old["x-unknown"] = rng.choice(_interesting_json)
+        description = f"added {name}/x-unknown"
+    elif operation == "cut":
+        text = json.dumps(index, indent=2)
+        archive.set("index.json", text[: rng.randrange(len(text))].encode())
+        return "index.json: cut off"
+    else:
+        parent[path[-1]] = rng.choice(_interesting_json)
+        description = f"{name} = {json.dumps(parent[path[-1]])}"
+    archive.set("index.json", json.dumps(index, indent=2).encode())
+    return f"index.json: {description}"
+
+
+def _binary_members(archive: UmbArchive) -> list[str]:
+    return [name for name in archive.names() if name != "index.json"]
+
+
+def _mutate_length(rng: random.Random, archive: UmbArchive) -> str | None:
+    """
+    Makes a binary member shorter or longer than the index requires.
+    """
+    names = _binary_members(archive)
+    if not names:
+        return None
+    name = rng.choice(names)
+    data = archive.get(name)
+    operation = rng.choice(["cut byte", "cut element", "empty", "extend element", "extend random", "double"])
+    if operation == "cut byte":
+        data = data[:-1]
+    elif operation == "cut element":
+        data = data[:-8]
+    elif operation == "empty":
+        data = b""
+    elif operation == "extend element":
+        data = data + bytes(8)
+    elif operation == "extend random":
+        data = data + rng.randbytes(rng.randint(1, 64))
+    else:
+        data = data + data
+    archive.set(name, data)
+    return f"{name}: {operation}"
+
+
+def _uint64s(data: bytes) -> list[int] | None:
+    if len(data) == 0 or len(data) % 8 != 0:
+        return None
+    return [int.from_bytes(data[i : i + 8], "little") for i in range(0, len(data), 8)]
+
+
+def _mutate_offsets(rng: random.Random, archive: UmbArchive) -> str | None:
+    """
+    Breaks the offsets of a CSR member, or points a branch to a state that does not exist.
+    """
+    names = [name for name in archive.names() if name in ["state-to-choices.bin", "choice-to-branches.bin", "branch-to-target.bin"] or name.endswith("string-mapping.bin")]
+    if not names:
+        return None
+    name = rng.choice(names)
+    values = _uint64s(archive.get(name))
+    if values is None:
+        return None
+    i = rng.randrange(len(values))
+    if name == "branch-to-target.bin":
+        num_states = _lookup(archive.index(), "transition-system", "#states")
+        values[i] = rng.choice([value for value in [num_states, 2**63, 2**64 - 1] if isinstance(value, int) and 0 <= value < 2**64])
+        operation = f"target {i} = {values[i]}"
+    else:
+        operation = rng.choice(["beyond end", "maximal", "zero", "swap", "last", "first"])
+        if operation == "beyond end":
+            values[i] = min(values[-1] + 1, 2**64 - 1)
+        elif operation == "maximal":
+            values[i] = 2**64 - 1
+        elif operation == "zero":
+            values[i] = 0
+        elif operation == "swap" and len(values) > 1:
+            i = min(i, len(values) - 2)
+            values[i], values[i + 1] = values[i + 1], values[i]
+        elif operation == "last":
+            values[-1] = min(max(0, values[-1] + rng.choice([-1, 1])), 2**64 - 1)
+        else:
+            values[0] = 1
+        operation = f"{operation} at {i}"
+    archive.set(name, b"".join(value.to_bytes(8, "little") for value in values))
+    return f"{name}: {operation}"
+
+
+def _lookup(value, *keys):
+    """
+    The value at the path in a possibly mutated index, or None if any part of the path is missing or of the wrong type.
+    """
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _value_members(archive: UmbArchive) -> dict[str, dict]:
+    """
+    The members with values, mapped to their types as given in the index.
+    """
+    index = archive.index()
+    members = dict()
+    for name, key in [("branch-to-probability.bin", "branch-probability-type"), ("state-to-exit-rate.bin", "exit-rate-type")]:
+        if isinstance(_lookup(index, "transition-system", key), dict):
+            members[name] = _lookup(index, "transition-system", key)
+    members["state-is-initial.bin"] = {"type": "bool"}
+    members["state-is-markovian.bin"] = {"type": "bool"}
+    annotations = _lookup(index, "annotations")
+    for group in annotations if isinstance(annotations, dict) else []:
+        for name in _lookup(annotations, group) if isinstance(_lookup(annotations, group), dict) else []:
+            sized_type = _lookup(annotations, group, name, "type")
+            applies_to = _lookup(annotations, group, name, "applies-to")
+            if not isinstance(sized_type, dict) or not isinstance(applies_to, list):
+                continue
+            for target in applies_to:
+                members[f"annotations/{group}/{name}/{target}/values.bin"] = sized_type
+    return {name: sized_type for name, sized_type in members.items() if archive.get(name)}
+
+
+def _mutate_values(rng: random.Random, archive: UmbArchive) -> str | None:
+    """
+    Replaces a value by one that is invalid or at the edge of its encoding: NaN, infinities and out-of-range probabilities,
+    rationals with zero denominators, intervals whose bounds are swapped, and bits beyond the end of bitvectors.
+    """
+    members = _value_members(archive)
+    if not members:
+        return None
+    name = rng.choice(sorted(members))
+    kind = members[name].get("type")
+    data = bytearray(archive.get(name))
+    if kind == "bool":
+        operation = rng.choice(["clear", "set all", "flip"])
+        if operation == "clear":
+            data = bytearray(len(data))
+        elif operation == "set all":
+            data = bytearray(b"\xff" * len(data))
+        else:
+            data[rng.randrange(len(data))] ^= 1 << rng.randrange(8)
+        archive.set(name, bytes(data))
+        return f"{name}: {operation}"
+    size = {"double": 8, "rational": 16, "double-interval": 16, "rational-interval": 32}.get(kind) if isinstance(kind, str) else None
+    if size is None or len(data) % size != 0:
+        return None
+    offset = rng.randrange(len(data) // size) * size
+    if kind == "double":
+        value = rng.choice(_interesting_doubles)
+        data[offset : offset + 8] = _double(value)
+        operation = f"{value}"
+    elif kind == "rational":
+        numerator, denominator = rng.choice([(1, 0), (-1, 1), (2, 1), (2**63 - 1, 1), (0, 0)])
+        data[offset : offset + 16] = numerator.to_bytes(8, "little", signed=True) + denominator.to_bytes(8, "little")
+        operation = f"{numerator}/{denominator}"
+    else:
+        half = size // 2
+        data[offset : offset + size] = data[offset + half : offset + size] + data[offset : offset + half]
+        operation = "swapped bounds"
+        if kind == "double-interval" and rng.random() < 0.5:
+            data[offset : offset + 8] = _double(math.nan)
+            operation = "NaN bound"
+    archive.set(name, bytes(data))
+    return f"{name}: {operation} at byte {offset}"
+
+
+def _double(value: float) -> bytes:
+    return struct.pack("<d", value)
+
+
+def _mutate_bytes(rng: random.Random, archive: UmbArchive) -> str | None:
+    """
+    Flips bits, overwrites, inserts or deletes bytes of a member.
+    """
+    names = [name for name in archive.names() if archive.get(name)]
+    if not names:
+        return None
+    name = rng.choice(names)
+    data = bytearray(archive.get(name))
+    i = rng.randrange(len(data))
+    operation = rng.choice(["flip", "flip", "overwrite", "insert", "delete"])
+    if operation == "flip":
+        data[i] ^= 1 << rng.randrange(8)
+    elif operation == "overwrite":
+        data[i] = rng.choice(_interesting_bytes)
+    elif operation == "insert":
+        data[i:i] = rng.randbytes(rng.randint(1, 8))
+    else:
+        del data[i : i + rng.randint(1, 8)]
+    archive.set(name, bytes(data))
+    return f"{name}: {operation} at byte {i}"
+
+
+def _mutate_members(rng: random.Random, archive: UmbArchive) -> str | None:
+    """
+    Changes the archive itself: members are dropped, duplicated, renamed, added or reordered, and the archive is cut off or compressed.
+    Member names never leave the archive (no absolute paths or ..), as some tools extract the archive.
+    """
+    if not archive.members:
+        return None
+    i = rng.randrange(len(archive.members))
+    name = archive.members[i][0]
+    operation = rng.choice(["drop", "duplicate", "rename", "add", "index last", "directory", "truncate", "compression"])
+    if operation == "drop":
+        del archive.members[i]
+    elif operation == "duplicate":
+        archive.members.insert(i + 1, [name, rng.randbytes(len(archive.members[i][1] or b""))])
+    elif operation == "rename":
+        archive.members[i][0] = rng.choice([name + "x", name.upper(), "./" + name, name.replace(".bin", ".dat")])
+        operation = f"rename to {archive.members[i][0]}"
+    elif operation == "add":
+        archive.members.insert(i, [rng.choice(["unknown.bin", "annotations/x/y/states/values.bin", "index.json.bak"]), rng.randbytes(8)])
+    elif operation == "index last":
+        archive.members.sort(key=lambda member: member[0] == "index.json")
+    elif operation == "directory":
+        archive.members.insert(i, [name.rsplit("/", 1)[0] + "/" if "/" in name else "annotations/", None])
+    elif operation == "truncate":
+        archive.truncate = rng.random()
+        return f"archive: cut off after {archive.truncate:.0%}"
+    else:
+        archive.compression = None if archive.compression == "gz" else "gz"
+        return f"archive: compression {archive.compression}"
+    return f"archive: {operation} {name}"
+
+
+mutators = {
+    "index": _mutate_index,
+    "length": _mutate_length,
+    "offsets": _mutate_offsets,
+    "values": _mutate_values,
+    "bytes": _mutate_bytes,
+    "members": _mutate_members,
+}
+
+
+def mutate(rng: random.Random, archive: UmbArchive, steps=None) -> tuple[UmbArchive, list[str]]:
+    """
+    Applies a few randomly chosen mutations to a copy of the archive.
+
+    :param steps: The number of mutations. If none, mostly one, sometimes up to four.
+    :return: The mutant, and a description of every mutation.
+    """
+    mutant = archive.copy()
+    if steps is None:
+        steps = rng.choice([1, 1, 1, 1, 2, 2, 3, 4])
+    descriptions = []
+    attempts = 0
+    while len(descriptions) < steps and attempts < 10 * steps:
+        attempts += 1
+        description = mutators[rng.choice(sorted(mutators))](rng, mutant)
+        if description is not None:
+            descriptions.append(description)
+    return mutant, descriptions
+
+
+def _read(mode: str, umb_file: pathlib.Path) -> dict:
+    """
+    Reads a UMB file the way UmbPython does in the given mode, without writing it.
+    """
+    import umbi
+
+    if mode == "ats":
+        ats = umbi.ats.read(umb_file, strict=True)
+        return {"states": ats.num_states, "transitions": ats.num_branches}
+    if mode == "umb":
+        umb = umbi.umb.read(umb_file, strict=True)
+        return {"states": umb.index.transition_system.num_states, "transitions": umb.index.transition_system.num_branches}
+    if mode == "stream":
+        index = stream_umb(umb_file, pathlib.Path(os.devnull))
+        return {"states": index.transition_system.num_states, "transitions": index.transition_system.num_branches}
+    if mode == "index":
+        index = read_umb_index(umb_file)
+        index.validate()
+        return {"states": index.transition_system.num_states, "transitions": index.transition_system.num_branches}
+    raise RuntimeError("Unknown mode")
+
+
+def _rejections() -> tuple:
+    """
+    The exceptions by which umbi rejects invalid input. All other exceptions are crashes.
+    """
+    from marshmallow import ValidationError
+
+    return (ValueError, KeyError, EOFError, RuntimeError, tarfile.TarError, ValidationError)
+
+
+def _read_logged(mode: str, umb_file: pathlib.Path, log_file: pathlib.Path) -> int:
+    """
+    Reads a UMB file and writes the outcome to the log: the model size, or an ERROR line with the exception and the innermost frame.
+
+    :return: 0 if the file was accepted, 1 if it was rejected, and 2 if the reader crashed.
+    """
+    lines = []
+    try:
+        model_info = _read(mode, umb_file)
+        lines = [f"States: {model_info['states']}", f"Transitions: {model_info['transitions']}"]
+        code = 0
+    except BaseException as e:
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        message = (str(e).splitlines() or [""])[0][:500]
+        if isinstance(e, _rejections()):
+            lines = [f"ERROR {type(e).__name__}: {message}"]
+            code = 1
+        else:
+            frame = traceback.extract_tb(e.__traceback__)[-1]
+            lines = [f"ERROR Unhandled exception {type(e).__name__}: {message} (at {pathlib.Path(frame.filename).name}:{frame.name})"]
+            lines += "".join(traceback.format_exception(e)).splitlines()
+            code = 2
+    with open(log_file, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return code
+
+
+def _serve(mode=None):
+    """
+    A worker of UmbiReader, speaking the protocol of PrismWorkerPool: every request is a line "mode<TAB>umb file<TAB>log file",
+    and the answer is "EXIT <code>", see _read_logged.
+
+    :param mode: The mode whose reader is imported right away, as importing umbi.ats takes seconds,
+        which should not count towards the time limit of the first request.
+    """
+    import umbi.umb
+
+    if mode == "ats":
+        import umbi.ats
+    _rejections()
+    for line in sys.stdin:
+        mode, umb_file, log_file = line.rstrip("\n").split("\t")
+        code = _read_logged(mode, pathlib.Path(umb_file), pathlib.Path(log_file))
+        print(f"EXIT {code}", flush=True)
+
+
+class UmbiReader(UmbTool):
+    """
+    The readers of UmbPython as a checker: check_umb only reads the file.
+
+    The files are read by long-lived Python processes, which are reused for many files (see PrismWorkerPool), such that
+    no interpreter has to start per file, while hangs and memory blow-ups are still contained and reported.
+    With workers=0, files are read in the calling thread, which is fastest, but neither limits nor hangs are handled.
+    """
+
+    name = "umbilib-reader"
+    default_workers = 2
+
+    def __init__(self, mode="umb", limits=None, workers=None):
+        """
+        :param mode: Either umb, ats, stream (see UmbPython), or index, which only reads and validates the index.
+        :param workers: The number of worker processes. If none, UmbiReader.default_workers is used.
+        """
+        self._mode = mode
+        self.limits = __class__.default_limits if limits is None else limits
+        workers = __class__.default_workers if workers is None else workers
+        self._pool = PrismWorkerPool(self._worker_command, workers) if workers > 0 else None
+
+    @property
+    def identifier(self):
+        return self.name + "(" + self._mode + ")"
+
+    def fingerprint(self):
+        import importlib.metadata
+
+        return f"umbi-{importlib.metadata.version('umbi')}"
+
+    def check_process(self):
+        return True
+
+    def _worker_command(self):
+        root = pathlib.Path(__file__).parent.parent.resolve().as_posix()
+        return [sys.executable, "-c", f"import sys; sys.path.insert(0, {root!r}); from umbtest.fuzz import _serve; _serve({self._mode!r})"]
+
+    def check_umb(self, umb_file: pathlib.Path, log_file: pathlib.Path, properties=[]):
+        if self._pool is None:
+            outcome = ProcessOutcome()
+            start = time.monotonic()
+            outcome.returncode = _read_logged(self._mode, pathlib.Path(umb_file), pathlib.Path(log_file))
+            outcome.wall_time = time.monotonic() - start
+        else:
+            outcome = self._pool.run([self._mode, pathlib.Path(umb_file).resolve().as_posix(), pathlib.Path(log_file).resolve().as_posix()], self.limits)
+        result = ReportedResults()
+        result.set_outcome(outcome)
+        result.logfile = log_file
+        lines = []
+        if pathlib.Path(log_file).exists():
+            with open(log_file, "r") as f:
+                lines = [line.rstrip("\n") for line in f]
+        result.log_tail = tuple(lines[-LogClassifier.default_tail_length :])
+        result.errors = tuple(line[len("ERROR ") :] for line in lines if line.startswith("ERROR "))
+        if outcome.returncode == 0:
+            result.model_info = {key.lower(): int(value) for key, value in (line.split(": ") for line in lines[:2])}
+        return record_file_sizes(result, umb_file)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+
+
+def triage(result: ReportedResults) -> tuple[str, str]:
+    """
+    Classifies the result of check_umb on a mutant.
+
+    :return: The outcome (crash, hang, accepted or rejected), and the message that explains it.
+    """
+    if result.timeout:
+        return "hang", "timeout"
+    if result.memout:
+        return "crash", "memout"
+    if result.signal is not None:
+        return "crash", f"signal {result.signal}"
+    messages = list(result.errors) + [
+        line for line in result.log_tail if "error" in line.lower() or any(marker in line for marker in _crash_markers)
+    ]
+    for message in messages:
+        if any(marker in message for marker in _crash_markers):
+            return "crash", message
+    if result.exit_code == 0:
+        return "accepted", ""
+    if messages:
+        return "rejected", messages[0]
+    if result.not_supported or result.anticipated_error:
+        return "rejected", "not supported" if result.not_supported else "anticipated error"
+    # The tool failed without saying why.
+    return "crash", f"exit code {result.exit_code}"
+
+
+def signature(message: str, umb_file: pathlib.Path | None = None) -> str:
+    """
+    The message without the parts that differ between occurrences of the same failure: file names, addresses and numbers.
+    """
+    if umb_file is not None:
+        message = message.replace(pathlib.Path(umb_file).as_posix(), "<file>")
+    message = re.sub(r"0x[0-9a-fA-F]+", "0x?", message)
+    message = re.sub(r"\b\d+\b", "N", message)
+    return " ".join(message.split())[:300]
+
+
+class _Entry:
+    """
+    A mutant in the corpus, or the smallest known reproducer of a finding.
+    """
+
+    def __init__(self, data: bytes, steps: list[str], archive: UmbArchive | None = None):
+        self.data = data
+        self.steps = steps
+        self.archive = archive
+        self.digest = hashlib.sha256(data).hexdigest()[:16]
+
+
+class FuzzReport:
+    """
+    The outcome counts, throughput and findings of a fuzzing run.
+    """
+
+    def __init__(self, tools: list[str], mutants, executions, duplicates, elapsed, counts, busy, findings, corpus, disagreements):
+        self.tools = tools
+        self.mutants = mutants
+        self.executions = executions
+        self.duplicates = duplicates
+        self.elapsed = elapsed
+        self.counts = counts
+        self.busy = busy
+        self.findings = findings
+        self.corpus = corpus
+        self.disagreements = disagreements
+
+    @property
+    def executions_per_second(self) -> float:
+        return self.executions / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "tools": self.tools,
+            "mutants": self.mutants,
+            "executions": self.executions,
+            "duplicates": self.duplicates,
+            "elapsed": self.elapsed,
+            "executions_per_second": self.executions_per_second,
+            "counts": self.counts,
+            "executions_per_second_by_tool": {
+                tool: sum(self.counts[tool].values()) / self.elapsed if self.elapsed > 0 else 0.0 for tool in self.tools
+            },
+            "findings": self.findings,
+            "corpus": self.corpus,
+            "disagreements": self.disagreements,
+        }
+
+    def write_json(self, path: pathlib.Path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.mutants} mutants, {self.executions} executions in {self.elapsed:.1f}s ({self.executions_per_second:.1f} exec/s), "
+            f"{self.duplicates} duplicate mutants skipped, {self.corpus} inputs in the corpus, {self.disagreements} behaviours where tools disagree"
+        ]
+        for tool in self.tools:
+            counts = ", ".join(f"{count} {outcome}" for outcome, count in self.counts[tool].items())
+            rate = sum(self.counts[tool].values()) / self.elapsed if self.elapsed > 0 else 0.0
+            lines.append(f"  {tool}: {counts} ({rate:.1f} exec/s, {self.busy[tool]:.1f}s busy)")
+        for finding in self.findings:
+            lines.append(f"  {finding['outcome'].upper()} {finding['tool']} x{finding['count']}: {finding['signature']}")
+        return "\n".join(lines)
+
+
+class Fuzzer:
+    """
+    Mutates valid UMB files and runs every mutant against the UMB readers of all tools, i.e., check_umb.
+
+    Every result is triaged into crash, hang, accepted or rejected (see triage). Crashes and hangs are deduplicated by tool and
+    the signature of their log (see signature), and for every finding the smallest reproducer is kept.
+    The combination of outcomes and signatures over all tools is the behaviour of a mutant. A mutant with a new behaviour joins the corpus
+    and is mutated further; for every behaviour, only the smallest mutant is kept, which keeps the corpus minimal.
+
+    Mutants are generated and executed by several threads at once. Each writes its mutant to the RAM directory of the Tester, if available.
+    """
+
+    def __init__(self, tools: list[UmbTool], directory: pathlib.Path | None = None, limits: Limits | None = None, workers=None, seed=0, max_corpus=1000):
+        """
+        :param tools: The tools whose check_umb reads the mutants, e.g., StormCLI, PrismWorkerCLI, ModestCLI and UmbiReader.
+        :param directory: Where findings, the corpus and the report are written. If none, nothing is written.
+        :param limits: Limits for every execution. If none, 10 seconds and 2 GiB.
+        :param workers: The number of mutants that are executed at the same time. If none, the number of cores.
+        :param seed: The seed from which the mutations of every iteration are derived.
+        :param max_corpus: The maximal number of mutants in the corpus, in addition to the seeds.
+        """
+        self._tools = tools
+        self._directory = None if directory is None else pathlib.Path(directory)
+        self._limits = Limits(time=10, memory=2 * 1024**3) if limits is None else limits
+        self._workers = workers or os.cpu_count()
+        self._seed = seed
+        self._max_corpus = max_corpus
+        self._lock = threading.Lock()
+        self._seeds = []
+        self._behaviours = dict()
+        self._findings = dict()
+        self._seen = set()
+        self._iterations = itertools.count()
+        self._calibrated = False
+        self.mutants = 0
+        self.executions = 0
+        self.duplicates = 0
+        self._counts = {_identifier(tool): {outcome: 0 for outcome in outcomes} for tool in tools}
+        self._busy = {_identifier(tool): 0.0 for tool in tools}
+
+    def add_seed(self, seed: pathlib.Path | UmbArchive):
+        """
+        Adds a valid UMB file from which mutants are derived.
+        """
+        archive = UmbArchive.read(seed) if not isinstance(seed, UmbArchive) else seed
+        self._seeds.append(archive)
+
+    def seeds_from_loaders(self, loaders: list[UmbTool], benchmarks: list[UmbBenchmark], directory: pathlib.Path) -> int:
+        """
+        Adds the UMB files that the loaders write for the benchmarks as seeds.
+
+        :return: The number of seeds that were added.
+        """
+        directory = pathlib.Path(directory)
+        added = 0
+        for loader in loaders:
+            for i, benchmark in enumerate(benchmarks):
+                output = directory / f"seed-{_file_name(_identifier(loader))}-{i}.umb"
+                result = loader.prism_file_to_umb(benchmark.location, output, log_file=directory / f"seed-{i}.log")
+                if result.exit_code == 0 and output.exists() and output.stat().st_size > 0:
+                    self.add_seed(output)
+                    added += 1
+        return added
+
+    def _corpus(self) -> list:
+        with self._lock:
+            return [(archive, []) for archive in self._seeds] + [(entry.archive, entry.steps) for entry in self._behaviours.values()]
+
+    def run(self, duration=None, mutants=None) -> FuzzReport:
+        """
+        Fuzzes until the duration has passed or the number of mutants has been generated, including duplicates, whichever comes first.
+
+        :param duration: In seconds.
+        """
+        if not self._seeds:
+            raise RuntimeError("The fuzzer needs at least one seed")
+        if duration is None and mutants is None:
+            raise RuntimeError("Either a duration or a number of mutants is required")
+        ram_dir = Tester.ramdir_default if os.access(Tester.ramdir_default, os.W_OK) else None
+        work_dir = pathlib.Path(tempfile.mkdtemp(dir=ram_dir, prefix="umbtest-fuzz-"))
+        if not self._calibrated:
+            self._calibrate(work_dir)
+            self._calibrated = True
+        deadline = None if duration is None else time.monotonic() + duration
+        start = time.monotonic()
+        stop = threading.Event()
+        errors = []
+
+        def loop():
+            try:
+                while not stop.is_set():
+                    iteration = next(self._iterations)
+                    if (mutants is not None and iteration >= mutants) or (deadline is not None and time.monotonic() > deadline):
+                        return
+                    self._iteration(iteration, work_dir)
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+        threads = [threading.Thread(target=loop, name=f"umbtest-fuzz-{i}") for i in range(self._workers)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            stop.set()
+            shutil.rmtree(work_dir, ignore_errors=True)
+        if errors:
+            raise RuntimeError("Fuzzing failed") from errors[0]
+        report = self.report(time.monotonic() - start)
+        if self._directory is not None:
+            self._write(report)
+        return report
+
+    def _iteration(self, iteration: int, work_dir: pathlib.Path):
+        rng = random.Random(f"{self._seed}:{iteration}")
+        parent, parent_steps = rng.choice(self._corpus())
+        archive, steps = mutate(rng, parent)
+        steps = parent_steps + steps
+        data = archive.to_bytes()
+        digest = hashlib.sha256(data).digest()
+        with self._lock:
+            if digest in self._seen:
+                self.duplicates += 1
+                return
+            self._seen.add(digest)
+            self.mutants += 1
+        umb_file = work_dir / f"{iteration}.umb"
+        umb_file.write_bytes(data)
+        behaviour = []
+        try:
+            for k, tool in enumerate(self._tools):
+                log_file = work_dir / f"{iteration}-{k}.log"
+                outcome, message, result = self._execute(tool, umb_file, log_file)
+                key = (_identifier(tool), outcome, signature(message, umb_file))
+                behaviour.append(key)
+                with self._lock:
+                    self.executions += 1
+                    self._counts[key[0]][outcome] += 1
+                    self._busy[key[0]] += result.wall_time or 0.0
+                    if outcome in ["crash", "hang"]:
+                        self._add_finding(key, data, steps, result.log_tail)
+                log_file.unlink(missing_ok=True)
+        finally:
+            umb_file.unlink(missing_ok=True)
+        with self._lock:
+            self._add_behaviour(tuple(behaviour), archive, data, steps)
+
+    def _execute(self, tool: UmbTool, umb_file: pathlib.Path, log_file: pathlib.Path) -> tuple[str, str, ReportedResults]:
+        result = tool.with_limits(self._limits).check_umb(umb_file, log_file=log_file)
+        outcome, message = triage(result)
+        if outcome == "hang":
+            # A timeout may be caused by a worker that was just started, e.g., after the previous one was killed, or by the load of the machine.
+            # It is a hang only if it happens again.
+            result = tool.with_limits(self._limits).check_umb(umb_file, log_file=log_file)
+            outcome, message = triage(result)
+        return outcome, message, result
+
+    def _calibrate(self, work_dir: pathlib.Path):
+        """
+        Runs every seed on every tool, as often as there are threads, which starts the workers of tools that reuse processes.
+        Seeds that a tool does not accept are reported, as their mutants say little about that tool.
+        """
+        jobs = []
+        for i, archive in enumerate(self._seeds):
+            umb_file = work_dir / f"seed-{i}.umb"
+            umb_file.write_bytes(archive.to_bytes())
+            jobs += [(tool, umb_file, work_dir / f"seed-{i}-{k}-{j}.log") for k, tool in enumerate(self._tools) for j in range(self._workers)]
+        limits = Limits(time=max(60, self._limits.time or 0), memory=self._limits.memory)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._workers) as executor:
+            results = list(executor.map(lambda job: job[0].with_limits(limits).check_umb(job[1], log_file=job[2]), jobs))
+        for (tool, umb_file, _), result in zip(jobs, results):
+            outcome, message = triage(result)
+            if outcome != "accepted":
+                logger.warning(f"{_identifier(tool)} does not accept the seed {umb_file.name}: {outcome} {message}")
+
+    def _add_finding(self, key, data, steps, log_tail):
+        finding = self._findings.get(key)
+        if finding is None:
+            finding = self._findings[key] = {"count": 0, "entry": None, "log_tail": None}
+        finding["count"] += 1
+        if finding["entry"] is None or len(data) < len(finding["entry"].data):
+            finding["entry"] = _Entry(data, steps)
+            finding["log_tail"] = list(log_tail)
+
+    def _add_behaviour(self, behaviour, archive, data, steps):
+        entry = self._behaviours.get(behaviour)
+        if entry is None and len(self._behaviours) >= self._max_corpus:
+            return
+        if entry is None or len(data) < len(entry.data):
+            self._behaviours[behaviour] = _Entry(data, steps, archive)
+
+    def report(self, elapsed: float) -> FuzzReport:
+        with self._lock:
+            findings = [
+                {
+                    "tool": tool,
+                    "outcome": outcome,
+                    "signature": message,
+                    "count": finding["count"],
+                    "reproducer": _reproducer(outcome, finding["entry"]),
+                    "size": len(finding["entry"].data),
+                    "steps": finding["entry"].steps,
+                    "log_tail": finding["log_tail"],
+                }
+                for (tool, outcome, message), finding in sorted(self._findings.items(), key=lambda item: -item[1]["count"])
+            ]
+            disagreements = sum(
+                1 for behaviour in self._behaviours if "accepted" in {outcome for _, outcome, _ in behaviour} and len({outcome for _, outcome, _ in behaviour}) > 1
+            )
+            return FuzzReport(
+                [_identifier(tool) for tool in self._tools],
+                self.mutants,
+                self.executions,
+                self.duplicates,
+                elapsed,
+                {tool: dict(counts) for tool, counts in self._counts.items()},
+                dict(self._busy),
+                findings,
+                len(self._seeds) + len(self._behaviours),
+                disagreements,
+            )
+
+    def _write(self, report: FuzzReport):
+        """
+        Writes the reproducer of every finding, the corpus and the report to the directory.
+        """
+        self._directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            for (_, outcome, _), finding in self._findings.items():
+                path = self._directory / _reproducer(outcome, finding["entry"])
+                path.parent.mkdir(exist_ok=True)
+                path.write_bytes(finding["entry"].data)
+            corpus = self._directory / "corpus"
+            corpus.mkdir(exist_ok=True)
+            for entry in self._behaviours.values():
+                (corpus / f"{entry.digest}.umb").write_bytes(entry.data)
+        report.write_json(self._directory / "report.json")
+
+
+def _reproducer(outcome: str, entry: _Entry) -> str:
+    return {"crash": "crashes", "hang": "hangs"}[outcome] + f"/{entry.digest}.umb"
+
+
+def _identifier(tool) -> str:
+    return str(getattr(tool, "identifier", tool.name))
+
+
+def _file_name(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", text)
+
+
+def main():
+    from umbtest.benchmarks import configure_tester, prism_files, select_benchmarks
+    from umbtest.synthetic import SyntheticModel
+    from umbtest.tools import ModestCLI, PrismWorkerCLI, StormCLI, check_tools, configure_umbtools
+
+    parser = argparse.ArgumentParser(description="Fuzzes the UMB readers of all tools with mutants of valid UMB files.")
+    parser.add_argument("directory", type=pathlib.Path, help="where findings, corpus and report are written")
+    parser.add_argument("--seeds", type=pathlib.Path, nargs="*", default=[], help="valid UMB files")
+    parser.add_argument("--loaders", action="store_true", help="use the UMB files that Storm and PRISM write for the small benchmarks as seeds")
+    parser.add_argument("--synthetic", action="store_true", help="use small synthetic models of every type as seeds")
+    parser.add_argument("--tools", nargs="*", default=["storm", "prism", "modest", "umbi"], choices=["storm", "prism", "modest", "umbi"])
+    parser.add_argument("--duration", type=float, default=60, help="in seconds")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=10, help="in seconds, per execution")
+    args = parser.parse_args()
+
+    configure_umbtools()
+    configure_tester()
+    workers = args.workers or os.cpu_count()
+    available = {
+        "storm": lambda: [StormCLI()],
+        "prism": lambda: [PrismWorkerCLI(workers=workers)],
+        "modest": lambda: [ModestCLI()],
+        "umbi": lambda: [UmbiReader(mode, workers=workers) for mode in ["umb", "ats", "stream"]],
+    }
+    tools = [tool for name in args.tools for tool in available[name]()]
+    check_tools(*tools)
+    fuzzer = Fuzzer(tools, args.directory, Limits(time=args.time_limit, memory=2 * 1024**3), workers=workers, seed=args.seed)
+    for seed in args.seeds:
+        fuzzer.add_seed(seed)
+    seed_dir = args.directory / "seeds"
+    seed_dir.mkdir(parents=True, exist_ok=True)
+    if args.synthetic:
+        for model_type in ["dtmc", "ctmc", "mdp", "ma"]:
+            model = SyntheticModel(model_type, states=20, branching=2, rewards=1, labels=1, seed=args.seed)
+            model.write(seed_dir / f"synthetic-{model_type}.umb", compression=None)
+            fuzzer.add_seed(seed_dir / f"synthetic-{model_type}.umb")
+    if args.loaders:
+        benchmarks = select_benchmarks(prism_files, max_states=1000)
+        fuzzer.seeds_from_loaders([StormCLI(), PrismWorkerCLI(workers=1)], benchmarks, seed_dir)
+    report = fuzzer.run(duration=args.duration)
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
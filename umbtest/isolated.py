@@ -0,0 +1,51 @@
+"""
+Runs a single UmbPython transformation in this process and writes its results to a JSON file.
+This is the child process of UmbPython with isolate=True, which enforces the limits on it.
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+import traceback
+import tracemalloc
+
+from umbtest.tools import UmbPython
+
+
+def _top_sites(count: int) -> list[tuple[str, int, int]]:
+    if count == 0 or not tracemalloc.is_tracing():
+        return []
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    return [(f"{s.traceback[0].filename}:{s.traceback[0].lineno}", s.size, s.count) for s in statistics[:count]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transforms a UMB file with umbi and reports the memory it needed.")
+    parser.add_argument("mode", choices=["umb", "ats", "stream"])
+    parser.add_argument("input", type=pathlib.Path)
+    parser.add_argument("output", type=pathlib.Path)
+    parser.add_argument("result", type=pathlib.Path)
+    parser.add_argument("--sites", type=int, default=10, help="Number of allocation sites to report; 0 disables tracing.")
+    args = parser.parse_args()
+
+    sites = []
+
+    def on_read():
+        sites.extend(_top_sites(args.sites))
+
+    if args.sites > 0:
+        tracemalloc.start()
+    try:
+        model_info = UmbPython(args.mode, isolate=False, trace_memory=False)._transform(args.input, args.output, on_read)
+    except Exception:
+        # The log is taken from stdout.
+        traceback.print_exc(file=sys.stdout)
+        sys.exit(1)
+    allocated_memory = tracemalloc.get_traced_memory()[1] if args.sites > 0 else None
+    with open(args.result, "w") as f:
+        json.dump({"model_info": model_info, "allocated_memory": allocated_memory, "allocation_sites": sites}, f)
+
+
+if __name__ == "__main__":
+    main()
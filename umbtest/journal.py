@@ -0,0 +1,184 @@
+import fcntl
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+import logging
+
+from umbtest.cache import file_hash
+from umbtest.tools import ReportedResults
+
+logger = logging.getLogger(__name__)
+
+_stages = ["loader", "transformer", "checker"]
+
+
+def results_to_dict(results: dict) -> dict:
+    """
+    The results of Tester.check_prism_file as a JSON-compatible dictionary.
+    """
+    content = dict()
+    for stage in _stages:
+        result = results.get(stage)
+        content[stage] = None if result is None else result.to_dict()
+    content["differences"] = results.get("differences")
+    content["memory_regressions"] = results.get("memory_regressions")
+    return content
+
+
+def results_from_dict(content: dict) -> dict:
+    """
+    The inverse of results_to_dict.
+    """
+    results = dict()
+    for stage in _stages:
+        fields = content.get(stage)
+        results[stage] = None if fields is None else ReportedResults.from_dict(fields)
+    results["differences"] = content.get("differences")
+    results["memory_regressions"] = content.get("memory_regressions")
+    return results
+
+
+def _tool_description(tool) -> list | None:
+    if tool is None:
+        return None
+    fingerprint = getattr(tool, "fingerprint", None)
+    return [
+        str(getattr(tool, "identifier", tool.name)),
+        list(getattr(tool, "_extra_args", [])),
+        fingerprint() if fingerprint is not None else None,
+        str(getattr(tool, "limits", None)),
+    ]
+
+
+def _ran_out_of_resources(content: dict) -> bool:
+    return any(content.get(stage) is not None and (content[stage].get("timeout") or content[stage].get("memout")) for stage in _stages)
+
+
+class ResultsJournal:
+    """
+    The verdicts of previous runs of tool chains on benchmarks, stored as JSON lines in a single file.
+
+    Entries are keyed on the content hash of the benchmark, its properties, and, for every step in the chain, the tool identifier, its extra arguments, its fingerprint and its limits.
+    A chain only needs to run again if one of these changed, e.g., because a tool binary was rebuilt.
+    Every verdict is appended as soon as it is known, such that an interrupted run resumes where it stopped.
+    If a key occurs multiple times, the last entry counts.
+    Timeouts and memouts depend on the load of the machine rather than on the chain, so they are only reused if requested.
+    """
+
+    version = 1
+
+    def __init__(self, location: pathlib.Path, reuse_timeouts=False):
+        """
+        :param location: The file in which the journal is stored. It is created if necessary.
+        :param reuse_timeouts: Also reuse verdicts in which a stage ran out of time or memory.
+        """
+        self._location = pathlib.Path(location)
+        self._reuse_timeouts = reuse_timeouts
+        self._entries = None
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.recorded = 0
+
+    def __getstate__(self):
+        # The lock cannot be sent to another process, and the entries are cheap to read again.
+        state = dict(self.__dict__)
+        del state["_lock"]
+        state["_entries"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def location(self) -> pathlib.Path:
+        return self._location
+
+    def __str__(self):
+        return f"ResultsJournal[{self._location},reused={self.reused},recorded={self.recorded}]"
+
+    def key(self, tester, benchmark, compare=False) -> str:
+        metadata = benchmark.metadata
+        content_hash = metadata["hash"] if metadata is not None else file_hash(benchmark.location)
+        description = [
+            content_hash,
+            list(benchmark.properties) if benchmark.properties is not None else None,
+            [_tool_description(tester._limited(tester.chain[stage])) for stage in _stages],
+            compare,
+        ]
+        return hashlib.sha256(json.dumps(description).encode()).hexdigest()
+
+    def _read(self) -> dict[str, dict]:
+        entries = dict()
+        try:
+            with open(self._location, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line that was cut off by an interrupted run.
+                        continue
+                    if entry.get("version") == __class__.version:
+                        entries[entry["key"]] = entry
+        except OSError:
+            pass
+        return entries
+
+    def entries(self) -> dict[str, dict]:
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._read()
+            return self._entries
+
+    def lookup(self, key: str) -> dict | None:
+        """
+        The recorded results for the key, see Tester.check_prism_file, or None if there is no verdict for the key
+        or the verdict is a timeout or memout that is not reused.
+        """
+        entry = self.entries().get(key)
+        if entry is None:
+            return None
+        if not self._reuse_timeouts and _ran_out_of_resources(entry["results"]):
+            return None
+        with self._lock:
+            self.reused += 1
+        return results_from_dict(entry["results"])
+
+    def record(self, key: str, tester, benchmark, results: dict):
+        """
+        Appends the results of a chain on a benchmark to the journal.
+        """
+        entry = {
+            "version": __class__.version,
+            "key": key,
+            "tester": str(tester.id),
+            "benchmark": str(benchmark.id),
+            "time": time.time(),
+            "results": results_to_dict(results),
+        }
+        line = (json.dumps(entry, sort_keys=True) + "\n").encode()
+        self._location.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._location, "ab+") as f:
+            # Appends by concurrent processes must not interleave.
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Do not continue a line that was cut off by an interrupted run.
+                    line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            if self._entries is not None:
+                self._entries[key] = entry
+            self.recorded += 1
+
+    def clear(self):
+        self._location.unlink(missing_ok=True)
+        with self._lock:
+            self._entries = dict()
@@ -0,0 +1,284 @@
+import atexit
+import fcntl
+import fnmatch
+import hashlib
+import json
+import os
+import pathlib
+import re
+import tempfile
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_model_type_aliases = {
+    "probabilistic": "dtmc",
+    "nondeterministic": "mdp",
+    "stochastic": "ctmc",
+}
+_model_type_pattern = re.compile(
+    r"^\s*(dtmc|ctmc|mdp|ma|pomdp|pta|smg|csg|tsg|lts|probabilistic|nondeterministic|stochastic)\s*$",
+    re.MULTILINE,
+)
+_constant_pattern = re.compile(
+    r"^\s*const\s+(?:(?:int|double|bool)\s+)?(\w+)\s*(?:=\s*([^;]*?)\s*)?;", re.MULTILINE
+)
+_comment_pattern = re.compile(r"//[^\n]*")
+
+
+def describe_prism_file(text: str) -> dict:
+    """
+    The model type and constants of a PRISM file, as far as they can be read off without parsing the model.
+    Constants without a definition have the value None.
+    """
+    text = _comment_pattern.sub("", text)
+    match = _model_type_pattern.search(text)
+    model_type = None
+    if match is not None:
+        model_type = _model_type_aliases.get(match.group(1), match.group(1))
+    constants = {m.group(1): m.group(2) for m in _constant_pattern.finditer(text)}
+    return {"model_type": model_type, "constants": constants}
+
+
+def _family(name: str) -> str:
+    """
+    The prefix of a file name up to the first separator, which groups related models (e.g., multiobj_*).
+    """
+    return re.split(r"[_\-.]", name, maxsplit=1)[0]
+
+
+def shard(items: list, index: int, count: int, key=str) -> list:
+    """
+    The items that belong to one of count shards.
+    An item is assigned by a hash of its key, such that the assignment does not depend on the order or the set of other items.
+
+    :param index: The shard, from 0 to count-1.
+    """
+    if not 0 <= index < count:
+        raise RuntimeError(f"Shard {index} does not exist, there are {count} shards")
+    return [item for item in items if int(hashlib.sha256(key(item).encode()).hexdigest()[:16], 16) % count == index]
+
+
+class BenchmarkManifest:
+    """
+    A persistent index of the benchmark files in a directory, with metadata per file:
+    content hash, model type, constants, measured numbers of states and transitions, last measured durations per tool, memory budgets per tool, and tags.
+
+    The manifest is only loaded when metadata is first requested.
+    Files are only hashed and described again if their size or modification time changed; measurements are dropped when the content changed.
+    Saving merges the changed entries into the file on disk, such that concurrent runs do not lose each other's measurements.
+    Measurements are saved at most every save_interval seconds, and when the process exits.
+    """
+
+    version = 1
+    default_patterns = ["*.nm", "*.nm-ma", "*.pm", "*.sm", "*.prism"]
+    save_interval = 60.0
+
+    def __init__(self, root: pathlib.Path, location: pathlib.Path | None = None, patterns=None):
+        """
+        :param root: The directory with the benchmark files. Subdirectories are included.
+        :param location: The manifest file. If none, .manifest.json in the root.
+        :param patterns: File name patterns of benchmark files. If none, BenchmarkManifest.default_patterns.
+        """
+        self._root = pathlib.Path(root).resolve()
+        self._location = pathlib.Path(location) if location is not None else self._root / ".manifest.json"
+        self._patterns = __class__.default_patterns if patterns is None else patterns
+        self._entries = None
+        self._dirty = set()
+        self._saved_at = time.monotonic()
+        self._lock = threading.RLock()
+        atexit.register(self.save)
+
+    @property
+    def location(self) -> pathlib.Path:
+        return self._location
+
+    @location.setter
+    def location(self, location: pathlib.Path):
+        with self._lock:
+            self._location = pathlib.Path(location)
+            self._entries = None
+
+    def key(self, path: pathlib.Path) -> str:
+        return pathlib.Path(path).resolve().relative_to(self._root).as_posix()
+
+    def files(self) -> list[pathlib.Path]:
+        """
+        All benchmark files, in a fixed order. Only the directory listing is read.
+        """
+        result = []
+        for directory, _, names in os.walk(self._root):
+            for name in names:
+                if any(fnmatch.fnmatch(name, pattern) for pattern in self._patterns):
+                    result.append(pathlib.Path(directory) / name)
+        return sorted(result)
+
+    def _read(self) -> dict:
+        try:
+            with open(self._location, "r") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return dict()
+        if content.get("version") != __class__.version:
+            return dict()
+        return content.get("entries", dict())
+
+    def entries(self) -> dict[str, dict]:
+        """
+        The entries of all benchmark files, keyed by their path relative to the root.
+        On first use, the manifest is loaded and brought up to date with the files.
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._read()
+                self.refresh()
+            return self._entries
+
+    def refresh(self) -> int:
+        """
+        Brings the manifest up to date with the files, and saves it if anything changed.
+
+        :return: The number of files that were described (again).
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._read()
+            described = 0
+            keys = set()
+            for path in self.files():
+                key = self.key(path)
+                keys.add(key)
+                stat = path.stat()
+                entry = self._entries.get(key)
+                if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                    continue
+                data = path.read_bytes()
+                content_hash = hashlib.sha256(data).hexdigest()
+                if entry is None or entry["hash"] != content_hash:
+                    tags = entry["tags"] if entry is not None else [_family(path.name)]
+                    entry = {
+                        "hash": content_hash,
+                        "states": None,
+                        "transitions": None,
+                        "durations": dict(),
+                        "memory": dict(),
+                        "tags": tags,
+                    }
+                    entry.update(describe_prism_file(data.decode(errors="replace")))
+                    described += 1
+                entry["size"] = stat.st_size
+                entry["mtime_ns"] = stat.st_mtime_ns
+                self._entries[key] = entry
+                self._dirty.add(key)
+            for key in set(self._entries) - keys:
+                del self._entries[key]
+                self._dirty.add(key)
+            if self._dirty:
+                self.save()
+            return described
+
+    def entry(self, path: pathlib.Path) -> dict | None:
+        return self.entries().get(self.key(path))
+
+    def save(self):
+        """
+        Writes the changed entries to the manifest file, on top of the entries that are in the file now.
+        """
+        with self._lock:
+            if self._entries is None or not self._dirty:
+                return
+            self._location.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._location.with_name(self._location.name + ".lock"), "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                entries = self._read()
+                for key in self._dirty:
+                    if key in self._entries:
+                        entries[key] = self._entries[key]
+                    else:
+                        entries.pop(key, None)
+                fd, tmp = tempfile.mkstemp(dir=self._location.parent, prefix=".manifest-")
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"version": __class__.version, "entries": entries}, f, indent=1, sort_keys=True)
+                os.replace(tmp, self._location)
+            self._dirty.clear()
+            self._saved_at = time.monotonic()
+
+    def tag(self, path: pathlib.Path, *tags: str):
+        with self._lock:
+            entry = self.entry(path)
+            entry["tags"] = sorted(set(entry["tags"]) | set(tags))
+            self._dirty.add(self.key(path))
+            self.save()
+
+    def memory_budget(self, path: pathlib.Path, name: str) -> float | None:
+        """
+        The memory budget of a tool and operation on a benchmark, in allocated bytes per transition, or None if there is none yet.
+        """
+        entry = self.entry(path)
+        if entry is None:
+            return None
+        return entry.get("memory", dict()).get(name)
+
+    def record(self, path: pathlib.Path, model_info: dict | None, durations: dict[str, float], memory: dict[str, float] | None = None):
+        """
+        Stores the measured size of a model and the durations of the tools that processed it.
+        The manifest file is only written if it was not saved for save_interval seconds, see save.
+
+        :param model_info: The model info as reported by a loader, with states and transitions.
+        :param durations: Durations in seconds, keyed by tool and operation.
+        :param memory: Allocated bytes per transition, keyed by tool and operation. The budget is the lowest value measured so far.
+        """
+        with self._lock:
+            entry = self.entry(path)
+            if entry is None:
+                return
+            if model_info is not None:
+                if model_info.get("states") is not None:
+                    entry["states"] = model_info["states"]
+                if model_info.get("transitions") is not None:
+                    entry["transitions"] = model_info["transitions"]
+            entry["durations"].update(durations)
+            budgets = entry.setdefault("memory", dict())
+            for name, value in (memory or dict()).items():
+                budgets[name] = value if name not in budgets else min(budgets[name], value)
+            self._dirty.add(self.key(path))
+            if time.monotonic() - self._saved_at >= __class__.save_interval:
+                self.save()
+
+    def select(self, min_states=None, max_states=None, model_types=None, tags=None, include_unmeasured=True) -> list[pathlib.Path]:
+        """
+        The benchmark files whose metadata matches all given criteria.
+
+        :param min_states: Lower bound on the measured number of states.
+        :param max_states: Upper bound on the measured number of states.
+        :param model_types: Allowed model types, e.g., ["dtmc", "mdp"].
+        :param tags: Required tags; a file matches if it has any of them.
+        :param include_unmeasured: Whether files whose size was not measured yet match size bounds.
+        """
+        result = []
+        for key, entry in sorted(self.entries().items()):
+            if not matches(entry, min_states, max_states, model_types, tags, include_unmeasured):
+                continue
+            result.append(self._root / key)
+        return result
+
+
+def matches(entry: dict, min_states=None, max_states=None, model_types=None, tags=None, include_unmeasured=True) -> bool:
+    """
+    Whether a manifest entry matches the criteria, see BenchmarkManifest.select.
+    """
+    if model_types is not None and entry["model_type"] not in model_types:
+        return False
+    if tags is not None and not set(tags) & set(entry["tags"]):
+        return False
+    if min_states is not None or max_states is not None:
+        states = entry["states"]
+        if states is None:
+            return include_unmeasured
+        if min_states is not None and states < min_states:
+            return False
+        if max_states is not None and states > max_states:
+            return False
+    return True
@@ -0,0 +1,264 @@
+import copy
+import fcntl
+import json
+import math
+import os
+import pathlib
+import statistics
+import tempfile
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+stages = ["loader", "transformer", "checker"]
+
+
+def mad(samples: list[float]) -> float:
+    """
+    The median absolute deviation from the median.
+    """
+    center = statistics.median(samples)
+    return statistics.median([abs(s - center) for s in samples])
+
+
+def median_interval(samples: list[float], confidence=0.95) -> tuple[float, float]:
+    """
+    A distribution-free confidence interval for the median, from the order statistics of the samples.
+    With few samples, the interval is the range of the samples, which has a lower confidence than requested.
+    """
+    values = sorted(samples)
+    n = len(values)
+    # The largest k such that the median lies between the k-th smallest and the k-th largest sample with the given confidence.
+    k = 0
+    cumulative = 0.0
+    for i in range(n // 2):
+        cumulative += math.comb(n, i) / 2**n
+        if 2 * cumulative > 1 - confidence:
+            break
+        k = i + 1
+    k = max(k, 1)
+    return values[k - 1], values[n - k]
+
+
+def mann_whitney_greater(new: list[float], old: list[float]) -> float:
+    """
+    The one-sided p-value of the Mann-Whitney U test for the new samples being larger than the old samples.
+    Uses the normal approximation with continuity and tie correction.
+    """
+    n1, n2 = len(new), len(old)
+    combined = sorted([(v, 0) for v in new] + [(v, 1) for v in old])
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tied = j - i + 1
+        tie_term += tied**3 - tied
+        i = j + 1
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def summarize(samples: list[float]) -> dict:
+    low, high = median_interval(samples)
+    return {
+        "n": len(samples),
+        "median": statistics.median(samples),
+        "mad": mad(samples),
+        "low": low,
+        "high": high,
+    }
+
+
+def _identifier(tool) -> str:
+    return str(getattr(tool, "identifier", tool.name))
+
+
+def chain_id(tester) -> str:
+    """
+    The identifiers of the tools in the chain of the tester, which distinguishes, e.g., Storm from Storm (exact).
+    """
+    return " -> ".join(_identifier(tool) for tool in tester.chain.values() if tool is not None)
+
+
+def succeeded(results) -> bool:
+    """
+    Whether the chain ran up to its checker and every stage that ran succeeded, without an anticipated error.
+    """
+    if results.get("checker") is None:
+        return False
+    return all(
+        result.exit_code == 0 and not result.not_supported and not result.anticipated_error
+        for result in (results.get(stage) for stage in stages)
+        if result is not None
+    )
+
+
+def measure(tester, benchmark, repeat: int, results=None) -> dict[str, tuple[str, str, list[float]]]:
+    """
+    Runs the chain of the tester repeatedly on the benchmark, bypassing the artifact cache, the results journal and the warehouse.
+    The runs go through Tester.check_benchmark, such that benchmarks that the chain does not support are never run.
+
+    :param results: The results of a previous check of the benchmark. Nothing is measured unless the chain succeeded in these results.
+    :return: For every stage that succeeded in every run, the identifier and fingerprint of its tool, and its wall times.
+    """
+    if results is not None and not succeeded(results):
+        return dict()
+    uncached = copy.copy(tester)
+    uncached._artifact_cache = None
+    uncached._journal = None
+    uncached._warehouse = None
+    samples = {stage: [] for stage in stages}
+    for _ in range(repeat):
+        results = uncached.check_benchmark(benchmark)
+        if not succeeded(results):
+            return dict()
+        for stage in stages:
+            result = results.get(stage)
+            if samples[stage] is None or result is None or result.wall_time is None:
+                samples[stage] = None
+                continue
+            samples[stage].append(result.wall_time)
+    measurements = dict()
+    for stage, tool in tester.chain.items():
+        if tool is None or not samples[stage]:
+            continue
+        fingerprint = getattr(tool, "fingerprint", None)
+        measurements[stage] = (_identifier(tool), fingerprint() if fingerprint is not None else "unknown", samples[stage])
+    return measurements
+
+
+class Slowdown:
+    """
+    A statistically significant slowdown of a stage of a chain on a benchmark.
+    """
+
+    def __init__(self, key: str, tool: str, fingerprints: tuple[str, str], old: dict, new: dict, p_value: float):
+        self.key = key
+        self.tool = tool
+        self.fingerprints = fingerprints
+        self.old = old
+        self.new = new
+        self.p_value = p_value
+
+    @property
+    def factor(self) -> float:
+        return self.new["median"] / self.old["median"]
+
+    def __str__(self):
+        old_fingerprint, new_fingerprint = self.fingerprints
+        build = "" if old_fingerprint == new_fingerprint else f", {old_fingerprint[:8]} -> {new_fingerprint[:8]}"
+        return (
+            f"{self.key}: {self.tool} {self.old['median']:.3f}s -> {self.new['median']:.3f}s"
+            f" (x{self.factor:.2f}, p={self.p_value:.3g}{build})"
+        )
+
+
+class PerfBaseline:
+    """
+    Wall times of every stage of chains on benchmarks, stored in a JSON file, as the reference for detecting slowdowns.
+
+    Every key (chain, stage, benchmark) keeps one set of samples per fingerprint of the tool in that stage.
+    New measurements are compared with the most recently saved samples, which may stem from an older build of the tool.
+    """
+
+    version = 1
+    default_location = None
+
+    def __init__(self, location: pathlib.Path | None = None):
+        """
+        :param location: The file in which the baselines are stored. If none, PerfBaseline.default_location is used.
+        """
+        self._location = pathlib.Path(__class__.default_location if location is None else location)
+        self._baselines = None
+        self._new = dict()
+        self._lock = threading.RLock()
+
+    @property
+    def location(self) -> pathlib.Path:
+        return self._location
+
+    @staticmethod
+    def key(chain: str, stage: str, benchmark: str) -> str:
+        return f"{chain} | {stage} | {benchmark}"
+
+    def _read(self) -> dict:
+        try:
+            with open(self._location, "r") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return dict()
+        if content.get("version") != __class__.version:
+            return dict()
+        return content.get("baselines", dict())
+
+    def baselines(self) -> dict[str, dict[str, dict]]:
+        with self._lock:
+            if self._baselines is None:
+                self._baselines = self._read()
+            return self._baselines
+
+    def reference(self, key: str) -> tuple[str, dict] | None:
+        """
+        The fingerprint and entry that were saved last for the key, or None.
+        """
+        entries = self.baselines().get(key)
+        if not entries:
+            return None
+        return max(entries.items(), key=lambda item: item[1]["time"])
+
+    def compare(self, key: str, tool: str, fingerprint: str, samples: list[float], alpha=0.01, min_slowdown=0.1, min_time=0.05):
+        """
+        The slowdown of the samples compared with the reference, or None if there is no significant slowdown.
+        A slowdown is significant if the Mann-Whitney test rejects equality at level alpha,
+        the median grew by more than min_slowdown, and the difference of the medians exceeds min_time seconds.
+        """
+        reference = self.reference(key)
+        if reference is None or len(samples) < 2:
+            return None
+        old_fingerprint, entry = reference
+        old, new = summarize(entry["samples"]), summarize(samples)
+        if new["median"] <= old["median"] * (1 + min_slowdown) or new["median"] - old["median"] < min_time:
+            return None
+        p_value = mann_whitney_greater(samples, entry["samples"])
+        if p_value >= alpha:
+            return None
+        return Slowdown(key, tool, (old_fingerprint, fingerprint), old, new, p_value)
+
+    def add(self, key: str, tool: str, fingerprint: str, samples: list[float]):
+        """
+        Makes the samples the reference for the key. They are written by save.
+        """
+        entry = {"tool": tool, "samples": list(samples), "time": time.time()}
+        with self._lock:
+            self.baselines().setdefault(key, dict())[fingerprint] = entry
+            self._new.setdefault(key, dict())[fingerprint] = entry
+
+    def save(self):
+        with self._lock:
+            if not self._new:
+                return
+            self._location.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._location.with_name(self._location.name + ".lock"), "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                baselines = self._read()
+                for key, entries in self._new.items():
+                    baselines.setdefault(key, dict()).update(entries)
+                fd, tmp = tempfile.mkstemp(dir=self._location.parent, prefix=".perf-")
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"version": __class__.version, "baselines": baselines}, f, indent=1, sort_keys=True)
+                os.replace(tmp, self._location)
+            self._new.clear()
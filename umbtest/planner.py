@@ -0,0 +1,230 @@
+import concurrent.futures
+import copy
+import os
+import shutil
+import tempfile
+import threading
+import logging
+from types import SimpleNamespace
+from typing import List, NamedTuple
+
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.tools import UmbTool, ReportedResults, run_sync
+
+logger = logging.getLogger(__name__)
+
+
+def _identifier(tool) -> str:
+    return str(getattr(tool, "identifier", tool.name))
+
+
+def _unique(tools: list) -> list:
+    """
+    The tools in the given order, without repetitions. Tools are compared by identity.
+    """
+    result = []
+    for tool in tools:
+        if not any(tool is other for other in result):
+            result.append(tool)
+    return result
+
+
+class ChainPath(NamedTuple):
+    """
+    A single chain in a ChainPlan. The transformer is None for chains that hand the loaded file directly to the checker.
+    """
+
+    loader: UmbTool
+    transformer: UmbTool | None
+    checker: UmbTool
+
+    @property
+    def id(self) -> str:
+        transformer = "None" if self.transformer is None else _identifier(self.transformer)
+        return f"l={_identifier(self.loader)}_t={transformer}_c={_identifier(self.checker)}"
+
+
+class ChainPlan:
+    """
+    Checks every combination of a set of loaders, transformers and checkers on benchmarks.
+
+    The chains form a tree per benchmark: every loader runs once, every transformer runs once on the output of every loader,
+    and all checkers then read the same file. Thus, N loaders, M transformers and K checkers need N loads and N*M transformations, rather than N*M*K of each.
+    The results are reported per chain, exactly as Tester.check_benchmark reports them for that chain,
+    including the results journal, the results warehouse and the manifest of the benchmark.
+    UMB benchmarks, e.g., of a SyntheticModel, are read without a loader, so chains that only differ in their loader share all steps.
+    """
+
+    def __init__(
+        self,
+        loaders: List[UmbTool],
+        checkers: List[UmbTool],
+        transformers: List[UmbTool | None] | None = None,
+        tester: Tester | None = None,
+    ):
+        """
+        :param loaders: The tools that write the benchmarks to UMB.
+        :param checkers: The tools that read the UMB files.
+        :param transformers: The tools that transform the UMB files, where None stands for no transformation. If none, there is no transformation.
+        :param tester: The tester whose settings, e.g., limits, artifact cache, journal and handoff, are used for every chain. If none, a new Tester.
+        """
+        self._tester = Tester() if tester is None else tester
+        transformers = [None] if transformers is None else transformers
+        self._paths = [
+            ChainPath(loader, transformer, checker)
+            for loader in _unique(loaders)
+            for transformer in _unique(transformers)
+            for checker in _unique(checkers)
+        ]
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.transforms = 0
+        self.checks = 0
+
+    @property
+    def paths(self) -> list[ChainPath]:
+        return list(self._paths)
+
+    def stats(self) -> dict[str, int]:
+        return {"paths": len(self._paths), "loads": self.loads, "transforms": self.transforms, "checks": self.checks}
+
+    def __str__(self):
+        return f"ChainPlan[{self.stats()}]"
+
+    def tester(self, path: ChainPath) -> Tester:
+        """
+        A tester for the single chain, with the settings of the tester of the plan.
+        """
+        tester = copy.copy(self._tester)
+        tester._id = path.id
+        tester.set_chain(loader=path.loader, checker=path.checker, transformer=path.transformer)
+        return tester
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def check_benchmark(self, benchmark: UmbBenchmark, return_exceptions=False) -> dict[ChainPath, dict[str, ReportedResults] | BaseException]:
+        """
+        Checks all chains on the benchmark.
+        Chains whose verdict is in the results journal do not run, and neither do loaders and transformers that only they need.
+
+        :param return_exceptions: If true, an exception raised by a step is returned as the result of all chains that contain the step. Otherwise, it is raised after all chains have finished.
+        :return: For every chain, the results as returned by Tester.check_benchmark.
+        """
+        return self._check_benchmark(benchmark, self._tester, return_exceptions)
+
+    def _check_benchmark(self, benchmark: UmbBenchmark, runner: Tester, return_exceptions: bool):
+        results = dict()
+        keys = dict()
+        pending = []
+        for path in self._paths:
+            tester = self.tester(path)
+            unsupported = tester._unsupported(benchmark)
+            if unsupported is not None:
+                results[path] = unsupported
+                continue
+            if tester._journal is not None:
+                keys[path] = tester._journal.key(tester, benchmark, tester._compare)
+                recorded = tester._journal.lookup(keys[path])
+                if recorded is not None:
+                    logger.info(f"{path.id}: reusing the recorded verdict on {benchmark.id}")
+                    results[path] = recorded
+                    continue
+            pending.append(path)
+        results.update(run_sync(self._run(benchmark, pending, runner)))
+        for path in pending:
+            if isinstance(results[path], BaseException):
+                continue
+            tester = self.tester(path)
+            if benchmark.manifest is not None:
+                tester._record(benchmark, results[path])
+            if path in keys:
+                tester._journal.record(keys[path], tester, benchmark, results[path])
+            if tester._warehouse is not None:
+                tester._warehouse.add(tester, benchmark, results[path])
+        results = {path: results[path] for path in self._paths}
+        if not return_exceptions:
+            for path, outcome in results.items():
+                if isinstance(outcome, BaseException):
+                    raise RuntimeError(f"Chain {path.id} on {benchmark.id} failed") from outcome
+        return results
+
+    async def _run(self, benchmark: UmbBenchmark, paths: list[ChainPath], runner: Tester) -> dict:
+        """
+        Runs the given chains, sharing the output of every loader and transformer among all chains that continue from it.
+
+        :param runner: The tester whose temporary directory holds the intermediate files.
+        """
+        results = dict()
+        if not benchmark.is_prism_file:
+            # The UMB file itself is handed to the transformers and checkers, see Tester.check_umb_file.
+            await self._run_transformers(benchmark, paths, None, SimpleNamespace(name=str(benchmark.location)), runner, results)
+            return results
+        for loader in _unique([path.loader for path in paths]):
+            loader_paths = [path for path in paths if path.loader is loader]
+            try:
+                loaded, umbfile = await runner._load(loader, benchmark.location)
+                self._count("loads")
+            except Exception as e:
+                results.update({path: e for path in loader_paths})
+                continue
+            await self._run_transformers(benchmark, loader_paths, loaded, umbfile, runner, results)
+        return results
+
+    async def _run_transformers(self, benchmark: UmbBenchmark, paths: list[ChainPath], loaded, umbfile, runner: Tester, results: dict):
+        """
+        Runs the transformers and checkers of the given chains on the loaded file, and adds the results of the chains to results.
+
+        :param loaded: The results of the loader, which are reported for all chains, or None for UMB benchmarks.
+        :param umbfile: The (temporary) file with the UMB file, or None if the loader failed.
+        """
+        for transformer in _unique([path.transformer for path in paths]):
+            transformer_paths = [path for path in paths if path.transformer is transformer]
+            shared = {"loader": loaded, "transformer": None, "checker": None, "differences": None}
+            artifact = umbfile
+            if umbfile is not None and transformer is not None:
+                try:
+                    shared["transformer"], artifact, shared["differences"] = await runner._transform(transformer, umbfile)
+                    self._count("transforms")
+                except Exception as e:
+                    results.update({path: e for path in transformer_paths})
+                    continue
+            # Chains of a UMB benchmark that only differ in their loader check the same file.
+            for checker in _unique([path.checker for path in transformer_paths]):
+                checker_paths = [path for path in transformer_paths if path.checker is checker]
+                result = dict(shared)
+                if artifact is not None:
+                    try:
+                        result["checker"] = await runner._check(checker, artifact, benchmark.properties)
+                        self._count("checks")
+                    except Exception as e:
+                        results.update({path: e for path in checker_paths})
+                        continue
+                results.update({path: dict(result) for path in checker_paths})
+            # The transformed file is removed once the last checker has read it.
+            del artifact
+
+    def check_benchmarks(
+        self, benchmarks: List[UmbBenchmark], max_workers=None, return_exceptions=False
+    ) -> list[dict[ChainPath, dict[str, ReportedResults] | BaseException]]:
+        """
+        Checks all chains on all benchmarks, see check_benchmark.
+        Benchmarks are checked concurrently, every one in a fresh subdirectory of the temporary directory of the tester.
+
+        :param max_workers: The number of benchmarks that are checked at the same time. If none, the number of cores.
+        :return: For every benchmark, the results of all chains.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = [executor.submit(self._check_in_job_dir, benchmark, return_exceptions) for benchmark in benchmarks]
+        return [future.result() for future in futures]
+
+    def _check_in_job_dir(self, benchmark: UmbBenchmark, return_exceptions: bool):
+        job_dir = tempfile.mkdtemp(dir=self._tester._get_tmp_dir_name(), prefix="job-")
+        runner = copy.copy(self._tester)
+        runner._tmpdir = job_dir
+        try:
+            return self._check_benchmark(benchmark, runner, return_exceptions)
+        finally:
+            if runner._delete_files:
+                shutil.rmtree(job_dir, ignore_errors=True)
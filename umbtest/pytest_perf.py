@@ -0,0 +1,147 @@
+"""
+A pytest plugin that fails tests whose tool chains became significantly slower.
+
+Tests that check a chain via the perf_check fixture run the chain a number of extra times, see --perf-repeat,
+and the wall times of every stage are compared with a stored baseline, see umbtest.perf.PerfBaseline.
+Load it with `pytest_plugins = ["umbtest.pytest_perf"]` in a conftest.py or with `-p umbtest.pytest_perf`.
+"""
+
+import json
+import warnings
+
+import pytest
+
+from umbtest.perf import PerfBaseline, Slowdown, chain_id, measure, summarize
+
+
+class PerfRegressionWarning(UserWarning):
+    pass
+
+
+class _PerfSession:
+    def __init__(self, config):
+        self.repeat = config.getoption("--perf-repeat")
+        self.mode = config.getoption("--perf-mode")
+        self.save = config.getoption("--perf-save")
+        self.alpha = config.getoption("--perf-alpha")
+        self.min_slowdown = config.getoption("--perf-min-slowdown")
+        self.report = config.getoption("--perf-report")
+        location = config.getoption("--perf-baseline")
+        if location is None and PerfBaseline.default_location is None:
+            self.baseline = None
+        else:
+            self.baseline = PerfBaseline(location)
+        self.slowdowns: list[tuple[str, Slowdown]] = []
+        self.measurements: list[dict] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.repeat > 0
+
+    def check(self, nodeid: str, tester, benchmark, results) -> list[Slowdown]:
+        result = []
+        for stage, (tool, fingerprint, samples) in measure(tester, benchmark, self.repeat, results).items():
+            key = PerfBaseline.key(chain_id(tester), stage, str(benchmark.id))
+            slowdown = None
+            if self.baseline is not None:
+                slowdown = self.baseline.compare(key, tool, fingerprint, samples, alpha=self.alpha, min_slowdown=self.min_slowdown)
+                if self.save:
+                    self.baseline.add(key, tool, fingerprint, samples)
+            self.measurements.append(
+                {"test": nodeid, "key": key, "tool": tool, "fingerprint": fingerprint, "slowdown": slowdown is not None, **summarize(samples)}
+            )
+            if slowdown is not None:
+                result.append(slowdown)
+                self.slowdowns.append((nodeid, slowdown))
+        return result
+
+
+_session_key = pytest.StashKey[_PerfSession]()
+_slowdowns_key = pytest.StashKey[list]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("umbtest-perf", "performance regressions of tool chains")
+    group.addoption(
+        "--perf-repeat",
+        type=int,
+        default=0,
+        help="Run every chain checked via perf_check this many extra times and compare the wall times with the baseline. 0 disables the comparison.",
+    )
+    group.addoption("--perf-baseline", default=None, help="The file with the baselines. Defaults to the baseline in tools.toml.")
+    group.addoption("--perf-save", action="store_true", help="Make the measured wall times the new baselines.")
+    group.addoption(
+        "--perf-mode",
+        choices=["fail", "warn"],
+        default="fail",
+        help="Fail the tests with significant slowdowns, or only warn about them.",
+    )
+    group.addoption("--perf-alpha", type=float, default=0.01, help="Significance level of the comparison with the baseline.")
+    group.addoption(
+        "--perf-min-slowdown",
+        type=float,
+        default=0.1,
+        help="Only report slowdowns of the median by more than this fraction.",
+    )
+    group.addoption("--perf-report", default=None, help="Write the statistics of every measured stage to this JSON file.")
+
+
+def pytest_configure(config):
+    config.stash[_session_key] = _PerfSession(config)
+
+
+@pytest.fixture
+def perf_check(request):
+    """
+    Checks a tester on a benchmark like Tester.check_benchmark, and returns the results of that check.
+    With --perf-repeat, a chain that succeeded also runs repeatedly, and slowdowns compared to the baseline fail the test.
+    """
+    session = request.config.stash[_session_key]
+
+    def check(tester, benchmark):
+        results = tester.check_benchmark(benchmark)
+        if session.enabled:
+            slowdowns = session.check(request.node.nodeid, tester, benchmark, results)
+            request.node.stash.setdefault(_slowdowns_key, []).extend(slowdowns)
+            if slowdowns and session.mode == "warn":
+                for slowdown in slowdowns:
+                    warnings.warn(PerfRegressionWarning(str(slowdown)))
+        return results
+
+    return check
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    if report.when != "call" or not report.passed:
+        return
+    slowdowns = item.stash.get(_slowdowns_key, [])
+    if slowdowns and item.config.stash[_session_key].mode == "fail":
+        report.outcome = "failed"
+        report.longrepr = "Significant slowdowns:\n" + "\n".join(str(slowdown) for slowdown in slowdowns)
+
+
+def pytest_sessionfinish(session):
+    perf = session.config.stash[_session_key]
+    if perf.baseline is not None and perf.save:
+        perf.baseline.save()
+    if perf.report is not None and perf.measurements:
+        with open(perf.report, "w") as f:
+            json.dump(perf.measurements, f, indent=1)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    perf = config.stash[_session_key]
+    if not perf.enabled:
+        return
+    if perf.baseline is None:
+        terminalreporter.write_line("No performance baseline is configured, the measurements were not compared.")
+        return
+    if not perf.slowdowns:
+        terminalreporter.write_line(f"No significant slowdowns in {len(perf.measurements)} measured stages.")
+        return
+    terminalreporter.section("performance regressions")
+    for nodeid, slowdown in perf.slowdowns:
+        terminalreporter.write_line(f"{slowdown}  [{nodeid}]")
@@ -0,0 +1,578 @@
+import argparse
+import concurrent.futures
+import copy
+import itertools
+import json
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import umbi
+from umbi.datatypes import Interval
+
+from umbtest.benchmarks import Tester
+from umbtest.compare import _csr_ranges, _row_ids, _segment_sums
+from umbtest.fuzz import signature
+from umbtest.tools import ReportedResults
+
+logger = logging.getLogger(__name__)
+
+# The order in which the parts of a model are reduced. Dropping annotations is cheap and makes the later steps faster.
+dimensions = ["annotations", "states", "choices", "branches"]
+
+
+class FailureSignature:
+    """
+    The failure that a reduced model has to reproduce: the stage of the chain that fails, and either its ERROR lines
+    (ReportedResults.errors) or, if it reports none, its exit code.
+    Error lines are compared without numbers and file names (see umbtest.fuzz.signature), as these change while the model shrinks.
+    """
+
+    def __init__(self, stage: str, errors=(), exit_code=None):
+        self.stage = stage
+        self.errors = tuple(errors)
+        self.exit_code = exit_code
+
+    @classmethod
+    def of(cls, results: dict[str, ReportedResults]):
+        """
+        The signature of the first stage that failed, or None if the chain succeeded.
+
+        :param results: The results as returned by Tester.check_umb_file.
+        """
+        for stage in ["transformer", "checker"]:
+            result = results.get(stage)
+            if result is None or result.exit_code == 0:
+                continue
+            if result.errors:
+                return cls(stage, errors=result.errors)
+            return cls(stage, exit_code=result.exit_code)
+        return None
+
+    def matches(self, results: dict[str, ReportedResults]) -> bool:
+        result = results.get(self.stage)
+        if result is None or result.exit_code == 0:
+            return False
+        if self.errors:
+            actual = {signature(error) for error in result.errors or ()}
+            return all(signature(error) in actual for error in self.errors)
+        return result.exit_code == self.exit_code
+
+    def to_dict(self) -> dict:
+        return {"stage": self.stage, "errors": list(self.errors), "exit_code": self.exit_code}
+
+    def __str__(self):
+        if self.errors:
+            return f"{self.stage}: {'; '.join(self.errors)}"
+        return f"{self.stage}: exit code {self.exit_code}"
+
+
+def _offsets(offsets, count: int) -> np.ndarray:
+    # Without the CSR member, every row has exactly one entry.
+    if offsets is None:
+        return np.arange(count + 1, dtype=np.int64)
+    return np.asarray(offsets, dtype=np.int64)
+
+
+def _row_counts(mask: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    return _segment_sums(mask.astype(np.uint64), offsets).astype(np.int64)
+
+
+def _select(values, mask: np.ndarray):
+    if values is None:
+        return None
+    return [values[i] for i in np.flatnonzero(mask)]
+
+
+def _add(left, right):
+    """
+    The sum of two branch probabilities. The upper bound of a sum of intervals is at most one.
+    """
+    if isinstance(left, Interval):
+        upper = left.right + right.right
+        return Interval(left.left + right.left, min(upper, type(upper)(1)))
+    return left + right
+
+
+def _sizes(umb) -> dict[str, int]:
+    ts = umb.index.transition_system
+    return {
+        "states": ts.num_states,
+        "choices": ts.num_choices,
+        "branches": ts.num_branches,
+        "annotations": len(_extras(umb)),
+    }
+
+
+def _extras(umb) -> list[tuple]:
+    """
+    The parts of a model besides its transitions that can be dropped: every annotation per entity it applies to,
+    actions, valuations and observations.
+    """
+    extras = []
+    for group, annotation_map in (umb.annotations or dict()).items():
+        for name, values in annotation_map.items():
+            for applies_to in values:
+                extras.append(("annotation", group, name, applies_to))
+    ts = umb.index.transition_system
+    if ts.num_choice_actions > 0:
+        extras.append(("actions", "choices"))
+    if ts.num_branch_actions > 0:
+        extras.append(("actions", "branches"))
+    for applies_to in umb.valuations or dict():
+        extras.append(("valuations", applies_to))
+    if ts.num_observations > 0:
+        extras.append(("observations",))
+    return extras
+
+
+def drop_extras(umb, extras: list[tuple]):
+    """
+    A copy of the model without the given annotations, actions, valuations or observations, see _extras.
+    """
+    result = copy.copy(umb)
+    result.index = copy.deepcopy(umb.index)
+    result.annotations = copy.deepcopy(umb.annotations)
+    result.valuations = dict(umb.valuations) if umb.valuations is not None else None
+    ts = result.index.transition_system
+    for extra in extras:
+        if extra[0] == "annotation":
+            _, group, name, applies_to = extra
+            del result.annotations[group][name][applies_to]
+            description = result.index.annotations[group][name]
+            description.applies_to = [entity for entity in description.applies_to if entity != applies_to]
+            if not result.annotations[group][name]:
+                del result.annotations[group][name]
+                del result.index.annotations[group][name]
+            if not result.annotations[group]:
+                del result.annotations[group]
+                del result.index.annotations[group]
+        elif extra == ("actions", "choices"):
+            ts.num_choice_actions = 0
+            result.choice_to_choice_action = None
+            result.choice_action_to_string = None
+        elif extra == ("actions", "branches"):
+            ts.num_branch_actions = 0
+            result.branch_to_branch_action = None
+            result.branch_action_to_string = None
+        elif extra[0] == "valuations":
+            del result.valuations[extra[1]]
+            if isinstance(result.index.valuations, dict):
+                result.index.valuations.pop(extra[1], None)
+        elif extra == ("observations",):
+            ts.num_observations = 0
+            ts.observations_apply_to = None
+            ts.observation_probability_type = None
+            result.entity_to_observation = None
+    if not result.annotations:
+        result.annotations = None
+        result.index.annotations = None
+    if not result.valuations:
+        result.valuations = None
+        result.index.valuations = None
+    return result
+
+
+def restrict(umb, keep_states: np.ndarray, keep_choices: np.ndarray, keep_branches: np.ndarray):
+    """
+    A copy of the model with only the given states, choices and branches, which is again a valid model:
+
+    - the choices of dropped states and the branches of dropped choices are dropped as well,
+    - every state keeps at least one choice, and every choice at least one branch,
+    - the probability of a dropped branch is added to the first remaining branch of its choice, such that distributions still sum up to one,
+    - branches to dropped states lead back to their source state instead, and are merged with an existing branch to that state.
+
+    :return: The restricted model, or None if no initial state remains.
+    """
+    ts = umb.index.transition_system
+    initial = np.asarray(umb.state_is_initial, dtype=bool)
+    keep_states = np.asarray(keep_states, dtype=bool)
+    if not np.any(keep_states & initial):
+        return None
+    state_to_choices = _offsets(umb.state_to_choices, ts.num_states)
+    choice_to_branches = _offsets(umb.choice_to_branches, ts.num_choices)
+    choice_state = _row_ids(state_to_choices)
+    branch_choice = _row_ids(choice_to_branches)
+
+    keep_choices = np.asarray(keep_choices, dtype=bool) & keep_states[choice_state]
+    lost = keep_states & (_row_counts(keep_choices, state_to_choices) == 0) & (np.diff(state_to_choices) > 0)
+    keep_choices[state_to_choices[:-1][lost]] = True
+    keep_branches = np.asarray(keep_branches, dtype=bool) & keep_choices[branch_choice]
+    lost = keep_choices & (_row_counts(keep_branches, choice_to_branches) == 0) & (np.diff(choice_to_branches) > 0)
+    keep_branches[choice_to_branches[:-1][lost]] = True
+
+    probabilities = list(umb.branch_to_probability) if umb.branch_to_probability is not None else None
+    kept = np.flatnonzero(keep_branches)
+    choices_with_branches, first = np.unique(branch_choice[kept], return_index=True)
+    first_kept = np.full(ts.num_choices, -1, dtype=np.int64)
+    first_kept[choices_with_branches] = kept[first]
+    if probabilities is not None:
+        for branch in np.flatnonzero(~keep_branches & keep_choices[branch_choice]):
+            target = first_kept[branch_choice[branch]]
+            probabilities[target] = _add(probabilities[target], probabilities[branch])
+
+    targets = np.asarray(umb.branch_to_target, dtype=np.int64).copy()
+    redirected = keep_branches & ~keep_states[targets]
+    if np.any(redirected):
+        targets[redirected] = choice_state[branch_choice[redirected]]
+        # A redirected branch is merged with the first other branch of its choice that has the same target.
+        existing = dict()
+        for branch in kept:
+            existing.setdefault((branch_choice[branch], targets[branch]), branch)
+        for branch in np.flatnonzero(redirected):
+            other = existing[(branch_choice[branch], targets[branch])]
+            if other != branch:
+                keep_branches[branch] = False
+                if probabilities is not None:
+                    probabilities[other] = _add(probabilities[other], probabilities[branch])
+
+    new_state = np.cumsum(keep_states) - 1
+    result = copy.copy(umb)
+    result.index = copy.deepcopy(umb.index)
+    new_ts = result.index.transition_system
+    new_ts.num_states = int(np.count_nonzero(keep_states))
+    new_ts.num_initial_states = int(np.count_nonzero(keep_states & initial))
+    new_ts.num_choices = int(np.count_nonzero(keep_choices))
+    new_ts.num_branches = int(np.count_nonzero(keep_branches))
+
+    result.state_is_initial = _select(umb.state_is_initial, keep_states)
+    result.state_to_player = _select(umb.state_to_player, keep_states)
+    result.state_is_markovian = _select(umb.state_is_markovian, keep_states)
+    result.state_to_exit_rate = _select(umb.state_to_exit_rate, keep_states)
+    if umb.state_to_choices is not None:
+        result.state_to_choices = [0] + np.cumsum(_row_counts(keep_choices, state_to_choices)[keep_states]).tolist()
+    if umb.choice_to_branches is not None:
+        result.choice_to_branches = [0] + np.cumsum(_row_counts(keep_branches, choice_to_branches)[keep_choices]).tolist()
+    result.branch_to_target = new_state[targets[keep_branches]].tolist()
+    result.branch_to_probability = _select(probabilities, keep_branches)
+    result.choice_to_choice_action = _select(umb.choice_to_choice_action, keep_choices)
+    result.branch_to_branch_action = _select(umb.branch_to_branch_action, keep_branches)
+
+    masks = {"states": keep_states, "choices": keep_choices, "branches": keep_branches}
+    if umb.annotations is not None:
+        result.annotations = {
+            group: {
+                name: {
+                    applies_to: _select(values, masks[applies_to]) if applies_to in masks else values
+                    for applies_to, values in applies_to_values.items()
+                }
+                for name, applies_to_values in annotation_map.items()
+            }
+            for group, annotation_map in umb.annotations.items()
+        }
+    if umb.valuations is not None:
+        result.valuations = {
+            applies_to: _select(values, masks[applies_to]) if applies_to in masks else values for applies_to, values in umb.valuations.items()
+        }
+    if umb.entity_to_observation is not None and ts.observations_apply_to in masks:
+        result.entity_to_observation = _select(umb.entity_to_observation, masks[ts.observations_apply_to])
+    return result
+
+
+def reachable(umb) -> np.ndarray:
+    """
+    The states that are reachable from an initial state.
+    """
+    ts = umb.index.transition_system
+    state_to_choices = _offsets(umb.state_to_choices, ts.num_states)
+    choice_to_branches = _offsets(umb.choice_to_branches, ts.num_choices)
+    targets = np.asarray(umb.branch_to_target, dtype=np.int64)
+    # The branches of a state are contiguous, as are its choices.
+    state_to_branches = choice_to_branches[state_to_choices]
+    reached = np.asarray(umb.state_is_initial, dtype=bool).copy()
+    frontier = np.flatnonzero(reached)
+    while len(frontier) > 0:
+        _, branches = _csr_ranges(state_to_branches, frontier)
+        successors = np.unique(targets[branches])
+        frontier = successors[~reached[successors]]
+        reached[frontier] = True
+    return reached
+
+
+def _units(umb, dimension: str) -> list:
+    """
+    The parts of the model in the given dimension that may be dropped.
+    """
+    if dimension == "annotations":
+        return _extras(umb)
+    ts = umb.index.transition_system
+    if dimension == "states":
+        return list(range(ts.num_states))
+    if dimension == "choices":
+        # The only choice of a state cannot be dropped.
+        offsets = _offsets(umb.state_to_choices, ts.num_states)
+        return np.flatnonzero(np.repeat(np.diff(offsets), np.diff(offsets)) > 1).tolist()
+    offsets = _offsets(umb.choice_to_branches, ts.num_choices)
+    return np.flatnonzero(np.repeat(np.diff(offsets), np.diff(offsets)) > 1).tolist()
+
+
+def _drop(umb, dimension: str, units: list):
+    """
+    The model without the given parts of the given dimension, or None if the result is not a valid model.
+    """
+    if dimension == "annotations":
+        return drop_extras(umb, units)
+    ts = umb.index.transition_system
+    masks = {
+        "states": np.ones(ts.num_states, dtype=bool),
+        "choices": np.ones(ts.num_choices, dtype=bool),
+        "branches": np.ones(ts.num_branches, dtype=bool),
+    }
+    masks[dimension][np.asarray(units, dtype=np.int64)] = False
+    return restrict(umb, masks["states"], masks["choices"], masks["branches"])
+
+
+class ReductionReport:
+    """
+    The outcome of a reduction: the sizes before and after, every reduction step, and the number of chain runs.
+    """
+
+    def __init__(self, signature: FailureSignature, original: dict, reduced: dict, steps: list[dict], tests: dict, elapsed: float, output: pathlib.Path):
+        self.signature = signature
+        self.original = original
+        self.reduced = reduced
+        self.steps = steps
+        self.tests = tests
+        self.elapsed = elapsed
+        self.output = output
+
+    def to_dict(self) -> dict:
+        return {
+            "signature": self.signature.to_dict(),
+            "original": self.original,
+            "reduced": self.reduced,
+            "steps": self.steps,
+            "tests": self.tests,
+            "elapsed": self.elapsed,
+            "output": str(self.output),
+        }
+
+    def write_json(self, path: pathlib.Path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary(self) -> str:
+        def sizes(s):
+            return f"{s['states']} states, {s['choices']} choices, {s['branches']} branches, {s['annotations']} annotations, {s['bytes']} bytes"
+
+        lines = [
+            f"Reproducing {self.signature}",
+            f"  original: {sizes(self.original)}",
+            f"  reduced:  {sizes(self.reduced)}, written to {self.output}",
+            f"  {len(self.steps)} steps, {self.tests['runs']} chain runs ({self.tests['reproduced']} reproduced, {self.tests['invalid']} invalid, "
+            f"{self.tests['speculative']} speculative runs discarded) in {self.elapsed:.1f}s",
+        ]
+        for step in self.steps:
+            lines.append(f"  {step['elapsed']:7.1f}s  dropped {step['dropped']} {step['dimension']}: {step['states']} states, {step['branches']} branches")
+        return "\n".join(lines)
+
+
+class Reducer:
+    """
+    Shrinks a UMB file on which a chain fails to a small file on which it fails the same way, see FailureSignature.
+
+    The reduction is delta debugging (ddmin) over the annotations, states, choices and branches of the model, in rounds until nothing can be dropped.
+    Every candidate is a valid model (see restrict and drop_extras), written by umbi and checked with Tester.check_umb_file.
+    The candidates of one ddmin step are checked speculatively in parallel; the first one in order that reproduces the failure is taken,
+    such that the result does not depend on the number of workers, and all later candidates are discarded.
+    """
+
+    def __init__(self, tester: Tester, signature: FailureSignature | None = None, properties=[], workers=None, time_budget=None, max_runs=None):
+        """
+        :param tester: The tester with the failing chain, see Tester.set_chain. The loader of the chain is not used.
+        :param signature: The failure to reproduce. If none, the failure of the chain on the original file.
+        :param properties: The properties that are checked.
+        :param workers: The number of candidates that are checked at the same time. If none, the number of cores.
+        :param time_budget: In seconds. When it has passed, the smallest reproducer so far is the result.
+        :param max_runs: The maximal number of chain runs.
+        """
+        self._tester = tester
+        self._signature = signature
+        self._properties = properties
+        self._workers = workers or os.cpu_count()
+        self._time_budget = time_budget
+        self._max_runs = max_runs
+        self._lock = threading.Lock()
+        self._names = itertools.count()
+        self._deadline = None
+        self._work_dir = None
+        self._tests = dict()
+
+    def _count(self, key: str):
+        with self._lock:
+            self._tests[key] += 1
+
+    def _exhausted(self) -> bool:
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            return True
+        return self._max_runs is not None and self._tests["runs"] >= self._max_runs
+
+    def _run(self, umb) -> dict[str, ReportedResults]:
+        umb_file = self._work_dir / f"candidate-{next(self._names)}.umb"
+        try:
+            umbi.umb.write(umb, umb_file, insert_umbi_metadata=False)
+            tester = copy.copy(self._tester)
+            self._count("runs")
+            return tester.check_umb_file(umb_file, self._properties)
+        finally:
+            umb_file.unlink(missing_ok=True)
+
+    def _test(self, umb, dimension: str, units: list):
+        """
+        :return: The candidate without the units, if it reproduces the failure, and None otherwise.
+        """
+        candidate = _drop(umb, dimension, units)
+        if candidate is None:
+            self._count("invalid")
+            return None
+        try:
+            results = self._run(candidate)
+        except Exception as e:
+            # E.g., umbi cannot write the candidate, or the chain raises.
+            logger.info(f"Candidate without {len(units)} {dimension} failed differently: {e}")
+            self._count("invalid")
+            return None
+        if not self._signature.matches(results):
+            return None
+        self._count("reproduced")
+        return candidate
+
+    def _first_reproducing(self, executor, umb, dimension: str, candidates: list[list]):
+        """
+        Checks all candidates in parallel.
+
+        :return: The index and model of the first candidate that reproduces the failure, or None.
+        """
+        futures = [executor.submit(self._test, umb, dimension, units) for units in candidates]
+        for i, future in enumerate(futures):
+            reduced = future.result()
+            if reduced is not None:
+                for later in futures[i + 1 :]:
+                    if not later.cancel():
+                        self._count("speculative")
+                return i, reduced
+        return None
+
+    def _ddmin(self, executor, umb, dimension: str, record):
+        """
+        Drops as many units of the dimension as possible.
+
+        :param record: Called with the model after every successful step.
+        """
+        granularity = 2
+        while not self._exhausted():
+            units = _units(umb, dimension)
+            if not units:
+                break
+            granularity = min(granularity, len(units))
+            chunks = [list(chunk) for chunk in np.array_split(np.arange(len(units)), granularity)]
+            # Keeping only one chunk first, as in ddmin, and then dropping one chunk. With two chunks, both are the same.
+            keep_only = [[units[j] for k, chunk in enumerate(chunks) if k != i for j in chunk] for i in range(len(chunks))] if granularity > 2 else []
+            drop_one = [[units[j] for j in chunk] for chunk in chunks]
+            if len(units) == 1:
+                keep_only = []
+            found = self._first_reproducing(executor, umb, dimension, keep_only + drop_one)
+            if found is not None:
+                i, umb = found
+                dropped = len(keep_only[i]) if i < len(keep_only) else len(drop_one[i - len(keep_only)])
+                record(umb, dimension, dropped)
+                granularity = 2 if i < len(keep_only) else max(granularity - 1, 2)
+            elif granularity >= len(units):
+                break
+            else:
+                granularity = min(2 * granularity, len(units))
+        return umb
+
+    def reduce(self, umb_file: pathlib.Path, output_file: pathlib.Path) -> ReductionReport:
+        """
+        Reduces the UMB file. The smallest reproducer so far is always in the output file.
+        """
+        start = time.monotonic()
+        self._deadline = None if self._time_budget is None else start + self._time_budget
+        self._tests = {"runs": 0, "reproduced": 0, "invalid": 0, "speculative": 0}
+        ram_dir = Tester.ramdir_default if os.access(Tester.ramdir_default, os.W_OK) else None
+        self._work_dir = pathlib.Path(tempfile.mkdtemp(dir=ram_dir, prefix="umbtest-reduce-"))
+        output_file = pathlib.Path(output_file)
+        try:
+            umb = umbi.umb.read(umb_file)
+            results = self._run(umb)
+            if self._signature is None:
+                self._signature = FailureSignature.of(results)
+                if self._signature is None:
+                    raise RuntimeError(f"The chain does not fail on {umb_file}")
+            elif not self._signature.matches(results):
+                raise RuntimeError(f"The chain does not fail on {umb_file} with {self._signature}")
+            self._count("reproduced")
+            logger.info(f"Reducing {umb_file}, which reproduces {self._signature}")
+            original = dict(_sizes(umb), bytes=pathlib.Path(umb_file).stat().st_size)
+            shutil.copyfile(umb_file, output_file)
+            steps = []
+
+            def record(reduced, dimension, dropped):
+                partial = output_file.with_name(output_file.name + ".partial")
+                umbi.umb.write(reduced, partial, insert_umbi_metadata=False)
+                os.replace(partial, output_file)
+                steps.append(dict(_sizes(reduced), dimension=dimension, dropped=dropped, bytes=output_file.stat().st_size, elapsed=time.monotonic() - start))
+                logger.info(f"Dropped {dropped} {dimension}: {_sizes(reduced)}")
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self._workers) as executor:
+                unreachable = list(np.flatnonzero(~reachable(umb)))
+                if unreachable:
+                    reduced = self._test(umb, "states", unreachable)
+                    if reduced is not None:
+                        umb = reduced
+                        record(umb, "unreachable states", len(unreachable))
+                progress = True
+                while progress and not self._exhausted():
+                    before = _sizes(umb)
+                    for dimension in dimensions:
+                        umb = self._ddmin(executor, umb, dimension, record)
+                    progress = _sizes(umb) != before
+        finally:
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+        reduced = dict(_sizes(umb), bytes=output_file.stat().st_size)
+        return ReductionReport(self._signature, original, reduced, steps, dict(self._tests), time.monotonic() - start, output_file)
+
+
+def main():
+    from umbtest.fuzz import UmbiReader
+    from umbtest.benchmarks import configure_tester
+    from umbtest.tools import ModestCLI, PrismCLI, StormCLI, UmbPython, configure_umbtools
+
+    parser = argparse.ArgumentParser(description="Reduces a UMB file on which a chain fails to a small file on which the chain fails the same way.")
+    parser.add_argument("input", type=pathlib.Path)
+    parser.add_argument("output", type=pathlib.Path)
+    parser.add_argument("--checker", choices=["storm", "prism", "modest", "umbi"], required=True)
+    parser.add_argument("--transformer", choices=["umbi", "umbi-ats", "umbi-stream"], default=None)
+    parser.add_argument("--property", dest="properties", action="append", default=[])
+    parser.add_argument("--error", dest="errors", action="append", default=[], help="an ERROR line that must be reproduced; by default, the failure on the input")
+    parser.add_argument("--exit-code", type=int, default=None, help="the exit code that must be reproduced, if there are no ERROR lines")
+    parser.add_argument("--stage", choices=["transformer", "checker"], default="checker", help="the stage of the chain whose failure is reproduced")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--time-budget", type=float, default=None, help="in seconds")
+    parser.add_argument("--report", type=pathlib.Path, default=None, help="writes the report as JSON")
+    args = parser.parse_args()
+
+    configure_umbtools()
+    configure_tester()
+    checkers = {"storm": StormCLI, "prism": PrismCLI, "modest": ModestCLI, "umbi": UmbiReader}
+    transformers = {"umbi": lambda: UmbPython("umb"), "umbi-ats": lambda: UmbPython("ats"), "umbi-stream": lambda: UmbPython("stream")}
+    tester = Tester()
+    tester.set_chain(loader=None, checker=checkers[args.checker](), transformer=None if args.transformer is None else transformers[args.transformer]())
+    failure = None
+    if args.errors or args.exit_code is not None:
+        failure = FailureSignature(args.stage, errors=args.errors, exit_code=args.exit_code)
+    reducer = Reducer(tester, failure, args.properties, workers=args.workers, time_budget=args.time_budget)
+    report = reducer.reduce(args.input, args.output)
+    print(report.summary())
+    if args.report is not None:
+        report.write_json(args.report)
+
+
+if __name__ == "__main__":
+    main()
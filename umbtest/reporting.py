@@ -0,0 +1,80 @@
+import csv
+import json
+import pathlib
+
+from umbtest.benchmarks import Tester, UmbBenchmark
+from umbtest.tools import ReportedResults
+
+stages = ["loader", "transformer", "checker"]
+
+
+class RunReport:
+    """
+    Collects the resource usage of every stage of every chain in a run, for export to JSON or CSV.
+    """
+
+    columns = [
+        "chain",
+        "benchmark",
+        "stage",
+        "tool",
+        "exit_code",
+        "timeout",
+        "memout",
+        "signal",
+        "wall_time",
+        "user_time",
+        "system_time",
+        "peak_memory",
+        "allocated_memory",
+        "input_size",
+        "output_size",
+        "handoff",
+        "cached",
+    ]
+
+    def __init__(self):
+        self.records = []
+
+    def add(
+        self,
+        tester: Tester,
+        benchmark: UmbBenchmark,
+        results: dict[str, ReportedResults],
+    ):
+        """
+        Adds one record per stage that was executed.
+
+        :param tester: The tester that produced the results.
+        :param benchmark: The benchmark on which the tester ran.
+        :param results: The results as returned by Tester.check_benchmark.
+        """
+        chain = tester.chain
+        for stage in stages:
+            if results.get(stage) is None:
+                continue
+            tool = chain[stage]
+            record = {
+                "chain": tester.id,
+                "benchmark": str(benchmark.id),
+                "stage": stage,
+                "tool": getattr(tool, "identifier", tool.name),
+            }
+            record.update(results[stage].resources())
+            self.records.append(record)
+
+    def bytes_off_disk(self) -> int:
+        """
+        The number of bytes of intermediate UMB files that were handed to the next step without touching the disk.
+        """
+        return sum(r["output_size"] or 0 for r in self.records if r["handoff"] == "ram")
+
+    def write_json(self, path: pathlib.Path):
+        with open(path, "w") as f:
+            json.dump(self.records, f, indent=2)
+
+    def write_csv(self, path: pathlib.Path):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=__class__.columns)
+            writer.writeheader()
+            writer.writerows(self.records)
@@ -0,0 +1,140 @@
+import argparse
+import fcntl
+import heapq
+import json
+import os
+import pathlib
+import statistics
+import tempfile
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def job_key(tester, benchmark) -> str:
+    """
+    Identifies a job by the identifiers of the tools in its chain and the benchmark.
+    """
+    tools = []
+    for stage, tool in tester.chain.items():
+        tools.append("-" if tool is None else str(getattr(tool, "identifier", tool.name)))
+    return " > ".join(tools) + " | " + str(benchmark.id)
+
+
+class DurationHistory:
+    """
+    The durations of jobs in previous runs, stored in a JSON file.
+    The estimate for a job is the median of its last few durations, such that a single slow run does not dominate.
+    Saving merges into the file on disk, such that concurrent runs do not lose each other's durations.
+    """
+
+    version = 1
+    keep = 5
+
+    def __init__(self, location: pathlib.Path):
+        self._location = pathlib.Path(location)
+        self._durations = None
+        self._new = dict()
+        self._lock = threading.RLock()
+
+    @property
+    def location(self) -> pathlib.Path:
+        return self._location
+
+    def _read(self) -> dict[str, list[float]]:
+        try:
+            with open(self._location, "r") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return dict()
+        if content.get("version") != __class__.version:
+            return dict()
+        return content.get("durations", dict())
+
+    def durations(self) -> dict[str, list[float]]:
+        with self._lock:
+            if self._durations is None:
+                self._durations = self._read()
+            return self._durations
+
+    def estimate(self, key: str) -> float | None:
+        """
+        The expected duration of a job in seconds, or None if it never ran.
+        """
+        values = self.durations().get(key)
+        if not values:
+            return None
+        return statistics.median(values)
+
+    def add(self, key: str, duration: float):
+        with self._lock:
+            values = self.durations().setdefault(key, [])
+            values.append(duration)
+            del values[: -__class__.keep]
+            self._new.setdefault(key, []).append(duration)
+
+    def save(self):
+        with self._lock:
+            if not self._new:
+                return
+            self._location.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._location.with_name(self._location.name + ".lock"), "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                durations = self._read()
+                for key, values in self._new.items():
+                    durations[key] = (durations.get(key, []) + values)[-__class__.keep :]
+                fd, tmp = tempfile.mkstemp(dir=self._location.parent, prefix=".history-")
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"version": __class__.version, "durations": durations}, f, indent=1, sort_keys=True)
+                os.replace(tmp, self._location)
+            self._new.clear()
+
+
+def estimates(keys: list[str], history: DurationHistory) -> list[float]:
+    """
+    The estimated duration of every job. Jobs that never ran are assumed to take as long as the median known job.
+    """
+    known = [history.estimate(key) for key in keys]
+    measured = [e for e in known if e is not None]
+    default = statistics.median(measured) if measured else 0.0
+    return [default if e is None else e for e in known]
+
+
+def longest_first(items: list, keys: list[str], history: DurationHistory) -> list:
+    """
+    The items ordered by decreasing estimated duration (longest processing time first).
+    Items with the same estimate keep their order.
+    """
+    durations = estimates(keys, history)
+    order = sorted(range(len(items)), key=lambda i: -durations[i])
+    return [items[i] for i in order]
+
+
+def predict_makespan(durations: list[float], workers: int) -> float:
+    """
+    The time until all jobs are done if they are started longest first, each on the first worker that becomes idle.
+    """
+    if workers < 1:
+        raise RuntimeError(f"Cannot schedule on {workers} workers")
+    finish_times = [0.0] * min(workers, max(len(durations), 1))
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(finish_times, finish_times[0] + duration)
+    return max(finish_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predicts the makespan of the jobs in a duration history.")
+    parser.add_argument("history", type=pathlib.Path)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    history = DurationHistory(args.history)
+    durations = estimates(list(history.durations()), history)
+    print(f"{len(durations)} jobs, {sum(durations):.0f}s in total, longest {max(durations, default=0):.0f}s")
+    for workers in args.workers:
+        print(f"{workers:4} workers: {predict_makespan(durations, workers):.0f}s")
+
+
+if __name__ == "__main__":
+    main()
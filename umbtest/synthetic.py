@@ -0,0 +1,475 @@
+import argparse
+import json
+import os
+import pathlib
+import tarfile
+import time
+
+import numpy as np
+import umbi
+from umbi.binary import SizedType
+from umbi.datatypes import IntervalType, NumericPrimitiveType, PrimitiveType
+
+from umbtest.benchmarks import UmbBenchmark
+
+model_types = ["dtmc", "ctmc", "mdp", "ma"]
+value_types = ["double", "exact", "interval", "exact-interval"]
+
+# Every random quantity of a block is drawn from its own stream, such that every member of the file can be generated without the others.
+_COUNTS = 0
+_TARGETS = 1
+_PROBABILITIES = 2
+_EXIT_RATES = 3
+_REWARDS = 1000
+_LABELS = 2000
+
+# The number of branches that are generated at once, which bounds the memory usage.
+_block_branches = 1 << 20
+
+
+class _ChunkReader:
+    """
+    A file object that reads the concatenation of a sequence of byte chunks, as consumed by tarfile.addfile.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._current = memoryview(b"")
+        self.position = 0
+
+    def read(self, size=-1) -> bytes:
+        parts = []
+        while size != 0:
+            if len(self._current) == 0:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._current = memoryview(chunk).cast("B")
+                continue
+            n = len(self._current) if size < 0 else min(size, len(self._current))
+            parts.append(self._current[:n])
+            self._current = self._current[n:]
+            size -= n if size > 0 else 0
+        data = b"".join(parts)
+        self.position += len(data)
+        return data
+
+    def exhausted(self) -> bool:
+        return len(self._current) == 0 and not any(len(chunk) for chunk in self._chunks)
+
+
+def _reduce(numerators: np.ndarray, denominators: np.ndarray) -> np.ndarray:
+    """
+    Rationals in the binary layout of UMB (a signed 64-bit numerator followed by an unsigned 64-bit denominator), in lowest terms.
+    """
+    divisors = np.gcd(numerators, denominators)
+    result = np.empty(len(numerators), dtype=[("numerator", "<i8"), ("denominator", "<u8")])
+    result["numerator"] = numerators // divisors
+    result["denominator"] = denominators // divisors
+    return result
+
+
+def _interval(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    result = np.empty(len(left), dtype=[("left", left.dtype), ("right", right.dtype)])
+    result["left"] = left
+    result["right"] = right
+    return result
+
+
+def _bitvector(values: np.ndarray) -> bytes:
+    return np.packbits(values, bitorder="little").tobytes()
+
+
+class _Block:
+    """
+    The structure of a contiguous range of states: how many choices every state has, and how many branches every choice has.
+    """
+
+    def __init__(self, first_state, markovian, state_choices, choice_branches):
+        self.first_state = first_state
+        self.markovian = markovian
+        self.state_choices = state_choices
+        self.choice_branches = choice_branches
+
+    @property
+    def num_states(self) -> int:
+        return len(self.state_choices)
+
+    @property
+    def num_choices(self) -> int:
+        return len(self.choice_branches)
+
+    @property
+    def num_branches(self) -> int:
+        return int(self.choice_branches.sum())
+
+    def choice_offsets(self) -> np.ndarray:
+        offsets = np.zeros(self.num_choices + 1, dtype=np.int64)
+        np.cumsum(self.choice_branches, out=offsets[1:])
+        return offsets
+
+
+class SyntheticModel:
+    """
+    A random model of arbitrary size, written directly to a UMB file, e.g., to stress the UMB import of the checkers
+    without first building a huge model from PRISM source.
+
+    The states are generated in blocks of about a million branches with vectorized NumPy code, and every member of the
+    UMB file is streamed block by block into the archive. Thus, memory usage is bounded by the size of a block, independent of the size of the model.
+    Every block is drawn from its own random stream, derived from the seed and the block number, such that the file is the same for the same parameters.
+
+    The model is strongly connected: the first branch of every choice of state s leads to state s+1 (modulo the number of states).
+    The other targets of a choice are distinct, and the probabilities of its branches are weights between 1 and 16 over their sum.
+    State 0 is the only initial state.
+    """
+
+    def __init__(
+        self,
+        model_type="dtmc",
+        states=1000,
+        branching=4,
+        choices=2,
+        rewards=1,
+        labels=1,
+        values="double",
+        seed=0,
+        markovian=0.5,
+        label_density=0.1,
+    ):
+        """
+        :param model_type: Either dtmc, ctmc, mdp or ma.
+        :param states: The number of states.
+        :param branching: The average number of branches per choice. Every choice has between 1 and 2*branching-1 branches.
+        :param choices: The average number of choices per state of MDPs, and per probabilistic state of MAs. Every such state has between 1 and 2*choices-1 choices.
+        :param rewards: The number of reward structures. They apply to states, and for MDPs and MAs also to choices.
+        :param labels: The number of atomic propositions.
+        :param values: Either double, exact (rationals), interval (intervals of doubles) or exact-interval (intervals of rationals).
+            Intervals are only supported for DTMCs and MDPs, and apply to the branch probabilities. Rewards and exit rates are exact for exact-interval values.
+        :param seed: The seed from which the model is drawn.
+        :param markovian: The fraction of Markovian states of MAs. Markovian states have a single choice.
+        :param label_density: The fraction of states that satisfy an atomic proposition.
+        """
+        if model_type not in model_types:
+            raise ValueError(f"Unknown model type {model_type}, expected one of {model_types}")
+        if values not in value_types:
+            raise ValueError(f"Unknown value type {values}, expected one of {value_types}")
+        if "interval" in values and model_type not in ["dtmc", "mdp"]:
+            raise ValueError(f"Interval values are only supported for DTMCs and MDPs, not for {model_type}")
+        if states < 1 or branching < 1 or choices < 1:
+            raise ValueError("The number of states, the branching and the number of choices must be positive")
+        self.model_type = model_type
+        self.states = states
+        self.branching = branching
+        self.choices = choices if model_type in ["mdp", "ma"] else 1
+        self.rewards = rewards
+        self.labels = labels
+        self.values = values
+        self.seed = seed
+        self.markovian = markovian
+        self.label_density = label_density
+        # Blocks are multiples of 64 states, such that the bitvectors of blocks can be concatenated.
+        self._block_states = max(64, _block_branches // (self.choices * branching) // 64 * 64)
+        self._totals = None
+
+    def __str__(self):
+        return f"SyntheticModel[{self.model_type}, {self.states} states, seed {self.seed}]"
+
+    @property
+    def parameters(self) -> dict:
+        return {
+            "model_type": self.model_type,
+            "states": self.states,
+            "branching": self.branching,
+            "choices": self.choices,
+            "rewards": self.rewards,
+            "labels": self.labels,
+            "values": self.values,
+            "seed": self.seed,
+            "markovian": self.markovian,
+            "label_density": self.label_density,
+        }
+
+    @property
+    def num_blocks(self) -> int:
+        return (self.states + self._block_states - 1) // self._block_states
+
+    def _rng(self, block: int, stream: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, block, stream])
+
+    def _block(self, block: int) -> _Block:
+        first_state = block * self._block_states
+        num_states = min(self._block_states, self.states - first_state)
+        rng = self._rng(block, _COUNTS)
+        markovian = None
+        if self.model_type == "ma":
+            markovian = rng.random(num_states) < self.markovian
+        if self.model_type in ["mdp", "ma"]:
+            state_choices = rng.integers(1, 2 * self.choices, size=num_states)
+            if markovian is not None:
+                state_choices[markovian] = 1
+        else:
+            state_choices = np.ones(num_states, dtype=np.int64)
+        choice_branches = rng.integers(1, 2 * self.branching, size=int(state_choices.sum()))
+        # The targets of a choice are distinct.
+        np.minimum(choice_branches, self.states, out=choice_branches)
+        return _Block(first_state, markovian, state_choices, choice_branches)
+
+    def _blocks(self):
+        for block in range(self.num_blocks):
+            yield self._block(block)
+
+    def totals(self) -> tuple[int, int]:
+        """
+        The number of choices and branches, which requires a pass over the structure of all blocks.
+        """
+        if self._totals is None:
+            num_choices, num_branches = 0, 0
+            for block in self._blocks():
+                num_choices += block.num_choices
+                num_branches += block.num_branches
+            self._totals = (num_choices, num_branches)
+        return self._totals
+
+    def _probability_type(self) -> SizedType:
+        return {
+            "double": SizedType.for_type(NumericPrimitiveType.DOUBLE),
+            "exact": SizedType.for_type(NumericPrimitiveType.RATIONAL),
+            "interval": SizedType.for_type(IntervalType(NumericPrimitiveType.DOUBLE)),
+            "exact-interval": SizedType.for_type(IntervalType(NumericPrimitiveType.RATIONAL)),
+        }[self.values]
+
+    def _value_type(self) -> SizedType:
+        """
+        The type of rewards and exit rates.
+        """
+        if self.values.startswith("exact"):
+            return SizedType.for_type(NumericPrimitiveType.RATIONAL)
+        return SizedType.for_type(NumericPrimitiveType.DOUBLE)
+
+    def index(self):
+        """
+        The index of the UMB file.
+        """
+        num_choices, num_branches = self.totals()
+        index = umbi.umb.index.UmbIndex()
+        index.file_data = umbi.umb.index.umbi_file_data()
+        index.model_data = umbi.umb.index.ModelData(
+            name=f"synthetic-{self.model_type}", description=json.dumps(self.parameters, sort_keys=True)
+        )
+        ts = index.transition_system
+        ts.time = {"dtmc": "discrete", "mdp": "discrete", "ctmc": "stochastic", "ma": "urgent-stochastic"}[self.model_type]
+        ts.num_players = 1 if self.model_type in ["mdp", "ma"] else 0
+        ts.num_states = self.states
+        ts.num_initial_states = 1
+        ts.num_choices = num_choices
+        ts.num_branches = num_branches
+        ts.branch_probability_type = self._probability_type()
+        if self.model_type in ["ctmc", "ma"]:
+            ts.exit_rate_type = self._value_type()
+        annotations = dict()
+        if self.rewards > 0:
+            applies_to = ["states", "choices"] if self.model_type in ["mdp", "ma"] else ["states"]
+            annotations["rewards"] = {
+                f"r{i}": umbi.umb.index.AnnotationDescription(applies_to=list(applies_to), type=self._value_type())
+                for i in range(self.rewards)
+            }
+        if self.labels > 0:
+            annotations["aps"] = {
+                f"l{i}": umbi.umb.index.AnnotationDescription(applies_to=["states"], type=SizedType.for_type(PrimitiveType.BOOL))
+                for i in range(self.labels)
+            }
+        index.annotations = annotations or None
+        index.validate()
+        return index
+
+    def _bitvector_chunks(self, values):
+        """
+        A bitvector over the states, padded to a multiple of 64 bits.
+
+        :param values: Returns the bits of the states of a block, given the block number and the block.
+        """
+        for index, block in enumerate(self._blocks()):
+            yield _bitvector(values(index, block))
+        # Only the last block can have a number of states that is not a multiple of 64.
+        yield bytes((self.states + 63) // 64 * 8 - (self.states + 7) // 8)
+
+    def _initial_chunks(self):
+        def initial(index, block):
+            values = np.zeros(block.num_states, dtype=bool)
+            values[0] = index == 0
+            return values
+
+        return self._bitvector_chunks(initial)
+
+    def _offset_chunks(self, counts):
+        """
+        The offsets of a CSR structure, given the counts of its rows per block.
+        """
+        total = 0
+        yield np.zeros(1, dtype="<u8").tobytes()
+        for block in self._blocks():
+            offsets = np.cumsum(counts(block), dtype=np.int64) + total
+            total = int(offsets[-1])
+            yield offsets.astype("<u8").tobytes()
+
+    def _target_chunks(self):
+        for index, block in enumerate(self._blocks()):
+            rng = self._rng(index, _TARGETS)
+            # The targets of a choice are s+1, s+1+step, s+1+2*step, ..., which are distinct as step*branches <= states.
+            choice_states = np.repeat(np.arange(block.first_state, block.first_state + block.num_states, dtype=np.int64), block.state_choices)
+            steps = rng.integers(1, np.maximum(1, (self.states - 1) // block.choice_branches) + 1)
+            offsets = block.choice_offsets()
+            positions = np.arange(offsets[-1], dtype=np.int64) - np.repeat(offsets[:-1], block.choice_branches)
+            sources = np.repeat(choice_states, block.choice_branches)
+            targets = (sources + 1 + positions * np.repeat(steps, block.choice_branches)) % self.states
+            yield targets.astype("<u8").tobytes()
+
+    def _probability_chunks(self):
+        for index, block in enumerate(self._blocks()):
+            rng = self._rng(index, _PROBABILITIES)
+            weights = rng.integers(1, 17, size=block.num_branches)
+            sums = np.repeat(np.add.reduceat(weights, block.choice_offsets()[:-1]), block.choice_branches)
+            if self.values == "double":
+                values = (weights / sums).astype("<f8")
+            elif self.values == "exact":
+                values = _reduce(weights, sums)
+            elif self.values == "interval":
+                values = _interval((0.9 * weights / sums).astype("<f8"), np.minimum(1.0, 1.1 * weights / sums).astype("<f8"))
+            else:
+                values = _interval(_reduce(9 * weights, 10 * sums), _reduce(np.minimum(11 * weights, 10 * sums), 10 * sums))
+            yield values.tobytes()
+
+    def _values(self, integers: np.ndarray, denominator: int) -> np.ndarray:
+        """
+        Rewards and exit rates, as integers over the denominator.
+        """
+        if self.values.startswith("exact"):
+            return _reduce(integers, np.full(len(integers), denominator, dtype=np.int64))
+        return (integers / denominator).astype("<f8")
+
+    def _exit_rate_chunks(self):
+        for index, block in enumerate(self._blocks()):
+            rates = self._rng(index, _EXIT_RATES).integers(1, 11, size=block.num_states)
+            if block.markovian is not None:
+                rates[~block.markovian] = 0
+            yield self._values(rates, 1).tobytes()
+
+    def _markovian_chunks(self):
+        return self._bitvector_chunks(lambda index, block: block.markovian)
+
+    def _reward_chunks(self, reward: int, applies_to: str):
+        for index, block in enumerate(self._blocks()):
+            rng = self._rng(index, _REWARDS + reward)
+            state_rewards = rng.integers(0, 41, size=block.num_states)
+            if applies_to == "states":
+                yield self._values(state_rewards, 4).tobytes()
+            else:
+                yield self._values(rng.integers(0, 41, size=block.num_choices), 4).tobytes()
+
+    def _label_chunks(self, label: int):
+        return self._bitvector_chunks(lambda index, block: self._rng(index, _LABELS + label).random(block.num_states) < self.label_density)
+
+    def members(self) -> list[tuple[str, int, object]]:
+        """
+        The members of the UMB file after the index: their names, sizes in bytes, and generators of their contents.
+        """
+        num_choices, num_branches = self.totals()
+        bitvector_size = (self.states + 63) // 64 * 8
+        probability_size = self._probability_type().size_bytes
+        value_size = self._value_type().size_bytes
+        members = [
+            ("state-is-initial.bin", bitvector_size, self._initial_chunks()),
+            ("state-to-choices.bin", (self.states + 1) * 8, self._offset_chunks(lambda block: block.state_choices)),
+        ]
+        if self.model_type == "ma":
+            members.append(("state-is-markovian.bin", bitvector_size, self._markovian_chunks()))
+        if self.model_type in ["ctmc", "ma"]:
+            members.append(("state-to-exit-rate.bin", self.states * value_size, self._exit_rate_chunks()))
+        members += [
+            ("choice-to-branches.bin", (num_choices + 1) * 8, self._offset_chunks(lambda block: block.choice_branches)),
+            ("branch-to-target.bin", num_branches * 8, self._target_chunks()),
+            ("branch-to-probability.bin", num_branches * probability_size, self._probability_chunks()),
+        ]
+        for i in range(self.rewards):
+            members.append((f"annotations/rewards/r{i}/states/values.bin", self.states * value_size, self._reward_chunks(i, "states")))
+            if self.model_type in ["mdp", "ma"]:
+                members.append((f"annotations/rewards/r{i}/choices/values.bin", num_choices * value_size, self._reward_chunks(i, "choices")))
+        for i in range(self.labels):
+            members.append((f"annotations/aps/l{i}/states/values.bin", bitvector_size, self._label_chunks(i)))
+        return members
+
+    def write(self, path: pathlib.Path, compression="gz", compresslevel=1):
+        """
+        Writes the model as a UMB file. Members are streamed into the archive, the file is never held in memory.
+
+        :param compression: Either gz, bz2, xz or None.
+        :param compresslevel: The compression level of gz and bz2. Low levels are much faster, at a slightly larger file.
+        :return: The index of the file.
+        """
+        index = self.index()
+        data = umbi.binary.scalar_to_bytes(umbi.datatypes.json_to_string(index.to_json()), PrimitiveType.STRING)
+        options = dict() if compression not in ["gz", "bz2"] else {"compresslevel": compresslevel}
+        with tarfile.open(os.fspath(path), mode=f"w|{compression or ''}", copybufsize=1 << 20, **options) as tar:
+            members = [("index.json", len(data), [data])] + self.members()
+            for name, size, chunks in members:
+                info = tarfile.TarInfo(name=name)
+                info.size = size
+                info.mtime = 0
+                reader = _ChunkReader(chunks)
+                tar.addfile(info, reader)
+                if reader.position != size or not reader.exhausted():
+                    raise RuntimeError(f"Generated a wrong number of bytes for {name}, the index requires {size} bytes")
+        return index
+
+    def benchmark(self, directory: pathlib.Path, properties=None) -> UmbBenchmark:
+        """
+        A benchmark with the model as UMB file, which is written to the directory unless it already exists there.
+        As it is not a PRISM file, the chains skip the loader, see Tester.check_umb_file.
+        """
+        directory = pathlib.Path(directory)
+        name = "synthetic-" + "-".join(str(value) for value in self.parameters.values()) + ".umb"
+        location = directory / name
+        if not location.exists():
+            directory.mkdir(parents=True, exist_ok=True)
+            partial = location.with_suffix(".partial")
+            self.write(partial)
+            partial.replace(location)
+        return UmbBenchmark(location, properties=properties, is_prism_file=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes a synthetic model of arbitrary size as UMB file.")
+    parser.add_argument("output", type=pathlib.Path)
+    parser.add_argument("--type", choices=model_types, default="dtmc")
+    parser.add_argument("--states", type=int, default=10**6)
+    parser.add_argument("--branching", type=int, default=4, help="the average number of branches per choice")
+    parser.add_argument("--choices", type=int, default=2, help="the average number of choices per state, for MDPs and MAs")
+    parser.add_argument("--rewards", type=int, default=1, help="the number of reward structures")
+    parser.add_argument("--labels", type=int, default=1, help="the number of atomic propositions")
+    parser.add_argument("--values", choices=value_types, default="double")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compression", choices=["gz", "bz2", "xz", "none"], default="gz")
+    parser.add_argument("--compresslevel", type=int, default=1)
+    args = parser.parse_args()
+
+    model = SyntheticModel(
+        args.type,
+        states=args.states,
+        branching=args.branching,
+        choices=args.choices,
+        rewards=args.rewards,
+        labels=args.labels,
+        values=args.values,
+        seed=args.seed,
+    )
+    start = time.monotonic()
+    index = model.write(args.output, None if args.compression == "none" else args.compression, args.compresslevel)
+    ts = index.transition_system
+    print(
+        f"Wrote {ts.num_states} states, {ts.num_choices} choices and {ts.num_branches} branches to {args.output} "
+        f"in {time.monotonic() - start:.1f}s ({args.output.stat().st_size / 2**20:.1f} MiB)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import csv
+import json
+import logging
+import math
+import pathlib
+import tempfile
+
+import numpy as np
+
+from umbtest.benchmarks import UmbBenchmark, scale_ladder
+from umbtest.tools import Limits, ReportedResults, UmbTool, read_umb_index
+
+logger = logging.getLogger(__name__)
+
+directions = ["prism_file_to_umb", "umb_to_umb", "check_umb"]
+
+
+def _megabytes(direction: str, result: ReportedResults) -> float:
+    """
+    The amount of UMB data handled by an invocation: written for exports, read for imports, and both for transformations.
+    """
+    sizes = {
+        "prism_file_to_umb": [result.output_size],
+        "umb_to_umb": [result.input_size, result.output_size],
+        "check_umb": [result.input_size],
+    }[direction]
+    return sum(size or 0 for size in sizes) / 1e6
+
+
+def _rate(amount, wall_time):
+    if amount is None or not wall_time:
+        return None
+    return amount / wall_time
+
+
+class ThroughputReport:
+    """
+    Throughput of every tool in every direction on every benchmark, and scaling curves fitted to it.
+    """
+
+    columns = [
+        "tool",
+        "direction",
+        "benchmark",
+        "states",
+        "transitions",
+        "megabytes",
+        "wall_time",
+        "states_per_second",
+        "transitions_per_second",
+        "megabytes_per_second",
+        "exit_code",
+        "timeout",
+        "memout",
+    ]
+
+    def __init__(self):
+        self.records = []
+
+    def add(self, tool: UmbTool, direction: str, benchmark: UmbBenchmark, index, result: ReportedResults):
+        """
+        :param index: The index of the UMB file that was written or read, which determines the size of the model.
+        """
+        states = index.transition_system.num_states
+        transitions = index.transition_system.num_branches
+        megabytes = _megabytes(direction, result)
+        self.records.append(
+            {
+                "tool": getattr(tool, "identifier", tool.name),
+                "direction": direction,
+                "benchmark": str(benchmark.id),
+                "states": states,
+                "transitions": transitions,
+                "megabytes": megabytes,
+                "wall_time": result.wall_time,
+                "states_per_second": _rate(states, result.wall_time),
+                "transitions_per_second": _rate(transitions, result.wall_time),
+                "megabytes_per_second": _rate(megabytes, result.wall_time),
+                "exit_code": result.exit_code,
+                "timeout": result.timeout,
+                "memout": result.memout,
+            }
+        )
+
+    def scaling(self) -> dict[tuple[str, str], tuple[float, float]]:
+        """
+        Fits wall_time = coefficient * states^exponent per tool and direction, by least squares in log-log space.
+        Only successful invocations are taken into account, and at least two different model sizes are required.
+
+        :return: For every tool and direction, the coefficient and the exponent.
+        """
+        points = dict()
+        for record in self.records:
+            if record["exit_code"] != 0 or not record["wall_time"] or not record["states"]:
+                continue
+            points.setdefault((record["tool"], record["direction"]), []).append((record["states"], record["wall_time"]))
+        result = dict()
+        for key, values in points.items():
+            sizes = np.log(np.array([v[0] for v in values], dtype=np.float64))
+            times = np.log(np.array([v[1] for v in values], dtype=np.float64))
+            if len(np.unique(sizes)) < 2:
+                continue
+            exponent, intercept = np.polyfit(sizes, times, 1)
+            result[key] = (math.exp(intercept), float(exponent))
+        return result
+
+    def superlinear(self, threshold=1.15) -> list[tuple[str, str]]:
+        """
+        The tools and directions whose time grows faster than states^threshold.
+        """
+        return sorted(key for key, (_, exponent) in self.scaling().items() if exponent > threshold)
+
+    def summary(self) -> str:
+        lines = []
+        for (tool, direction), (coefficient, exponent) in sorted(self.scaling().items()):
+            lines.append(f"{tool:30} {direction:20} time ~ {coefficient:.3g} * states^{exponent:.2f}")
+        return "\n".join(lines)
+
+    def write_json(self, path: pathlib.Path):
+        with open(path, "w") as f:
+            json.dump(self.records, f, indent=2)
+
+    def write_csv(self, path: pathlib.Path):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=__class__.columns)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+
+class ThroughputSuite:
+    """
+    Measures every tool in every direction it supports.
+
+    Every tool that can export writes the benchmark to UMB. The first successful export is the reference UMB file,
+    which is then transformed and checked by every tool that supports this, such that all imports see the same file.
+    """
+
+    def __init__(self, tools: list[UmbTool], tmpdir=None, limits: Limits | None = None):
+        """
+        :param tools: The tools to measure.
+        :param tmpdir: The directory for the UMB files. If none, a temporary directory is used.
+        :param limits: Limits for every invocation, overriding the limits of the tools.
+        """
+        self._tools = [tool if limits is None else tool.with_limits(limits) for tool in tools]
+        self._tmpdir = tmpdir
+
+    def _supporting(self, direction: str) -> list[UmbTool]:
+        return [tool for tool in self._tools if hasattr(tool, direction)]
+
+    def run(self, benchmarks: list[UmbBenchmark], report: ThroughputReport | None = None) -> ThroughputReport:
+        report = ThroughputReport() if report is None else report
+        with tempfile.TemporaryDirectory(dir=self._tmpdir) as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            for benchmark in benchmarks:
+                self._run_benchmark(benchmark, tmpdir, report)
+        return report
+
+    def _run_benchmark(self, benchmark: UmbBenchmark, tmpdir: pathlib.Path, report: ThroughputReport):
+        reference = None
+        for i, tool in enumerate(self._supporting("prism_file_to_umb")):
+            output_file = tmpdir / f"export-{i}.umb"
+            result = tool.prism_file_to_umb(benchmark.location, output_file, log_file=tmpdir / f"export-{i}.log")
+            if result.exit_code != 0 or not output_file.exists() or output_file.stat().st_size == 0:
+                logger.warning(f"{tool.name} could not export {benchmark.id}")
+                continue
+            index = read_umb_index(output_file)
+            report.add(tool, "prism_file_to_umb", benchmark, index, result)
+            if reference is None:
+                reference = (output_file, index)
+        if reference is None:
+            logger.warning(f"No tool could export {benchmark.id}, skipping the imports")
+            return
+        umb_file, index = reference
+        for i, tool in enumerate(self._supporting("umb_to_umb")):
+            output_file = tmpdir / f"transform-{i}.umb"
+            result = tool.umb_to_umb(umb_file, output_file, log_file=tmpdir / f"transform-{i}.log")
+            report.add(tool, "umb_to_umb", benchmark, index, result)
+            output_file.unlink(missing_ok=True)
+        for i, tool in enumerate(self._supporting("check_umb")):
+            result = tool.check_umb(umb_file, log_file=tmpdir / f"check-{i}.log")
+            report.add(tool, "check_umb", benchmark, index, result)
+        for path in tmpdir.iterdir():
+            path.unlink()
+
+
+def main():
+    from umbtest.benchmarks import configure_tester
+    from umbtest.tools import ModestCLI, PrismCLI, StormCLI, UmbPython, check_tools, configure_umbtools
+
+    parser = argparse.ArgumentParser(description="Measures the UMB throughput of all tools on the scale ladder.")
+    parser.add_argument("--min-states", type=int, default=None)
+    parser.add_argument("--max-states", type=int, default=10**6)
+    parser.add_argument("--time-limit", type=float, default=None, help="in seconds, per invocation")
+    parser.add_argument("--json", type=pathlib.Path, default=None)
+    parser.add_argument("--csv", type=pathlib.Path, default=None)
+    args = parser.parse_args()
+
+    configure_umbtools()
+    configure_tester()
+    tools = [PrismCLI(), StormCLI(), ModestCLI(), UmbPython("umb"), UmbPython("stream")]
+    check_tools(*tools)
+    with tempfile.TemporaryDirectory() as directory:
+        benchmarks = scale_ladder(pathlib.Path(directory), args.min_states, args.max_states)
+        report = ThroughputSuite(tools, limits=Limits(time=args.time_limit)).run(benchmarks)
+    if args.json is not None:
+        report.write_json(args.json)
+    if args.csv is not None:
+        report.write_csv(args.csv)
+    print(report.summary())
+    for tool, direction in report.superlinear():
+        print(f"WARN: {tool} scales super-linearly in {direction}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,32 @@
 import subprocess
+import contextlib
+import codecs
+import io
+import tarfile
+import gzip
+import lzma
+import bz2
 import pathlib
+import re
+import hashlib
+import copy
+import os
+import signal
+import threading
+import time
+import resource
+import tracemalloc
+import queue
+import atexit
+import contextvars
+import tempfile
 import tomllib
+import json
+import functools
+import importlib
 import logging
-import umbi
+import sys
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
@@ -27,98 +51,1016 @@ def try_parse(log, start, before, after, out_dict, out_key, out_type):
     return start
 
 
-def parse_logfile_storm(log, inv):
-    unsupported_messages = [
-        "ERROR (storm-cli.cpp:49): An exception caused Storm to terminate. The message of the exception is: NotSupportedException: Can not build interval model for the provided value type."
-    ]  # add messages that indicate that the invocation is not supported
-    inv.not_supported = contains_any_of(log, unsupported_messages)
-    memout_messages = []  # add messages that indicate that the invocation is not supported
-    memout_messages.append(
-        "An unexpected exception occurred and caused Storm to terminate. The message of this exception is: std::bad_alloc"
-    )
-    memout_messages.append("Return code:\t-9")
-    inv.memout = contains_any_of(log, memout_messages)
-    known_error_messages = [
-        "ERROR (SparseModelFromUmb.cpp:242): Only state observations are currently supported for POMDP models.",
-        "ERROR (ValueEncoding.h:56): Some values are given as double intervals but a model with a non-interval type is requested.",
-    ]  # add messages that indicate a "known" error, i.e., something that indicates that this is a reported issue.
-    inv.anticipated_error = contains_any_of(log, known_error_messages)
+class LogPatterns:
+    """
+    A fixed set of patterns that is matched against every line of a log with a single compiled regular expression.
+
+    Every pattern is an optional lookahead anchored at the start of the line, such that one match call
+    reports all flags, statistics and the error message that occur in the line.
+    """
+
+    def __init__(
+        self,
+        flags: dict[str, list[str]],
+        statistics: list[tuple[str, str, str, type]] = [],
+        error_marker: str | None = None,
+    ):
+        """
+        :param flags: For every flag, the messages that raise it.
+        :param statistics: Tuples (key, text before the value, regex for the value, type of the value).
+        :param error_marker: Lines containing the marker are errors; the text after the marker is the error message.
+        """
+        self.flag_names = []
+        self.statistics = []
+        parts = []
+        for name, messages in flags.items():
+            if len(messages) == 0:
+                continue
+            alternatives = "|".join(re.escape(m) for m in messages)
+            parts.append(f"(?=(?:.*?(?P<f{len(self.flag_names)}>{alternatives}))?)")
+            self.flag_names.append(name)
+        for key, before, value, out_type in statistics:
+            parts.append(f"(?=(?:.*?{re.escape(before)}(?P<s{len(self.statistics)}>{value}))?)")
+            self.statistics.append((key, out_type))
+        if error_marker is not None:
+            parts.append(f"(?=(?:.*?{re.escape(error_marker)}(?P<e0>.*))?)")
+        self.regex = re.compile("".join(parts))
+
+
+class LogClassifier:
+    """
+    Classifies a log incrementally, line by line, such that the log never has to be kept in memory.
+    Only a bounded tail of the log is retained.
+    """
+
+    default_tail_length = 20
+    default_max_errors = 31
+
+    def __init__(self, patterns: LogPatterns, tail_length=None, max_errors=None):
+        self._patterns = patterns
+        self._max_errors = max_errors or __class__.default_max_errors
+        self.flags = set()
+        self.errors = []
+        self.statistics = dict()
+        self.tail = deque(maxlen=tail_length or __class__.default_tail_length)
+
+    def feed(self, line: str):
+        self.tail.append(line.rstrip("\n"))
+        match = self._patterns.regex.match(line)
+        if match.lastindex is None:
+            return
+        for group, value in match.groupdict().items():
+            if value is None:
+                continue
+            index = int(group[1:])
+            if group[0] == "f":
+                self.flags.add(self._patterns.flag_names[index])
+            elif group[0] == "s":
+                key, out_type = self._patterns.statistics[index]
+                # Only the first report of a statistic counts.
+                if key not in self.statistics:
+                    self.statistics[key] = out_type(value)
+            elif len(self.errors) < self._max_errors:
+                self.errors.append(value.rstrip("\n"))
+
+    def feed_text(self, text: str):
+        for line in text.splitlines(keepends=True):
+            self.feed(line)
+
+
+_storm_log_patterns = LogPatterns(
+    flags={
+        # Messages that indicate that the invocation is not supported.
+        "unsupported": [
+            "ERROR (storm-cli.cpp:49): An exception caused Storm to terminate. The message of the exception is: NotSupportedException: Can not build interval model for the provided value type."
+        ],
+        # Messages that indicate that the invocation ran out of memory.
+        "memout": [
+            "An unexpected exception occurred and caused Storm to terminate. The message of this exception is: std::bad_alloc",
+            "Return code:\t-9",
+        ],
+        # Messages that indicate a "known" error, i.e., something that indicates that this is a reported issue.
+        "known_error": [
+            "ERROR (SparseModelFromUmb.cpp:242): Only state observations are currently supported for POMDP models.",
+            "ERROR (ValueEncoding.h:56): Some values are given as double intervals but a model with a non-interval type is requested.",
+        ],
+    },
+    statistics=[
+        ("model-building-time", "Time for model construction: ", r"[-+.\deE]+", float),
+        ("states", "States: \t", r"\d+", int),
+        ("transitions", "Transitions: \t", r"\d+", int),
+        ("choices", "Choices: \t", r"\d+", int),
+        ("observations", "Observations: \t", r"\d+", int),
+    ],
+    error_marker="ERROR",
+)
+
+
+def classify_storm_log(classifier: LogClassifier, inv):
+    """
+    Fills in the results of a Storm invocation from a classifier that has seen the complete log.
+    """
+    inv.log_tail = tuple(classifier.tail)
+    inv.not_supported = "unsupported" in classifier.flags
+    inv.memout = inv.memout or "memout" in classifier.flags
+    inv.anticipated_error = "known_error" in classifier.flags
     if inv.not_supported or inv.anticipated_error:
         return
     if inv.exit_code not in [0, 1]:
         if not inv.timeout and not inv.memout:
             print(f"WARN: Unexpected return code(s): {inv.exit_code}")
         return
+    inv.errors = tuple(classifier.errors)
+    inv.model_info = dict(classifier.statistics)
+
+
+def parse_logfile_storm(log, inv):
+    classifier = LogClassifier(_storm_log_patterns)
+    classifier.feed_text(log)
+    classify_storm_log(classifier, inv)
+
+
+_modest_log_patterns = LogPatterns(
+    flags={
+        "failure": ["error:"],
+        "unsupported": [
+            "UMB: error: Only deadlock-free MA, MDP, CTMC, DTMC, and LTS models are supported."
+        ],
+        "known_error": [
+            "UMB: error: Models where state 0 is not the initial state are not supported"
+        ],
+    },
+)
 
-    errors = {}
-    pos = 0
-    i = 0
-    while i <= 30:
-        pos = try_parse(
-            log,
-            pos,
-            "ERROR",
-            "\n",
-            errors,
-            i,
-            str,
+
+def classify_modest_log(classifier: LogClassifier, inv):
+    """
+    Fills in the results of a Modest invocation from a classifier that has seen the complete log.
+    """
+    inv.log_tail = tuple(classifier.tail)
+    if "failure" in classifier.flags:
+        inv.exit_code = 1
+    if "unsupported" in classifier.flags:
+        inv.not_supported = True
+    if "known_error" in classifier.flags:
+        inv.anticipated_error = True
+
+
+class Limits:
+    """
+    Resource limits for a single tool invocation.
+    """
+
+    def __init__(self, time=None, memory=None):
+        """
+        :param time: The wall-clock time limit in seconds. If none, there is no time limit.
+        :param memory: The memory limit (resident set size of all processes together) in bytes. If none, there is no memory limit.
+        """
+        self.time = time
+        self.memory = memory
+
+    def merged(self, other):
+        """
+        Combines two limits, where the limits set in other take precedence.
+        """
+        if other is None:
+            return self
+        return Limits(
+            time=other.time if other.time is not None else self.time,
+            memory=other.memory if other.memory is not None else self.memory,
         )
-        if i not in errors:
-            break
-        i = i + 1
-    inv.errors = tuple(errors.values())
-    pos = 0
-    inv.model_info = dict()
-
-    pos = try_parse(
-        log,
-        pos,
-        "Time for model construction: ",
-        "s.",
-        inv.model_info,
-        "model-building-time",
-        float,
-    )
 
-    pos = try_parse(log, pos, "States: \t", "\n", inv.model_info, "states", int)
-    pos = try_parse(
-        log, pos, "Transitions: \t", "\n", inv.model_info, "transitions", int
-    )
-    pos = try_parse(log, pos, "Choices: \t", "\n", inv.model_info, "choices", int)
-    pos = try_parse(
-        log, pos, "Observations: \t", "\n", inv.model_info, "observations", int
-    )
+    def __str__(self):
+        return f"Limits[{self.time},{self.memory}]"
 
 
 class UmbTool:
-    pass
+    """
+    A tool in a chain. Tools that start processes implement the asynchronous methods on run_process_async,
+    and their blocking methods are thin wrappers via run_sync. For tools that only implement the blocking methods,
+    such as in-process tools, the asynchronous methods run them in a thread, see run_blocking.
+    """
 
+    default_limits = Limits()
+    unsupported_model_types = []  # Model types (as in the manifest) that the tool cannot handle at all.
 
-def configure_umbtools():
+    def with_limits(self, limits: Limits):
+        """
+        Creates a copy of this tool, with the given limits overriding the limits of this tool.
+        """
+        result = copy.copy(self)
+        result.limits = self.limits.merged(limits)
+        return result
+
+    async def prism_file_to_umb_async(self, prism_file: pathlib.Path, output_file: pathlib.Path, log_file: pathlib.Path):
+        """
+        Like prism_file_to_umb, but without blocking the event loop. By default, the blocking method runs in a thread, see run_blocking.
+        """
+        return await run_blocking(self.prism_file_to_umb, prism_file, output_file, log_file=log_file)
+
+    async def umb_to_umb_async(self, input_file: pathlib.Path, output_file: pathlib.Path, log_file: pathlib.Path):
+        """
+        Like umb_to_umb, but without blocking the event loop. By default, the blocking method runs in a thread, see run_blocking.
+        """
+        return await run_blocking(self.umb_to_umb, input_file, output_file, log_file=log_file)
+
+    async def check_umb_async(self, umb_file: pathlib.Path, log_file: pathlib.Path, properties=[]):
+        """
+        Like check_umb, but without blocking the event loop. By default, the blocking method runs in a thread, see run_blocking.
+        """
+        return await run_blocking(self.check_umb, umb_file, log_file=log_file, properties=properties)
+
+    async def check_process_async(self):
+        """
+        Like check_process, but without blocking the event loop. By default, the blocking method runs in a thread, see run_blocking.
+        """
+        return await run_blocking(self.check_process)
+
+
+# The content digests of files by location, with the inode, size and modification time at which they were hashed.
+# They are stored next to the probes, see ToolProbes, such that a new process does not hash unchanged tools again.
+_file_digests = None
+_file_digests_location = None
+_file_digests_lock = threading.Lock()
+
+
+def file_digests_location() -> pathlib.Path:
+    probes = pathlib.Path(ToolProbes.default_location)
+    return probes.with_name(probes.stem + "-digests.json")
+
+
+def _read_file_digests(location: pathlib.Path) -> dict[str, list]:
+    try:
+        with open(location, "r") as f:
+            content = json.load(f)
+    except (OSError, ValueError):
+        return dict()
+    return content if isinstance(content, dict) else dict()
+
+
+def _stored_file_digests() -> dict[str, list]:
+    global _file_digests, _file_digests_location
+    location = file_digests_location()
+    if _file_digests is None or _file_digests_location != location:
+        _file_digests = _read_file_digests(location)
+        _file_digests_location = location
+    return _file_digests
+
+
+def _save_file_digests(paths: list[str]):
+    """
+    Merges the digests of the given files into the stored digests, such that concurrent processes do not lose each other's digests.
+    """
+    with _file_digests_lock:
+        digests = _stored_file_digests()
+        location = _file_digests_location
+        stored = _read_file_digests(location)
+        stored.update({path: digests[path] for path in paths})
+        try:
+            location.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=location.parent, prefix=".digests-")
+            with os.fdopen(fd, "w") as f:
+                json.dump(stored, f, sort_keys=True)
+            os.replace(tmp, location)
+        except OSError as e:
+            logger.warning(f"Cannot store the digests of tool files in {location}: {e}")
+
+
+def _file_digest(path: pathlib.Path, stat: os.stat_result, hashed: list[str]) -> str:
+    signature = [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+    with _file_digests_lock:
+        stored = _stored_file_digests().get(path.as_posix())
+    if stored is not None and stored[:3] == signature:
+        return stored[3]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _file_digests_lock:
+        _stored_file_digests()[path.as_posix()] = signature + [digest]
+    hashed.append(path.as_posix())
+    return digest
+
+
+def file_fingerprint(*paths) -> str:
+    """
+    A fingerprint of the content of a set of files or directories, such that rebuilding a tool with the same result keeps its fingerprint.
+    Directories are taken into account with the names and contents of all files below them, so only pass the directories of the tool itself.
+    The digests are stored across runs, see file_digests_location, and a file is only hashed again if its inode, size or modification time changed.
+    Paths that do not exist are included as such.
+
+    :param paths: The files to take into account.
+    :return: A hex digest.
+    """
+    h = hashlib.sha256()
+    hashed = []
+    for path in paths:
+        path = pathlib.Path(path)
+        h.update(path.name.encode())
+        if path.is_dir():
+            for directory, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    file = pathlib.Path(directory) / filename
+                    try:
+                        digest = _file_digest(file, file.stat(), hashed)
+                    except OSError:
+                        # E.g., a dangling link.
+                        digest = "unreadable"
+                    h.update(f":{file.relative_to(path).as_posix()}:{digest}\n".encode())
+        elif path.exists():
+            h.update(f":{_file_digest(path, path.stat(), hashed)}\n".encode())
+        else:
+            h.update(b":missing\n")
+    if hashed:
+        _save_file_digests(hashed)
+    return h.hexdigest()
+
+
+class ProcessOutcome:
+    """
+    The outcome of run_process.
+    """
+
+    def __init__(self):
+        self.returncode = None
+        self.stdout = None
+        self.stderr = None
+        self.timeout = False
+        self.memout = False
+        self.signal = None
+        self.wall_time = None
+        self.user_time = None
+        self.system_time = None
+        self.peak_memory = None
+
+
+def _process_group_rss(pgid: int) -> int:
+    """
+    The total resident set size of all processes in a process group, in bytes.
+    """
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat", "r") as f:
+                stat = f.read()
+            # The command name may contain spaces, the remaining fields start after the closing bracket.
+            fields = stat[stat.rfind(")") + 2 :].split()
+            if int(fields[2]) == pgid:
+                total += int(fields[21]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+# The cgroup (v2) below which run_process creates a cgroup with memory.max for every invocation. If none, the cgroup of this process is tried.
+memory_cgroup = None
+# Messages of processes that failed to allocate memory, by which a process that hit its RLIMIT_DATA is recognized.
+_allocation_failure_markers = [
+    "MemoryError",
+    "std::bad_alloc",
+    "java.lang.OutOfMemoryError",
+    "Could not reserve enough space",
+    "Cannot allocate memory",
+    "cannot map zero-fill pages",
+    "failed to map segment",
+    "Out of memory",
+    "out of memory",
+]
+
+
+@functools.cache
+def _memory_cgroup_parent(configured) -> pathlib.Path | None:
+    """
+    The cgroup below which invocations get a cgroup of their own, or None if there is none with a delegated memory controller.
+    """
+    if configured is None:
+        try:
+            with open("/proc/self/cgroup", "r") as f:
+                lines = [line.strip() for line in f if line.startswith("0::")]
+        except OSError:
+            return None
+        if not lines:
+            return None
+        configured = "/sys/fs/cgroup" + lines[0][3:]
+    path = pathlib.Path(configured)
+    try:
+        controllers = (path / "cgroup.subtree_control").read_text().split()
+    except OSError:
+        return None
+    if "memory" not in controllers or not os.access(path, os.W_OK):
+        return None
+    return path
+
+
+class _MemoryCgroup:
+    """
+    A cgroup (v2) for a single invocation, in which the kernel enforces the memory limit on all processes together.
+    """
+
+    _counter = 0
+    _counter_lock = threading.Lock()
+
+    def __init__(self, path: pathlib.Path, memory: int):
+        self.path = path
+        path.mkdir()
+        (path / "memory.max").write_text(str(memory))
+        try:
+            # Swapping would let the processes exceed the limit unnoticed.
+            (path / "memory.swap.max").write_text("0")
+        except OSError:
+            pass
+        self._procs = (path / "cgroup.procs").as_posix()
+
+    @staticmethod
+    def create(memory: int):
+        """
+        A cgroup with the memory limit, or None if cgroups cannot be used.
+        """
+        parent = _memory_cgroup_parent(memory_cgroup)
+        if parent is None:
+            return None
+        with __class__._counter_lock:
+            __class__._counter += 1
+            name = f"umbtest-{os.getpid()}-{__class__._counter}"
+        try:
+            return _MemoryCgroup(parent / name, memory)
+        except OSError as e:
+            logger.warning(f"Cannot create a cgroup in {parent}: {e}")
+            try:
+                (parent / name).rmdir()
+            except OSError:
+                pass
+            return None
+
+    def wrap(self, invocation: list[str]) -> list[str]:
+        """
+        The invocation, started by a shell that first moves itself into the cgroup, such that all processes start inside it.
+        """
+        return ["/bin/sh", "-c", 'echo $$ > "$0" && exec "$@"', self._procs] + invocation
+
+    def _read_keyed(self, name: str) -> dict[str, int]:
+        try:
+            with open(self.path / name, "r") as f:
+                return {key: int(value) for key, value in (line.split() for line in f)}
+        except (OSError, ValueError):
+            return dict()
+
+    @property
+    def oom_killed(self) -> bool:
+        return self._read_keyed("memory.events").get("oom_kill", 0) > 0
+
+    @property
+    def peak(self) -> int:
+        try:
+            return int((self.path / "memory.peak").read_text())
+        except (OSError, ValueError):
+            # memory.peak is only available since Linux 5.19.
+            return 0
+
+    def remove(self):
+        try:
+            (self.path / "cgroup.kill").write_text("1")
+        except OSError:
+            pass
+        for _ in range(50):
+            try:
+                self.path.rmdir()
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                # The killed processes have not exited yet.
+                time.sleep(0.01)
+        logger.warning(f"Cannot remove the cgroup {self.path}")
+
+
+def _memory_rlimit(invocation: list[str], memory: int) -> list[str]:
+    """
+    The invocation, started by a shell that first limits the data segment, which is inherited by all processes it starts.
+    """
+    return ["/bin/sh", "-c", f'ulimit -d {max(1, memory // 1024)} && exec "$@"', "sh"] + invocation
+
+
+def _kill_process_group(pgid: int):
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class _ProcessGroups:
+    """
+    The process groups that are started on behalf of one asynchronous invocation, see run_blocking.
+    Once cancelled, running groups are killed, and groups that start afterwards are killed immediately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = set()
+        self.cancelled = False
+
+    def add(self, pgid: int):
+        with self._lock:
+            self._groups.add(pgid)
+            cancelled = self.cancelled
+        if cancelled:
+            _kill_process_group(pgid)
+
+    def discard(self, pgid: int):
+        with self._lock:
+            self._groups.discard(pgid)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            groups = list(self._groups)
+        for pgid in groups:
+            _kill_process_group(pgid)
+
+
+_process_groups = contextvars.ContextVar("umbtest_process_groups", default=None)
+
+
+@contextlib.contextmanager
+def _registered_process_group(pgid: int):
+    """
+    Makes the process group known to the asynchronous invocation that started it, if any, such that cancelling the invocation kills it.
+    """
+    groups = _process_groups.get()
+    if groups is None:
+        yield
+        return
+    groups.add(pgid)
+    try:
+        yield
+    finally:
+        groups.discard(pgid)
+
+
+_blocking_executor = None
+_blocking_executor_lock = threading.Lock()
+blocking_workers = 64
+
+
+def _get_blocking_executor():
+    import concurrent.futures
+
+    global _blocking_executor
+    with _blocking_executor_lock:
+        if _blocking_executor is None:
+            _blocking_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=blocking_workers, thread_name_prefix="umbtest-invocation"
+            )
+        return _blocking_executor
+
+
+async def run_blocking(function, *args, **kwargs):
+    """
+    Runs a blocking tool invocation in a thread, such that the event loop can do other work in the meantime.
+    This is the fallback for tools that only implement the blocking API; the command line tools are asynchronous, see run_process_async.
+    If the awaiting task is cancelled, all processes that the invocation started are killed (including their children),
+    the invocation is awaited until it returns, and the cancellation is propagated.
+    In-process work, such as UmbPython, cannot be interrupted and runs to completion.
+    At most umbtest.tools.blocking_workers invocations run at the same time.
+    """
+    import asyncio
+
+    groups = _ProcessGroups()
+    context = contextvars.copy_context()
+    context.run(_process_groups.set, groups)
+    future = asyncio.get_running_loop().run_in_executor(
+        _get_blocking_executor(), context.run, lambda: function(*args, **kwargs)
+    )
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        groups.cancel()
+        # Wait until the thread returned, such that no process outlives the invocation.
+        await asyncio.wait([future])
+        if not future.cancelled():
+            # The outcome of a cancelled invocation is not of interest.
+            future.exception()
+        raise
+
+
+def run_sync(awaitable):
+    """
+    Runs a coroutine to completion and returns its result, which makes the asynchronous API usable from blocking code.
+    If this thread runs an event loop already, e.g., in a notebook, the coroutine runs on a fresh loop in another thread.
+    """
+    # Imported here, as asyncio and concurrent.futures take long to import, which would slow down every import of umbtest.
+    import asyncio
+    import concurrent.futures
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        running = False
+    else:
+        running = True
+    # Outside of the except clause, such that exceptions of the coroutine are not chained to the missing loop.
+    if not running:
+        return asyncio.run(awaitable)
+    context = contextvars.copy_context()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(context.run, asyncio.run, awaitable).result()
+
+
+def run_process(
+    invocation: list[str],
+    limits: Limits | None = None,
+    poll_interval=0.1,
+    log_file: pathlib.Path | None = None,
+    line_handler=None,
+    env=None,
+    rlimit=True,
+) -> ProcessOutcome:
+    """
+    The blocking variant of run_process_async.
+    """
+    return run_sync(run_process_async(invocation, limits, poll_interval, log_file, line_handler, env, rlimit))
+
+
+async def run_process_async(
+    invocation: list[str],
+    limits: Limits | None = None,
+    poll_interval=0.1,
+    log_file: pathlib.Path | None = None,
+    line_handler=None,
+    env=None,
+    rlimit=True,
+) -> ProcessOutcome:
+    """
+    Runs a process in its own process group and enforces the limits on the whole group.
+    This makes sure that also children, such as the JVM started by the prism script, are killed.
+    The output is read, the limits are enforced, and the process is reaped on the event loop, without a thread per process.
+    The process is reaped via wait4 once its pidfd becomes readable, such that its resource usage (including waited-for descendants)
+    is reported. For that reason, it is started by Popen rather than asyncio.create_subprocess_exec, whose child watcher reaps
+    it via waitpid, which loses the resource usage. Without pidfds, wait4 blocks a thread of the default executor.
+    Cancelling the awaiting task kills the process group, and the cancellation is propagated once the process is reaped.
+
+    The memory limit is enforced by the kernel where possible: by a cgroup with memory.max for the whole group, if a cgroup with
+    a delegated memory controller is available (see umbtest.tools.memory_cgroup), and otherwise by RLIMIT_DATA for every process,
+    together with polling the resident set size of the group, which catches groups of processes that exceed the limit together.
+    Both are set up by a shell that execs the command, since preparing the child in Popen is not safe with threads running.
+
+    :param invocation: The command to run.
+    :param limits: The limits to enforce. If none, no limits are enforced.
+    :param poll_interval: Time in seconds between two checks of the limits.
+    :param log_file: If given, stdout is streamed into this file while the process runs, and not kept in the outcome.
+    :param line_handler: If given, called with every line of stdout as soon as it is read.
+    :param env: The environment of the process. If none, the environment of this process.
+    :param rlimit: Whether to use RLIMIT_DATA without cgroup. The JVM reserves its heap at startup and fails under it,
+        so Java tools only rely on polling.
+    :return: The outcome, including output and whether a limit was exceeded.
+    """
+    if limits is None:
+        limits = Limits()
+    outcome = ProcessOutcome()
+    cgroup = None
+    rlimited = False
+    if limits.memory is not None:
+        cgroup = _MemoryCgroup.create(limits.memory)
+        if cgroup is not None:
+            invocation = cgroup.wrap(invocation)
+        elif rlimit:
+            invocation = _memory_rlimit(invocation, limits.memory)
+            rlimited = True
+    start = time.monotonic()
+    try:
+        process = subprocess.Popen(
+            invocation,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+            start_new_session=True,
+            env=env,
+        )
+        with _registered_process_group(process.pid):
+            return await _supervise_process(process, start, outcome, limits, poll_interval, log_file, line_handler, cgroup, rlimited)
+    finally:
+        if cgroup is not None:
+            cgroup.remove()
+
+
+async def _read_lines(pipe, on_line):
+    """
+    Calls on_line with every line read from the pipe, including its line break, until the pipe is closed.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    try:
+        while chunk := await reader.read(1 << 16):
+            *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+            for line in lines:
+                on_line(line + "\n")
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            on_line(pending)
+    finally:
+        transport.close()
+
+
+async def _reap(process):
+    """
+    Waits until the process terminated and reaps it.
+
+    :return: The status and resource usage, as returned by os.wait4.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        _, status, rusage = await loop.run_in_executor(None, os.wait4, process.pid, 0)
+    else:
+        exited = loop.create_future()
+        loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+        try:
+            await exited
+        finally:
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+        _, status, rusage = os.wait4(process.pid, 0)
+    # Popen must not try to reap the process again.
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return status, rusage
+
+
+async def _supervise_process(process, start, outcome, limits, poll_interval, log_file, line_handler, cgroup=None, rlimited=False) -> ProcessOutcome:
+    """
+    Enforces the limits on a process started by run_process_async, streams its output, and reaps it.
+    """
+    import asyncio
+
+    sampled_rss = 0
+    # Without a cgroup, the resident set size of the group is polled.
+    polled = limits.memory is not None and cgroup is None
+    # With RLIMIT_DATA, processes fail to allocate memory instead of being killed.
+    allocation_failed = False
+
+    async def watchdog():
+        nonlocal sampled_rss
+        while True:
+            await asyncio.sleep(poll_interval)
+            if limits.time is not None and time.monotonic() - start > limits.time:
+                outcome.timeout = True
+                _kill_process_group(process.pid)
+                return
+            if polled:
+                rss = _process_group_rss(process.pid)
+                sampled_rss = max(sampled_rss, rss)
+                if rss > limits.memory:
+                    outcome.memout = True
+                    _kill_process_group(process.pid)
+                    return
+
+    def failed_allocation(line):
+        nonlocal allocation_failed
+        if rlimited and not allocation_failed and contains_any_of(line, _allocation_failure_markers):
+            allocation_failed = True
+
+    output = {"stdout": [], "stderr": []}
+    log = open(log_file, "w") if log_file is not None else None
+
+    def on_stdout(line):
+        if log is not None:
+            log.write(line)
+        elif line_handler is None:
+            output["stdout"].append(line)
+        if line_handler is not None:
+            line_handler(line)
+        failed_allocation(line)
+
+    def on_stderr(line):
+        output["stderr"].append(line)
+        failed_allocation(line)
+
+    readers = [
+        asyncio.ensure_future(_read_lines(process.stdout, on_stdout)),
+        asyncio.ensure_future(_read_lines(process.stderr, on_stderr)),
+    ]
+    watchdog_task = None
+    if limits.time is not None or polled:
+        watchdog_task = asyncio.ensure_future(watchdog())
+    reaping = asyncio.ensure_future(_reap(process))
+    try:
+        status, rusage = await asyncio.shield(reaping)
+    finally:
+        # Do not leave any children behind, also if the awaiting task was cancelled.
+        _kill_process_group(process.pid)
+        if watchdog_task is not None:
+            watchdog_task.cancel()
+        await asyncio.wait([reaping] + readers)
+        if log is not None:
+            log.close()
+    outcome.stdout = None if log_file is not None or line_handler is not None else "".join(output["stdout"])
+    outcome.stderr = "".join(output["stderr"])
+    outcome.wall_time = time.monotonic() - start
+    outcome.user_time = rusage.ru_utime
+    outcome.system_time = rusage.ru_stime
+    # On Linux, ru_maxrss is given in kilobytes.
+    outcome.peak_memory = max(rusage.ru_maxrss * 1024, sampled_rss, cgroup.peak if cgroup is not None else 0)
+    outcome.returncode = process.returncode
+    if process.returncode < 0:
+        outcome.signal = -process.returncode
+    if cgroup is not None and cgroup.oom_killed:
+        outcome.memout = True
+    if allocation_failed and process.returncode != 0 and not outcome.timeout:
+        outcome.memout = True
+    return outcome
+
+
+def _file_size(path) -> int | None:
+    if path is None:
+        return None
+    path = pathlib.Path(path)
+    if not path.exists():
+        return None
+    return path.stat().st_size
+
+
+def record_file_sizes(result, input_file=None, output_file=None):
+    """
+    Stores the sizes of the input and output file of an invocation in its results.
+    """
+    result.input_size = _file_size(input_file)
+    result.output_size = _file_size(output_file)
+    return result
+
+
+@functools.cache
+def load_config() -> dict:
+    """
+    The content of tools.toml, which is read only once.
+    """
     path = str(pathlib.Path(__file__).parent.parent / "tools.toml")
     with open(path, "rb") as config_file:
-        paths = tomllib.load(config_file)
-        PrismCLI.default_path = paths["tools"]["prism"]
-        logger.warning(
-            f"Prism is now configured with default location {PrismCLI.default_path}"
-        )
-        StormCLI.default_path = paths["tools"]["storm"]
-        logger.warning(
-            f"Storm is now configured with default location {StormCLI.default_path}"
-        )
-        ModestCLI.default_path = paths["tools"]["modest"]
-        logger.warning(
-            f"Modest is now configured with default location {ModestCLI.default_path}"
-        )
+        return tomllib.load(config_file)
 
 
-def check_tools(*args):
-    for tool in args:
+def configure_umbtools():
+    global memory_cgroup
+    paths = load_config()
+    PrismCLI.default_path = paths["tools"]["prism"]
+    logger.info(
+        f"Prism is now configured with default location {PrismCLI.default_path}"
+    )
+    StormCLI.default_path = paths["tools"]["storm"]
+    logger.info(
+        f"Storm is now configured with default location {StormCLI.default_path}"
+    )
+    ModestCLI.default_path = paths["tools"]["modest"]
+    logger.info(
+        f"Modest is now configured with default location {ModestCLI.default_path}"
+    )
+    if "umbpython" in paths and "isolate" in paths["umbpython"]:
+        UmbPython.default_isolate = paths["umbpython"]["isolate"]
+    if "probes" in paths and "location" in paths["probes"]:
+        ToolProbes.default_location = pathlib.Path(paths["probes"]["location"])
+    if "limits" in paths:
+        memory_cgroup = paths["limits"].get("cgroup", memory_cgroup)
+        UmbTool.default_limits = _limits_from_config(paths["limits"])
+        for tool in [PrismCLI, StormCLI, ModestCLI, UmbPython]:
+            if tool.name in paths["limits"]:
+                tool.default_limits = UmbTool.default_limits.merged(
+                    _limits_from_config(paths["limits"][tool.name])
+                )
+                logger.warning(
+                    f"{tool.name} is now configured with limits {tool.default_limits}"
+                )
+
+
+def _limits_from_config(config) -> Limits:
+    memory = config.get("memory")
+    return Limits(
+        time=config.get("time"),
+        memory=memory * 1024 * 1024 if memory is not None else None,
+    )
+
+
+class ToolProbes:
+    """
+    The tools that passed check_process, stored in a JSON file by tool name and fingerprint.
+    A tool is only probed again if its binary or installation changed, such that the JVM or other processes are not started on every run.
+    Failed probes are not stored.
+    """
+
+    default_location = pathlib.Path(tempfile.gettempdir()) / "umbtest-probes.json"
+
+    def __init__(self, location: pathlib.Path | None = None):
+        """
+        :param location: The file in which successful probes are stored. If none, ToolProbes.default_location is used.
+        """
+        self._location = pathlib.Path(__class__.default_location if location is None else location)
+        self._passed = set()
+        self._lock = threading.Lock()
+
+    @property
+    def location(self) -> pathlib.Path:
+        return self._location
+
+    @staticmethod
+    def key(tool) -> str:
+        return f"{tool.name}:{tool.fingerprint()}"
+
+    def _read(self) -> dict[str, float]:
+        try:
+            with open(self._location, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict()
+
+    def passed(self, tool) -> bool:
+        key = __class__.key(tool)
+        with self._lock:
+            if key in self._passed:
+                return True
+        if key in self._read():
+            with self._lock:
+                self._passed.add(key)
+            return True
+        return False
+
+    def add(self, tool):
+        key = __class__.key(tool)
+        with self._lock:
+            self._passed.add(key)
+            probes = self._read()
+            probes[key] = time.time()
+            self._location.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self._location.parent, prefix=".probes-")
+            with os.fdopen(fd, "w") as f:
+                json.dump(probes, f, indent=1, sort_keys=True)
+            os.replace(tmp, self._location)
+
+    def check(self, tool) -> bool:
+        """
+        Whether the tool works, probing it only if there is no stored probe for its current fingerprint.
+        """
+        if not hasattr(tool, "fingerprint"):
+            return tool.check_process()
+        if self.passed(tool):
+            return True
         if not tool.check_process():
+            return False
+        self.add(tool)
+        return True
+
+
+def check_tools(*args, probes: ToolProbes | None = None):
+    """
+    Raises a RuntimeError if one of the tools does not work. Probes are reused, see ToolProbes.
+
+    :param probes: The stored probes. If none, the probes at ToolProbes.default_location are used.
+    """
+    if probes is None:
+        probes = ToolProbes()
+    for tool in args:
+        if not probes.check(tool):
             raise RuntimeError(f"Tool '{tool.name}' failed")
 
 
 class ReportedResults:
+    """
+    The outcome of a single tool invocation.
+    The fields are fixed, which keeps the many results of a run small, and to_dict and from_dict convert them to JSON-compatible dictionaries.
+    """
+
+    __slots__ = [
+        "timeout",
+        "memout",
+        "not_supported",
+        "anticipated_error",
+        "errors",
+        "exit_code",
+        "model_info",
+        "logfile",
+        "signal",
+        "wall_time",
+        "user_time",
+        "system_time",
+        "peak_memory",
+        "allocated_memory",
+        "allocation_sites",
+        "input_size",
+        "output_size",
+        "log_tail",
+        "handoff",
+        "cached",
+    ]
+
     def __init__(self):
         self.timeout = None
         self.memout = None
@@ -132,19 +1074,122 @@ class ReportedResults:
         self.exit_code = None
         self.model_info = None
         self.logfile = None
+        self.signal = None  # The signal that terminated the process, if any.
+        self.wall_time = None  # In seconds.
+        self.user_time = None  # In seconds.
+        self.system_time = None  # In seconds.
+        self.peak_memory = None  # In bytes.
+        self.allocated_memory = None  # In bytes, the peak memory allocated by Python code, as measured by tracemalloc.
+        self.allocation_sites = tuple()  # The largest allocation sites with the model in memory, as (file:line, bytes, count).
+        self.input_size = None  # In bytes.
+        self.output_size = None  # In bytes.
+        self.log_tail = tuple()  # The last lines of the log.
+        self.handoff = None  # Where the output was handed to the next step: "ram", "disk", or "spilled" (from ram to disk).
+        self.cached = False  # Whether the output was reused from an ArtifactCache, in which case no resources were measured.
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        # Results pickled before the fields were fixed have a plain dictionary as state.
+        if isinstance(state, tuple):
+            state = {**(state[0] or dict()), **(state[1] or dict())}
+        self.__init__()
+        self._assign({name: value for name, value in state.items() if name in __class__.__slots__})
+
+    def to_dict(self) -> dict:
+        """
+        The fields that differ from their defaults, as a JSON-compatible dictionary.
+        """
+        defaults = ReportedResults()
+        content = dict()
+        for name in __class__.__slots__:
+            value = getattr(self, name)
+            if value == getattr(defaults, name):
+                continue
+            if name == "logfile":
+                value = str(value)
+            elif name in ["errors", "log_tail"]:
+                value = list(value)
+            elif name == "allocation_sites":
+                value = [list(site) for site in value]
+            content[name] = value
+        return content
+
+    @staticmethod
+    def from_dict(content: dict):
+        """
+        The inverse of to_dict.
+        """
+        result = ReportedResults()
+        result._assign(content)
+        return result
+
+    def _assign(self, content: dict):
+        for name, value in content.items():
+            if name == "logfile":
+                value = None if value is None else pathlib.Path(value)
+            elif name in ["errors", "log_tail"]:
+                value = tuple(value)
+            elif name == "allocation_sites":
+                value = tuple(tuple(site) for site in value)
+            setattr(self, name, value)
+
+    def forget_resources(self):
+        """
+        Clears the measured resource usage, e.g., of results that are reused rather than measured again.
+        """
+        self.wall_time = None
+        self.user_time = None
+        self.system_time = None
+        self.peak_memory = None
+        self.allocated_memory = None
+        self.allocation_sites = tuple()
+
+    def set_outcome(self, outcome: ProcessOutcome):
+        self.exit_code = outcome.returncode
+        self.timeout = outcome.timeout
+        self.memout = outcome.memout
+        self.signal = outcome.signal
+        self.wall_time = outcome.wall_time
+        self.user_time = outcome.user_time
+        self.system_time = outcome.system_time
+        self.peak_memory = outcome.peak_memory
+
+    def resources(self) -> dict:
+        """
+        The resource usage of the invocation as a flat dictionary.
+        """
+        return {
+            "exit_code": self.exit_code,
+            "timeout": self.timeout,
+            "memout": self.memout,
+            "signal": self.signal,
+            "wall_time": self.wall_time,
+            "user_time": self.user_time,
+            "system_time": self.system_time,
+            "peak_memory": self.peak_memory,
+            "allocated_memory": self.allocated_memory,
+            "input_size": self.input_size,
+            "output_size": self.output_size,
+            "handoff": self.handoff,
+            "cached": self.cached,
+        }
 
     def __str__(self):
-        return f"ReportedResults[{self.logfile},{self.exit_code},{self.model_info},{self.timeout},{self.memout}]"
+        return f"ReportedResults[{self.logfile},{self.exit_code},{self.model_info},{self.timeout},{self.memout},{self.signal},{self.wall_time}]"
 
 class PrismCLI(UmbTool):
     default_path = "/opt/prism"
     name = "PrismCLI"
+    unsupported_model_types = ["ma"]
 
-    def __init__(self, location=None, extra_args=[], custom_identifier=None):
+    def __init__(self, location=None, extra_args=[], custom_identifier=None, limits=None):
         """
         Create an instance of a prism cli tool.
 
         :param location: The location of the prism installation. If none, PrismCLI.default_path is used.
+        :param limits: The resource limits for every invocation. If none, PrismCLI.default_limits is used.
         """
         if location is None:
             self.prism_dir_path = __class__.default_path
@@ -152,6 +1197,7 @@ class PrismCLI(UmbTool):
             self.prism_dir_path = location
         self._extra_args = extra_args
         self._custom_identifier = custom_identifier
+        self.limits = __class__.default_limits if limits is None else limits
 
     @property
     def identifier(self):
@@ -165,84 +1211,61 @@ class PrismCLI(UmbTool):
             raise RuntimeError(f"Prism executable not found at {path}")
         return path
 
-    def get_prism_log_extract_script(self):
-        path = pathlib.Path(self.prism_dir_path) / "prism/etc/scripts/prism-log-extract"
-        if not path.exists():
-            raise RuntimeError(f"Prism log script not found at {path}")
-        return path
+    def fingerprint(self):
+        base = pathlib.Path(self.prism_dir_path) / "prism"
+        # The classes, jars and native libraries on the classpath, see _prism_classpath of PrismWorkerCLI.
+        libraries = sorted(path for pattern in ["*.jar", "*.so", "*.dylib"] for path in (base / "lib").glob(pattern))
+        return file_fingerprint(base / "bin/prism", base / "classes", *libraries)
 
     def _make_invocation(self, args):
         return [self.get_prism_path().as_posix()] + args
 
-    def _call_prism(self, log_file: pathlib.Path, args: list[str]):
+    async def _run_async(self, args: list[str]) -> ProcessOutcome:
+        # The JVM fails at startup under RLIMIT_DATA, see run_process_async.
+        return await run_process_async(self._make_invocation(args), self.limits, rlimit=False)
+
+    async def _call_prism_async(self, log_file: pathlib.Path, args: list[str]):
         args += ["-test"] + self._extra_args
         reported_args = args
         if log_file is not None:
             args = ["-mainlog", log_file.as_posix()] + args
         print(" ".join(self._make_invocation(reported_args)))
-        invocation = self._make_invocation(args)
-
-        subprocess_result = subprocess.run(
-            invocation,
-            capture_output=True,
-            text=True,
-        )
+        outcome = await self._run_async(args)
         reported_result = ReportedResults()
-        reported_result.timeout = None
-        reported_result.memout = None
-        reported_result.exit_code = subprocess_result.returncode
+        reported_result.set_outcome(outcome)
         reported_result.logfile = log_file
         if log_file is not None:
+            if not log_file.exists():
+                # PRISM was terminated before it opened the log.
+                log_file.touch()
             with open(log_file, "r") as log:
-                parse_logfile_prism(log.read(), reported_result)
-            log_subprocess_result = subprocess.run(
-                [
-                    self.get_prism_log_extract_script().as_posix(),
-                    "--fields=import_model_file,states,transitions",
-                    reported_result.logfile,
-                ],
-                capture_output=True,
-                text=True,
-            )
-            if log_subprocess_result.stderr != "":
-                logger.warning(
-                    "Issues parsing logfile:  " + log_subprocess_result.stderr
-                )
-            if log_subprocess_result.returncode != 0:
-                logger.warning(f"Issues parsing logfile yielded error code {log_subprocess_result.returncode}.")
-            try:
-                data = log_subprocess_result.stdout.split("\n")[1].split(",")
-                reported_result.model_info = {
-                    "states": int(data[1]),
-                    "transitions": int(data[2]),
-                }
-            except Exception as e:
-                logger.warning(f"Issues parsing the model info data {data}. Got exception: {e}")
-                reported_result.model_info = {}
+                parse_log_lines_prism(log, reported_result)
 
         return reported_result
 
-    def prism_file_to_umb(
+    async def prism_file_to_umb_async(
         self,
         prism_file: pathlib.Path,
         output_file: pathlib.Path,
         log_file: pathlib.Path,
     ):
-        return self._call_prism(
+        result = await self._call_prism_async(
             log_file,
             [prism_file.as_posix(), "-exportmodel", output_file.as_posix(), "-ex"],
         )
+        return record_file_sizes(result, prism_file, output_file)
 
-    def check_umb(self, umb_file: pathlib.Path, log_file: pathlib.Path, properties=[]):
-        return self._call_prism(log_file, ["-importmodel", umb_file.as_posix()])
+    async def check_umb_async(self, umb_file: pathlib.Path, log_file: pathlib.Path, properties=[]):
+        result = await self._call_prism_async(log_file, ["-importmodel", umb_file.as_posix()])
+        return record_file_sizes(result, umb_file)
 
-    def umb_to_umb(
+    async def umb_to_umb_async(
         self,
         input_file: pathlib.Path,
         output_file: pathlib.Path,
         log_file: pathlib.Path,
     ):
-        return self._call_prism(
+        result = await self._call_prism_async(
             log_file,
             [
                 "-importmodel",
@@ -251,19 +1274,334 @@ class PrismCLI(UmbTool):
                 output_file.as_posix(),
             ],
         )
+        return record_file_sizes(result, input_file, output_file)
 
-    def check_process(self):
-        result = self._call_prism(None, ["-version"])
+    async def check_process_async(self):
+        result = await self._call_prism_async(None, ["-version"])
         return result.exit_code == 0
 
+    def prism_file_to_umb(self, prism_file: pathlib.Path, output_file: pathlib.Path, log_file: pathlib.Path):
+        return run_sync(self.prism_file_to_umb_async(prism_file, output_file, log_file))
+
+    def check_umb(self, umb_file: pathlib.Path, log_file: pathlib.Path, properties=[]):
+        return run_sync(self.check_umb_async(umb_file, log_file, properties))
+
+    def umb_to_umb(self, input_file: pathlib.Path, output_file: pathlib.Path, log_file: pathlib.Path):
+        return run_sync(self.umb_to_umb_async(input_file, output_file, log_file))
+
+    def check_process(self):
+        return run_sync(self.check_process_async())
+
+
+_prism_model_info_patterns = [
+    (re.compile(r"Type:\s+(\S+)"), "model-type", str),
+    (re.compile(r"States:\s+(\d+)(?:\s+\((\d+) initial\))?"), "states", int),
+    (re.compile(r"Transitions:\s+(\d+)"), "transitions", int),
+    (re.compile(r"Choices:\s+(\d+)"), "choices", int),
+]
+_prism_time_pattern = re.compile(r"Time for (.+?): ([-+.\deE]+) sec")
+_prism_timing_names = {
+    "model construction": "model-building-time",
+    "model checking": "model-checking-time",
+}
+
+
+_prism_unsupported_messages = [
+    "smg",
+    "Error: Explicit engine: Intervals not supported for EXACT.",
+    "Error: Unsupported model type TSG in UMB file.",
+]  # add messages that indicate that the invocation is not supported
+
 
 def parse_logfile_prism(log, inv):
-    unsupported_messages = [
-        "smg",
-        "Error: Explicit engine: Intervals not supported for EXACT.",
-        "Error: Unsupported model type TSG in UMB file.",
-    ]  # add messages that indicate that the invocation is not supported
-    inv.not_supported = contains_any_of(log, unsupported_messages)
+    """
+    Parses a PRISM main log in a single pass.
+    Fills in whether the invocation is not supported, the error lines, and in model_info the model type,
+    number of states, initial states, transitions and choices, as well as all reported timings.
+    If the model is reported multiple times, the last report counts.
+    """
+    parse_log_lines_prism(log.splitlines(), inv)
+
+
+def parse_log_lines_prism(lines, inv):
+    """
+    Like parse_logfile_prism, but consumes the log line by line, e.g., directly from an open file.
+    Only a bounded tail of the log is kept.
+    """
+    inv.not_supported = False
+    errors = []
+    model_info = dict()
+    tail = deque(maxlen=LogClassifier.default_tail_length)
+    for line in lines:
+        line = line.rstrip("\n")
+        tail.append(line)
+        if not inv.not_supported and contains_any_of(line, _prism_unsupported_messages):
+            inv.not_supported = True
+        line = line.strip()
+        if line.startswith("Error:"):
+            errors.append(line)
+            continue
+        if line.startswith("Time for "):
+            match = _prism_time_pattern.match(line)
+            if match:
+                name = match.group(1).lower()
+                key = _prism_timing_names.get(name, name.replace(" ", "-") + "-time")
+                model_info[key] = float(match.group(2))
+            continue
+        for pattern, key, out_type in _prism_model_info_patterns:
+            match = pattern.match(line)
+            if match:
+                model_info[key] = out_type(match.group(1))
+                if key == "states" and match.group(2) is not None:
+                    model_info["initial-states"] = int(match.group(2))
+                break
+    inv.errors = tuple(errors)
+    inv.model_info = model_info
+    inv.log_tail = tuple(tail)
+
+
+class _PrismWorkerProcess:
+    """
+    A single long-lived worker process.
+
+    The protocol is line-based: every request is one line with the PRISM arguments separated by tabs,
+    and the worker answers with a line "EXIT <code>" once the invocation is done.
+    """
+
+    def __init__(self, command: list[str]):
+        self._process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            start_new_session=True,
+        )
+        self._responses = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self._process.stdout:
+            self._responses.put(line)
+        # Signals that the worker has terminated.
+        self._responses.put(None)
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def kill(self):
+        _kill_process_group(self._process.pid)
+        self._process.wait()
+
+    def request(self, args: list[str], limits: Limits, poll_interval=0.1) -> ProcessOutcome:
+        # Cancelling an asynchronous invocation kills the worker, which is then replaced.
+        with _registered_process_group(self._process.pid):
+            return self._request(args, limits, poll_interval)
+
+    def _request(self, args: list[str], limits: Limits, poll_interval) -> ProcessOutcome:
+        outcome = ProcessOutcome()
+        start = time.monotonic()
+        try:
+            self._process.stdin.write("\t".join(args) + "\n")
+            self._process.stdin.flush()
+        except BrokenPipeError:
+            pass
+        while True:
+            try:
+                line = self._responses.get(timeout=poll_interval)
+            except queue.Empty:
+                if limits.time is not None and time.monotonic() - start > limits.time:
+                    outcome.timeout = True
+                elif limits.memory is not None and _process_group_rss(self._process.pid) > limits.memory:
+                    outcome.memout = True
+                else:
+                    continue
+                self.kill()
+                outcome.returncode = -signal.SIGKILL
+                break
+            if line is None:
+                # The worker terminated during the request, e.g., by calling System.exit.
+                self._process.wait()
+                outcome.returncode = self._process.returncode
+                break
+            if line.startswith("EXIT "):
+                outcome.returncode = int(line.split()[1])
+                break
+        outcome.wall_time = time.monotonic() - start
+        if outcome.returncode < 0:
+            outcome.signal = -outcome.returncode
+        return outcome
+
+
+class PrismWorkerPool:
+    """
+    A pool of long-lived PRISM worker processes, started on demand.
+    Workers that terminate or exceed their limits are replaced by fresh ones.
+    """
+
+    def __init__(self, command_factory, size: int):
+        """
+        :param command_factory: Called (once) to obtain the command that starts a worker.
+        :param size: The maximal number of workers.
+        """
+        self._command_factory = command_factory
+        self._command = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.Queue()
+        self.started = 0
+        atexit.register(self.close)
+
+    def _get_command(self):
+        with self._lock:
+            if self._command is None:
+                self._command = self._command_factory()
+            return self._command
+
+    def run(self, args: list[str], limits: Limits) -> ProcessOutcome:
+        with self._slots:
+            worker = None
+            while worker is None:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    worker = _PrismWorkerProcess(self._get_command())
+                    self.started += 1
+                if not worker.alive:
+                    worker = None
+            outcome = worker.request(args, limits)
+            if worker.alive:
+                self._idle.put(worker)
+            return outcome
+
+    def close(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.kill()
+
+
+@functools.cache
+def java_feature_version() -> int | None:
+    """
+    The feature version of the java on the path, e.g., 21, or None if it cannot be determined.
+    """
+    try:
+        result = subprocess.run(["java", "-version"], capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', result.stderr)
+    if match is None:
+        return None
+    major = int(match.group(1))
+    # Up to Java 8, versions are reported as 1.8.0.
+    return int(match.group(2) or 0) if major == 1 else major
+
+
+@functools.cache
+def _java_has_security_manager(java_without_security_manager: int) -> bool:
+    version = java_feature_version()
+    if version is not None and version >= java_without_security_manager:
+        logger.warning(f"Java {version} has no security manager, PRISM runs without workers")
+        return False
+    return True
+
+
+class PrismWorkerCLI(PrismCLI):
+    """
+    A drop-in replacement for PrismCLI that sends invocations to a pool of warm JVMs,
+    which avoids the JVM start-up for every invocation.
+    By default, the workers run resources/prism-worker/PrismWorker.java, which is compiled against the PRISM installation on first use.
+    The worker traps the calls of PRISM to System.exit with a security manager, which Java removed in version 24 (JEP 486).
+    With such a Java, the default workers are not used, and PRISM runs as with PrismCLI.
+    """
+
+    name = "PrismWorkerCLI"
+    default_workers = 2
+    # The first Java version without a security manager.
+    java_without_security_manager = 24
+    worker_source = (pathlib.Path(__file__).parent.parent) / "resources" / "prism-worker" / "PrismWorker.java"
+
+    def __init__(self, location=None, extra_args=[], custom_identifier=None, limits=None, workers=None, worker_command=None):
+        """
+        :param workers: The number of worker processes. If none, PrismWorkerCLI.default_workers is used.
+        :param worker_command: The command that starts a worker. If none, the PRISM worker is compiled and used.
+        """
+        super().__init__(location, extra_args, custom_identifier, limits)
+        self._workers = workers
+        self._worker_command = worker_command
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return PrismWorkerPool(
+            self.get_worker_command,
+            __class__.default_workers if self._workers is None else self._workers,
+        )
+
+    def __copy__(self):
+        # Copies, e.g., by with_limits, share the pool.
+        result = object.__new__(type(self))
+        result.__dict__.update(self.__dict__)
+        return result
+
+    def __getstate__(self):
+        # The worker processes cannot be pickled, the unpickled tool gets a pool of its own, which starts its workers on demand.
+        state = dict(self.__dict__)
+        del state["_pool"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pool = self._new_pool()
+
+    def _prism_classpath(self):
+        base = pathlib.Path(self.prism_dir_path) / "prism"
+        # This mirrors the classpath set by the prism script.
+        return ":".join([(base / "lib/prism.jar").as_posix(), (base / "classes").as_posix(), base.as_posix(), (base / "lib/*").as_posix()])
+
+    def get_worker_command(self):
+        if self._worker_command is not None:
+            return self._worker_command
+        build_dir = pathlib.Path(tempfile.gettempdir()) / f"umbtest-prism-worker-{self.fingerprint()[:16]}"
+        if not (build_dir / "PrismWorker.class").exists():
+            build_dir.mkdir(parents=True, exist_ok=True)
+            result = subprocess.run(
+                ["javac", "-cp", self._prism_classpath(), "-d", build_dir.as_posix(), __class__.worker_source.as_posix()],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"Compiling the PRISM worker failed: {result.stderr}")
+        base = pathlib.Path(self.prism_dir_path) / "prism"
+        return [
+            "java",
+            "-Djava.security.manager=allow",
+            f"-Djava.library.path={(base / 'lib').as_posix()}",
+            "-cp",
+            self._prism_classpath() + ":" + build_dir.as_posix(),
+            "PrismWorker",
+        ]
+
+    def _uses_workers(self):
+        return self._worker_command is not None or _java_has_security_manager(__class__.java_without_security_manager)
+
+    def _make_invocation(self, args):
+        if not self._uses_workers():
+            return super()._make_invocation(args)
+        # Only used for reporting, the workers do not need the prism script.
+        return ["PrismWorker"] + args
+
+    async def _run_async(self, args: list[str]) -> ProcessOutcome:
+        if not self._uses_workers():
+            return await super()._run_async(args)
+        # The pool hands out warm workers, which are driven by a thread; cancelling kills the worker, see _PrismWorkerProcess.
+        return await run_blocking(self._pool.run, args, self.limits)
+
+    def close(self):
+        self._pool.close()
 
 
 class ModestCLI(UmbTool):
@@ -271,13 +1609,14 @@ class ModestCLI(UmbTool):
     default_path = "/opt/modest"
     empty_properties_file = (pathlib.Path(__file__).parent.parent) / "resources" / "empty.properties.txt"
 
-    def __init__(self, location=None, extra_args=[], custom_identifier=None):
+    def __init__(self, location=None, extra_args=[], custom_identifier=None, limits=None):
         if location is None:
             self._modest_path = __class__.default_path
         else:
             self._modest_path = location
         self._extra_args = extra_args
         self._custom_identifier = custom_identifier
+        self.limits = __class__.default_limits if limits is None else limits
 
 
 
@@ -293,37 +1632,37 @@ class ModestCLI(UmbTool):
             raise RuntimeError(f"Modest executable not found at {path}")
         return path
 
-    def _call_mcsta(self, log_file, args):
+    def fingerprint(self):
+        # The assemblies of Modest are located next to its executable.
+        binary = pathlib.Path(self._modest_path).resolve()
+        if not binary.is_file():
+            return file_fingerprint(binary)
+        return file_fingerprint(binary, *sorted(binary.parent.glob("*.dll")))
+
+    async def _call_mcsta_async(self, log_file, args):
         invocation = [self.get_modest_path().as_posix(), "mcsta", "-Y"] + args + self._extra_args
         print(" ".join(invocation))
-        result = subprocess.run(
+        classifier = LogClassifier(_modest_log_patterns) if log_file is not None else None
+        result = await run_process_async(
             invocation,
-            capture_output=True,
-            text=True,
+            self.limits,
+            log_file=log_file,
+            line_handler=classifier.feed if classifier is not None else None,
         )
         reported_result = ReportedResults()
-        reported_result.exit_code = result.returncode
-        reported_result.timeout = False
-        reported_result.memout = False
+        reported_result.set_outcome(result)
         reported_result.logfile = log_file
-        if log_file is not None:
-            with open(log_file, "w+") as log:
-                log.write(result.stdout)
-                if "error:" in result.stdout:
-                    reported_result.exit_code = 1
-                if "UMB: error: Only deadlock-free MA, MDP, CTMC, DTMC, and LTS models are supported." in result.stdout:
-                    reported_result.not_supported = True
-                if "UMB: error: Models where state 0 is not the initial state are not supported" in result.stdout:
-                    reported_result.anticipated_error = True
+        if classifier is not None:
+            classify_modest_log(classifier, reported_result)
         return reported_result
 
-    def check_umb(self, umb_file: pathlib.Path, log_file: pathlib.Path, properties=[]):
+    async def check_umb_async(self, umb_file: pathlib.Path, log_file: pathlib.Path, properties=[]):
         args = [umb_file.as_posix(), __class__.empty_properties_file.as_posix(), "-I", "UMB", "--exhaustive", "-D"]
         if properties is not None and len(properties) > 0:
             raise NotImplementedError("The use of properties is not implemented yet.")
-        return self._call_mcsta(log_file, args)
+        return record_file_sizes(await self._call_mcsta_async(log_file, args), umb_file)
 
-    def umb_to_umb(
+    async def umb_to_umb_async(
         self,
         input_file: pathlib.Path,
         output_file: pathlib.Path,
@@ -332,7 +1671,7 @@ class ModestCLI(UmbTool):
         assert log_file is not None
         print(log_file)
         # Note that output_file must end with .umb for this to work.
-        return self._call_mcsta(
+        result = await self._call_mcsta_async(
             log_file=log_file,
             args=[
                 input_file.as_posix(),
@@ -344,23 +1683,34 @@ class ModestCLI(UmbTool):
                 "--exhaustive"
             ],
         )
+        return record_file_sizes(result, input_file, output_file)
 
-    def check_process(self):
-        result = self._call_mcsta(None, ["--version"])
+    async def check_process_async(self):
+        result = await self._call_mcsta_async(None, ["--version"])
         return result.exit_code == 0
 
+    def check_umb(self, umb_file: pathlib.Path, log_file: pathlib.Path, properties=[]):
+        return run_sync(self.check_umb_async(umb_file, log_file, properties))
+
+    def umb_to_umb(self, input_file: pathlib.Path, output_file: pathlib.Path, log_file: pathlib.Path):
+        return run_sync(self.umb_to_umb_async(input_file, output_file, log_file))
+
+    def check_process(self):
+        return run_sync(self.check_process_async())
+
 
 class StormCLI(UmbTool):
     name = "StormCLI"
     default_path = "/opt/storm"
 
-    def __init__(self, location=None, extra_args=[], custom_identifier=None):
+    def __init__(self, location=None, extra_args=[], custom_identifier=None, limits=None):
         if location is None:
             self._storm_path = __class__.default_path
         else:
             self._storm_path = location
         self._extra_args = extra_args
         self._custom_identifier = custom_identifier
+        self.limits = __class__.default_limits if limits is None else limits
 
     @property
     def identifier(self):
@@ -374,33 +1724,38 @@ class StormCLI(UmbTool):
             raise RuntimeError(f"Storm executable not found at {path}")
         return path
 
-    def _call_storm(self, log_file, args):
+    def fingerprint(self):
+        # The shared libraries of a Storm build are located in lib/ next to bin/.
+        binary = pathlib.Path(self._storm_path).resolve()
+        if not binary.is_file():
+            return file_fingerprint(binary)
+        return file_fingerprint(binary, *sorted((binary.parent.parent / "lib").glob("libstorm*")))
+
+    async def _call_storm_async(self, log_file, args):
         invocation = [self.get_storm_path().as_posix()] + args + self._extra_args
         logger.info("Storm invocation: " + " ".join(invocation))
-        result = subprocess.run(
+        classifier = LogClassifier(_storm_log_patterns) if log_file is not None else None
+        result = await run_process_async(
             invocation,
-            capture_output=True,
-            text=True,
+            self.limits,
+            log_file=log_file,
+            line_handler=classifier.feed if classifier is not None else None,
         )
         reported_result = ReportedResults()
-        reported_result.exit_code = result.returncode
-        reported_result.timeout = False
-        reported_result.memout = False
+        reported_result.set_outcome(result)
         reported_result.logfile = log_file
-        if log_file is not None:
-            parse_logfile_storm(result.stdout, reported_result)
-            with open(log_file, "w+") as log:
-                log.write(result.stdout)
+        if classifier is not None:
+            classify_storm_log(classifier, reported_result)
         return reported_result
 
-    def prism_file_to_umb(
+    async def prism_file_to_umb_async(
         self,
         prism_file: pathlib.Path,
         output_file: pathlib.Path,
         log_file: pathlib.Path,
     ):
         # Note that output_file must end with .umb for this to work.
-        return self._call_storm(
+        result = await self._call_storm_async(
             log_file,
             [
                 "--prism",
@@ -411,21 +1766,22 @@ class StormCLI(UmbTool):
                 "-pc",
             ],
         )
+        return record_file_sizes(result, prism_file, output_file)
 
-    def check_umb(self, umb_file: pathlib.Path, log_file=pathlib.Path, properties=[]):
+    async def check_umb_async(self, umb_file: pathlib.Path, log_file=pathlib.Path, properties=[]):
         args = ["--explicit-umb", umb_file.as_posix()]
         if properties is not None and len(properties) > 0:
             args += ["--prop", ";".join(properties)]
-        return self._call_storm(log_file, args)
+        return record_file_sizes(await self._call_storm_async(log_file, args), umb_file)
 
-    def umb_to_umb(
+    async def umb_to_umb_async(
         self,
         input_file: pathlib.Path,
         output_file: pathlib.Path,
         log_file: pathlib.Path
     ):
         # Note that output_file must end with .umb for this to work.
-        return self._call_storm(
+        result = await self._call_storm_async(
             log_file,
             [
                 "--explicit-umb",
@@ -434,49 +1790,299 @@ class StormCLI(UmbTool):
                 output_file.as_posix(),
             ],
         )
+        return record_file_sizes(result, input_file, output_file)
 
-    def check_process(self):
-        result = self._call_storm(None, ["--version"])
+    async def check_process_async(self):
+        result = await self._call_storm_async(None, ["--version"])
         return result.exit_code == 0
 
+    def prism_file_to_umb(self, prism_file: pathlib.Path, output_file: pathlib.Path, log_file: pathlib.Path):
+        return run_sync(self.prism_file_to_umb_async(prism_file, output_file, log_file))
+
+    def check_umb(self, umb_file: pathlib.Path, log_file: pathlib.Path, properties=[]):
+        return run_sync(self.check_umb_async(umb_file, log_file, properties))
+
+    def umb_to_umb(self, input_file: pathlib.Path, output_file: pathlib.Path, log_file: pathlib.Path):
+        return run_sync(self.umb_to_umb_async(input_file, output_file, log_file))
+
+    def check_process(self):
+        return run_sync(self.check_process_async())
+
+
+def _expected_member_sizes(transition_system) -> dict[str, int]:
+    """
+    The sizes in bytes of the members of a UMB file whose size is determined by the index.
+    """
+    sizes = dict()
+    if transition_system.num_states is not None:
+        # Bitvectors are padded to multiples of 64 bits.
+        sizes["state-is-initial.bin"] = (transition_system.num_states + 63) // 64 * 8
+        sizes["state-to-choices.bin"] = (transition_system.num_states + 1) * 8
+    if transition_system.num_choices is not None:
+        sizes["choice-to-branches.bin"] = (transition_system.num_choices + 1) * 8
+    if transition_system.num_branches is not None:
+        sizes["branch-to-target.bin"] = transition_system.num_branches * 8
+    return sizes
+
+
+def _open_decompressed(path: pathlib.Path):
+    """
+    Opens a possibly compressed file for reading, such that decompression happens in bounded chunks.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(6)
+    if magic.startswith(b"\x1f\x8b"):
+        return gzip.open(path, "rb")
+    if magic.startswith(b"\xfd7zXZ"):
+        return lzma.open(path, "rb")
+    if magic.startswith(b"BZh"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def _umbi():
+    """
+    umbi, which is only imported once a UMB file is processed in-process, such that the CLI wrappers load quickly.
+    """
+    return importlib.import_module("umbi")
+
+
+def _parse_umb_index(data: bytes):
+    umbi = _umbi()
+    json_str = umbi.binary.bytes_to_scalar(data, umbi.datatypes.PrimitiveType.STRING)
+    return umbi.umb.index.UmbIndex.from_json(umbi.datatypes.string_to_json(json_str))
+
+
+def read_umb_index(umb_file: pathlib.Path):
+    """
+    Reads only the index of a UMB file. The archive is read until the index is found, which is typically the first member.
+    """
+    with (
+        _open_decompressed(umb_file) as decompressed,
+        tarfile.open(fileobj=decompressed, mode="r|") as tar,
+    ):
+        for member in tar:
+            if member.isfile() and member.name == "index.json":
+                return _parse_umb_index(tar.extractfile(member).read())
+    raise RuntimeError(f"{umb_file} does not contain an index")
+
+
+def stream_umb(input_file: pathlib.Path, output_file: pathlib.Path):
+    """
+    Rewrites a UMB file member by member, without decoding the model.
+    Only the index is parsed, validated and rewritten (with umbi as the writing tool); all other members are copied byte for byte.
+    The sizes of the members that are determined by the index are validated against the index.
+    Memory usage is bounded by the size of the index, independent of the size of the model.
+
+    :return: The index of the UMB file.
+    """
+    index = None
+    member_sizes = dict()
+    with (
+        _open_decompressed(input_file) as decompressed,
+        tarfile.open(fileobj=decompressed, mode="r|") as tar_in,
+        tarfile.open(os.fspath(output_file), mode="w|gz") as tar_out,
+    ):
+        for member in tar_in:
+            if not member.isfile():
+                continue
+            member_sizes[member.name] = member.size
+            if member.name != "index.json":
+                tar_out.addfile(member, tar_in.extractfile(member))
+                continue
+            index = _parse_umb_index(tar_in.extractfile(member).read())
+            index.validate()
+            umbi = _umbi()
+            index.file_data = umbi.umb.index.umbi_file_data()
+            data = umbi.binary.scalar_to_bytes(
+                umbi.datatypes.json_to_string(index.to_json()), umbi.datatypes.PrimitiveType.STRING
+            )
+            info = tarfile.TarInfo(name=member.name)
+            info.size = len(data)
+            info.mtime = member.mtime
+            tar_out.addfile(info, io.BytesIO(data))
+    if index is None:
+        raise RuntimeError(f"{input_file} does not contain an index")
+    for name, size in _expected_member_sizes(index.transition_system).items():
+        if name in member_sizes and member_sizes[name] != size:
+            raise RuntimeError(f"{name} in {input_file} has {member_sizes[name]} bytes, but the index requires {size} bytes")
+    return index
+
+
+# The number of traced blocks that are running, see trace_peak_memory, and whether they started tracing.
+# The lock is only held to start and stop tracing, not while the blocks run.
+_traced_blocks = 0
+_started_tracing = False
+_tracemalloc_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def trace_peak_memory():
+    """
+    Measures the peak memory allocated by Python code while the block runs, via tracemalloc.
+    Tracing is global to the process: traced blocks in different threads share it, and it stops once the last of them is left.
+    The peak of a block therefore includes the allocations of all threads that run at the same time.
+    For a peak of its own, trace in a separate process, see UmbPython with isolate=True.
+
+    :return: A dict whose "peak" is the peak in bytes once the block is left.
+    """
+    global _traced_blocks, _started_tracing
+    with _tracemalloc_lock:
+        if _traced_blocks == 0:
+            _started_tracing = not tracemalloc.is_tracing()
+            if _started_tracing:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+        _traced_blocks += 1
+    traced = {"peak": None}
+    try:
+        yield traced
+    finally:
+        with _tracemalloc_lock:
+            traced["peak"] = tracemalloc.get_traced_memory()[1]
+            _traced_blocks -= 1
+            if _traced_blocks == 0 and _started_tracing:
+                tracemalloc.stop()
+
 
 class UmbPython(UmbTool):
     name = "umbilib"
+    default_isolate = False
+    track_memory = True
+    allocation_sites = 10
 
-    def __init__(self, mode="umb"):
+    def __init__(self, mode="umb", limits=None, trace_memory=None, isolate=None):
         """
-        :param mode: Either ats or umb
+        :param mode: Either ats, umb, or stream. In stream mode, the file is rewritten without decoding the model, see stream_umb.
+        :param limits: Resource limits. These are only enforced if the transformation is isolated.
+        :param trace_memory: Report the peak memory allocated during the transformation, as measured by tracemalloc. This slows down the transformation.
+            If none, memory is only traced if the transformation is isolated, where the tracing does not affect other threads.
+        :param isolate: Run the transformation in a separate Python process, which is killed if it exceeds the limits, such that a memory blow-up is reported as a memout.
+            The peak memory is then the resident set size of that process, and its largest allocation sites are reported as well.
+            If none, UmbPython.default_isolate is used.
         """
         self._mode = mode
+        self.limits = __class__.default_limits if limits is None else limits
+        self._isolate = __class__.default_isolate if isolate is None else isolate
+        self._trace_memory = self._isolate if trace_memory is None else trace_memory
+
+    @property
+    def identifier(self):
+        return self.name + "(" + self._mode + ")"
+
+    def fingerprint(self):
+        # The installed version can be determined without importing umbi.
+        import importlib.metadata
+
+        return f"umbi-{importlib.metadata.version('umbi')}"
 
     def check_process(self):
         return True
 
-    def umb_to_umb(
-        self,
-        input_file: pathlib.Path,
-        output_file: pathlib.Path,
-        log_file: pathlib.Path
-    ):
+    def _transform(self, input_file: pathlib.Path, output_file: pathlib.Path, on_read=None):
+        """
+        :param on_read: If given, called once the model is in memory, before it is written.
+        """
+        umbi = _umbi()
+        if on_read is None:
+            on_read = lambda: None
         if self._mode == "ats":
             ats = umbi.ats.read(input_file, strict=True)
+            on_read()
             umbi.ats.write(ats, output_file)
-            reported_results = ReportedResults()
-            reported_results.exit_code = 0
-            reported_results.model_info = {
+            return {
                 "states": ats.num_states,
                 "transitions": ats.num_branches,
             }
-            return reported_results
         elif self._mode == "umb":
             umb = umbi.umb.read(input_file, strict=True)
+            on_read()
             umbi.umb.write(umb, output_file)
-            reported_results = ReportedResults()
-            reported_results.exit_code = 0
-            reported_results.model_info = {
+            return {
                 "states": umb.index.transition_system.num_states,
                 "transitions": umb.index.transition_system.num_branches,
             }
-            return reported_results
+        elif self._mode == "stream":
+            index = stream_umb(input_file, output_file)
+            on_read()
+            return {
+                "states": index.transition_system.num_states,
+                "transitions": index.transition_system.num_branches,
+            }
         else:
             raise RuntimeError("Unknown mode")
+
+    def umb_to_umb(
+        self,
+        input_file: pathlib.Path,
+        output_file: pathlib.Path,
+        log_file: pathlib.Path
+    ):
+        if self._isolate:
+            return run_sync(self._isolated_umb_to_umb_async(input_file, output_file, log_file))
+        with trace_peak_memory() if self._trace_memory else contextlib.nullcontext() as traced:
+            # CPU times are taken for the current thread only, such that concurrent transformations do not interfere.
+            usage_before = resource.getrusage(resource.RUSAGE_THREAD)
+            start = time.monotonic()
+            try:
+                model_info = self._transform(input_file, output_file)
+            finally:
+                wall_time = time.monotonic() - start
+                usage_after = resource.getrusage(resource.RUSAGE_THREAD)
+        peak_memory = traced["peak"] if traced is not None else None
+        reported_results = ReportedResults()
+        reported_results.exit_code = 0
+        reported_results.timeout = False
+        reported_results.memout = False
+        reported_results.model_info = model_info
+        reported_results.wall_time = wall_time
+        reported_results.user_time = usage_after.ru_utime - usage_before.ru_utime
+        reported_results.system_time = usage_after.ru_stime - usage_before.ru_stime
+        reported_results.peak_memory = peak_memory
+        reported_results.allocated_memory = peak_memory
+        return record_file_sizes(reported_results, input_file, output_file)
+
+    async def umb_to_umb_async(self, input_file: pathlib.Path, output_file: pathlib.Path, log_file: pathlib.Path):
+        """
+        Like umb_to_umb. An isolated transformation runs as a child process, which is killed if the awaiting task is cancelled.
+        An in-process transformation runs in a thread, see run_blocking, and cannot be interrupted.
+        """
+        if self._isolate:
+            return await self._isolated_umb_to_umb_async(input_file, output_file, log_file)
+        return await run_blocking(self.umb_to_umb, input_file, output_file, log_file=log_file)
+
+    async def _isolated_umb_to_umb_async(self, input_file: pathlib.Path, output_file: pathlib.Path, log_file: pathlib.Path):
+        """
+        Runs the transformation in a child process, see umbtest.isolated, which reports its results in a JSON file next to the output.
+        """
+        result_file = pathlib.Path(str(output_file) + ".result.json")
+        invocation = [
+            sys.executable, "-m", "umbtest.isolated", self._mode,
+            pathlib.Path(input_file).resolve().as_posix(),
+            pathlib.Path(output_file).resolve().as_posix(),
+            result_file.resolve().as_posix(),
+            "--sites", str(__class__.allocation_sites if self._trace_memory else 0),
+        ]
+        root = pathlib.Path(__file__).parent.parent.resolve().as_posix()
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([root] + [p for p in [os.environ.get("PYTHONPATH")] if p]))
+        outcome = await run_process_async(invocation, self.limits, log_file=log_file, env=env)
+        reported_results = ReportedResults()
+        reported_results.set_outcome(outcome)
+        reported_results.logfile = log_file
+        try:
+            with open(result_file, "r") as f:
+                child = json.load(f)
+            result_file.unlink()
+        except (OSError, ValueError):
+            child = None
+        if child is not None:
+            reported_results.model_info = child["model_info"]
+            reported_results.allocated_memory = child["allocated_memory"]
+            reported_results.allocation_sites = tuple(tuple(site) for site in child["allocation_sites"])
+        elif log_file is not None and log_file.exists():
+            with open(log_file, "r") as log:
+                tail = deque(log, maxlen=LogClassifier.default_tail_length)
+            reported_results.log_tail = tuple(line.rstrip("\n") for line in tail)
+            reported_results.errors = tuple(line for line in reported_results.log_tail[-1:] if line)
+        return record_file_sizes(reported_results, input_file, output_file)
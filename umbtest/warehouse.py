@@ -0,0 +1,324 @@
+import atexit
+import json
+import os
+import pathlib
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+import logging
+
+from umbtest.tools import ReportedResults
+
+logger = logging.getLogger(__name__)
+
+stages = ["loader", "transformer", "checker"]
+
+_schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    host TEXT,
+    label TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs(id),
+    time REAL NOT NULL,
+    chain TEXT NOT NULL,
+    benchmark TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    args TEXT,
+    fingerprint TEXT,
+    exit_code INTEGER,
+    timeout INTEGER,
+    memout INTEGER,
+    not_supported INTEGER,
+    anticipated_error INTEGER,
+    signal INTEGER,
+    wall_time REAL,
+    user_time REAL,
+    system_time REAL,
+    peak_memory INTEGER,
+    allocated_memory INTEGER,
+    input_size INTEGER,
+    output_size INTEGER,
+    handoff TEXT,
+    states INTEGER,
+    transitions INTEGER,
+    errors TEXT,
+    model_info TEXT
+);
+-- Covers the aggregation of wall times per tool and benchmark, without reading the rows.
+CREATE INDEX IF NOT EXISTS results_tool_benchmark ON results (tool, stage, benchmark, time, exit_code, wall_time);
+CREATE INDEX IF NOT EXISTS results_benchmark ON results (benchmark, time);
+CREATE INDEX IF NOT EXISTS results_time ON results (time);
+CREATE INDEX IF NOT EXISTS results_run ON results (run);
+"""
+
+# The columns of the results table that are inserted, in the order of the insert statement.
+columns = [
+    "run",
+    "time",
+    "chain",
+    "benchmark",
+    "stage",
+    "tool",
+    "args",
+    "fingerprint",
+    "exit_code",
+    "timeout",
+    "memout",
+    "not_supported",
+    "anticipated_error",
+    "signal",
+    "wall_time",
+    "user_time",
+    "system_time",
+    "peak_memory",
+    "allocated_memory",
+    "input_size",
+    "output_size",
+    "handoff",
+    "states",
+    "transitions",
+    "errors",
+    "model_info",
+]
+
+# Columns that can be aggregated and grouped by, which are the only ones that are inserted into queries as names.
+_metrics = {"wall_time", "user_time", "system_time", "peak_memory", "allocated_memory", "input_size", "output_size", "states", "transitions"}
+_keys = {"run", "chain", "benchmark", "stage", "tool", "fingerprint", "handoff", "exit_code"}
+
+
+class _Median:
+    """
+    The median as an SQLite aggregate function.
+    """
+
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        return statistics.median(self.values) if self.values else None
+
+
+def _tool_fields(tool) -> tuple[str, str, str | None]:
+    fingerprint = getattr(tool, "fingerprint", None)
+    return (
+        str(getattr(tool, "identifier", tool.name)),
+        json.dumps(list(getattr(tool, "_extra_args", []))),
+        fingerprint() if fingerprint is not None else None,
+    )
+
+
+class ResultsWarehouse:
+    """
+    Every stage result of every run, stored in an SQLite database for the analysis across runs.
+
+    Every ResultsWarehouse object that adds results is a run. Rows are inserted in batches,
+    and the rows that were not yet inserted are written by flush, when the batch is full, and at exit.
+    The database uses write-ahead logging, such that concurrent pytest workers can write to the same file.
+    """
+
+    def __init__(self, location: pathlib.Path, label: str | None = None, batch_size=500):
+        """
+        :param location: The SQLite database file. It is created if necessary.
+        :param label: A description of the run, e.g., the git revision.
+        :param batch_size: The number of rows that are inserted at once.
+        """
+        self._location = pathlib.Path(location)
+        self._label = label
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._connection = None
+        self._run = None
+        self._pending = []
+        self._pid = os.getpid()
+        atexit.register(self.flush)
+
+    def __getstate__(self):
+        # The connection cannot be sent to another process; there, rows are inserted right away, as the process may exit without cleanup.
+        state = dict(self.__dict__)
+        del state["_lock"]
+        # All processes add to the same run.
+        state["_run"] = self._run_id()
+        state["_connection"] = None
+        state["_pending"] = []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def location(self) -> pathlib.Path:
+        return self._location
+
+    def __str__(self):
+        return f"ResultsWarehouse[{self._location}]"
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._location.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self._location, timeout=60, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_schema)
+            connection.create_aggregate("median", 1, _Median)
+            self._connection = connection
+        return self._connection
+
+    def _run_id(self) -> int:
+        if self._run is None:
+            with self._connect() as connection:
+                cursor = connection.execute(
+                    "INSERT INTO runs (started, host, label) VALUES (?, ?, ?)", (time.time(), socket.gethostname(), self._label)
+                )
+            self._run = cursor.lastrowid
+        return self._run
+
+    def add(self, tester, benchmark, results: dict[str, ReportedResults]):
+        """
+        Adds one row per stage that was executed. Stages reused from an ArtifactCache were not measured and are left out.
+
+        :param results: The results as returned by Tester.check_benchmark.
+        """
+        now = time.time()
+        rows = []
+        for stage in stages:
+            result = results.get(stage)
+            if result is None or result.cached:
+                continue
+            tool, args, fingerprint = _tool_fields(tester.chain[stage])
+            model_info = result.model_info or dict()
+            rows.append(
+                [
+                    now,
+                    str(tester.id),
+                    str(benchmark.id),
+                    stage,
+                    tool,
+                    args,
+                    fingerprint,
+                    result.exit_code,
+                    result.timeout,
+                    result.memout,
+                    result.not_supported,
+                    result.anticipated_error,
+                    result.signal,
+                    result.wall_time,
+                    result.user_time,
+                    result.system_time,
+                    result.peak_memory,
+                    result.allocated_memory,
+                    result.input_size,
+                    result.output_size,
+                    result.handoff,
+                    model_info.get("states"),
+                    model_info.get("transitions"),
+                    json.dumps(list(result.errors)) if result.errors else None,
+                    json.dumps(model_info) if model_info else None,
+                ]
+            )
+        with self._lock:
+            self._pending.extend(rows)
+            if len(self._pending) >= self._batch_size or os.getpid() != self._pid:
+                self._flush()
+
+    def flush(self):
+        """
+        Inserts all pending rows.
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        run = self._run_id()
+        placeholders = ", ".join("?" * len(columns))
+        with self._connect() as connection:
+            connection.executemany(
+                f"INSERT INTO results ({', '.join(columns)}) VALUES ({placeholders})", [[run] + row for row in self._pending]
+            )
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def query(self, sql: str, parameters=()) -> dict[str, list]:
+        """
+        Runs a query and returns its result by column, e.g., for numpy.asarray or pandas.DataFrame.
+        Pending rows are inserted first. The aggregate function median is available in queries.
+        """
+        self.flush()
+        with self._lock:
+            cursor = self._connect().execute(sql, parameters)
+            names = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+        return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+    @staticmethod
+    def _where(tool=None, stage=None, benchmark=None, days=None, successful=False) -> tuple[str, list]:
+        conditions, parameters = [], []
+        for column, value in [("tool", tool), ("stage", stage), ("benchmark", benchmark)]:
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if days is not None:
+            conditions.append("time >= ?")
+            parameters.append(time.time() - days * 24 * 3600)
+        if successful:
+            conditions.append("exit_code = 0")
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", parameters
+
+    def results(self, tool=None, stage=None, benchmark=None, days=None, successful=False, fields=None) -> dict[str, list]:
+        """
+        The rows that match the criteria, by column.
+
+        :param days: Only results of the last days.
+        :param successful: Only results with exit code 0.
+        :param fields: The columns to return. If none, all columns.
+        """
+        names = columns if fields is None else [name for name in fields if name in columns]
+        where, parameters = __class__._where(tool, stage, benchmark, days, successful)
+        return self.query(f"SELECT {', '.join(names)} FROM results{where} ORDER BY time", parameters)
+
+    def aggregate(
+        self, metric="wall_time", function="median", by=("tool", "benchmark"), tool=None, stage=None, benchmark=None, days=None, successful=True
+    ) -> dict[str, list]:
+        """
+        Aggregates a metric per group, e.g., the median import time of Storm per benchmark in the last 30 days is
+        aggregate("wall_time", "median", ("benchmark",), tool="Storm", stage="checker", days=30).
+
+        :param function: median, avg, min, max or count.
+        :return: The group columns, the aggregate as column "value", and the number of results as column "n".
+        """
+        if metric not in _metrics or function not in ["median", "avg", "min", "max", "count"] or not set(by) <= _keys:
+            raise ValueError(f"Cannot aggregate {metric} with {function} by {by}")
+        where, parameters = __class__._where(tool, stage, benchmark, days, successful)
+        group = ", ".join(by)
+        return self.query(
+            f"SELECT {group}, {function}({metric}) AS value, count({metric}) AS n FROM results{where} GROUP BY {group} ORDER BY {group}",
+            parameters,
+        )
+
+    def dataframe(self, **criteria):
+        """
+        The results that match the criteria, see results, as a pandas DataFrame.
+        """
+        # pandas is only needed for this method.
+        import pandas
+
+        return pandas.DataFrame(self.results(**criteria))
@@ -0,0 +1,527 @@
+"""
+Runs (chain, benchmark) jobs on workers on several hosts, which share a directory with the coordinator.
+
+The coordinator, a QueueRunner, writes every job as a JSON file to the queue. A worker claims a job by moving it to leases/,
+runs it with the tools and settings of its own tools.toml, and writes the results to results/.
+Start workers with `python -m umbtest.workqueue worker <directory>` on every host.
+Tools other than the command line tools of umbtest.tools are pickled. Workers only load them, and only use the commands for PRISM workers
+of the jobs, with `--trust-queue`, as everyone who can write to the directory can then run code on the workers.
+"""
+
+import argparse
+import base64
+import json
+import os
+import pathlib
+import pickle
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+import logging
+
+from umbtest.benchmarks import MatrixRunner, Tester, UmbBenchmark, prism_files, _run_matrix_job
+from umbtest.cache import file_hash
+from umbtest.journal import results_from_dict, results_to_dict
+from umbtest.schedule import job_key, longest_first
+from umbtest.tools import Limits, ModestCLI, PrismCLI, PrismWorkerCLI, StormCLI, UmbPython
+
+logger = logging.getLogger(__name__)
+
+# Tools that are created from their arguments on the worker, such that they use the paths of its tools.toml.
+_known_tools = {tool.__name__: tool for tool in [PrismCLI, PrismWorkerCLI, StormCLI, ModestCLI, UmbPython]}
+# The constructor arguments of the known tools that a job may set, with their types.
+_cli_args = {"extra_args": list, "custom_identifier": (str, type(None))}
+_known_tool_args = {
+    "PrismCLI": _cli_args,
+    "PrismWorkerCLI": _cli_args | {"workers": (int, type(None)), "worker_command": (list, type(None))},
+    "StormCLI": _cli_args,
+    "ModestCLI": _cli_args,
+    "UmbPython": {"mode": str, "trace_memory": (bool, type(None)), "isolate": (bool, type(None))},
+}
+
+
+def _limits_to_dict(limits: Limits | None) -> dict | None:
+    return None if limits is None else {"time": limits.time, "memory": limits.memory}
+
+
+def _limits_from_dict(content: dict | None) -> Limits | None:
+    return None if content is None else Limits(**content)
+
+
+def tool_to_dict(tool) -> dict:
+    """
+    A description of the tool from which a worker creates the same tool with its own configuration.
+    Limits are only included if they differ from the default limits of the tool class.
+    Tools of other classes are pickled, such that their module must be importable on the workers, which must trust the queue.
+    """
+    # CachedTool and throttled tools are recreated on the worker as needed.
+    tool = getattr(tool, "_tool", tool)
+    cls = type(tool)
+    if cls.__name__ not in _known_tools or _known_tools[cls.__name__] is not cls:
+        return {"pickle": base64.b64encode(pickle.dumps(tool)).decode()}
+    if cls is UmbPython:
+        isolate = None if tool._isolate == UmbPython.default_isolate else tool._isolate
+        args = {"mode": tool._mode, "trace_memory": tool._trace_memory, "isolate": isolate}
+    else:
+        args = {"extra_args": list(tool._extra_args), "custom_identifier": tool._custom_identifier}
+    if cls is PrismWorkerCLI:
+        worker_command = None if tool._worker_command is None else list(tool._worker_command)
+        args.update({"workers": tool._workers, "worker_command": worker_command})
+    limits = None if tool.limits is cls.default_limits else _limits_to_dict(tool.limits)
+    return {"class": cls.__name__, "args": args, "limits": limits}
+
+
+def tool_from_dict(content: dict, trusted=False):
+    """
+    The tool described by tool_to_dict.
+
+    :param trusted: Whether the description may run code of its choice, i.e., unpickle a tool or set the command of the PRISM workers.
+        Otherwise, only the known tools are created, from arguments of the expected types.
+    """
+    if "pickle" in content:
+        if not trusted:
+            raise RuntimeError("The job describes a pickled tool, which is only loaded from a trusted queue")
+        return pickle.loads(base64.b64decode(content["pickle"]))
+    if content.get("class") not in _known_tools:
+        raise RuntimeError(f"Unknown tool {content.get('class')}")
+    expected = _known_tool_args[content["class"]]
+    for name, value in content["args"].items():
+        if name not in expected or not isinstance(value, expected[name]):
+            raise RuntimeError(f"Invalid argument {name} of {content['class']}")
+        if isinstance(value, list) and not all(isinstance(item, str) for item in value):
+            raise RuntimeError(f"Invalid argument {name} of {content['class']}")
+    if content["args"].get("worker_command") is not None and not trusted:
+        raise RuntimeError("The job sets the command of the PRISM workers, which is only used from a trusted queue")
+    return _known_tools[content["class"]](limits=_limits_from_dict(content["limits"]), **content["args"])
+
+
+def job_to_dict(tester: Tester, benchmark: UmbBenchmark) -> dict:
+    return {
+        "tester": {
+            "id": tester._id,
+            "limits": _limits_to_dict(tester._limits),
+            "compare": tester._compare,
+            "chain": {stage: None if tool is None else tool_to_dict(tool) for stage, tool in tester.chain.items()},
+        },
+        "benchmark": {
+            "id": str(benchmark.id),
+            "name": pathlib.Path(benchmark.location).name,
+            "properties": None if benchmark.properties is None else list(benchmark.properties),
+            "is_prism_file": benchmark.is_prism_file,
+            "hash": file_hash(benchmark.location),
+        },
+    }
+
+
+class WorkQueue:
+    """
+    A queue of jobs in a directory that is shared by a coordinator and its workers, e.g., via NFS.
+
+    Every job is a JSON file that is moved from jobs/ to leases/ by the worker that claims it. As the move is a rename, only one worker gets the job.
+    The lease is named after the job and a fresh token, such that a worker only ever renews or completes its own claim.
+    Workers renew their lease by touching the file while the job runs. A lease that was not renewed for lease_timeout seconds is returned to jobs/,
+    such that the jobs of crashed workers run again, at most max_attempts times. The results of a worker that lost its lease are dropped.
+    Benchmarks are copied to models/, for workers that do not have the same benchmark files.
+    """
+
+    default_lease_timeout = 300
+    default_max_attempts = 3
+
+    def __init__(self, location: pathlib.Path):
+        """
+        :param location: The directory of the queue. Its settings are read from queue.json, see WorkQueue.create.
+        """
+        self._location = pathlib.Path(location)
+        try:
+            with open(self._location / "queue.json", "r") as f:
+                settings = json.load(f)
+        except (OSError, ValueError):
+            settings = dict()
+        self.lease_timeout = settings.get("lease_timeout", __class__.default_lease_timeout)
+        self.max_attempts = settings.get("max_attempts", __class__.default_max_attempts)
+
+    @staticmethod
+    def create(location: pathlib.Path, lease_timeout=None, max_attempts=None):
+        """
+        Creates the directories of a queue and stores its settings.
+        """
+        location = pathlib.Path(location)
+        for name in ["jobs", "leases", "results", "models"]:
+            (location / name).mkdir(parents=True, exist_ok=True)
+        settings = {
+            "lease_timeout": WorkQueue.default_lease_timeout if lease_timeout is None else lease_timeout,
+            "max_attempts": WorkQueue.default_max_attempts if max_attempts is None else max_attempts,
+        }
+        _write_json(location / "queue.json", settings)
+        (location / "stop").unlink(missing_ok=True)
+        return WorkQueue(location)
+
+    @property
+    def location(self) -> pathlib.Path:
+        return self._location
+
+    def _path(self, directory: str, job_id: str) -> pathlib.Path:
+        return self._location / directory / f"{job_id}.json"
+
+    def _lease_path(self, job_id: str, lease: str) -> pathlib.Path:
+        return self._location / "leases" / f"{job_id}.{lease}.json"
+
+    def put(self, job_id: str, content: dict):
+        content.setdefault("attempts", 0)
+        _write_json(self._path("jobs", job_id), content)
+
+    def add_model(self, location: pathlib.Path, content_hash: str):
+        target = self._location / "models" / content_hash / pathlib.Path(location).name
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+            shutil.copyfile(location, tmp)
+            os.replace(tmp, target)
+
+    def model(self, content_hash: str, name: str) -> pathlib.Path:
+        return self._location / "models" / content_hash / name
+
+    def claim(self) -> tuple[str, str, dict] | None:
+        """
+        Claims the first job, in the order of the job ids.
+
+        :return: The id of the job, the token of the lease, and the description of the job, or None if there is no job.
+        """
+        for path in sorted((self._location / "jobs").glob("*.json")):
+            token = uuid.uuid4().hex
+            lease = self._lease_path(path.stem, token)
+            try:
+                # The lease starts now, not when the job was queued.
+                os.utime(path)
+                os.rename(path, lease)
+            except FileNotFoundError:
+                # Another worker was faster.
+                continue
+            os.utime(lease)
+            with open(lease, "r") as f:
+                return path.stem, token, json.load(f)
+        return None
+
+    def renew(self, job_id: str, lease: str) -> bool:
+        """
+        Renews the lease of a job.
+
+        :return: False if the lease was lost, because it expired.
+        """
+        try:
+            os.utime(self._lease_path(job_id, lease))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def complete(self, job_id: str, content: dict, lease: str | None = None) -> bool:
+        """
+        Stores the results of a job and ends its lease.
+
+        :param lease: The token of the lease of the worker. If none, the job is completed by the coordinator, e.g., as it failed too often.
+        :return: False if the lease was lost, because it expired. Then the results are dropped, as the job runs again.
+        """
+        if lease is not None:
+            # Taking the lease away is atomic, such that it is either completed here or reclaimed, see reclaim_expired.
+            completing = self._location / f".complete-{uuid.uuid4().hex}"
+            try:
+                os.rename(self._lease_path(job_id, lease), completing)
+            except FileNotFoundError:
+                return False
+            completing.unlink()
+        _write_json(self._path("results", job_id), content)
+        return True
+
+    def result(self, job_id: str) -> dict | None:
+        try:
+            with open(self._path("results", job_id), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def reclaim_expired(self) -> int:
+        """
+        Returns the jobs whose lease expired to the queue. Jobs that expired max_attempts times fail.
+
+        :return: The number of reclaimed leases.
+        """
+        count = 0
+        now = time.time()
+        for lease in (self._location / "leases").glob("*.json"):
+            try:
+                if now - lease.stat().st_mtime < self.lease_timeout:
+                    continue
+                # Only one of several concurrent reclaimers gets the lease.
+                reclaimed = self._location / f".reclaim-{uuid.uuid4().hex}"
+                os.rename(lease, reclaimed)
+            except FileNotFoundError:
+                continue
+            job_id = lease.stem.rsplit(".", 1)[0]
+            with open(reclaimed, "r") as f:
+                content = json.load(f)
+            content["attempts"] += 1
+            # A worker that was only slow may have finished the job in the meantime.
+            if self.result(job_id) is None:
+                if content["attempts"] >= self.max_attempts:
+                    self.complete(job_id, {"error": f"The lease expired {content['attempts']} times.", "worker": None})
+                else:
+                    logger.warning(f"Lease of job {job_id} expired, it is queued again")
+                    self.put(job_id, content)
+            reclaimed.unlink()
+            count += 1
+        return count
+
+    def stop(self):
+        """
+        Tells all workers to exit once their current job is done.
+        """
+        (self._location / "stop").touch()
+
+    @property
+    def stopped(self) -> bool:
+        return (self._location / "stop").exists()
+
+    def status(self) -> dict[str, int]:
+        return {name: len(list((self._location / name).glob("*.json"))) for name in ["jobs", "leases", "results"]}
+
+
+def _write_json(path: pathlib.Path, content: dict):
+    """
+    Writes the file atomically, such that readers on other hosts never see a partial file.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(content, f)
+    os.replace(tmp, path)
+
+
+class QueueRunner:
+    """
+    Runs a collection of (Tester, UmbBenchmark) jobs on the workers of a WorkQueue, like MatrixRunner runs them locally.
+
+    Only the chain, the limits of the tester and its tools, and the comparison setting are sent to the workers.
+    Everything else, e.g., the tool locations, caches and handoff, is taken from the tools.toml of the worker.
+    """
+
+    def __init__(self, location: pathlib.Path, lease_timeout=None, max_attempts=None, poll_interval=0.5, history=None):
+        """
+        :param location: The directory of the queue, which must be reachable by all workers.
+        :param lease_timeout: Seconds after which the job of a worker that did not renew its lease is run again. If none, WorkQueue.default_lease_timeout.
+        :param max_attempts: The number of times a job is started before it fails. If none, WorkQueue.default_max_attempts.
+        :param history: The DurationHistory used for scheduling. If none, MatrixRunner.default_history is used, and if that is none, jobs start in the given order.
+        """
+        self._queue = WorkQueue.create(location, lease_timeout, max_attempts)
+        self._poll_interval = poll_interval
+        self._history = MatrixRunner.default_history if history is None else history
+
+    @property
+    def queue(self) -> WorkQueue:
+        return self._queue
+
+    def submit(self, jobs: list[tuple[Tester, UmbBenchmark]]) -> list[str]:
+        """
+        Adds the jobs to the queue, longest first if there is a history.
+
+        :return: The ids of the jobs, in the order of the jobs.
+        """
+        order = list(range(len(jobs)))
+        if self._history is not None:
+            order = longest_first(order, [job_key(tester, benchmark) for tester, benchmark in jobs], self._history)
+        ids = [None] * len(jobs)
+        batch = uuid.uuid4().hex[:8]
+        for position, i in enumerate(order):
+            tester, benchmark = jobs[i]
+            content = job_to_dict(tester, benchmark)
+            self._queue.add_model(benchmark.location, content["benchmark"]["hash"])
+            # Workers claim jobs in the order of their ids.
+            ids[i] = f"{batch}-{position:06d}"
+            self._queue.put(ids[i], content)
+        return ids
+
+    def results(self, job_ids: list[str], timeout=None):
+        """
+        Yields the index and the results of every job as soon as a worker finished it.
+        A job that failed on the worker yields a RuntimeError.
+
+        :param timeout: Seconds after which waiting for the remaining jobs stops with a TimeoutError. If none, there is no timeout.
+        """
+        pending = dict(enumerate(job_ids))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while pending:
+            self._queue.reclaim_expired()
+            for index, job_id in list(pending.items()):
+                content = self._queue.result(job_id)
+                if content is None:
+                    continue
+                del pending[index]
+                if "error" in content:
+                    yield index, RuntimeError(f"Job {job_id} failed on worker {content['worker']}: {content['error']}")
+                else:
+                    yield index, results_from_dict(content["results"])
+            if pending:
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"{len(pending)} jobs did not finish in time")
+                time.sleep(self._poll_interval)
+
+    def run(self, jobs: list[tuple[Tester, UmbBenchmark]], return_exceptions=False, timeout=None):
+        """
+        Runs all jobs on the workers and returns their results in the order of the jobs, see MatrixRunner.run.
+        """
+        outcomes = [None] * len(jobs)
+        for index, outcome in self.results(self.submit(jobs), timeout):
+            outcomes[index] = outcome
+        return MatrixRunner(history=self._history)._collect(jobs, outcomes, return_exceptions)
+
+    def close(self):
+        self._queue.stop()
+
+
+class QueueWorker:
+    """
+    Runs the jobs of a WorkQueue, with the tools and settings of the local tools.toml.
+    """
+
+    def __init__(self, location: pathlib.Path, workers=1, idle_exit=None, poll_interval=1.0, tool_limits=None, trusted=False):
+        """
+        :param workers: The number of jobs that this worker runs at the same time.
+        :param trusted: Whether the jobs may run code of their choice, i.e., pickled tools, see tool_from_dict.
+        :param idle_exit: Seconds without jobs after which the worker exits. If none, the worker runs until the queue is stopped.
+        :param tool_limits: Maps tool names to the maximal number of concurrent invocations of that tool. If none, MatrixRunner.default_tool_limits is used.
+        """
+        self._queue = WorkQueue(location)
+        self._workers = workers
+        self._idle_exit = idle_exit
+        self._poll_interval = poll_interval
+        self._semaphores = {
+            name: threading.BoundedSemaphore(limit)
+            for name, limit in (MatrixRunner.default_tool_limits if tool_limits is None else tool_limits).items()
+        }
+        self._name = f"{socket.gethostname()}:{os.getpid()}"
+        self._trusted = trusted
+        self._lock = threading.Lock()
+        # Tools by their description, such that all jobs share one tool, e.g., one pool of warm PRISM workers.
+        self._tools = dict()
+        self.completed = 0
+
+    def run(self) -> int:
+        """
+        Runs jobs until the queue is stopped or the worker was idle for too long.
+        Tools with worker processes are closed before returning.
+
+        :return: The number of completed jobs.
+        """
+        threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(self._workers)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.close()
+        return self.completed
+
+    def close(self):
+        with self._lock:
+            tools, self._tools = list(self._tools.values()), dict()
+        for tool in tools:
+            if hasattr(tool, "close"):
+                tool.close()
+
+    def _loop(self):
+        idle_since = time.monotonic()
+        while not self._queue.stopped:
+            claimed = self._queue.claim()
+            if claimed is None:
+                self._queue.reclaim_expired()
+                if self._idle_exit is not None and time.monotonic() - idle_since > self._idle_exit:
+                    return
+                time.sleep(self._poll_interval)
+                continue
+            self._run_job(*claimed)
+            idle_since = time.monotonic()
+
+    def _run_job(self, job_id: str, lease: str, content: dict):
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(self._queue.lease_timeout / 3):
+                if not self._queue.renew(job_id, lease):
+                    logger.warning(f"Lost the lease of job {job_id}")
+                    return
+
+        renewer = threading.Thread(target=renew, daemon=True)
+        renewer.start()
+        try:
+            tester, benchmark = self._job(content)
+            logger.info(f"{self._name}: running {tester.id} on {benchmark.id}")
+            result = {"results": results_to_dict(_run_matrix_job(tester, benchmark, self._semaphores)), "worker": self._name}
+        except Exception:
+            result = {"error": traceback.format_exc(), "worker": self._name}
+        finally:
+            done.set()
+            renewer.join()
+        if not self._queue.complete(job_id, result, lease):
+            logger.warning(f"{self._name}: dropping the results of job {job_id}, as its lease expired and the job runs again")
+            return
+        with self._lock:
+            self.completed += 1
+
+    def _job(self, content: dict) -> tuple[Tester, UmbBenchmark]:
+        description = content["tester"]
+        tester = Tester(id=description["id"], limits=_limits_from_dict(description["limits"]), compare=description["compare"])
+        chain = {stage: None if tool is None else self._tool(tool) for stage, tool in description["chain"].items()}
+        tester.set_chain(**chain)
+        return tester, self._benchmark(content["benchmark"])
+
+    def _tool(self, description: dict):
+        key = json.dumps(description, sort_keys=True)
+        with self._lock:
+            if key not in self._tools:
+                self._tools[key] = tool_from_dict(description, self._trusted)
+            return self._tools[key]
+
+    def _benchmark(self, description: dict) -> UmbBenchmark:
+        """
+        The local benchmark with the same id and content, which has the metadata of the manifest, or else the copy in the queue.
+        """
+        for benchmark in prism_files:
+            if str(benchmark.id) == description["id"] and file_hash(benchmark.location) == description["hash"]:
+                return UmbBenchmark(benchmark.location, description["properties"], description["is_prism_file"], benchmark.manifest)
+        location = self._queue.model(description["hash"], description["name"])
+        return UmbBenchmark(location, description["properties"], description["is_prism_file"])
+
+
+def main():
+    from umbtest.benchmarks import configure_tester
+    from umbtest.tools import configure_umbtools
+
+    parser = argparse.ArgumentParser(description="Runs or inspects the jobs of a umbtest work queue in a shared directory.")
+    parser.add_argument("command", choices=["worker", "status", "stop"])
+    parser.add_argument("location", type=pathlib.Path)
+    parser.add_argument("--workers", type=int, default=None, help="Number of jobs run at the same time. Defaults to the workers of the runner in tools.toml.")
+    parser.add_argument("--idle-exit", type=float, default=None, help="Exit after this many seconds without jobs.")
+    parser.add_argument("--trust-queue", action="store_true", help="Load pickled tools from the jobs. Only use this if nobody else can write to the directory.")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(WorkQueue(args.location).status())
+        return
+    if args.command == "stop":
+        WorkQueue(args.location).stop()
+        return
+    logging.basicConfig(level=logging.INFO)
+    configure_umbtools()
+    configure_tester()
+    workers = args.workers
+    if workers is None:
+        workers = MatrixRunner.default_max_workers or os.cpu_count()
+    completed = QueueWorker(args.location, workers=workers, idle_exit=args.idle_exit, trusted=args.trust_queue).run()
+    print(f"Completed {completed} jobs")
+
+
+if __name__ == "__main__":
+    main()